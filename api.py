@@ -1,30 +1,77 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Request, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import pandas as pd
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 import call_tracker as ct
+import search_index
+import call_queue
+import coverage_planner
+import outbound
+import geo_index
+import change_journal
+import call_history
+from api.regions import extract_city
+from api.hours import HoursIndex, local_now
+from api.geo import place_location
+from api.metrics import CONTENT_TYPE, configure_logging, instrument, render as render_metrics
+from api import profiling
+from api.http_cache import response_cache
+from api import realtime
+from api import idempotency
+from status_normalizer import VALID_STATUSES, status_mask
+from business_schema import coerce_value, next_id, set_value, format_date
+import asyncio
+import functools
+import json
+import logging
 import os
-import traceback
+import threading
+import time
 from datetime import datetime
 from itertools import islice
 from urllib.parse import unquote
-from backend.database import (
-    get_all_businesses,
-    get_businesses_by_status,
-    update_business,
-    create_business,
-    get_all_meetings,
-    create_meeting,
-    update_meeting,
-    get_all_clients,
-    create_client,
-    update_client,
-    get_callbacks_due_today,
-    get_overdue_callbacks
-)
+try:
+    from backend.database import (
+        get_all_businesses,
+        get_businesses_by_status,
+        update_business,
+        create_business,
+        get_all_meetings,
+        create_meeting,
+        update_meeting,
+        get_all_clients,
+        create_client,
+        update_client,
+        get_callbacks_due_today,
+        get_overdue_callbacks
+    )
+except ImportError:
+    # Without backend/, use the Supabase functions the Vercel app uses
+    from api.database import (
+        get_all_businesses,
+        get_businesses_by_status,
+        update_business,
+        create_business,
+        get_all_meetings,
+        create_meeting,
+        update_meeting,
+        get_all_clients,
+        create_client,
+        update_client,
+        get_callbacks_due_today,
+        get_overdue_callbacks
+    )
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
+instrument(app)
+profiling.install(app)
 
 # Enable CORS
 app.add_middleware(
@@ -33,12 +80,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Places-Found", "X-Details-Calls", "X-Details-Saved", "X-Details-Saved-Ratio",
+                    "X-Profile-Id", "ETag"],
 )
 
-# Valid status values
-VALID_STATUSES = ['tocall', 'called', 'callback', 'dont_call', 'client', 'lead']
-
 class Business(BaseModel):
+    id: Optional[int] = None
     name: str
     phone: str
     address: str
@@ -60,6 +107,9 @@ class Business(BaseModel):
     best_time_to_call: str = ""
     decision_maker: str = ""
     next_action: str = ""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    place_id: str = ""
 
 class BusinessUpdate(BaseModel):
     name: Optional[str] = None
@@ -82,6 +132,8 @@ class BusinessUpdate(BaseModel):
     best_time_to_call: Optional[str] = None
     decision_maker: Optional[str] = None
     next_action: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class NewBusiness(BaseModel):
     name: str
@@ -94,10 +146,20 @@ class NewBusiness(BaseModel):
     region: str = ""
     hours: str = ""
     industry: str = "Restaurant"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    place_id: str = ""
 
 class BulkBusinessRequest(BaseModel):
     businesses: List[NewBusiness]
 
+class BatchOperation(BaseModel):
+    id: Union[int, str]  # business id (or name)
+    patch: BusinessUpdate
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
 class Meeting(BaseModel):
     id: Optional[str] = None
     business_name: str
@@ -130,6 +192,20 @@ class Client(BaseModel):
 class BusinessFilter(BaseModel):
     status: Optional[str] = None
 
+class CallEvent(BaseModel):
+    outcome: Optional[str] = None  # usually the status the call ended in
+    note: Optional[str] = None
+    duration_seconds: Optional[int] = None
+
+class NearbyBusiness(BaseModel):
+    business: Business
+    distance_m: float
+
+class QueuedBusiness(BaseModel):
+    business: Business
+    reason: str  # "callback" or "tocall"
+    lease_expires_at: str
+
 CLIENTS_FILE = "clients.xlsx"
 ENV_FILE = ".env"
 
@@ -183,12 +259,51 @@ def set_env_api_key(data: dict):
     ct.initialize_gmaps()
     return {"message": "API key updated"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: route latency, Excel/Places/VAPI timings, executor queues."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/api/admin/outbound")
+async def outbound_stats():
+    """Queue length, wait times and outcomes of the outbound call executors."""
+    return outbound.stats()
+
+@app.get("/api/admin/profiles")
+def list_profiles():
+    """Profiling settings and the captured request profiles, newest first."""
+    return {"settings": profiling.settings, "profiles": profiling.list_profiles()}
+
+@app.post("/api/admin/profiles/settings")
+def update_profiling(data: dict):
+    """Turn profiling on or off and set the sampled fraction of requests."""
+    try:
+        sample_rate = data.get("sample_rate")
+        return profiling.update_settings(enabled=data.get("enabled"),
+                                         sample_rate=float(sample_rate) if sample_rate is not None else None)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/profiles/{profile_id}")
+def download_profile(profile_id: str,
+                     format: str = Query("text", description="'text' for the top functions, 'pstats' for the raw file")):
+    """A captured profile: the top functions as text, or the raw pstats file."""
+    if format not in ("text", "pstats"):
+        raise HTTPException(status_code=400, detail="format must be 'text' or 'pstats'")
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(profile["pstats"], media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'})
+    return Response(profile["text"], media_type="text/plain")
+
 @app.get("/api/businesses", response_model=List[Business])
 async def get_all_businesses():
     try:
         return await get_all_businesses()
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_all_businesses failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/businesses/status/{status}", response_model=List[Business])
@@ -198,181 +313,550 @@ async def get_businesses_by_status(status: str):
     try:
         return await get_businesses_by_status(status)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_businesses_by_status failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Parsed opening hours of the current data, rebuilt only when the data changes
+_hours_cache = {}
+
+def _hours_index(df):
+    signature = change_journal.signature(ct.EXCEL_FILE)
+    cached = _hours_cache.get(ct.EXCEL_FILE)
+    if cached is None or cached[0] != signature or len(cached[1].codes) != len(df):
+        cached = _hours_cache[ct.EXCEL_FILE] = (signature, HoursIndex.from_text(df['Hours']))
+    return cached[1]
+
+# file path -> (change_journal.signature, {lowercase region: row labels})
+_region_cache = {}
+
+def _region_index(df):
+    """Rows of each region, keyed the way the region filter compares them; built once per data version."""
+    signature = change_journal.signature(ct.EXCEL_FILE)
+    cached = _region_cache.get(ct.EXCEL_FILE)
+    if cached is None or cached[0] != signature or cached[2] != len(df):
+        keys = df['Region'].astype(str).str.strip().str.lower()
+        rows = {key: df.index[positions] for key, positions in keys.groupby(keys, sort=False).indices.items()}
+        cached = _region_cache[ct.EXCEL_FILE] = (signature, rows, len(df))
+    return cached[1]
+
+def _open_within(open_now, open_within):
+    """Minutes ahead for the opening-hours filter, or None when not filtering."""
+    return open_within if open_within is not None else (0 if open_now else None)
+
+def _data_version():
+    """Changes whenever the Excel snapshot or its change journal does (ETags of cached lists)."""
+    return change_journal.signature(ct.EXCEL_FILE)
+
+def _filter_rows(status, region, industry, open_now, open_within, tz, order):
+    logger.debug("Filter: status=%s region=%s industry=%s", status, region, industry)
+    df = ct.load_data(ct.EXCEL_FILE)
+    if 'Hours' not in df.columns:
+        df['Hours'] = ''
+    if 'Industry' not in df.columns:
+        df['Industry'] = 'Restaurant'
+    logger.debug("Loaded %d businesses from Excel", len(df))
+    loaded = len(df)
+    everyone = df
+
+    within = _open_within(open_now, open_within)
+    if within is not None:
+        # Businesses with unknown hours are kept: only known-closed ones are dropped
+        df = df[_hours_index(df).open_mask(local_now(tz), within)]
+        logger.debug("After opening hours filter: %d businesses", len(df))
+    
+    if status and status.strip():
+        df = df[status_mask(df['Status'], status)]
+        logger.debug("After status filter: %d businesses", len(df))
+        
+    if region and region.strip():
+        # Region is derived from the address at ingest (see extract_cities.py)
+        rows = _region_index(everyone).get(region.strip().lower(), [])
+        df = df[df.index.isin(rows)]
+        logger.debug("After region filter: %d businesses", len(df))
+        
+    if industry and industry.strip():
+        industry_lower = industry.strip().lower()
+        df['industry_lower'] = df['Industry'].astype(str).str.lower().str.strip()
+        df = df[df['industry_lower'] == industry_lower]
+        logger.debug("After industry filter: %d businesses", len(df))
+    
+    if order == 'cluster':
+        # Call lists walk one neighbourhood at a time
+        _, geo = geo_index.get_index(ct.EXCEL_FILE, ct.load_data)
+        if geo.size == loaded:
+            df = df.loc[geo.cluster_order(df.index.to_numpy())]
+
+    businesses = [row_to_business(row) for _, row in df.iterrows()]
+    logger.debug("Returning %d businesses", len(businesses))
+    return businesses
+
 @app.get("/api/businesses/filter", response_model=List[Business])
 async def filter_businesses(
+    request: Request,
     status: Optional[str] = Query(None),
     region: Optional[str] = Query(None),
-    industry: Optional[str] = Query(None)
+    industry: Optional[str] = Query(None),
+    open_now: bool = Query(False, description="Only businesses open right now"),
+    open_within: Optional[int] = Query(None, ge=0, le=24 * 60, description="Only businesses open now or opening within this many minutes"),
+    tz: Optional[str] = Query(None, description="Time zone of the businesses (default BUSINESS_TIMEZONE or server time)"),
+    order: Optional[str] = Query(None, description="'cluster' puts neighbouring businesses next to each other")
 ):
     try:
-        print("\n\n===== FILTER ENDPOINT HIT =====")
-        print(f"Query parameters - status: {status}, region: {region}, industry: {industry}")
-        df = ct.load_data(ct.EXCEL_FILE)
-        if 'Hours' not in df.columns:
-            df['Hours'] = ''
-        if 'Industry' not in df.columns:
-            df['Industry'] = 'Restaurant'
-        print(f"Loaded {len(df)} businesses from Excel")
-        
-        if status and status.strip():
-            status_lower = status.strip().lower()
-            df['status_lower'] = df['Status'].astype(str).str.lower().str.strip()
-            df = df[df['status_lower'] == status_lower]
-            print(f"After status filter: {len(df)} businesses")
-            
-        if region and region.strip():
-            def extract_city(address):
-                if pd.isna(address):
-                    return ''
-                parts = str(address).split(',')
-                if len(parts) >= 2:
-                    return parts[1].strip()
-                return ''
-            df['city'] = df['Address'].apply(extract_city)
-            region_lower = region.strip().lower()
-            df = df[df['city'].str.lower() == region_lower]
-            print(f"After region filter: {len(df)} businesses")
-            
-        if industry and industry.strip():
-            industry_lower = industry.strip().lower()
-            df['industry_lower'] = df['Industry'].astype(str).str.lower().str.strip()
-            df = df[df['industry_lower'] == industry_lower]
-            print(f"After industry filter: {len(df)} businesses")
-        
-        businesses = []
-        for _, row in df.iterrows():
-            businesses.append(Business(
-                name=str(row['Name']),
-                phone=str(row['Number']) if not pd.isna(row['Number']) else "",
-                address=str(row['Address']) if not pd.isna(row['Address']) else "",
-                status=str(row['Status']) if not pd.isna(row['Status']) else "tocall",
-                comments=str(row['Comments']) if not pd.isna(row['Comments']) else "",
-                hours=str(row['Hours']) if not pd.isna(row['Hours']) else "",
-                industry=str(row['Industry']) if not pd.isna(row['Industry']) else "Restaurant"
-            ))
-        print(f"Returning {len(businesses)} businesses")
-        print("===== END FILTER ENDPOINT =====\n\n")
-        return businesses
+        # Opening-hours filters change with the clock, not the data, so they are not cached
+        version = None if _open_within(open_now, open_within) is not None else _data_version()
+        return await response_cache.respond(
+            request, 'local', version,
+            lambda: _filter_rows(status, region, industry, open_now, open_within, tz, order))
     except Exception as e:
-        print(f"ERROR in filter_businesses: {str(e)}")
-        traceback.print_exc()
+        logger.exception("filter_businesses failed")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/businesses/{name}")
-async def update_business(name: str, update: BusinessUpdate):
+def _text(row, column, default=""):
+    value = row.get(column, default)
+    if isinstance(value, pd.Timestamp):
+        return format_date(value)
+    return default if pd.isna(value) else str(value)
+
+def _int(row, column, default):
+    value = row.get(column, default)
+    return default if pd.isna(value) else int(value)
+
+def _float(row, column):
+    value = row.get(column)
+    return None if value is None or pd.isna(value) else float(value)
+
+def _with_location(rows):
+    """Coordinates for new rows that came without them, from the geocode cache."""
+    missing = [row for row in rows if row.get('Latitude') is None or row.get('Longitude') is None]
+    if missing:
+        cached = geo_index.lookup([row['Address'] for row in missing])
+        for row in missing:
+            row['Latitude'], row['Longitude'] = cached.get(geo_index.address_key(row['Address']), (None, None))
+    return rows
+
+def row_to_business(row):
+    """Build a Business response model from a DataFrame row."""
+    return Business(
+        id=_int(row, 'Id', None),
+        name=_text(row, 'Name'),
+        phone=_text(row, 'Number'),
+        address=_text(row, 'Address'),
+        status=_text(row, 'Status', "tocall"),
+        comments=_text(row, 'Comments'),
+        region=_text(row, 'Region'),
+        hours=_text(row, 'Hours'),
+        industry=_text(row, 'Industry', "Restaurant"),
+        callback_due_date=_text(row, 'CallbackDueDate'),
+        callback_due_time=_text(row, 'CallbackDueTime'),
+        callback_reason=_text(row, 'CallbackReason'),
+        callback_priority=_text(row, 'CallbackPriority', "Medium"),
+        callback_count=_int(row, 'CallbackCount', 0),
+        lead_score=_int(row, 'LeadScore', 5),
+        interest_level=_text(row, 'InterestLevel', "Unknown"),
+        best_time_to_call=_text(row, 'BestTimeToCall'),
+        decision_maker=_text(row, 'DecisionMaker'),
+        next_action=_text(row, 'NextAction'),
+        latitude=_float(row, 'Latitude'),
+        longitude=_float(row, 'Longitude'),
+        place_id=_text(row, 'PlaceId')
+    )
+
+def _journal_save(df, entries):
+    """Journal API changes and wake the realtime subscribers."""
+    ct.api_journal_save(df, entries)
+    realtime.hub.publish('local')
+
+def _changes_since(since):
+    cursor = change_journal.last_seq(ct.EXCEL_FILE)
+    if since is None or since > cursor:
+        df = ct.load_data(ct.EXCEL_FILE, copy=False)
+        return {"changes": [row_to_business(row) for _, row in df.iterrows()], "deleted": [],
+                "cursor": str(cursor), "has_more": False, "full": True}
+
+    # Entries before the frame, so the frame holds at least every change reported
+    touched_ids, touched_names = set(), {}
+    for entry in change_journal.entries_since(ct.EXCEL_FILE, since):
+        cursor = max(cursor, entry['seq'])
+        if entry.get('id') is not None:
+            touched_ids.add(entry['id'])
+            continue
+        # Journaled before businesses had ids
+        for name in (entry['name'], (entry.get('changes') or {}).get('Name')):
+            if name:
+                touched_names[change_journal.name_key(name)] = name
+    df = ct.load_data(ct.EXCEL_FILE, copy=False)
+    keys = df['Name'].astype(str).str.strip().str.lower()
+    changed = df[df['Id'].isin(touched_ids) | keys.isin(touched_names)]
+    present_ids, present_keys = set(changed['Id']), set(keys[changed.index])
+    deleted = sorted(touched_ids - present_ids) + \
+        [name for key, name in touched_names.items() if key not in present_keys]
+    return {"changes": [row_to_business(row) for _, row in changed.iterrows()], "deleted": deleted,
+            "cursor": str(cursor), "has_more": False, "full": False}
+
+@app.get("/api/businesses/changes")
+async def business_changes(since: Optional[int] = Query(None, ge=0, description="cursor from the previous response")):
+    """
+    Businesses changed through the API since the cursor (a change journal
+    sequence number), plus the ids of those deleted (names, for changes
+    journaled before businesses had ids, also list renamed ones). Without
+    since, or with a cursor this journal never issued, every business
+    ("full": true). Changes saved by the CLI bypass the journal and only show
+    up in a full sync.
+    """
+    try:
+        return _changes_since(since)
+    except Exception as e:
+        logger.exception("business_changes failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.websocket("/api/ws/businesses")
+async def business_updates(websocket: WebSocket, since: Optional[int] = Query(None, ge=0)):
+    """
+    Push business changes as they are journaled. Each message has the body of
+    GET /api/businesses/changes; reconnect with since=<last cursor> to resume.
+    Without since the stream starts at the latest change.
+    """
+    await websocket.accept()
+    subscription = realtime.hub.subscribe('local')
+    cursor = since if since is not None else change_journal.last_seq(ct.EXCEL_FILE)
+    # Client messages are ignored; receiving them is how a disconnect is noticed
+    receiving = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            delta = await run_in_threadpool(_changes_since, cursor)
+            cursor = int(delta["cursor"])
+            if delta["changes"] or delta["deleted"]:
+                await websocket.send_json(jsonable_encoder(delta))
+            waiting = asyncio.ensure_future(subscription.wait())
+            done, _ = await asyncio.wait({receiving, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            if receiving in done:
+                waiting.cancel()
+                if receiving.result()["type"] == "websocket.disconnect":
+                    return
+                receiving = asyncio.ensure_future(websocket.receive())
+    except Exception:
+        logger.exception("business_updates failed")
+    finally:
+        receiving.cancel()
+        subscription.close()
+
+@app.get("/api/businesses/near", response_model=List[NearbyBusiness])
+async def businesses_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(1000, gt=0, le=100000, description="Search radius in meters"),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, gt=0, le=500)
+):
+    """Businesses within radius meters of a point, nearest first."""
+    try:
+        df, index = geo_index.get_index(ct.EXCEL_FILE, ct.load_data)
+        hits = index.near(lat, lng, radius)
+        if status:
+            statuses = df['Status'].iloc[[position for position, _ in hits]]
+            hits = [hit for hit, keep in zip(hits, status_mask(statuses, status)) if keep]
+        return [NearbyBusiness(business=row_to_business(df.iloc[position]), distance_m=round(distance, 1))
+                for position, distance in hits[:limit]]
+    except Exception as e:
+        logger.exception("businesses_near failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/businesses/query", response_model=List[Business])
+async def query_businesses(
+    q: str = Query(..., min_length=1, description="Search text (name, address, comments, decision maker)"),
+    limit: int = Query(50, gt=0, le=500, description="Maximum number of results")
+):
+    """Ranked, typo-tolerant search over the local businesses list."""
+    try:
+        df, index = search_index.get_index(ct.EXCEL_FILE, ct.load_data)
+        return [row_to_business(df.iloc[position]) for position, _ in index.search(q, limit)]
+    except Exception as e:
+        logger.exception("query_businesses failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+PRIORITIES = ['High', 'Medium', 'Low']
+INTEREST_LEVELS = ['High', 'Medium', 'Low', 'Unknown']
+
+def _update_errors(update: BusinessUpdate):
+    """What is wrong with an update, before anything is written ([] if nothing)."""
+    errors = []
+    if update.status and update.status not in VALID_STATUSES:
+        errors.append(f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+    if update.callback_due_date is not None:
+        try:
+            coerce_value('CallbackDueDate', update.callback_due_date)
+        except ValueError:
+            errors.append("Callback due date must be YYYY-MM-DD")
+    if update.callback_priority is not None and update.callback_priority not in PRIORITIES:
+        errors.append("Priority must be High, Medium, or Low")
+    if update.lead_score is not None and not (1 <= update.lead_score <= 10):
+        errors.append("Lead score must be between 1 and 10")
+    if update.interest_level is not None and update.interest_level not in INTEREST_LEVELS:
+        errors.append("Interest level must be High, Medium, Low, or Unknown")
+    return errors
+
+def _apply_update(df, row_mask, update: BusinessUpdate, today):
+    """Apply a validated update to the masked rows of df."""
+    if update.status:
+        df.loc[row_mask, 'Status'] = update.status
+        if update.status == "called":
+            set_value(df, row_mask, 'LastCalledDate', today)
+        elif update.status == "callback":
+            set_value(df, row_mask, 'LastCallbackDate', today)
+
+    if update.comments is not None:
+        df.loc[row_mask, 'Comments'] = update.comments
+
+    if update.name is not None:
+        df.loc[row_mask, 'Name'] = update.name
+
+    if update.phone is not None:
+        df.loc[row_mask, 'Number'] = update.phone
+
+    if update.address is not None:
+        df.loc[row_mask, 'Address'] = update.address
+        if update.region is None:
+            df.loc[row_mask, 'Region'] = extract_city(update.address)
+        if update.latitude is None or update.longitude is None:
+            # Old coordinates belong to the old address
+            location = _with_location([{'Address': update.address}])[0]
+            set_value(df, row_mask, 'Latitude', location['Latitude'])
+            set_value(df, row_mask, 'Longitude', location['Longitude'])
+
+    if update.latitude is not None and update.longitude is not None:
+        set_value(df, row_mask, 'Latitude', update.latitude)
+        set_value(df, row_mask, 'Longitude', update.longitude)
+
+    if update.region is not None:
+        df.loc[row_mask, 'Region'] = update.region
+
+    if update.hours is not None:
+        df.loc[row_mask, 'Hours'] = update.hours
+
+    if update.industry is not None:
+        set_value(df, row_mask, 'Industry', update.industry or 'Restaurant')
+
+    # Handle enhanced callback tracking fields
+    if update.callback_due_date is not None:
+        set_value(df, row_mask, 'CallbackDueDate', update.callback_due_date)
+
+    if update.callback_due_time is not None:
+        df.loc[row_mask, 'CallbackDueTime'] = update.callback_due_time
+
+    if update.callback_reason is not None:
+        df.loc[row_mask, 'CallbackReason'] = update.callback_reason
+
+    if update.callback_priority is not None:
+        set_value(df, row_mask, 'CallbackPriority', update.callback_priority)
+
+    if update.callback_count is not None:
+        set_value(df, row_mask, 'CallbackCount', update.callback_count)
+
+    if update.lead_score is not None:
+        set_value(df, row_mask, 'LeadScore', update.lead_score)
+
+    if update.interest_level is not None:
+        set_value(df, row_mask, 'InterestLevel', update.interest_level)
+
+    if update.best_time_to_call is not None:
+        df.loc[row_mask, 'BestTimeToCall'] = update.best_time_to_call
+
+    if update.decision_maker is not None:
+        df.loc[row_mask, 'DecisionMaker'] = update.decision_maker
+
+    if update.next_action is not None:
+        df.loc[row_mask, 'NextAction'] = update.next_action
+
+def _changed_columns(before, after):
+    """{column: new value} for the columns of a row that an update changed."""
+    return {column: after[column].iloc[0] for column in after.columns
+            if column in before.columns and not after[column].equals(before[column])}
+
+def _record_update(business_id, changes, actor):
+    """Side effect of a journaled update: a new note or outcome is a call event (Comments keeps only the latest note)."""
+    if 'Comments' in changes or 'Status' in changes:
+        call_history.record_event(int(business_id), outcome=changes.get('Status'), note=changes.get('Comments'),
+                                  actor=actor)
+
+def _find_business(df, business_id):
+    """
+    Row label (for df.loc) of a business by id, or by URL-encoded name for
+    older clients. 404 when nothing matches; 409 when the name is shared by
+    several businesses, which only their ids tell apart.
+    """
+    business_id = unquote(str(business_id))
+    rows = ct.find_rows(df, business_id)
+    if rows.empty:
+        raise HTTPException(status_code=404, detail=f"Business not found: '{business_id}'")
+    if len(rows) > 1:
+        ids = ', '.join(str(row_id) for row_id in df.loc[rows, 'Id'])
+        raise HTTPException(status_code=409, detail=f"{len(rows)} businesses are named '{business_id}' (ids {ids}); use the id")
+    return rows
+
+def _history_key(df, business_id):
+    """
+    What call history is kept under: the business's Id. Deleted businesses
+    keep their history, so an unknown id is used as is; an unknown name only
+    finds events recorded before businesses had ids.
+    """
+    try:
+        return int(df.loc[_find_business(df, business_id)[0], 'Id'])
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+    business_id = unquote(business_id).strip()
+    return int(business_id) if business_id.isdigit() else business_id
+
+def _update_entries(before, after, changes, actor):
+    """One journal entry per updated row, keyed by its id."""
+    return [change_journal.make_entry('update', name, changes, actor, business_id)
+            for name, business_id in zip(before['Name'], after['Id'])]
+
+@app.put("/api/businesses/{business_id}")
+async def update_business(business_id: str, update: BusinessUpdate, x_caller: Optional[str] = Header(None)):
     try:
-        # Properly decode URL-encoded business name
-        decoded_name = unquote(name)
-        print(f"PUT request for business: '{name}' -> decoded: '{decoded_name}'")
-        
         df = ct.load_data(ct.EXCEL_FILE)
-        # Robust name matching: ignore case and whitespace
-        name_clean = decoded_name.strip().lower()
-        df['Name_clean'] = df['Name'].astype(str).str.strip().str.lower()
-        
-        print(f"Looking for name_clean: '{name_clean}'")
-        print(f"Available names: {df['Name_clean'].tolist()[:10]}...")  # Show first 10 for debugging
-        
-        if name_clean not in df['Name_clean'].values:
-            raise HTTPException(status_code=404, detail=f"Business not found: '{decoded_name}'")
-        row_mask = df['Name_clean'] == name_clean
+        row_mask = _find_business(df, business_id)
+        errors = _update_errors(update)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0])
 
         # Ensure date columns exist
         df = ct.ensure_date_columns(df)
-        today_str = datetime.now().strftime('%Y-%m-%d')
-
-        if update.status:
-            if update.status not in VALID_STATUSES:
-                raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
-            # Use robust mask for status changes
-            if update.status == "called":
-                df.loc[row_mask, 'Status'] = 'called'
-                df.loc[row_mask, 'LastCalledDate'] = today_str
-            elif update.status == "callback":
-                df.loc[row_mask, 'Status'] = 'callback'
-                df.loc[row_mask, 'LastCallbackDate'] = today_str
-            elif update.status == "dont_call":
-                df.loc[row_mask, 'Status'] = 'dont_call'
-            elif update.status == "tocall":
-                df.loc[row_mask, 'Status'] = 'tocall'
-            elif update.status == "client":
-                df.loc[row_mask, 'Status'] = 'client'
-            elif update.status == "lead":
-                df.loc[row_mask, 'Status'] = 'lead'
-
-        if update.comments is not None:
-            df.loc[row_mask, 'Comments'] = update.comments
-
-        if update.name is not None:
-            df.loc[row_mask, 'Name'] = update.name
-
-        if update.phone is not None:
-            df.loc[row_mask, 'Number'] = update.phone
-
-        if update.address is not None:
-            df.loc[row_mask, 'Address'] = update.address
-
-        if update.hours is not None:
-            df.loc[row_mask, 'Hours'] = update.hours
-
-        if update.industry is not None:
-            # Ensure Industry column exists
-            if 'Industry' not in df.columns:
-                df['Industry'] = 'Restaurant'
-            df.loc[row_mask, 'Industry'] = update.industry
-
-        # Handle enhanced callback tracking fields
-        if update.callback_due_date is not None:
-            df.loc[row_mask, 'CallbackDueDate'] = update.callback_due_date
-        
-        if update.callback_due_time is not None:
-            df.loc[row_mask, 'CallbackDueTime'] = update.callback_due_time
-        
-        if update.callback_reason is not None:
-            df.loc[row_mask, 'CallbackReason'] = update.callback_reason
-        
-        if update.callback_priority is not None:
-            if update.callback_priority not in ['High', 'Medium', 'Low']:
-                raise HTTPException(status_code=400, detail="Priority must be High, Medium, or Low")
-            df.loc[row_mask, 'CallbackPriority'] = update.callback_priority
-        
-        if update.callback_count is not None:
-            df.loc[row_mask, 'CallbackCount'] = update.callback_count
-        
-        if update.lead_score is not None:
-            if not (1 <= update.lead_score <= 10):
-                raise HTTPException(status_code=400, detail="Lead score must be between 1 and 10")
-            df.loc[row_mask, 'LeadScore'] = update.lead_score
-        
-        if update.interest_level is not None:
-            if update.interest_level not in ['High', 'Medium', 'Low', 'Unknown']:
-                raise HTTPException(status_code=400, detail="Interest level must be High, Medium, Low, or Unknown")
-            df.loc[row_mask, 'InterestLevel'] = update.interest_level
-        
-        if update.best_time_to_call is not None:
-            df.loc[row_mask, 'BestTimeToCall'] = update.best_time_to_call
-        
-        if update.decision_maker is not None:
-            df.loc[row_mask, 'DecisionMaker'] = update.decision_maker
-        
-        if update.next_action is not None:
-            df.loc[row_mask, 'NextAction'] = update.next_action
+        before = df.loc[row_mask].copy()
+        _apply_update(df, row_mask, update, pd.Timestamp.now().normalize())
+
+        # Journal only the columns that actually changed
+        after = df.loc[row_mask]
+        changes = _changed_columns(before, after)
+        if changes:
+            _journal_save(df, _update_entries(before, after, changes, x_caller))
+            _record_update(after['Id'].iloc[0], changes, x_caller)
 
-        df = df.drop(columns=['Name_clean'])
-        ct.api_direct_save(df)
-            
         return {"message": "Business updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("update_business failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Operations per POST /api/businesses/batch
+BATCH_LIMIT = 1000
+
+@app.post("/api/businesses/batch")
+async def batch_update(
+    batch: BatchRequest,
+    idempotency_key: Optional[str] = Header(None),
+    x_caller: Optional[str] = Header(None)
+):
+    """
+    Apply many updates in one journal write. Every operation is checked first;
+    if any is invalid or names an unknown business nothing is applied (422).
+    A retry with the same Idempotency-Key returns the first result.
+    """
+    if not 0 < len(batch.operations) <= BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {BATCH_LIMIT} operations")
+    digest = idempotency.fingerprint(batch.model_dump(exclude_unset=True))
+    if idempotency_key:
+        try:
+            previous = idempotency.store.begin('local', idempotency_key, digest)
+        except idempotency.IdempotencyConflict as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if previous is not None:
+            return dict(previous, replayed=True)
+    try:
+        df = ct.ensure_date_columns(ct.load_data(ct.EXCEL_FILE))
+        today = pd.Timestamp.now().normalize()
+        results, entries, updated = [], [], []
+        for index, operation in enumerate(batch.operations):
+            errors = _update_errors(operation.patch)
+            try:
+                row_mask = _find_business(df, operation.id)
+            except HTTPException as e:
+                errors.insert(0, e.detail)
+            result = {"index": index, "id": operation.id, "ok": not errors}
+            if errors:
+                results.append(dict(result, error="; ".join(errors)))
+                continue
+            # Later operations see the earlier ones, so one batch can rename and then update
+            before = df.loc[row_mask].copy()
+            _apply_update(df, row_mask, operation.patch, today)
+            after = df.loc[row_mask]
+            changes = _changed_columns(before, after)
+            if changes:
+                entries.extend(_update_entries(before, after, changes, x_caller))
+                updated.append((after['Id'].iloc[0], changes))
+            results.append(dict(result, changed=bool(changes), business=row_to_business(after.iloc[0])))
+
+        if not all(result["ok"] for result in results):
+            if idempotency_key:
+                idempotency.store.release('local', idempotency_key)
+            return JSONResponse(status_code=422, content=jsonable_encoder(
+                {"applied": False, "replayed": False, "results": results}))
+        if entries:
+            _journal_save(df, entries)
+            for business_id, changes in updated:
+                _record_update(business_id, changes, x_caller)
+        response = jsonable_encoder({"applied": True, "replayed": False, "results": results})
+        if idempotency_key:
+            idempotency.store.finish('local', idempotency_key, digest, response)
+        return response
+    except Exception as e:
+        if idempotency_key:
+            idempotency.store.release('local', idempotency_key)
+        logger.exception("batch_update failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/businesses/{business_id}/history")
+async def get_business_history(
+    business_id: str,
+    limit: int = Query(call_history.PAGE_SIZE, gt=0, le=200),
+    before: Optional[int] = Query(None, description="next_before from the previous page")
+):
+    """Call history of a business, newest first, one page at a time."""
+    try:
+        key = _history_key(ct.load_data(ct.EXCEL_FILE, copy=False), business_id)
+        return call_history.get_history(key, limit, before)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("get_business_history failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/businesses/{business_id}/history")
+async def log_call(business_id: str, event: CallEvent, x_caller: Optional[str] = Header(None)):
+    """Record a call. The note becomes the business's Comments; a status outcome updates Status."""
+    try:
+        if event.outcome is not None and event.outcome not in VALID_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Invalid outcome. Must be one of: {', '.join(VALID_STATUSES)}")
+        df = ct.load_data(ct.EXCEL_FILE)
+        row_mask = _find_business(df, business_id)
+
+        rows = df.loc[row_mask]
+        recorded = call_history.record_event(int(rows['Id'].iloc[0]), event.outcome, event.note,
+                                             event.duration_seconds, actor=x_caller)
+        changes = {}
+        if event.note:
+            changes['Comments'] = f"{recorded['occurred_at'][:16]}: {event.note}"
+        if event.outcome:
+            changes['Status'] = event.outcome
+            if event.outcome == 'called':
+                changes['LastCalledDate'] = pd.Timestamp.now().normalize()
+            elif event.outcome == 'callback':
+                changes['LastCallbackDate'] = pd.Timestamp.now().normalize()
+        for column, value in changes.items():
+            set_value(df, row_mask, column, value)
+        if changes:
+            _journal_save(df, _update_entries(rows, rows, changes, x_caller))
+        return recorded
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("log_call failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/businesses")
-async def add_business(business: NewBusiness):
+async def add_business(business: NewBusiness, x_caller: Optional[str] = Header(None)):
     try:
         if business.status not in VALID_STATUSES:
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
@@ -380,80 +864,99 @@ async def add_business(business: NewBusiness):
         if business.name in df['Name'].values:
             raise HTTPException(status_code=400, detail="Business already exists")
         # Add new business
-        new_row = pd.DataFrame({
-            'Name': [business.name],
-            'Number': [business.phone],
-            'Address': [business.address],
-            'Status': [business.status],
-            'Comments': [business.comments],
-            'Hours': [business.hours],
-            'Industry': [business.industry if business.industry else 'Restaurant']
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        ct.api_direct_save(df)
-        return {"message": "Business added successfully"}
+        new_row = {
+            'Id': next_id(df),
+            'Name': business.name,
+            'Number': business.phone,
+            'Address': business.address,
+            'Status': business.status,
+            'Comments': business.comments,
+            'Region': business.region or extract_city(business.address),
+            'Hours': business.hours,
+            'Industry': business.industry if business.industry else 'Restaurant',
+            'Latitude': business.latitude,
+            'Longitude': business.longitude,
+            'PlaceId': business.place_id
+        }
+        _with_location([new_row])
+        df = change_journal.insert_rows(df, [new_row])
+        entry = change_journal.make_entry('insert', business.name, new_row, x_caller, new_row['Id'])
+        _journal_save(df, [entry])
+        return {"message": "Business added successfully", "id": new_row['Id']}
     except HTTPException:
         raise
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("add_business failed")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/businesses/{name}")
-async def delete_business(name: str):
+@app.delete("/api/businesses/{business_id}")
+async def delete_business(business_id: str, x_caller: Optional[str] = Header(None)):
     try:
         df = ct.load_data(ct.EXCEL_FILE)
         
         # Check if business exists
-        if name not in df['Name'].values:
-            raise HTTPException(status_code=404, detail="Business not found")
+        rows = _find_business(df, business_id)
         
         # Remove the business
-        df = df[df['Name'] != name]
-        ct.api_direct_save(df)
+        entries = [change_journal.make_entry('delete', name, actor=x_caller, business_id=row_id)
+                   for name, row_id in zip(df.loc[rows, 'Name'], df.loc[rows, 'Id'])]
+        df = df.drop(index=rows).reset_index(drop=True)
+        _journal_save(df, entries)
         
         return {"message": "Business deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("delete_business failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/businesses/bulk")
-async def add_businesses_bulk(request: BulkBusinessRequest):
+async def add_businesses_bulk(request: BulkBusinessRequest, x_caller: Optional[str] = Header(None)):
     try:
         df = ct.load_data(ct.EXCEL_FILE)
         added_count = 0
         errors = []
+        new_rows = []
+        names = set(df['Name'])
+        new_id = next_id(df)
         for business in request.businesses:
             try:
                 if business.status not in VALID_STATUSES:
                     errors.append(f"Invalid status for {business.name}. Must be one of: {', '.join(VALID_STATUSES)}")
                     continue
-                if business.name in df['Name'].values:
+                if business.name in names:
                     errors.append(f"Business {business.name} already exists")
                     continue
-                new_row = pd.DataFrame({
-                    'Name': [business.name],
-                    'Number': [business.phone],
-                    'Address': [business.address],
-                    'Status': [business.status],
-                    'Comments': [business.comments],
-                    'Hours': [business.hours],
-                    'Industry': [business.industry if business.industry else 'Restaurant']
+                new_rows.append({
+                    'Id': new_id + len(new_rows),
+                    'Name': business.name,
+                    'Number': business.phone,
+                    'Address': business.address,
+                    'Status': business.status,
+                    'Comments': business.comments,
+                    'Region': business.region or extract_city(business.address),
+                    'Hours': business.hours,
+                    'Industry': business.industry if business.industry else 'Restaurant',
+                    'Latitude': business.latitude,
+                    'Longitude': business.longitude,
+                    'PlaceId': business.place_id
                 })
-                df = pd.concat([df, new_row], ignore_index=True)
+                names.add(business.name)
                 added_count += 1
             except Exception as e:
                 errors.append(f"Error adding {business.name}: {str(e)}")
         if added_count > 0:
-            ct.api_direct_save(df)
+            _with_location(new_rows)
+            df = change_journal.insert_rows(df, new_rows)
+            entries = [change_journal.make_entry('insert', row['Name'], row, x_caller, row['Id']) for row in new_rows]
+            _journal_save(df, entries)
         return {
             "message": f"Added {added_count} businesses successfully",
             "added_count": added_count,
             "errors": errors
         }
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("add_businesses_bulk failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Meeting endpoints
@@ -462,7 +965,7 @@ async def get_all_meetings():
     try:
         return await get_all_meetings()
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_all_meetings failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/meetings", response_model=Meeting)
@@ -470,7 +973,7 @@ async def create_meeting(meeting: MeetingCreate):
     try:
         return await create_meeting(meeting)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("create_meeting failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/meetings/{meeting_id}")
@@ -478,7 +981,7 @@ async def update_meeting(meeting_id: str, update: MeetingUpdate):
     try:
         return await update_meeting(meeting_id, update)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("update_meeting failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/clients", response_model=List[Client])
@@ -486,7 +989,7 @@ async def get_clients():
     try:
         return await get_all_clients()
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_clients failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/clients")
@@ -494,7 +997,7 @@ async def add_client(client: Client):
     try:
         return await create_client(client)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("add_client failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/clients/{name}")
@@ -502,30 +1005,25 @@ async def update_client(name: str, client: Client):
     try:
         return await update_client(name, client)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("update_client failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/businesses/lookup")
-async def lookup_business(name: str = Query(..., description="Business name to look up")):
+async def lookup_business(request: Request, name: str = Query(..., description="Business name to look up")):
     try:
         # Get basic details
-        phone, address = ct.get_business_details_online(name)
+        phone, address = await outbound.places.run(ct.get_business_details_online, name, request=request)
         
         # Get hours from Google Places API
         try:
-            print(f"\n🔍 Making Places API call for business lookup: {name}")
-            results = ct.gmaps.places(
-                query=name,
-                type='business'
-            )
+            logger.debug("Places API call for business lookup: %s", name)
+            results = await outbound.places.run(ct.gmaps.places, query=name, type='business', request=request)
             
             hours = ""
             if results['status'] == 'OK' and results.get('results'):
                 place_id = results['results'][0]['place_id']
-                details = ct.gmaps.place(
-                    place_id=place_id,
-                    fields=['opening_hours']
-                )
+                details = await outbound.places.run(ct.gmaps.place, place_id=place_id, fields=['opening_hours'],
+                                                    request=request)
                 
                 if 'opening_hours' in details.get('result', {}) and 'weekday_text' in details['result']['opening_hours']:
                     hours = ' | '.join(details['result']['opening_hours']['weekday_text'])
@@ -536,8 +1034,10 @@ async def lookup_business(name: str = Query(..., description="Business name to l
                 "address": address,
                 "hours": hours
             }
+        except (outbound.Overloaded, outbound.Cancelled):
+            raise
         except Exception as e:
-            print(f"Error fetching hours: {str(e)}")
+            logger.warning("Error fetching hours for %s: %s", name, e)
             return {
                 "name": name,
                 "phone": phone,
@@ -545,7 +1045,7 @@ async def lookup_business(name: str = Query(..., description="Business name to l
                 "hours": ""
             }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _outbound_error(e) or HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/callbacks/due-today", response_model=List[Business])
 async def get_callbacks_due_today():
@@ -553,7 +1053,7 @@ async def get_callbacks_due_today():
     try:
         return await get_callbacks_due_today()
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_callbacks_due_today failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/callbacks/overdue", response_model=List[Business])
@@ -562,128 +1062,353 @@ async def get_overdue_callbacks():
     try:
         return await get_overdue_callbacks()
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_overdue_callbacks failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/callbacks/priority/{priority}", response_model=List[Business])
-async def get_callbacks_by_priority(priority: str):
+async def get_callbacks_by_priority(priority: str, request: Request):
     """Get callbacks by priority level (High, Medium, Low)."""
     if priority not in ['High', 'Medium', 'Low']:
         raise HTTPException(status_code=400, detail="Priority must be High, Medium, or Low")
-    
-    try:
+
+    def rows():
         df = ct.load_data(ct.EXCEL_FILE)
-        status_mask = df['Status'].str.lower().str.strip() == "callback"
-        priority_mask = df['CallbackPriority'].str.lower() == priority.lower()
-        filtered_df = df[status_mask & priority_mask]
-        
-        businesses = []
-        for _, row in filtered_df.iterrows():
-            businesses.append(Business(
-                name=str(row['Name']),
-                phone=str(row['Number']) if not pd.isna(row['Number']) else "",
-                address=str(row['Address']) if not pd.isna(row['Address']) else "",
-                status=str(row['Status']) if not pd.isna(row['Status']) else "callback",
-                comments=str(row['Comments']) if not pd.isna(row['Comments']) else "",
-                hours=str(row['Hours']) if not pd.isna(row['Hours']) else "",
-                industry=str(row['Industry']) if not pd.isna(row['Industry']) else "Restaurant",
-                callback_due_date=str(row.get('CallbackDueDate', '')) if not pd.isna(row.get('CallbackDueDate', '')) else "",
-                callback_due_time=str(row.get('CallbackDueTime', '')) if not pd.isna(row.get('CallbackDueTime', '')) else "",
-                callback_reason=str(row.get('CallbackReason', '')) if not pd.isna(row.get('CallbackReason', '')) else "",
-                callback_priority=str(row.get('CallbackPriority', 'Medium')) if not pd.isna(row.get('CallbackPriority', 'Medium')) else "Medium",
-                callback_count=int(row.get('CallbackCount', 0)) if not pd.isna(row.get('CallbackCount', 0)) else 0,
-                lead_score=int(row.get('LeadScore', 5)) if not pd.isna(row.get('LeadScore', 5)) else 5,
-                interest_level=str(row.get('InterestLevel', 'Unknown')) if not pd.isna(row.get('InterestLevel', 'Unknown')) else "Unknown",
-                best_time_to_call=str(row.get('BestTimeToCall', '')) if not pd.isna(row.get('BestTimeToCall', '')) else "",
-                decision_maker=str(row.get('DecisionMaker', '')) if not pd.isna(row.get('DecisionMaker', '')) else "",
-                next_action=str(row.get('NextAction', '')) if not pd.isna(row.get('NextAction', '')) else ""
-            ))
-        
-        return businesses
+        callback_mask = status_mask(df['Status'], "callback")
+        priority_mask = df['CallbackPriority'] == priority
+        filtered_df = df[callback_mask & priority_mask]
+        return [row_to_business(row) for _, row in filtered_df.iterrows()]
+
+    try:
+        return await response_cache.respond(request, 'local', _data_version(), rows)
+    except Exception as e:
+        logger.exception("get_callbacks_by_priority failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _call_queue():
+    # The queue only reads the frame, so it can share load_data's cached one
+    return call_queue.get_queue(ct.EXCEL_FILE, lambda path: ct.load_data(path, copy=False))
+
+@app.get("/api/queue/next", response_model=List[QueuedBusiness])
+async def next_in_queue(
+    n: int = Query(1, gt=0, le=50, description="How many businesses to lease"),
+    lease_seconds: int = Query(call_queue.LEASE_SECONDS, gt=0, le=4 * 3600),
+    caller: Optional[str] = Query(None, description="Caller name if the X-Caller header is not sent"),
+    open_now: bool = Query(False, description="Only businesses open right now"),
+    open_within: Optional[int] = Query(None, ge=0, le=24 * 60, description="Only businesses open now or opening within this many minutes"),
+    tz: Optional[str] = Query(None, description="Time zone of the businesses (default BUSINESS_TIMEZONE or server time)"),
+    x_caller: Optional[str] = Header(None)
+):
+    """
+    Lease the next businesses to dial: due callbacks first, then the best
+    leads. Leased businesses are not handed to anyone else until the lease
+    runs out, the caller releases them or their status changes.
+    """
+    caller = x_caller or caller
+    if not caller:
+        raise HTTPException(status_code=400, detail="Send the X-Caller header (or caller) to lease businesses")
+    try:
+        df, queue = _call_queue()
+        within = _open_within(open_now, open_within)
+        picked = queue.next(n, caller, lease_seconds, open_at=None if within is None else local_now(tz),
+                            open_within=within or 0)
+        return [QueuedBusiness(business=row_to_business(df.iloc[queue.positions[key]]), reason=reason,
+                               lease_expires_at=expires.isoformat(timespec='seconds'))
+                for key, reason, expires in picked]
+    except Exception as e:
+        logger.exception("next_in_queue failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/queue/{business_id}/release")
+async def release_lease(business_id: str, caller: Optional[str] = Query(None), x_caller: Optional[str] = Header(None)):
+    """Put a leased business back into the queue without changing it."""
+    try:
+        df, queue = _call_queue()
+        rows = _find_business(df, business_id)
+        if not queue.release(int(df.loc[rows[0], 'Id']), x_caller or caller):
+            raise HTTPException(status_code=404, detail="No lease on this business for this caller")
+        return {"message": "Lease released"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("release_lease failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/queue")
+async def queue_status(caller: Optional[str] = Query(None), x_caller: Optional[str] = Header(None)):
+    """Queue sizes, plus the leases held by the caller when one is given."""
+    try:
+        df, queue = _call_queue()
+        caller = x_caller or caller
+        status = queue.stats()
+        if caller:
+            status['leases'] = [{"name": _text(df.iloc[queue.positions[key]], 'Name'),
+                                 "lease_expires_at": expires.isoformat(timespec='seconds')}
+                                for key, (_, expires) in queue.leases(caller).items() if key in queue.positions]
+        return status
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("queue_status failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _outbound_error(e):
+    """The HTTPException for an outbound executor error, or None for any other error."""
+    if isinstance(e, outbound.Overloaded):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    if isinstance(e, outbound.DeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, outbound.Cancelled):
+        return HTTPException(status_code=499, detail=str(e))
+    return None
+
+def _text_search(gmaps, search_query, stats):
+    """Places from every page of a text search (at most 60)."""
+    page_token = None
+    while True:
+        logger.debug("Places API call for search: %s (page_token: %s)", search_query, page_token)
+        results = gmaps.places(
+            query=search_query,
+            type='business',
+            page_token=page_token
+        )
+        stats['requests'] += 1
+        if results['status'] != 'OK' or not results.get('results'):
+            return
+        yield from results.get('results', [])
+        page_token = results.get('next_page_token')
+        if not page_token:
+            return
+        time.sleep(2)
+
+def _search_events(query, limit=60, no_website=False, initial_radius=1000, max_radius=50000,
+                   keywords=None, skip_known=True, sweep=True, skip_searched=False, cancel=None):
+    """
+    Run a business search, yielding (event, data) as it goes: 'progress'
+    when a keyword starts or a search page arrives, 'result' for each new
+    business once its details are in, and a final 'summary'. Places calls
+    go through the outbound executor; setting cancel stops the search.
+    """
+    started = time.monotonic()
+    gmaps = outbound.Client(ct.gmaps, outbound.places, cancel)
+    known_df, known = geo_index.get_index(ct.EXCEL_FILE, ct.load_data) if skip_known else (None, None)
+    located = []
+    skipped = 0
+    # place_ids seen in any keyword pass; each is looked up at most once
+    requested = set()
+    found = 0
+    details_calls = 0
+    text_stats = {'requests': 0}
+    # Prepare keywords
+    if keywords:
+        keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
+    else:
+        keyword_list = ['restaurant', 'cafe', 'Tavern', 'coffee', 'bistro', 'diner']
+
+    # The text search stops at 60 results; sweeping the area in tiles does not
+    planner = None
+    geocode_calls = 0
+    if sweep:
+        geocode_calls = 1
+        bounds = coverage_planner.region_bounds(gmaps, query, max_radius)
+        if bounds:
+            planner = coverage_planner.CoveragePlanner(gmaps)
+            radius = coverage_planner.root_radius(bounds, initial_radius)
+            # A tile searched with other filters may hold places these filters keep
+            scope = f"no_website={int(no_website)},skip_known={int(skip_known)}"
+        else:
+            logger.info("Could not locate '%s' - falling back to text search", query)
+
+    def search_requests():
+        return text_stats['requests'] + (planner.stats['requests'] if planner else 0)
+
+    def progress(keyword, keyword_start):
+        return 'progress', {
+            'keyword': keyword,
+            'page': search_requests() - keyword_start,
+            'search_requests': search_requests(),
+            'details_calls': details_calls,
+            'quota_used': geocode_calls + search_requests() + details_calls,
+            'results': len(all_results),
+        }
+
+    all_results = []
+    seen = set()
+    try:
+        for keyword in keyword_list:
+            search_query = f"{keyword} {query}".strip()
+            keyword_start = reported = search_requests()
+            yield progress(keyword, keyword_start)
+            places = (planner.sweep(keyword, bounds, radius, skip_searched, scope) if planner
+                      else _text_search(gmaps, search_query, text_stats))
+            try:
+                for place in places:
+                    if search_requests() != reported:
+                        reported = search_requests()
+                        yield progress(keyword, keyword_start)
+                    place_id = place['place_id']
+                    found += 1
+                    if place_id in requested:
+                        continue
+                    requested.add(place_id)
+                    if known is not None and place_id in known.place_ids:
+                        skipped += 1
+                        continue
+                    lat, lng = place_location(place)
+                    if known is not None and lat is not None and any(
+                            change_journal.name_key(known_df['Name'].iat[position]) == change_journal.name_key(place.get('name', ''))
+                            for position, _ in known.near(lat, lng, geo_index.SAME_PLACE_METERS)):
+                        skipped += 1
+                        continue
+                    try:
+                        logger.debug("Place Details API call for: %s", place.get('name', ''))
+                        details_calls += 1
+                        details = gmaps.place(
+                            place_id=place_id, 
+                            fields=['name', 'formatted_phone_number', 'formatted_address', 'website', 'url', 'opening_hours']
+                        )
+                        info = details.get('result', {})
+                    except (outbound.Overloaded, outbound.Cancelled):
+                        raise
+                    except Exception as detail_error:
+                        logger.warning("Error fetching details for place %s: %s", place_id, detail_error)
+                        if planner:
+                            # Its tile is searched again next time
+                            planner.incomplete()
+                        continue
+                    # If no_website is True, skip if website exists
+                    if no_website and info.get('website'):
+                        continue
+                    # Format hours into a single string
+                    hours = []
+                    if 'opening_hours' in info and 'weekday_text' in info['opening_hours']:
+                        hours = info['opening_hours']['weekday_text']
+                    hours_str = ' | '.join(hours) if hours else ''
+                    key = (info.get('name', place.get('name', '')).strip().lower(), info.get('formatted_address', '').strip().lower())
+                    if key not in seen:
+                        seen.add(key)
+                        result = {
+                            'name': info.get('name', place.get('name', '')),
+                            'phone': info.get('formatted_phone_number', ''),
+                            'address': info.get('formatted_address', ''),
+                            'website': info.get('website', ''),
+                            'google_maps_url': info.get('url', ''),
+                            'hours': hours_str,
+                            'latitude': lat,
+                            'longitude': lng,
+                            'place_id': place_id
+                        }
+                        all_results.append(result)
+                        located.append((result['address'], lat, lng))
+                        yield 'result', result
+                        if len(all_results) >= limit:
+                            break
+            except (outbound.Overloaded, outbound.Cancelled):
+                raise
+            except Exception as search_error:
+                logger.warning("Error in search attempt for %s: %s", search_query, search_error)
+            finally:
+                # Tiles not fully consumed are queried again next time
+                places.close()
+            if len(all_results) >= limit:
+                break
+    finally:
+        # Businesses added from these results later get their coordinates from the cache
+        geo_index.remember(located)
+    if planner:
+        # The sweep drops repeated place_ids before they get here
+        found += planner.stats['duplicates']
+    logger.info("search", extra={'fields': {
+        'query': query, 'places_found': found, 'details_calls': details_calls, 'skipped_known': skipped,
+        'coverage': planner.stats if planner else None}})
+    yield 'summary', {
+        'results': len(all_results),
+        'places_found': found,
+        'details_calls': details_calls,
+        'details_saved': found - details_calls,
+        'skipped_known': skipped,
+        'search_requests': search_requests(),
+        'quota_used': geocode_calls + search_requests() + details_calls,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+def _search_savings(found, details_calls):
+    """Response headers reporting the details calls a search did not have to make."""
+    saved = found - details_calls
+    return {
+        "X-Places-Found": str(found),
+        "X-Details-Calls": str(details_calls),
+        "X-Details-Saved": str(saved),
+        "X-Details-Saved-Ratio": f"{saved / found:.3f}" if found else "0.000",
+    }
+
 @app.get("/api/businesses/search")
 async def search_businesses(
+    request: Request,
+    response: Response,
     query: str = Query(..., description="Search query for businesses"),
     limit: int = Query(60, gt=0, description="Number of results to return"),
     no_website: bool = Query(False, description="Only include results without a website"),
     initial_radius: int = Query(1000, description="Initial search radius in meters"),
     max_radius: int = Query(50000, description="Maximum search radius in meters"),
-    keywords: Optional[str] = Query(None, description="Comma-separated list of keywords to prepend to the query (e.g. 'restaurant,cafe,bar')")
+    keywords: Optional[str] = Query(None, description="Comma-separated list of keywords to prepend to the query (e.g. 'restaurant,cafe,bar')"),
+    skip_known: bool = Query(True, description="Skip places that are already in the list (saves a details call each)"),
+    sweep: bool = Query(True, description="Tile the area around the query location with nearby searches"),
+    skip_searched: bool = Query(False, description="With sweep, skip tiles searched recently with the same filters")
 ):
+    cancel = threading.Event()
+    watcher = asyncio.ensure_future(outbound.cancel_on_disconnect(request, cancel))
     try:
-        # Prepare keywords
-        if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
-        else:
-            keyword_list = ['restaurant', 'cafe', 'Tavern', 'coffee', 'bistro', 'diner']
-
+        # The search blocks on Places calls, so it runs off the event loop
+        events = await run_in_threadpool(list, _search_events(query, limit, no_website, initial_radius, max_radius,
+                                                              keywords, skip_known, sweep, skip_searched, cancel))
         all_results = []
-        seen = set()
-        for keyword in keyword_list:
-            search_query = f"{keyword} {query}".strip()
-            page_token = None
-            while len(all_results) < limit:
-                try:
-                    print(f"\n🔍 Making Places API call for search: {search_query} (page_token: {page_token})")
-                    results = ct.gmaps.places(
-                        query=search_query,
-                        type='business',
-                        page_token=page_token
-                    )
-                    if results['status'] != 'OK' or not results.get('results'):
-                        break
-                    for place in results.get('results', []):
-                        place_id = place['place_id']
-                        try:
-                            print(f"🔍 Making Place Details API call for: {place.get('name', '')}")
-                            details = ct.gmaps.place(
-                                place_id=place_id, 
-                                fields=['name', 'formatted_phone_number', 'formatted_address', 'website', 'url', 'opening_hours']
-                            )
-                            info = details.get('result', {})
-                            # If no_website is True, skip if website exists
-                            if no_website and info.get('website'):
-                                continue
-                            # Format hours into a single string
-                            hours = []
-                            if 'opening_hours' in info and 'weekday_text' in info['opening_hours']:
-                                hours = info['opening_hours']['weekday_text']
-                            hours_str = ' | '.join(hours) if hours else ''
-                            key = (info.get('name', place.get('name', '')).strip().lower(), info.get('formatted_address', '').strip().lower())
-                            if key not in seen:
-                                seen.add(key)
-                                all_results.append({
-                                    'name': info.get('name', place.get('name', '')),
-                                    'phone': info.get('formatted_phone_number', ''),
-                                    'address': info.get('formatted_address', ''),
-                                    'website': info.get('website', ''),
-                                    'google_maps_url': info.get('url', ''),
-                                    'hours': hours_str
-                                })
-                                if len(all_results) >= limit:
-                                    break
-                        except Exception as detail_error:
-                            print(f"Error fetching details for place {place_id}: {str(detail_error)}")
-                            continue
-                    if len(all_results) >= limit:
-                        break
-                    page_token = results.get('next_page_token')
-                    if not page_token:
-                        break
-                    import time
-                    time.sleep(2)
-                except Exception as search_error:
-                    print(f"Error in search attempt: {str(search_error)}")
-                    break
-            if len(all_results) >= limit:
-                break
+        for event, data in events:
+            if event == 'result':
+                all_results.append(data)
+            elif event == 'summary':
+                response.headers.update(_search_savings(data['places_found'], data['details_calls']))
         return all_results[:limit]
     except Exception as e:
-        print(f"Search error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Search error: %s", e)
+        raise _outbound_error(e) or HTTPException(status_code=500, detail=str(e))
+    finally:
+        watcher.cancel()
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/api/businesses/search/stream")
+async def search_businesses_stream(
+    query: str = Query(..., description="Search query for businesses"),
+    limit: int = Query(60, gt=0, description="Number of results to return"),
+    no_website: bool = Query(False, description="Only include results without a website"),
+    initial_radius: int = Query(1000, description="Initial search radius in meters"),
+    max_radius: int = Query(50000, description="Maximum search radius in meters"),
+    keywords: Optional[str] = Query(None, description="Comma-separated list of keywords to prepend to the query (e.g. 'restaurant,cafe,bar')"),
+    skip_known: bool = Query(True, description="Skip places that are already in the list (saves a details call each)"),
+    sweep: bool = Query(True, description="Tile the area around the query location with nearby searches"),
+    skip_searched: bool = Query(False, description="With sweep, skip tiles searched recently with the same filters")
+):
+    """
+    The same search as /api/businesses/search as Server-Sent Events:
+    progress, one result event per business as soon as its details arrive,
+    then summary (or error).
+    """
+    async def stream():
+        # The search blocks on Places calls, so it is iterated in the threadpool.
+        # When the client goes away the response is cancelled and the search stops.
+        cancel = threading.Event()
+        events = _search_events(query, limit, no_website, initial_radius, max_radius, keywords, skip_known, sweep,
+                                skip_searched, cancel)
+        try:
+            async for event, data in iterate_in_threadpool(events):
+                yield _sse(event, data)
+        except Exception as e:
+            logger.exception("stream failed")
+            yield _sse('error', {'detail': str(e)})
+        finally:
+            cancel.set()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/api/vapi/send-listings")
 async def send_listings_to_vapi(data: dict):
@@ -779,7 +1504,8 @@ async def send_listings_to_vapi(data: dict):
             }
             
             try:
-                response = requests.post(vapi_url, headers=headers, json=payload, timeout=30)
+                response = await outbound.vapi.run(
+                    functools.partial(requests.post, vapi_url, headers=headers, json=payload, timeout=30))
                 if response.status_code == 201:
                     call_data = response.json()
                     calls_initiated.append({
@@ -794,7 +1520,7 @@ async def send_listings_to_vapi(data: dict):
                         "phone": business["phone"],
                         "error": f"HTTP {response.status_code}: {response.text}"
                     })
-            except requests.RequestException as e:
+            except (requests.RequestException, outbound.Overloaded, outbound.DeadlineExceeded) as e:
                 failed_calls.append({
                     "business": business["name"],
                     "phone": business["phone"],
@@ -1,5 +1,6 @@
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import hmac
 import jwt
 import os
 from typing import Optional
@@ -41,6 +42,22 @@ async def get_current_user(request: Request) -> str:
         # Fallback to demo user
         return "demo-user-001"
 
+async def is_admin(request: Request) -> bool:
+    """
+    Whether the request may use admin routes (/metrics, /api/admin/*): it
+    sends ADMIN_TOKEN as X-Admin-Token or a Bearer token (as Prometheus
+    scrapers do). The user from get_current_user is never enough, since it
+    comes from headers the client sets. Without ADMIN_TOKEN nobody is an admin.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        return False
+    sent = request.headers.get("x-admin-token", "")
+    auth_header = request.headers.get("authorization", "")
+    if not sent and auth_header.startswith("Bearer "):
+        sent = auth_header[len("Bearer "):]
+    return bool(sent) and hmac.compare_digest(sent.encode(), token.encode())
+
 async def get_current_user_optional(request: Request) -> Optional[str]:
     """
     Get current user but don't fail if not authenticated.
@@ -1,7 +1,21 @@
 from supabase import create_client, Client
 from dotenv import load_dotenv
+import base64
+import hashlib
+import json
 import os
 
+try:
+    from .regions import extract_city
+    from .hours import HoursIndex, parse_hours, encode_intervals, decode_intervals, local_now, minute_of_week
+    from .geo import geohash
+    from .metrics import timed
+except ImportError:
+    from regions import extract_city
+    from hours import HoursIndex, parse_hours, encode_intervals, decode_intervals, local_now, minute_of_week
+    from geo import geohash
+    from metrics import timed
+
 # Load environment variables
 load_dotenv()
 
@@ -23,16 +37,141 @@ BUSINESSES_TABLE = "businesses"
 MEETINGS_TABLE = "meetings"
 CLIENTS_TABLE = "clients"
 CALLBACKS_TABLE = "callbacks"
+CALL_EVENTS_TABLE = "call_events"
+BUSINESS_VERSIONS_TABLE = "business_versions"
+BUSINESS_TOMBSTONES_TABLE = "business_tombstones"
 
 # Helper functions for database operations
-async def get_all_businesses(user_id: str = None):
+def with_region(data: dict) -> dict:
+    """Derive region from address when a write sets the address but not the region"""
+    if data.get("address") and not data.get("region"):
+        data["region"] = extract_city(data["address"])
+    return data
+
+def with_hours(data: dict) -> dict:
+    """Parse hours into hours_intervals whenever a write sets hours"""
+    if "hours" in data:
+        data["hours_intervals"] = encode_intervals(parse_hours(data["hours"]))
+    return data
+
+def with_location(data: dict) -> dict:
+    """Keep geohash in step with latitude/longitude"""
+    if "latitude" in data or "longitude" in data:
+        located = data.get("latitude") is not None and data.get("longitude") is not None
+        data["geohash"] = geohash(data["latitude"], data["longitude"]) if located else None
+    return data
+
+def filter_open(rows: list, open_within: int = 0, tz: str = None) -> list:
+    """Keep businesses open now or opening within open_within minutes; unknown hours count as open"""
+    parsed = [decode_intervals(row["hours_intervals"]) if row.get("hours_intervals") is not None
+              else parse_hours(row.get("hours")) for row in rows]
+    mask = HoursIndex(parsed).open_mask(local_now(tz), open_within)
+    return [row for row, is_open in zip(rows, mask) if is_open]
+
+@timed('supabase')
+async def get_all_businesses(user_id: str = None, region: str = None, open_within: int = None, tz: str = None,
+                             order: str = None):
     supabase = get_supabase_client()
     query = supabase.table(BUSINESSES_TABLE).select("*")
     if user_id:
         query = query.eq("user_id", user_id)
+    if region:
+        query = query.eq("region", region)
+    if order == "cluster":
+        # Neighbouring businesses share a geohash prefix (idx_businesses_user_geohash)
+        query = query.order("geohash")
     response = query.execute()
+    if open_within is not None:
+        return filter_open(response.data, open_within, tz)
     return response.data
 
+def encode_cursor(position: dict) -> str:
+    """Opaque delta sync cursor for a {"c": business change_seq, "t": tombstone change_seq} position"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    The position in a cursor from encode_cursor; ValueError if it isn't one.
+    Cursors from before change_seq ({"u", "i", "t"}) decode to None, so the
+    client syncs everything again.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if isinstance(position, dict) and set(position) == {"u", "i", "t"}:
+        return None
+    if not isinstance(position, dict) or set(position) != {"c", "t"} \
+            or not isinstance(position["c"], int) or not isinstance(position["t"], int):
+        raise ValueError("Invalid cursor")
+    return position
+
+def _latest_change(supabase, table: str, user_id: str = None) -> int:
+    query = supabase.table(table).select("change_seq").gt("change_seq", 0)
+    if user_id:
+        query = query.eq("user_id", user_id)
+    latest = query.order("change_seq", desc=True).limit(1).execute().data
+    return latest[0]["change_seq"] if latest else 0
+
+@timed('supabase')
+async def get_changes_cursor(user_id: str = None) -> str:
+    """Cursor at the latest change: a delta sync from it returns only later changes"""
+    supabase = get_supabase_client()
+    return encode_cursor({"c": _latest_change(supabase, BUSINESSES_TABLE, user_id),
+                          "t": _latest_change(supabase, BUSINESS_TOMBSTONES_TABLE, user_id)})
+
+@timed('supabase')
+async def get_business_changes(user_id: str = None, position: dict = None, limit: int = 500):
+    """
+    Businesses inserted or updated after position (see decode_cursor) and the
+    ids of businesses deleted since, for delta sync. Keyset paging on
+    change_seq via idx_businesses_user_change; deletions come from
+    business_tombstones. change_seq numbers a user's writes in commit order
+    (next_business_change in supabase-setup-safe.sql), so a write that
+    commits after a poll is always above the cursor that poll returned.
+    Without a position every business is returned.
+    """
+    supabase = get_supabase_client()
+    query = supabase.table(BUSINESSES_TABLE).select("*")
+    if user_id:
+        query = query.eq("user_id", user_id)
+    if position:
+        query = query.gt("change_seq", position["c"])
+    rows = query.order("change_seq").order("id").limit(limit + 1).execute().data
+    changes = rows[:limit]
+
+    if position is None:
+        # A full list already leaves out everything deleted so far
+        logged, deleted, tombstone_seq = [], [], _latest_change(supabase, BUSINESS_TOMBSTONES_TABLE, user_id)
+    else:
+        tombstones = supabase.table(BUSINESS_TOMBSTONES_TABLE).select("change_seq, business_id")
+        if user_id:
+            tombstones = tombstones.eq("user_id", user_id)
+        logged = tombstones.gt("change_seq", position["t"]).order("change_seq").limit(limit + 1).execute().data
+        deleted = [row["business_id"] for row in logged[:limit]]
+        tombstone_seq = logged[:limit][-1]["change_seq"] if deleted else position["t"]
+
+    last = changes[-1] if changes else None
+    next_position = {
+        "c": last["change_seq"] if last else (position or {}).get("c", 0),
+        "t": tombstone_seq,
+    }
+    return {
+        "changes": changes,
+        "deleted": deleted,
+        "cursor": encode_cursor(next_position),
+        "has_more": len(rows) > limit or len(logged) > limit,
+        "full": position is None,
+    }
+
+@timed('supabase')
+async def get_business_version(user_id: str) -> int:
+    """Counter bumped by every write to the user's businesses (next_business_change)"""
+    supabase = get_supabase_client()
+    response = supabase.table(BUSINESS_VERSIONS_TABLE).select("version").eq("user_id", user_id).execute()
+    return response.data[0]["version"] if response.data else 0
+
+@timed('supabase')
 async def get_businesses_by_status(status: str, user_id: str = None):
     supabase = get_supabase_client()
     query = supabase.table(BUSINESSES_TABLE).select("*").eq("status", status)
@@ -41,51 +180,226 @@ async def get_businesses_by_status(status: str, user_id: str = None):
     response = query.execute()
     return response.data
 
+@timed('supabase')
 async def update_business(business_id: str, data: dict, user_id: str = None):
     supabase = get_supabase_client()
-    query = supabase.table(BUSINESSES_TABLE).update(data).eq("id", business_id)
+    query = supabase.table(BUSINESSES_TABLE).update(with_location(with_hours(with_region(data)))).eq("id", business_id)
     if user_id:
         query = query.eq("user_id", user_id)
     response = query.execute()
     return response.data
 
+@timed('supabase')
 async def create_business(data: dict, user_id: str = None):
     supabase = get_supabase_client()
     if user_id and 'user_id' not in data:
         data['user_id'] = user_id
-    response = supabase.table(BUSINESSES_TABLE).insert(data).execute()
+    response = supabase.table(BUSINESSES_TABLE).insert(with_location(with_hours(with_region(data)))).execute()
+    return response.data
+
+# Columns a batch patch may set; region, hours_intervals and geohash follow
+# from address, hours and latitude/longitude
+PATCH_COLUMNS = {
+    "name", "phone", "address", "status", "comments", "hours", "industry", "region", "callback_count",
+    "lead_score", "last_called_date", "last_callback_date", "callback_due_date", "callback_due_time",
+    "callback_reason", "callback_priority", "interest_level", "best_time_to_call", "decision_maker",
+    "next_action", "latitude", "longitude", "place_id",
+}
+# status_normalizer.VALID_STATUSES, which is not deployed with this package
+STATUSES = ("tocall", "called", "callback", "dont_call", "client", "lead")
+# Set to the time of the write when a status is set without them
+# (as apply_business_batch() does)
+STATUS_DATES = {"called": "last_called_date", "callback": "last_callback_date"}
+PRIORITIES = ("High", "Medium", "Low")
+INTEREST_LEVELS = ("High", "Medium", "Low", "Unknown")
+
+def patch_errors(patch) -> list:
+    """What is wrong with a batch patch, before anything is written ([] if nothing)"""
+    from datetime import date
+    if not isinstance(patch, dict) or not patch:
+        return ["Patch must be a non-empty object"]
+    errors = [f"Unknown field: {key}" for key in sorted(set(patch) - PATCH_COLUMNS)]
+    if "name" in patch and not str(patch["name"] or "").strip():
+        errors.append("Name cannot be empty")
+    if "status" in patch and patch["status"] not in STATUSES:
+        errors.append(f"Invalid status. Must be one of: {', '.join(STATUSES)}")
+    if patch.get("callback_due_date") is not None:
+        try:
+            date.fromisoformat(str(patch["callback_due_date"]))
+        except ValueError:
+            errors.append("Callback due date must be YYYY-MM-DD")
+    if patch.get("callback_priority") is not None and patch["callback_priority"] not in PRIORITIES:
+        errors.append("Priority must be High, Medium, or Low")
+    if patch.get("lead_score") is not None and \
+            (not isinstance(patch["lead_score"], int) or not 1 <= patch["lead_score"] <= 10):
+        errors.append("Lead score must be between 1 and 10")
+    if patch.get("interest_level") is not None and patch["interest_level"] not in INTEREST_LEVELS:
+        errors.append("Interest level must be High, Medium, Low, or Unknown")
+    return errors
+
+@timed('supabase')
+async def apply_business_batch(user_id: str, operations: list, idempotency_key: str = None):
+    """
+    Apply [{"id", "patch"}] in one transaction (see apply_business_batch() in
+    supabase-setup-safe.sql): all of them, or none when an id is not the
+    user's. With idempotency_key, a retry gets the first result back; the
+    same key with different operations returns {"conflict": true}.
+    """
+    supabase = get_supabase_client()
+    request_hash = hashlib.sha256(json.dumps(operations, sort_keys=True, default=str).encode()).hexdigest()
+    prepared = [{"id": operation["id"], "patch": with_location(with_hours(with_region(dict(operation["patch"]))))}
+                for operation in operations]
+    params = {"p_user_id": user_id, "p_key": idempotency_key, "p_request_hash": request_hash,
+              "p_operations": prepared}
+    return supabase.rpc("apply_business_batch", params).execute().data
+
+@timed('supabase')
+async def get_known_place_ids(user_id: str, place_ids: list, batch_size: int = 200) -> set:
+    """The place_ids among place_ids that are already in the businesses table"""
+    supabase = get_supabase_client()
+    place_ids = [place_id for place_id in dict.fromkeys(place_ids) if place_id]
+    known = set()
+    for start in range(0, len(place_ids), batch_size):
+        query = supabase.table(BUSINESSES_TABLE).select("place_id").in_("place_id", place_ids[start:start + batch_size])
+        if user_id:
+            query = query.eq("user_id", user_id)
+        known.update(row["place_id"] for row in query.execute().data)
+    return known
+
+@timed('supabase')
+async def query_businesses(search_query: str, user_id: str = None, limit: int = 50):
+    """Ranked full-text + trigram search (see search_businesses() in supabase-setup-safe.sql)"""
+    supabase = get_supabase_client()
+    params = {"search_query": search_query, "max_results": limit}
+    if user_id:
+        params["p_user_id"] = user_id
+    response = supabase.rpc("search_businesses", params).execute()
+    return response.data
+
+@timed('supabase')
+async def create_call_event(business_id: int, data: dict, user_id: str = None):
+    """
+    Log a call; the set_latest_call_note trigger copies the note into
+    businesses.comments. An outcome (one of STATUSES, see call_event_errors)
+    becomes the business's status and stamps its call date.
+    """
+    supabase = get_supabase_client()
+    event = {key: data[key] for key in ("outcome", "note", "duration_seconds", "occurred_at") if data.get(key) is not None}
+    event["business_id"] = business_id
+    if user_id:
+        event["user_id"] = user_id
+    response = supabase.table(CALL_EVENTS_TABLE).insert(event).execute()
+    if data.get("outcome"):
+        from datetime import datetime
+        changes = {"status": data["outcome"]}
+        if data["outcome"] in STATUS_DATES:
+            changes[STATUS_DATES[data["outcome"]]] = datetime.utcnow().isoformat(timespec="seconds")
+        await update_business(business_id, changes, user_id)
+    return response.data
+
+def call_event_errors(data) -> list:
+    """What is wrong with a call event for create_call_event ([] if nothing)"""
+    if not isinstance(data, dict):
+        return ["Call event must be an object"]
+    if data.get("outcome") is not None and data["outcome"] not in STATUSES:
+        return [f"Invalid outcome. Must be one of: {', '.join(STATUSES)}"]
+    return []
+
+@timed('supabase')
+async def get_call_history(business_id: int, user_id: str = None, limit: int = 20, before: int = None):
+    """
+    One page of a business's call events, newest first. Keyset paging on
+    (occurred_at, id) via idx_call_events_business_time; pass next_before
+    from the previous page.
+    """
+    supabase = get_supabase_client()
+    query = supabase.table(CALL_EVENTS_TABLE).select("*").eq("business_id", business_id)
+    if user_id:
+        query = query.eq("user_id", user_id)
+    if before is not None:
+        anchor = supabase.table(CALL_EVENTS_TABLE).select("occurred_at").eq("id", before).execute().data
+        if not anchor:
+            return {"events": [], "next_before": None}
+        occurred_at = anchor[0]["occurred_at"]
+        query = query.or_(f'occurred_at.lt."{occurred_at}",and(occurred_at.eq."{occurred_at}",id.lt.{before})')
+    rows = query.order("occurred_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data
+    events = rows[:limit]
+    return {"events": events, "next_before": events[-1]["id"] if len(rows) > limit else None}
+
+@timed('supabase')
+async def get_businesses_near(user_id: str, lat: float, lng: float, radius_m: float = 1000,
+                              limit: int = 50, status: str = None):
+    """[{business, distance_m}] nearest first (see businesses_near() in supabase-setup-safe.sql)"""
+    supabase = get_supabase_client()
+    params = {"p_user_id": user_id, "p_lat": lat, "p_lng": lng, "p_radius_m": radius_m, "p_limit": limit}
+    if status:
+        params["p_status"] = status
+    response = supabase.rpc("businesses_near", params).execute()
+    return response.data
+
+@timed('supabase')
+async def lease_next_businesses(user_id: str, caller: str, count: int = 1, lease_seconds: int = 600,
+                                open_within: int = None, tz: str = None):
+    """
+    Lease the next businesses to dial (see lease_next_businesses() in
+    supabase-setup-safe.sql). With open_within only businesses open now or
+    opening within that many minutes are leased.
+    """
+    supabase = get_supabase_client()
+    params = {"p_user_id": user_id, "p_caller": caller, "p_count": count, "p_lease_seconds": lease_seconds}
+    if open_within is not None:
+        params.update(p_open_at=minute_of_week(local_now(tz)), p_open_within=open_within)
+    response = supabase.rpc("lease_next_businesses", params).execute()
+    return response.data
+
+@timed('supabase')
+async def release_business_lease(business_id: int, caller: str, user_id: str = None):
+    """Give a leased business back to the queue; only the caller holding the lease can"""
+    supabase = get_supabase_client()
+    query = supabase.table(BUSINESSES_TABLE).update({"leased_by": None, "lease_expires_at": None})\
+        .eq("id", business_id).eq("leased_by", caller)
+    if user_id:
+        query = query.eq("user_id", user_id)
+    response = query.execute()
     return response.data
 
+@timed('supabase')
 async def get_all_meetings():
     supabase = get_supabase_client()
     response = supabase.table(MEETINGS_TABLE).select("*").execute()
     return response.data
 
+@timed('supabase')
 async def create_meeting(data: dict):
     supabase = get_supabase_client()
     response = supabase.table(MEETINGS_TABLE).insert(data).execute()
     return response.data
 
+@timed('supabase')
 async def update_meeting(meeting_id: str, data: dict):
     supabase = get_supabase_client()
     response = supabase.table(MEETINGS_TABLE).update(data).eq("id", meeting_id).execute()
     return response.data
 
+@timed('supabase')
 async def get_all_clients():
     supabase = get_supabase_client()
     response = supabase.table(CLIENTS_TABLE).select("*").execute()
     return response.data
 
+@timed('supabase')
 async def create_client(data: dict):
     supabase = get_supabase_client()
     response = supabase.table(CLIENTS_TABLE).insert(data).execute()
     return response.data
 
+@timed('supabase')
 async def update_client(client_id: str, data: dict):
     supabase = get_supabase_client()
     response = supabase.table(CLIENTS_TABLE).update(data).eq("id", client_id).execute()
     return response.data
 
+@timed('supabase')
 async def get_callbacks_due_today(user_id: str = None):
     from datetime import datetime
     supabase = get_supabase_client()
@@ -99,6 +413,7 @@ async def get_callbacks_due_today(user_id: str = None):
     response = query.execute()
     return response.data
 
+@timed('supabase')
 async def get_overdue_callbacks(user_id: str = None):
     from datetime import datetime
     supabase = get_supabase_client()
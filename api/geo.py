@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+
+# Geohash: interleaved longitude/latitude bits in base32. Nearby places share
+# a prefix, so sorting by geohash groups neighbours and a prefix is a bucket.
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_BASE32_CHARS = np.array(list(BASE32))
+PRECISION = 7  # cells of about 150 m x 150 m
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+
+def _bits(precision):
+    """(longitude bits, latitude bits) for a geohash of this length."""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def geohashes(lats, lngs, precision=PRECISION):
+    """Vectorized geohash of arrays of coordinates (no NaNs)."""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    lng_bits, lat_bits = _bits(precision)
+    lng_cells = np.clip(((lngs + 180.0) / 360.0 * (1 << lng_bits)).astype(np.int64), 0, (1 << lng_bits) - 1)
+    lat_cells = np.clip(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    code = np.zeros(len(lats), dtype=np.int64)
+    for bit in range(5 * precision):
+        # Even bits come from longitude, odd bits from latitude, most significant first
+        if bit % 2 == 0:
+            lng_bits -= 1
+            code = (code << 1) | ((lng_cells >> lng_bits) & 1)
+        else:
+            lat_bits -= 1
+            code = (code << 1) | ((lat_cells >> lat_bits) & 1)
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    chars = _BASE32_CHARS[(code[:, None] >> shifts) & 31]
+    return np.ascontiguousarray(chars).view(f'<U{precision}').ravel()
+
+
+def geohash(lat, lng, precision=PRECISION):
+    return str(geohashes([lat], [lng], precision)[0])
+
+
+def cell_size_m(precision, lat=0.0):
+    """(height, width) in meters of a geohash cell at a latitude."""
+    lng_bits, lat_bits = _bits(precision)
+    height = 180.0 / (1 << lat_bits) * METERS_PER_DEGREE
+    width = 360.0 / (1 << lng_bits) * METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+    return height, width
+
+
+def haversine_m(lat, lng, lats, lngs):
+    """Distance in meters from one point to arrays of points."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def place_location(place):
+    """(lat, lng) from a Places search or details result, or (None, None)."""
+    location = (place or {}).get('geometry', {}).get('location') or {}
+    if location.get('lat') is None or location.get('lng') is None:
+        return None, None
+    return float(location['lat']), float(location['lng'])
@@ -0,0 +1,165 @@
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# Opening hours are kept as minute-of-week intervals [start, end), Monday 00:00 = 0.
+# Hours text comes from Google's weekday_text joined with " | "
+# ("Monday: 9:00 AM – 5:00 PM | Tuesday: Closed | ...") or from JSON imports
+# ("Monday: 9AM-5PM, Tuesday: ...").
+DAY = 24 * 60
+WEEK = 7 * DAY
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_DAY_NAMES = r'(mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)[a-z]*'
+_DAY_RE = re.compile(r'\b' + _DAY_NAMES + r'(?:\s*[-–—]\s*' + _DAY_NAMES + r')?\s*:', re.I)
+_RANGE_RE = re.compile(
+    r'(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?\s*(?:-|–|—|to)\s*'
+    r'(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?', re.I)
+
+
+def _day_index(name):
+    return next(i for i, day in enumerate(DAYS) if day.startswith(name.lower()[:3]))
+
+
+def _to_minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem == 'pm' and hour < 12:
+        hour += 12
+    elif meridiem == 'am' and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+def _day_intervals(spec):
+    """Minute-of-day intervals for one day's hours text, or None if it can't be read."""
+    spec = spec.lower().replace('noon', '12:00 pm').replace('midnight', '12:00 am')
+    if 'closed' in spec:
+        return []
+    if '24 hours' in spec:
+        return [(0, DAY)]
+    intervals = []
+    for match in _RANGE_RE.finditer(spec):
+        start_m = (match.group(3) or '').replace('.', '') or None
+        end_m = (match.group(6) or '').replace('.', '') or None
+        # "5:00 – 10:00 PM": the start shares the end's meridiem unless that
+        # would put it after the end ("11:00 – 2:00 PM" starts in the morning)
+        start = _to_minutes(match.group(1), match.group(2), start_m or end_m)
+        end = _to_minutes(match.group(4), match.group(5), end_m)
+        if not start_m and end_m == 'pm' and start > end:
+            start -= 12 * 60
+        if end <= start:
+            end += DAY  # past midnight
+        intervals.append((start, end))
+    return intervals or None
+
+
+@lru_cache(maxsize=65536)
+def parse_hours(text):
+    """
+    Parse an Hours cell into a sorted tuple of (start, end) minute-of-week
+    intervals. Returns None when the hours are unknown (empty or unreadable),
+    which is different from () = closed all week.
+    """
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return None
+    text = str(text).replace('\u202f', ' ').replace('\u2009', ' ').replace('\xa0', ' ')
+    matches = list(_DAY_RE.finditer(text))
+    if not matches:
+        return None
+    intervals = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        first = _day_index(match.group(1))
+        last = _day_index(match.group(2)) if match.group(2) else first
+        day_intervals = _day_intervals(text[match.end():following.start() if following else len(text)])
+        if day_intervals is None:
+            return None
+        for day in range(first, first + (last - first) % 7 + 1):
+            offset = (day % 7) * DAY
+            for start, end in day_intervals:
+                start, end = offset + start, offset + end
+                if end > WEEK:  # Sunday night into Monday morning
+                    intervals.append((0, end - WEEK))
+                    end = WEEK
+                intervals.append((start, end))
+    return tuple(sorted(intervals))
+
+
+def encode_intervals(intervals):
+    """Flat [start, end, start, end, ...] list for storage (businesses.hours_intervals)."""
+    return None if intervals is None else [minute for interval in intervals for minute in interval]
+
+
+def decode_intervals(flat):
+    return None if flat is None else tuple(zip(flat[::2], flat[1::2]))
+
+
+def local_now(tz=None):
+    """The current time where the businesses are (tz or BUSINESS_TIMEZONE, else server time)."""
+    tz = tz or os.getenv('BUSINESS_TIMEZONE')
+    if tz and ZoneInfo is not None:
+        return datetime.now(ZoneInfo(tz)).replace(tzinfo=None)
+    return datetime.now()
+
+
+def minute_of_week(moment):
+    return moment.weekday() * DAY + moment.hour * 60 + moment.minute
+
+
+def is_open(intervals, moment, within=0):
+    """Scalar check for one business: open at moment, or opening within `within` minutes."""
+    if intervals is None:
+        return True
+    start = minute_of_week(moment)
+    end = start + max(within, 1)
+    return any(s < end and e > start or s < end - WEEK for s, e in intervals)
+
+
+class HoursIndex:
+    """
+    Parsed hours for a whole column. Businesses share a handful of distinct
+    Hours strings, so each distinct string is parsed once and rows only keep
+    an int32 code into the flat interval arrays of those strings.
+    """
+
+    def __init__(self, parsed, codes=None):
+        # parsed: interval tuples (or None) per distinct value; codes: row -> value
+        self.codes = np.arange(len(parsed), dtype=np.int32) if codes is None else codes.astype(np.int32)
+        self.known = np.array([intervals is not None for intervals in parsed], dtype=bool)
+        owners, starts, ends = [], [], []
+        for owner, intervals in enumerate(parsed):
+            for start, end in intervals or ():
+                owners.append(owner)
+                starts.append(start)
+                ends.append(end)
+        self.owners = np.array(owners, dtype=np.int32)
+        self.starts = np.array(starts, dtype=np.int32)
+        self.ends = np.array(ends, dtype=np.int32)
+
+    @classmethod
+    def from_text(cls, hours):
+        """Build from a Series (or list) of Hours text."""
+        codes, uniques = pd.factorize(pd.Series(hours, dtype=object).fillna(''))
+        return cls([parse_hours(text) for text in uniques], codes)
+
+    def open_mask(self, moment, within=0):
+        """
+        Boolean array per row: open at moment or opening within `within`
+        minutes. Businesses with unknown hours count as open.
+        """
+        start = minute_of_week(moment)
+        end = start + max(within, 1)
+        hit = (self.starts < end) & (self.ends > start)
+        if end > WEEK:  # the window runs into next Monday
+            hit |= self.starts < end - WEEK
+        open_values = ~self.known
+        open_values[self.owners[hit]] = True
+        return open_values[self.codes]
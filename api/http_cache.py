@@ -0,0 +1,134 @@
+import hashlib
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    from .metrics import register_collector
+except ImportError:
+    from metrics import register_collector
+
+# Conditional GET for list endpoints. A response is tagged with a version of
+# the data it came from (the Excel snapshot + journal signature locally, the
+# per-user business_versions counter on Supabase). A poll sending the tag back
+# in If-None-Match gets a 304 without the list being read or serialized; a
+# changed tag is served from the rendered-body cache when another poll
+# already built it.
+
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '256'))
+MAX_BYTES = int(float(os.getenv('RESPONSE_CACHE_MB', '64')) * 1024 * 1024)
+# Browsers keep the body and revalidate it with If-None-Match on every poll
+CACHE_CONTROL = 'private, no-cache'
+
+
+def etag(scope, key, version):
+    digest = hashlib.blake2b(f'{scope}|{key}|{version}'.encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def matches(if_none_match, tag):
+    """Whether an If-None-Match header value names tag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = tag[2:] if tag.startswith('W/') else tag
+    return any(candidate.strip().removeprefix('W/') == bare for candidate in if_none_match.split(','))
+
+
+def request_key(request):
+    """Path plus sorted query string, so parameter order does not matter."""
+    return request.url.path + '?' + '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.multi_items()))
+
+
+async def _call(produce):
+    result = produce()
+    return await result if inspect.isawaitable(result) else result
+
+
+class ResponseCache:
+    """Rendered JSON bodies by (scope, request key), valid for one version of the scope's data."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # (scope, key) -> (version, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counts = {'hit': 0, 'miss': 0, 'not_modified': 0}
+
+    def _count(self, result):
+        with self._lock:
+            self.counts[result] += 1
+
+    def get(self, scope, key, version):
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((scope, key))
+            return entry[1]
+
+    def put(self, scope, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((scope, key), None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[(scope, key)] = (version, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, scope=None):
+        """Drop the entries of one scope (a user), or all of them."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if scope is None or k[0] == scope]:
+                self._bytes -= len(self._entries.pop(entry_key)[1])
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self._entries), bytes=self._bytes)
+
+    async def respond(self, request, scope, version, produce, key=None):
+        """
+        The JSON response for request: 304 if the client's If-None-Match is
+        current, the cached body if this version was rendered before, else
+        produce() (a function or coroutine function) rendered and cached.
+        version None disables caching.
+        """
+        if version is None:
+            return await _call(produce)
+        key = key or request_key(request)
+        tag = etag(scope, key, version)
+        headers = {'ETag': tag, 'Cache-Control': CACHE_CONTROL}
+        if matches(request.headers.get('if-none-match'), tag):
+            self._count('not_modified')
+            return Response(status_code=304, headers=headers)
+        body = self.get(scope, key, version)
+        if body is None:
+            self._count('miss')
+            body = JSONResponse(jsonable_encoder(await _call(produce))).body
+            self.put(scope, key, version, body)
+        else:
+            self._count('hit')
+        return Response(body, media_type='application/json', headers=headers)
+
+
+response_cache = ResponseCache()
+
+
+def _collect():
+    stats = response_cache.stats()
+    yield 'response_cache_requests_total', 'counter', 'Cached list requests by result', \
+        [({'result': result}, stats[result]) for result in ('hit', 'miss', 'not_modified')]
+    yield 'response_cache_bytes', 'gauge', 'Bytes of rendered responses held', [({}, stats['bytes'])]
+
+
+register_collector(_collect)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Results of requests sent with an Idempotency-Key header, so a client that
+# retries (after a timeout, say) gets the first result instead of applying
+# the request twice. Kept in memory for TTL_SECONDS; the Supabase batch keeps
+# its keys in the business_batches table instead.
+
+TTL_SECONDS = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+
+
+class IdempotencyConflict(Exception):
+    """The key is in use by a different request, or by one still running."""
+
+
+def fingerprint(payload):
+    """Digest of a JSON-able request body, independent of key order."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl=TTL_SECONDS, max_keys=MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()   # (scope, key) -> (fingerprint, expires, result or None while running)
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            entry_key, (_, expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.pop(entry_key)
+
+    def begin(self, scope, key, digest):
+        """
+        The stored result for a retry, or None after claiming the key for a new
+        request (finish or release it). Raises IdempotencyConflict if the key
+        belongs to a different request or one that has not finished.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get((scope, key))
+            if entry is not None:
+                if entry[0] != digest:
+                    raise IdempotencyConflict("Idempotency key was used for a different request")
+                if entry[2] is None:
+                    raise IdempotencyConflict("A request with this idempotency key is still running")
+                return entry[2]
+            self._entries[(scope, key)] = (digest, now + self.ttl, None)
+            return None
+
+    def finish(self, scope, key, digest, result):
+        with self._lock:
+            self._entries[(scope, key)] = (digest, time.monotonic() + self.ttl, result)
+
+    def release(self, scope, key):
+        """Forget a claimed key whose request failed, so it can be retried."""
+        with self._lock:
+            self._entries.pop((scope, key), None)
+
+
+store = IdempotencyStore()
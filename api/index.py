@@ -10,26 +10,56 @@ from datetime import datetime
 from itertools import islice
 from urllib.parse import unquote
 from mangum import Mangum
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
+import logging
+try:
+    from .metrics import CONTENT_TYPE, configure_logging, instrument, render as render_metrics
+    from . import profiling
+    from .http_cache import response_cache
+    from . import realtime
+except ImportError:
+    from metrics import CONTENT_TYPE, configure_logging, instrument, render as render_metrics
+    import profiling
+    from http_cache import response_cache
+    import realtime
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Try-catch imports to handle missing dependencies gracefully
 try:
-    from .auth import get_current_user
+    from .auth import get_current_user, is_admin
     AUTH_AVAILABLE = True
 except ImportError as e:
-    print(f"Auth import failed: {e}")
+    logger.debug("Auth import failed: %s", e)
     try:
-        from auth import get_current_user
+        from auth import get_current_user, is_admin
         AUTH_AVAILABLE = True
     except ImportError as e2:
-        print(f"Auth import failed (both attempts): {e}, {e2}")
+        logger.error("Auth import failed (both attempts): %s, %s", e, e2)
         AUTH_AVAILABLE = False
 
 try:
     from .database import (
         get_all_businesses,
+        get_business_version,
+        get_business_changes,
+        get_changes_cursor,
+        decode_cursor,
         get_businesses_by_status,
+        query_businesses,
+        get_businesses_near,
+        get_call_history,
+        create_call_event,
+        lease_next_businesses,
+        release_business_lease,
         update_business,
+        apply_business_batch,
+        patch_errors,
+        call_event_errors,
         create_business,
+        get_known_place_ids,
         get_all_meetings,
         create_meeting,
         update_meeting,
@@ -41,13 +71,27 @@ try:
     )
     DATABASE_AVAILABLE = True
 except ImportError as e:
-    print(f"Database import failed: {e}")
+    logger.debug("Database import failed: %s", e)
     try:
         from database import (
             get_all_businesses,
+            get_business_version,
+            get_business_changes,
+            get_changes_cursor,
+            decode_cursor,
             get_businesses_by_status,
+            query_businesses,
+            get_businesses_near,
+            get_call_history,
+            create_call_event,
+            lease_next_businesses,
+            release_business_lease,
             update_business,
+            apply_business_batch,
+            patch_errors,
+            call_event_errors,
             create_business,
+            get_known_place_ids,
             get_all_meetings,
             create_meeting,
             update_meeting,
@@ -59,22 +103,24 @@ except ImportError as e:
         )
         DATABASE_AVAILABLE = True
     except ImportError as e2:
-        print(f"Database import failed (both attempts): {e}, {e2}")
+        logger.error("Database import failed (both attempts): %s, %s", e, e2)
         DATABASE_AVAILABLE = False
 
 try:
     from .models import Business, BusinessUpdate, NewBusiness, Meeting, Client
     MODELS_AVAILABLE = True
 except ImportError as e:
-    print(f"Models import failed: {e}")
+    logger.debug("Models import failed: %s", e)
     try:
         from models import Business, BusinessUpdate, NewBusiness, Meeting, Client
         MODELS_AVAILABLE = True
     except ImportError as e2:
-        print(f"Models import failed (both attempts): {e}, {e2}")
+        logger.error("Models import failed (both attempts): %s, %s", e, e2)
         MODELS_AVAILABLE = False
 
 app = FastAPI()
+instrument(app)
+profiling.install(app)
 
 # Enable CORS - update with your Vercel frontend URL when deployed
 app.add_middleware(
@@ -85,6 +131,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def _cached_list(request: Request, user_id: str, produce, cacheable: bool = True):
+    """
+    Serve a list of the user's businesses with an ETag from their business_versions
+    counter: 304 when the client's copy is current, else the cached or fresh body.
+    Lists are not cached when the version can't be read.
+    """
+    version = None
+    if cacheable:
+        try:
+            # Read before the list, so a write in between can only make the body newer than its tag.
+            # The date rolls the today/overdue callback lists over at midnight.
+            version = f"{await get_business_version(user_id)}:{datetime.now().date()}"
+        except Exception as e:
+            logger.debug("Business version unavailable: %s", e)
+    return await response_cache.respond(request, user_id, version, produce)
+
+def _business_changed(user_id: str):
+    """After a write to the user's businesses: drop their cached lists and wake their event streams"""
+    response_cache.invalidate(user_id)
+    realtime.hub.publish(user_id)
+
 @app.get("/api/health")
 async def health_check():
     try:
@@ -129,7 +196,14 @@ async def simple_test():
     return {"message": "Simple endpoint working", "status": "ok"}
 
 @app.get("/api/businesses")
-async def get_businesses(request: Request):
+async def get_businesses(
+    request: Request,
+    region: Optional[str] = Query(None),
+    open_now: bool = Query(False),
+    open_within: Optional[int] = Query(None, ge=0, le=24 * 60),
+    tz: Optional[str] = Query(None),
+    order: Optional[str] = Query(None, description="'cluster' puts neighbouring businesses next to each other")
+):
     try:
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE or not MODELS_AVAILABLE:
             return {"error": "Required modules not available", "missing": {
@@ -138,17 +212,122 @@ async def get_businesses(request: Request):
                 "models": not MODELS_AVAILABLE
             }}
         user_id = await get_current_user(request)
-        return await get_all_businesses(user_id)
+        if open_within is None and open_now:
+            open_within = 0
+        # Opening-hours filters change with the clock, not the data, so they are not cached
+        return await _cached_list(request, user_id, lambda: get_all_businesses(user_id, region, open_within, tz, order),
+                                  cacheable=open_within is None)
     except Exception as e:
         return {"error": str(e), "status": "businesses endpoint failed"}
 
+@app.get("/api/businesses/changes")
+async def business_changes_route(
+    request: Request,
+    since: Optional[str] = Query(None, description="cursor from the previous response"),
+    limit: int = Query(500, gt=0, le=2000)
+):
+    """
+    Businesses inserted or updated since the cursor, plus the ids of those deleted.
+    Without since, every business ("full": true). Drop the deleted ids, upsert the
+    changes by id and keep cursor for the next call; has_more means call again now.
+    """
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        try:
+            position = decode_cursor(since) if since else None
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return await get_business_changes(user_id, position, limit)
+    except Exception as e:
+        return {"error": str(e), "status": "business changes endpoint failed"}
+
+@app.get("/api/businesses/events")
+async def business_events_route(request: Request, since: Optional[str] = Query(None)):
+    """
+    Server-Sent Events stream of the user's business changes. Each "changes"
+    event has the body of GET /api/businesses/changes and its cursor as the
+    event id, so EventSource resumes where it left off after a reconnect.
+    Without since the stream starts at the latest change.
+    """
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        since = since or request.headers.get("last-event-id")
+        try:
+            position = decode_cursor(since) if since else decode_cursor(await get_changes_cursor(user_id))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return {"error": str(e), "status": "business events endpoint failed"}
+
+    async def stream():
+        nonlocal position
+        subscription = realtime.hub.subscribe(user_id)
+        deadline = asyncio.get_running_loop().time() + realtime.STREAM_SECONDS
+        try:
+            yield f"retry: {int(realtime.POLL_SECONDS * 1000)}\n\n"
+            while asyncio.get_running_loop().time() < deadline:
+                delta = await get_business_changes(user_id, position)
+                position = decode_cursor(delta["cursor"])
+                if delta["changes"] or delta["deleted"]:
+                    yield realtime.sse_event(delta, "changes", delta["cursor"])
+                if delta["has_more"]:
+                    continue
+                if not await subscription.wait():
+                    # Keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+        except Exception as e:
+            logger.exception("Business event stream failed")
+            yield realtime.sse_event({"error": str(e)}, "error")
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/businesses/query")
+async def query_businesses_route(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, gt=0, le=500)
+):
+    """Ranked, typo-tolerant search over name, address, comments and decision maker"""
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        return await query_businesses(q, user_id, limit)
+    except Exception as e:
+        return {"error": str(e), "status": "business query endpoint failed"}
+
+@app.get("/api/businesses/near")
+async def businesses_near_route(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(1000, gt=0, le=100000),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, gt=0, le=500)
+):
+    """Businesses within radius meters of a point, nearest first"""
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        return await get_businesses_near(user_id, lat, lng, radius, limit, status)
+    except Exception as e:
+        return {"error": str(e), "status": "businesses near endpoint failed"}
+
 @app.get("/api/businesses/{status}")
 async def get_businesses_by_status_route(status: str, request: Request):
     try:
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await get_businesses_by_status(status, user_id)
+        return await _cached_list(request, user_id, lambda: get_businesses_by_status(status, user_id))
     except Exception as e:
         return {"error": str(e), "status": "businesses status endpoint failed"}
 
@@ -158,7 +337,9 @@ async def create_business_route(business: dict, request: Request):
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await create_business(business, user_id)
+        created = await create_business(business, user_id)
+        _business_changed(user_id)
+        return created
     except Exception as e:
         # If there's an error (e.g., database constraint), raise an HTTPException
         # The frontend is already set up to handle 400 errors and continue
@@ -170,10 +351,90 @@ async def update_business_route(business_id: int, business: dict, request: Reque
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await update_business(business_id, business, user_id)
+        updated = await update_business(business_id, business, user_id)
+        _business_changed(user_id)
+        return updated
     except Exception as e:
         return {"error": str(e), "status": "update business endpoint failed"}
 
+# Operations per POST /api/businesses/batch
+BATCH_LIMIT = 500
+
+@app.post("/api/businesses/batch")
+async def batch_update_route(batch: dict, request: Request):
+    """
+    Apply {"operations": [{"id": ..., "patch": {...}}]} in one transaction.
+    Every operation is checked first; if any is invalid or is not one of the
+    user's businesses nothing is applied (422, with the error per operation).
+    A retry with the same Idempotency-Key header returns the first result.
+    """
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        operations = batch.get("operations")
+        if not isinstance(operations, list) or not 0 < len(operations) <= BATCH_LIMIT:
+            return JSONResponse({"error": f"Send between 1 and {BATCH_LIMIT} operations"}, status_code=400)
+
+        results = []
+        for index, operation in enumerate(operations):
+            errors = []
+            if not isinstance(operation, dict) or not isinstance(operation.get("id"), int):
+                errors.append("Each operation needs an integer id")
+            errors += patch_errors(operation.get("patch") if isinstance(operation, dict) else None)
+            result = {"index": index, "id": operation.get("id") if isinstance(operation, dict) else None}
+            results.append(dict(result, ok=False, error="; ".join(errors)) if errors else dict(result, ok=True))
+        if not all(result["ok"] for result in results):
+            return JSONResponse({"applied": False, "replayed": False, "results": results}, status_code=422)
+
+        outcome = await apply_business_batch(user_id, operations, request.headers.get("idempotency-key"))
+        if outcome.get("conflict"):
+            return JSONResponse({"error": "Idempotency key was used for a different request"}, status_code=409)
+        if not outcome["applied"]:
+            missing = set(outcome["missing"])
+            return JSONResponse({"applied": False, "replayed": False, "results": [
+                dict(result, ok=False, error="Business not found") if result["index"] in missing else result
+                for result in results]}, status_code=422)
+        if not outcome["replayed"]:
+            _business_changed(user_id)
+        return {"applied": True, "replayed": outcome["replayed"], "results": [
+            dict(result, ok=True, business=applied["business"])
+            for result, applied in zip(results, outcome["results"])]}
+    except Exception as e:
+        return {"error": str(e), "status": "batch update endpoint failed"}
+
+@app.get("/api/businesses/{business_id}/history")
+async def get_business_history_route(
+    business_id: int,
+    request: Request,
+    limit: int = Query(20, gt=0, le=200),
+    before: Optional[int] = Query(None)
+):
+    """Call history of a business, newest first; pass next_before to get the next page"""
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        return await get_call_history(business_id, user_id, limit, before)
+    except Exception as e:
+        return {"error": str(e), "status": "business history endpoint failed"}
+
+@app.post("/api/businesses/{business_id}/history")
+async def create_call_event_route(business_id: int, event: dict, request: Request):
+    """Log a call (outcome, note, duration_seconds); the note becomes the business's comments"""
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        errors = call_event_errors(event)
+        if errors:
+            return JSONResponse({"error": "; ".join(errors)}, status_code=400)
+        logged = await create_call_event(business_id, event, user_id)
+        _business_changed(user_id)
+        return logged
+    except Exception as e:
+        return {"error": str(e), "status": "log call endpoint failed"}
+
 @app.post("/api/businesses/upload")
 async def upload_businesses_json(businesses: List[dict], request: Request):
     """
@@ -206,9 +467,13 @@ async def upload_businesses_json(businesses: List[dict], request: Request):
                 'city': str(biz.get('city', '')).strip(),
                 'state': str(biz.get('state', '')).strip(),
                 'zip_code': str(biz.get('postalCode', '')).strip(),
+                'region': str(biz.get('city', '') or '').strip(),
                 'industry': str(biz.get('categoryName', 'Business')).strip(),
                 'website': str(biz.get('url', '')).strip(),
                 'status': 'new',
+                'place_id': biz.get('placeId') or biz.get('place_id') or None,
+                'latitude': (biz.get('location') or {}).get('lat'),
+                'longitude': (biz.get('location') or {}).get('lng'),
                 'notes': f"Imported from JSON. Rating: {biz.get('totalScore', 'N/A')}" + 
                         (f" | {biz.get('reviewsCount', 0)} reviews" if biz.get('reviewsCount') else ""),
                 'user_id': user_id
@@ -222,20 +487,27 @@ async def upload_businesses_json(businesses: List[dict], request: Request):
                         hours_list.append(f"{hour['day']}: {hour['hours']}")
                 if hours_list:
                     formatted_business['notes'] += f" | Hours: {', '.join(hours_list)}"
+                    # Stored like Google's weekday_text so it parses into hours_intervals
+                    formatted_business['hours'] = ' | '.join(hours_list)
             
             valid_businesses.append(formatted_business)
         
         if not valid_businesses:
             raise HTTPException(status_code=400, detail="No valid businesses found. Each business must have a name and phone number.")
         
-        # Remove duplicates based on phone number
+        # Remove duplicates based on phone number, and places that are already in the list
+        known_places = await get_known_place_ids(user_id, [business['place_id'] for business in valid_businesses])
         unique_businesses = []
         seen_phones = set()
+        skipped_existing = 0
         for business in valid_businesses:
             phone = business['phone']
-            if phone not in seen_phones:
+            if business['place_id'] and business['place_id'] in known_places:
+                skipped_existing += 1
+            elif phone not in seen_phones:
                 unique_businesses.append(business)
                 seen_phones.add(phone)
+                known_places.add(business['place_id'])
         
         # Bulk insert businesses
         created_businesses = []
@@ -250,12 +522,14 @@ async def upload_businesses_json(businesses: List[dict], request: Request):
                     'business': business['name'],
                     'error': str(e)
                 })
+        _business_changed(user_id)
         
         return {
             "message": f"Successfully uploaded {len(created_businesses)} businesses",
             "total_processed": len(businesses),
             "valid_businesses": len(valid_businesses),
             "unique_businesses": len(unique_businesses),
+            "skipped_existing": skipped_existing,
             "created_businesses": len(created_businesses),
             "failed_businesses": len(failed_businesses),
             "created": created_businesses,
@@ -328,7 +602,7 @@ async def get_today_callbacks(request: Request):
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await get_callbacks_due_today(user_id)
+        return await _cached_list(request, user_id, lambda: get_callbacks_due_today(user_id))
     except Exception as e:
         return {"error": str(e), "status": "callbacks today endpoint failed"}
 
@@ -338,10 +612,52 @@ async def get_overdue_callbacks_route(request: Request):
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await get_overdue_callbacks(user_id)
+        return await _cached_list(request, user_id, lambda: get_overdue_callbacks(user_id))
     except Exception as e:
         return {"error": str(e), "status": "callbacks overdue endpoint failed"}
 
+@app.get("/api/queue/next")
+async def next_in_queue_route(
+    request: Request,
+    n: int = Query(1, gt=0, le=50),
+    lease_seconds: int = Query(600, gt=0, le=4 * 3600),
+    open_now: bool = Query(False),
+    open_within: Optional[int] = Query(None, ge=0, le=24 * 60),
+    tz: Optional[str] = Query(None)
+):
+    """
+    Lease the next businesses to dial; the X-Caller header names the caller (defaults to the user).
+    open_now / open_within skip businesses that are closed (hours in the tz time zone).
+    """
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        caller = request.headers.get("x-caller") or user_id
+        if open_within is None and open_now:
+            open_within = 0
+        leased = await lease_next_businesses(user_id, caller, n, lease_seconds, open_within, tz)
+        _business_changed(user_id)
+        return leased
+    except Exception as e:
+        return {"error": str(e), "status": "queue next endpoint failed"}
+
+@app.post("/api/queue/{business_id}/release")
+async def release_lease_route(business_id: int, request: Request):
+    """Put a leased business back into the queue"""
+    try:
+        if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
+            return {"error": "Required modules not available"}
+        user_id = await get_current_user(request)
+        caller = request.headers.get("x-caller") or user_id
+        released = await release_business_lease(business_id, caller, user_id)
+        _business_changed(user_id)
+        if not released:
+            return {"error": "No lease on this business for this caller"}
+        return {"message": "Lease released"}
+    except Exception as e:
+        return {"error": str(e), "status": "queue release endpoint failed"}
+
 @app.get("/api/calls")
 async def get_calls(request: Request):
     """Get all businesses for calling purposes - alias for businesses endpoint"""
@@ -349,7 +665,7 @@ async def get_calls(request: Request):
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await get_all_businesses(user_id)
+        return await _cached_list(request, user_id, lambda: get_all_businesses(user_id))
     except Exception as e:
         return {"error": str(e), "status": "calls endpoint failed"}
 
@@ -360,10 +676,64 @@ async def get_calls_by_status(status: str, request: Request):
         if not AUTH_AVAILABLE or not DATABASE_AVAILABLE:
             return {"error": "Required modules not available"}
         user_id = await get_current_user(request)
-        return await get_businesses_by_status(status, user_id)
+        return await _cached_list(request, user_id, lambda: get_businesses_by_status(status, user_id))
     except Exception as e:
         return {"error": str(e), "status": "calls by status endpoint failed"}
 
+def _admin_required():
+    return JSONResponse(status_code=403, content={"error": "Admin access required"})
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus scrape endpoint (this instance only): route latency and Supabase timings. Admins only"""
+    if not AUTH_AVAILABLE or not await is_admin(request):
+        return _admin_required()
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    """Profiling settings and the profiles captured by this instance, newest first"""
+    try:
+        if not AUTH_AVAILABLE:
+            return {"error": "Required modules not available"}
+        if not await is_admin(request):
+            return _admin_required()
+        return {"settings": profiling.settings, "profiles": profiling.list_profiles()}
+    except Exception as e:
+        return {"error": str(e), "status": "list profiles endpoint failed"}
+
+@app.post("/api/admin/profiles/settings")
+async def update_profiling(data: dict, request: Request):
+    """Turn profiling on or off for this instance and set the sampled fraction of requests"""
+    try:
+        if not AUTH_AVAILABLE:
+            return {"error": "Required modules not available"}
+        if not await is_admin(request):
+            return _admin_required()
+        sample_rate = data.get("sample_rate")
+        return profiling.update_settings(enabled=data.get("enabled"),
+                                         sample_rate=float(sample_rate) if sample_rate is not None else None)
+    except Exception as e:
+        return {"error": str(e), "status": "profiling settings endpoint failed"}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request, format: str = Query("text")):
+    """A captured profile: the top functions as text, or the raw pstats file with format=pstats"""
+    try:
+        if not AUTH_AVAILABLE:
+            return {"error": "Required modules not available"}
+        if not await is_admin(request):
+            return _admin_required()
+        profile = profiling.get_profile(profile_id)
+        if profile is None:
+            return JSONResponse(status_code=404, content={"error": "Profile not found"})
+        if format == "pstats":
+            return Response(profile["pstats"], media_type="application/octet-stream",
+                            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'})
+        return Response(profile["text"], media_type="text/plain")
+    except Exception as e:
+        return {"error": str(e), "status": "download profile endpoint failed"}
+
 # Add error handling middleware
 @app.middleware("http")
 async def error_handling_middleware(request, call_next):
@@ -371,7 +741,7 @@ async def error_handling_middleware(request, call_next):
         response = await call_next(request)
         return response
     except Exception as e:
-        print(f"Middleware error: {str(e)}")
+        logger.exception("Middleware error: %s", e)
         return JSONResponse(
             status_code=500,
             content={"detail": str(e), "traceback": traceback.format_exc()}
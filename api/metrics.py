@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Latency histograms in the Prometheus text format, plus logging setup.
+# Shared by api.py (local) and api/index.py (Vercel); each process keeps
+# its own numbers, so on Vercel they cover one warm instance.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                            ('method', 'route', 'status'))
+OPERATION_SECONDS = Histogram('operation_duration_seconds',
+                              'Latency of Excel, Supabase, Places and VAPI calls',
+                              ('system', 'operation', 'outcome'))
+
+_histograms = [REQUEST_SECONDS, OPERATION_SECONDS]
+# Callables returning [(name, type, help, [(labels dict, value)])] at scrape time
+_collectors = []
+
+
+def register_collector(collect):
+    _collectors.append(collect)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+    for collect in _collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'  # starlette appends the charset
+
+
+def timed(system, operation=None):
+    """Decorator recording a function's latency (sync or async) under system/operation."""
+    def decorate(fn):
+        name = operation or fn.__name__
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = await fn(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                finally:
+                    OPERATION_SECONDS.observe(time.perf_counter() - started, system=system, operation=name,
+                                              outcome=outcome)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - started, system=system, operation=name,
+                                          outcome=outcome)
+        return wrapper
+    return decorate
+
+
+def instrument(app):
+    """Add middleware recording per-route latency and an access log line per request."""
+    access_log = logging.getLogger('access')
+
+    @app.middleware("http")
+    async def record_latency(request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            # The route template, not the raw path, so /api/businesses/{name} is one series
+            route = request.scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            REQUEST_SECONDS.observe(elapsed, method=request.method, route=path, status=status)
+            if access_log.isEnabledFor(logging.INFO):
+                access_log.info("request", extra={'fields': {
+                    'method': request.method, 'route': path, 'path': request.url.path,
+                    'status': status, 'duration_ms': round(elapsed * 1000, 2)}})
+    return app
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra={'fields': {...}} adds keys."""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=None, fmt=None):
+    """
+    Root logging from LOG_LEVEL (default INFO) and LOG_FORMAT ('json', the
+    default, or 'text'). Debug lines cost one level check when disabled.
+    """
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'json')).lower()
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
@@ -0,0 +1,122 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+# Opt-in request profiling with cProfile. A request is profiled when it sends
+# X-Profile (while profiling is enabled, or with PROFILE_TOKEN as the value),
+# or is picked by sample_rate while enabled. Profiles are kept in memory and
+# served by /api/admin/profiles. When nothing is enabled the middleware costs
+# one flag check and one header lookup.
+#
+# cProfile sees the event-loop thread only: async routes (filter,
+# update_business) are covered, work handed to the threadpool is not, and
+# other requests running on the loop at the same time show up in the profile.
+
+PROFILE_HEADER = 'x-profile'
+TOKEN = os.getenv('PROFILE_TOKEN') or None
+KEEP = int(os.getenv('PROFILE_KEEP', '20'))
+TOP_FUNCTIONS = 40
+
+settings = {
+    'enabled': os.getenv('PROFILING', '') == '1',
+    'sample_rate': float(os.getenv('PROFILE_SAMPLE_RATE', '0') or 0),
+}
+
+_profiles = deque(maxlen=KEEP)
+_profiles_lock = threading.Lock()
+# One profile at a time: cProfile only allows one active profiler per thread
+_active = threading.Lock()
+
+
+def update_settings(enabled=None, sample_rate=None):
+    if sample_rate is not None and not 0 <= sample_rate <= 1:
+        raise ValueError("sample_rate must be between 0 and 1")
+    if enabled is not None:
+        settings['enabled'] = bool(enabled)
+    if sample_rate is not None:
+        settings['sample_rate'] = float(sample_rate)
+    return dict(settings)
+
+
+def wanted(headers):
+    header = headers.get(PROFILE_HEADER)
+    if header is not None:
+        return settings['enabled'] or (TOKEN is not None and header == TOKEN)
+    return settings['enabled'] and random.random() < settings['sample_rate']
+
+
+def _summary(profiler, sort='cumulative'):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def save(profiler, method, path, route, status, seconds):
+    profiler.create_stats()
+    # Same bytes as Profile.dump_stats, so snakeviz/pstats can open the download.
+    # Taken first: pstats.Stats(profiler) empties profiler.stats.
+    raw = marshal.dumps(profiler.stats)
+    profile = {
+        'id': uuid.uuid4().hex[:12],
+        'captured_at': datetime.now().isoformat(timespec='seconds'),
+        'method': method,
+        'path': path,
+        'route': route,
+        'status': status,
+        'duration_ms': round(seconds * 1000, 2),
+        'text': _summary(profiler),
+        'pstats': raw,
+    }
+    with _profiles_lock:
+        _profiles.append(profile)
+    return profile
+
+
+def list_profiles():
+    """Newest first, without the profile bodies."""
+    with _profiles_lock:
+        profiles = list(_profiles)
+    return [{key: value for key, value in profile.items() if key not in ('text', 'pstats')}
+            for profile in reversed(profiles)]
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return next((profile for profile in _profiles if profile['id'] == profile_id), None)
+
+
+def install(app):
+    """Add the profiling middleware to a FastAPI app."""
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        if not (settings['enabled'] or PROFILE_HEADER in request.headers) or not wanted(request.headers):
+            return await call_next(request)
+        if not _active.acquire(blocking=False):
+            return await call_next(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        status = 500
+        try:
+            profiler.enable()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.disable()
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - started
+            _active.release()
+            route = getattr(request.scope.get('route'), 'path', 'unmatched')
+            profile = save(profiler, request.method, request.url.path, route, status, elapsed)
+        response.headers['X-Profile-Id'] = profile['id']
+        return response
+    return app
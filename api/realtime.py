@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import threading
+
+try:
+    from .metrics import register_collector
+except ImportError:
+    from metrics import register_collector
+
+# Push for business changes. A mutation route calls hub.publish(scope) after
+# its write (scope is the user, or 'local' for the Excel app); every
+# subscriber of that scope wakes up and sends what changed since its cursor,
+# using the same delta sync as GET /api/businesses/changes. Wake-ups carry no
+# payload, so a burst of writes costs one delta and a client that reconnects
+# with its last cursor misses nothing.
+# Subscribers also wake every POLL_SECONDS, which picks up writes made by
+# other processes (another serverless instance, or the database directly).
+
+POLL_SECONDS = float(os.getenv('REALTIME_POLL_SECONDS', '5'))
+# Serverless functions are cut off after a while; end event streams first, the browser reconnects
+STREAM_SECONDS = float(os.getenv('REALTIME_STREAM_SECONDS', '240'))
+
+
+class Subscription:
+    """One client's wake-up flag for a scope. Use from the event loop that created it."""
+
+    def __init__(self, hub, scope):
+        self.hub = hub
+        self.scope = scope
+        self.loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def _wake(self):
+        self.loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout=None):
+        """True when woken by a publish, False after timeout (default POLL_SECONDS)."""
+        try:
+            await asyncio.wait_for(self._event.wait(), POLL_SECONDS if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+    def close(self):
+        self.hub._remove(self)
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers = {}   # scope -> set of Subscription
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, scope):
+        subscription = Subscription(self, scope)
+        with self._lock:
+            self._subscribers.setdefault(scope, set()).add(subscription)
+        return subscription
+
+    def _remove(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.scope, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.scope, None)
+
+    def publish(self, scope):
+        """Wake every subscriber of scope. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(scope, ()))
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription._wake()
+            except RuntimeError:
+                # Its event loop is closed; the subscriber is gone
+                subscription.close()
+
+    def count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+hub = Hub()
+
+
+def sse_event(data, event=None, event_id=None):
+    """One Server-Sent Events frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _collect():
+    yield 'realtime_subscribers', 'gauge', 'Open realtime connections', [({}, hub.count())]
+    yield 'realtime_publishes_total', 'counter', 'Business change notifications', [({}, hub.published)]
+
+
+register_collector(_collect)
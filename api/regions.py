@@ -0,0 +1,34 @@
+import re
+import pandas as pd
+
+# Province abbreviations and "Canada" are never the city
+SKIP_WORDS = {'BC', 'AB', 'SK', 'MB', 'ON', 'QC', 'NB', 'NS', 'PE', 'NL', 'YT', 'NT', 'NU', 'Canada'}
+
+def extract_city(address):
+    """
+    Derive the region (city) from a single address.
+    Scans the comma separated parts from right to left and returns the first
+    one that is not a province/country and contains letters but no digits.
+    """
+    if address is None or (not isinstance(address, str) and pd.isna(address)):
+        return ''
+
+    parts = [p.strip() for p in str(address).split(',')]
+    for part in reversed(parts):
+        if not part or part in SKIP_WORDS:
+            continue
+        if re.search(r'\d', part):
+            continue
+        if re.search(r'[a-zA-Z]', part):
+            return part
+    return ''
+
+def extract_cities(addresses):
+    """
+    Derive regions for a whole Series of addresses at once.
+    Each distinct address is parsed once and the result mapped back, which is
+    what makes ingest and backfill batches cheap (lead lists repeat a lot).
+    """
+    addresses = pd.Series(addresses, dtype=object)
+    unique = pd.unique(addresses)
+    return addresses.map(dict(zip(unique, map(extract_city, unique))))
@@ -0,0 +1 @@
+# Offline benchmarks: python -m benchmarks.run (see benchmarks/README.md)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic businesses shaped like a real call list: a few cities, a mix of
+# statuses and comments, weekday_text hours and coordinates for most rows.
+
+WORDS = ['Golden', 'Dragon', 'Pizza', 'Cafe', 'Bistro', 'Maple', 'Sushi', 'Taco', 'Grill', 'House',
+         'Garden', 'Royal', 'Blue', 'Corner', 'Spice', 'Noodle', 'Burger', 'Bakery', 'Express', 'Kitchen']
+# city, province, postal prefix, latitude, longitude
+CITIES = [('Vancouver', 'BC', 'V5K', 49.2827, -123.1207), ('Burnaby', 'BC', 'V5H', 49.2488, -122.9805),
+          ('Surrey', 'BC', 'V3T', 49.1913, -122.8490), ('Richmond', 'BC', 'V6X', 49.1666, -123.1336),
+          ('Victoria', 'BC', 'V8W', 48.4284, -123.3656), ('Calgary', 'AB', 'T2P', 51.0447, -114.0719),
+          ('Toronto', 'ON', 'M5H', 43.6532, -79.3832), ('Montreal', 'QC', 'H2Y', 45.5019, -73.5674)]
+STATUSES = ['tocall', 'tocall', 'tocall', 'called', 'callback', 'dont_call', 'To Call', 'Called']
+COMMENTS = ['', '', '2024-01-02 10:00: left voicemail', 'spoke to owner | call back', 'not interested']
+PEOPLE = ['', '', 'John Smith', 'Maria Garcia', 'Li Wei', 'Priya Patel', 'Ahmed Khan']
+INDUSTRIES = ['Restaurant', 'Restaurant', 'Cafe', 'Bar', 'Bakery']
+HOURS = [
+    '',
+    ' | '.join(f'{day}: 9:00 AM – 5:00 PM' for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'))
+    + ' | Saturday: Closed | Sunday: Closed',
+    ' | '.join(f'{day}: 11:00 AM – 10:00 PM' for day in
+               ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')),
+    ' | '.join(f'{day}: 5:00 PM – 2:00 AM' for day in ('Thursday', 'Friday', 'Saturday'))
+    + ' | Monday: Closed | Tuesday: Closed | Wednesday: Closed | Sunday: Closed',
+]
+
+
+def business_name(i, first, second):
+    return f'{WORDS[first]} {WORDS[second]} {i}'
+
+
+def make_businesses(rows, seed=0):
+    """A DataFrame of rows businesses with every call_tracker column."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows)
+    first, second = rng.integers(0, len(WORDS), rows), rng.integers(0, len(WORDS), rows)
+    city = rng.integers(0, len(CITIES), rows)
+    cities = [CITIES[c] for c in city]
+    located = rng.random(rows) > 0.1
+    lat = np.array([c[3] for c in cities]) + rng.normal(0, 0.03, rows)
+    lng = np.array([c[4] for c in cities]) + rng.normal(0, 0.05, rows)
+    return pd.DataFrame({
+        'Name': [business_name(i, a, b) for i, a, b in zip(ids, first, second)],
+        'Number': [f'604-555-{i % 10000:04d}' for i in ids],
+        'Address': [f'{number} Main St, {c[0]}, {c[1]} {c[2]} 0A1, Canada'
+                    for number, c in zip(rng.integers(1, 9999, rows), cities)],
+        'Status': rng.choice(STATUSES, rows),
+        'Comments': rng.choice(COMMENTS, rows),
+        'Region': [c[0] for c in cities],
+        'Hours': rng.choice(HOURS, rows),
+        'Industry': rng.choice(INDUSTRIES, rows),
+        'DecisionMaker': rng.choice(PEOPLE, rows),
+        'Latitude': np.where(located, lat, np.nan),
+        'Longitude': np.where(located, lng, np.nan),
+        'PlaceId': [f'place-{i}' for i in ids],
+    })
+
+
+def new_businesses(count, start, seed=1):
+    """Bodies for POST /api/businesses(/bulk): count businesses not in make_businesses' names."""
+    rng = np.random.default_rng(seed + start)
+    businesses = []
+    for i in range(start, start + count):
+        c = CITIES[int(rng.integers(0, len(CITIES)))]
+        businesses.append({
+            'name': f'New Business {i}',
+            'phone': f'778-555-{i % 10000:04d}',
+            'address': f'{int(rng.integers(1, 9999))} Oak Ave, {c[0]}, {c[1]} {c[2]} 1B2, Canada',
+            'status': 'tocall',
+            'hours': HOURS[i % len(HOURS)],
+            'latitude': c[3] + float(rng.normal(0, 0.03)),
+            'longitude': c[4] + float(rng.normal(0, 0.05)),
+            'place_id': f'new-place-{i}',
+        })
+    return businesses
+
+
+def places_export(count, start, seed=2):
+    """A Google Places JSON export, as POSTed to /api/businesses/upload."""
+    rng = np.random.default_rng(seed + start)
+    export = []
+    for i in range(start, start + count):
+        c = CITIES[int(rng.integers(0, len(CITIES)))]
+        export.append({
+            'title': f'Upload Business {i}',
+            'phone': f'+1 604-555-{i % 10000:04d}',
+            'phoneUnformatted': f'+1604555{i % 10000:04d}',
+            'address': f'{int(rng.integers(1, 9999))} Pine St, {c[0]}, {c[1]} {c[2]} 2C3, Canada',
+            'city': c[0],
+            'state': c[1],
+            'postalCode': f'{c[2]} 2C3',
+            'categoryName': 'Restaurant',
+            'url': f'https://maps.google.com/?cid={i}',
+            'placeId': f'place-{i}',
+            'location': {'lat': c[3] + float(rng.normal(0, 0.03)), 'lng': c[4] + float(rng.normal(0, 0.05))},
+            'totalScore': round(float(rng.uniform(3, 5)), 1),
+            'reviewsCount': int(rng.integers(0, 500)),
+            'openingHours': [{'day': day, 'hours': '11 AM to 10 PM'}
+                             for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')],
+        })
+    return export
+
+
+def supabase_rows(df, user_id):
+    """The businesses table rows api/index.py would have stored for df."""
+    return [{
+        'id': i + 1,
+        'user_id': user_id,
+        'name': row.Name,
+        'phone': row.Number,
+        'address': row.Address,
+        'region': row.Region,
+        'status': str(row.Status).lower().replace(' ', ''),
+        'industry': row.Industry,
+        'hours': row.Hours,
+        'notes': row.Comments,
+        'place_id': row.PlaceId,
+        'latitude': None if np.isnan(row.Latitude) else row.Latitude,
+        'longitude': None if np.isnan(row.Longitude) else row.Longitude,
+        'callback_due_date': None,
+        'updated_at': '2024-01-01T00:00:00+00:00',
+    } for i, row in enumerate(df.itertuples(index=False))]
@@ -0,0 +1,397 @@
+import csv
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from api.geo import haversine_m
+
+# Offline stand-ins for the two remote services: a googlemaps.Client with the
+# calls search and lookup make, and a supabase client with the query-builder
+# subset api/database.py uses. Both keep everything in memory and can sleep
+# per call to mimic network latency.
+
+
+class FakePlaces:
+    """googlemaps.Client over synthetic places around a city center."""
+
+    def __init__(self, center=(49.2827, -123.1207), places=3000, spread=0.05, latency=0.0, seed=3):
+        rng = np.random.default_rng(seed)
+        self.center = center
+        self.spread = spread
+        self.lat = center[0] + rng.normal(0, spread / 2, places)
+        self.lng = center[1] + rng.normal(0, spread, places)
+        self.latency = latency
+        self.calls = {}
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _place(self, i, keyword=''):
+        return {'place_id': f'fake-{i}', 'name': f'{keyword.title()} Place {i}'.strip(),
+                'geometry': {'location': {'lat': float(self.lat[i]), 'lng': float(self.lng[i])}}}
+
+    def geocode(self, address):
+        self._call('geocode')
+        lat, lng = self.center
+        return [{'geometry': {
+            'location': {'lat': lat, 'lng': lng},
+            'viewport': {'southwest': {'lat': lat - self.spread, 'lng': lng - self.spread},
+                         'northeast': {'lat': lat + self.spread, 'lng': lng + self.spread}}}}]
+
+    def places(self, query=None, type=None, page_token=None, **kwargs):
+        """Text search: one page of the 20 places nearest the center."""
+        self._call('places')
+        keyword = (query or '').split(' ')[0]
+        nearest = np.argsort(haversine_m(self.center[0], self.center[1], self.lat, self.lng))[:20]
+        return {'status': 'OK', 'results': [self._place(i, keyword) for i in nearest]}
+
+    def places_nearby(self, location=None, radius=None, keyword=None, page_token=None, **kwargs):
+        """Nearby search: the first 20 places within radius, no further pages."""
+        self._call('places_nearby')
+        inside = np.flatnonzero(haversine_m(location[0], location[1], self.lat, self.lng) <= radius)[:20]
+        return {'status': 'OK' if len(inside) else 'ZERO_RESULTS',
+                'results': [self._place(i, keyword or '') for i in inside]}
+
+    def place(self, place_id=None, fields=None, **kwargs):
+        self._call('place')
+        i = int(place_id.split('-')[-1])
+        return {'status': 'OK', 'result': {
+            'name': f'Place {i}',
+            'formatted_phone_number': f'(604) 555-{i % 10000:04d}',
+            'formatted_address': f'{i} Fake St, Vancouver, BC V5K 0A1, Canada',
+            'website': f'https://place{i}.example' if i % 3 else '',
+            'url': f'https://maps.google.com/?cid={i}',
+            'opening_hours': {'weekday_text': ['Monday: 9:00 AM – 5:00 PM', 'Tuesday: 9:00 AM – 5:00 PM']},
+        }}
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _coerce(raw, sample):
+    """The filter value raw (a string) as the type of the stored value sample."""
+    if isinstance(sample, bool):
+        return raw == 'true'
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def column_test(column, operator, raw):
+    """A row predicate for the PostgREST filter column=operator.raw."""
+    negate = operator.startswith('not.')
+    if negate:
+        operator = operator[4:]
+    if operator == 'is':
+        expected = {'null': None, 'true': True, 'false': False}[raw]
+        test = lambda row: row.get(column) is expected
+    elif operator == 'in':
+        inner = raw[1:-1] if raw.startswith('(') and raw.endswith(')') else raw
+        values = next(csv.reader([inner])) if inner else []
+        test = lambda row: row.get(column) is not None and \
+            row[column] in {_coerce(v, row[column]) for v in values}
+    else:
+        compare = {'eq': lambda a, b: a == b, 'neq': lambda a, b: a != b, 'lt': lambda a, b: a < b,
+                   'lte': lambda a, b: a <= b, 'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b}[operator]
+        raw = _unquote(raw)
+        test = lambda row: row.get(column) is not None and compare(row[column], _coerce(raw, row[column]))
+    return (lambda row: not test(row)) if negate else test
+
+
+def _split_top_level(text):
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def logic_test(operator, text):
+    """A row predicate for a PostgREST logic tree: or=(a.eq.1,and(b.gt.2,c.lt.3))."""
+    tests = []
+    for part in _split_top_level(text):
+        if part.startswith(('and(', 'or(')) and part.endswith(')'):
+            inner_operator, _, inner = part.partition('(')
+            tests.append(logic_test(inner_operator, inner[:-1]))
+        else:
+            column, _, rest = part.partition('.')
+            part_operator, _, raw = rest.partition('.')
+            if part_operator == 'not':
+                negated, _, raw = raw.partition('.')
+                part_operator = f'not.{negated}'
+            tests.append(column_test(column, part_operator, raw))
+    combine = any if operator == 'or' else all
+    return lambda row: combine(test(row) for test in tests)
+
+
+class FakeQuery:
+    """One table query, built up like supabase-py's and run by execute()."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = 'select'
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.window = None
+        self.columns = '*'
+        self.count = None
+
+    def select(self, columns='*', count=None):
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def update(self, data):
+        self.action, self.payload = 'update', data
+        return self
+
+    def upsert(self, rows):
+        """Insert rows, or update the existing row with the same id."""
+        self.action, self.payload = 'upsert', rows
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def where(self, test):
+        """Keep rows for which test(row) is true."""
+        self.filters.append(test)
+        return self
+
+    def eq(self, column, value):
+        return self.where(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self.where(lambda row: row.get(column) != value)
+
+    def lt(self, column, value):
+        return self.where(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column, value):
+        return self.where(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def gt(self, column, value):
+        return self.where(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column, value):
+        return self.where(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self.where(lambda row: row.get(column) in values)
+
+    def or_(self, filters):
+        return self.where(logic_test('or', filters))
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.window = (0, count)
+        return self
+
+    def range(self, start, end):
+        """Rows start..end inclusive, like PostgREST's Range header."""
+        self.window = (start, end - start + 1)
+        return self
+
+    def _project(self, row):
+        if self.columns == '*':
+            return dict(row)
+        return {column.strip(): row.get(column.strip()) for column in self.columns.split(',')}
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the supabase client: table() queries with
+    select/eq/neq/lt/lte/gt/gte/in_/or_/order/limit/range and
+    insert/update/delete, plus rpc('apply_business_batch'). latency seconds
+    are slept on every execute(), as a round trip would. Writes to businesses
+    do what the triggers in supabase-setup-safe.sql do: set updated_at, number
+    each write from the owner's business_versions counter (change_seq) and
+    log deletes in business_tombstones.
+    """
+
+    def __init__(self, tables=None, latency=0.0):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.next_id = {name: max((row.get('id', 0) for row in rows), default=0) + 1
+                        for name, rows in self.tables.items()}
+        self.latency = latency
+        self.requests = 0
+        # Numbered as the change_seq backfill in supabase-setup-safe.sql does
+        for row in self.tables.get('businesses', []):
+            if row.get('user_id') is not None and row.get('change_seq') is None:
+                row['change_seq'] = self._next_change(row['user_id'])
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        if name != 'apply_business_batch':
+            raise NotImplementedError(f"FakeSupabase has no rpc {name}()")
+        return SimpleNamespace(execute=lambda: self._rpc_call(self._apply_business_batch, params))
+
+    def _rpc_call(self, function, params):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(data=function(**params), count=None)
+
+    def _apply_business_batch(self, p_user_id, p_key, p_request_hash, p_operations):
+        """apply_business_batch() from supabase-setup-safe.sql."""
+        batches = self.tables.setdefault('business_batches', [])
+        if p_key is not None:
+            previous = next((row for row in batches
+                             if row['user_id'] == p_user_id and row['idempotency_key'] == p_key), None)
+            if previous is not None:
+                if previous['request_hash'] != p_request_hash:
+                    return {'conflict': True}
+                return {'applied': True, 'replayed': True, 'results': previous['results']}
+        rows = {row['id']: row for row in self.tables.get('businesses', []) if row.get('user_id') == p_user_id}
+        missing = [i for i, operation in enumerate(p_operations) if operation['id'] not in rows]
+        if missing:
+            return {'applied': False, 'missing': missing}
+        results = []
+        for operation in p_operations:
+            row = rows[operation['id']]
+            before = dict(row)
+            patch = dict(operation['patch'])
+            stamped = {'called': 'last_called_date', 'callback': 'last_callback_date'}.get(patch.get('status'))
+            if stamped and stamped not in patch:
+                patch[stamped] = _now()
+            row.update(patch, updated_at=_now())
+            self._after_write('businesses', [before], [row])
+            results.append({'id': row['id'], 'business': dict(row)})
+        if p_key is not None:
+            batches.append({'user_id': p_user_id, 'idempotency_key': p_key, 'request_hash': p_request_hash,
+                            'results': results})
+        return {'applied': True, 'replayed': False, 'results': results}
+
+    def _matches(self, query):
+        return [row for row in self.tables.setdefault(query.table, []) if all(test(row) for test in query.filters)]
+
+    def _insert(self, table, row):
+        row = dict(row)
+        if 'id' not in row:
+            row['id'] = self.next_id.get(table, 1)
+            self.next_id[table] = row['id'] + 1
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def _next_change(self, user_id):
+        """next_business_change() from supabase-setup-safe.sql."""
+        versions = self.tables.setdefault('business_versions', [])
+        current = next((row for row in versions if row['user_id'] == user_id), None)
+        if current is None:
+            current = {'user_id': user_id, 'version': 0}
+            versions.append(current)
+        current['version'] += 1
+        return current['version']
+
+    def _after_write(self, table, old_rows, new_rows):
+        if table != 'businesses':
+            return
+        for row in new_rows:
+            if row.get('user_id') is not None:
+                row['change_seq'] = self._next_change(row['user_id'])
+        # A business that left a user (deleted or reassigned) is a tombstone for that user
+        kept = {(row['id'], row.get('user_id')) for row in new_rows}
+        for row in old_rows:
+            if row.get('user_id') is not None and (row['id'], row.get('user_id')) not in kept:
+                self._insert('business_tombstones', {'user_id': row['user_id'], 'business_id': row['id'],
+                                                     'deleted_at': _now(),
+                                                     'change_seq': self._next_change(row['user_id'])})
+
+    def execute(self, query):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if query.action == 'insert':
+            rows = query.payload if isinstance(query.payload, list) else [query.payload]
+            created = []
+            for row in rows:
+                if query.table == 'businesses':
+                    row = dict(row, updated_at=row.get('updated_at') or _now())
+                created.append(self._insert(query.table, row))
+            self._after_write(query.table, [], created)
+            return SimpleNamespace(data=[dict(row) for row in created], count=None)
+        if query.action == 'upsert':
+            rows = query.payload if isinstance(query.payload, list) else [query.payload]
+            table = self.tables.setdefault(query.table, [])
+            by_id = {row['id']: row for row in table if 'id' in row}
+            before, written = [], []
+            for row in rows:
+                current = by_id.get(row.get('id'))
+                if current is None:
+                    current = self._insert(query.table, row)
+                else:
+                    before.append(dict(current))
+                    current.update(row)
+                if query.table == 'businesses':
+                    current['updated_at'] = _now()
+                written.append(current)
+            self._after_write(query.table, before, written)
+            return SimpleNamespace(data=[dict(row) for row in written], count=None)
+        matches = self._matches(query)
+        if query.action == 'update':
+            before = [dict(row) for row in matches]
+            for row in matches:
+                row.update(query.payload)
+                if query.table == 'businesses':
+                    row['updated_at'] = _now()
+            self._after_write(query.table, before, matches)
+            return SimpleNamespace(data=[dict(row) for row in matches], count=None)
+        if query.action == 'delete':
+            removed = {id(row) for row in matches}
+            self.tables[query.table] = [row for row in self.tables[query.table] if id(row) not in removed]
+            self._after_write(query.table, matches, [])
+            return SimpleNamespace(data=[dict(row) for row in matches], count=None)
+        for column, desc in reversed(query.ordering):
+            # NULLs sort last ascending and first descending, as in Postgres
+            matches.sort(key=lambda row: (row.get(column) is None,
+                                          row.get(column) if row.get(column) is not None else 0), reverse=desc)
+        total = len(matches)
+        if query.window:
+            start, count = query.window
+            matches = matches[start:] if count is None else matches[start:start + count]
+        return SimpleNamespace(data=[query._project(row) for row in matches],
+                               count=total if query.count else None)
@@ -0,0 +1,199 @@
+"""
+Load test for the Vercel app (api/index.py) against a local PostgREST stand-in.
+
+    python -m benchmarks.loadtest                         # 20 users for 30s, 20ms database latency
+    python -m benchmarks.loadtest --users 50 --duration 60 --latency-ms 40 --jitter-ms 60
+    python -m benchmarks.loadtest --mix list=60,filter=30,update=10 --out /tmp/load.json
+
+The app and benchmarks/postgrest.py run under uvicorn on local ports, seeded
+with a synthetic call list. Virtual users send requests back to back, picking
+list, filter, update or upload by weight. The report gives throughput and
+p50/p95/p99 latency per endpoint.
+
+Everything shares one process, so treat the numbers as a way to compare
+changes, not as the capacity of a deployment.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_ID = 'load-test-user'
+DEFAULT_MIX = {'list': 40, 'filter': 30, 'update': 25, 'upload': 5}
+STATUSES = ['tocall', 'called', 'callback', 'dont_call']
+REGIONS = ['Vancouver', 'Burnaby', 'Surrey', 'Richmond', 'Victoria', 'Calgary', 'Toronto', 'Montreal']
+# Businesses per upload request
+UPLOAD_SIZE = 20
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(math.ceil(p * len(sorted_values)) - 1, 0))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint '{name}'; use {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Workload:
+    """Builds each endpoint's next request and records how it went."""
+
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.random = random.Random(seed)
+        self.uploads = 0
+        self.samples = {}   # endpoint -> [seconds]
+        self.errors = {}
+
+    def request(self, endpoint):
+        """(method, path, kwargs) for one request to endpoint."""
+        from benchmarks.data import places_export
+
+        if endpoint == 'list':
+            return 'GET', '/api/businesses', {}
+        if endpoint == 'filter':
+            if self.random.random() < 0.5:
+                return 'GET', '/api/businesses', {'params': {'region': self.random.choice(REGIONS)}}
+            return 'GET', f'/api/businesses/{self.random.choice(STATUSES)}', {}
+        if endpoint == 'update':
+            business_id = self.random.randint(1, self.rows)
+            return 'PUT', f'/api/businesses/{business_id}', {'json': {
+                'status': self.random.choice(STATUSES), 'notes': f'load test {time.time():.0f}'}}
+        # Half of each upload is already stored, so the known-place check has work to do
+        self.uploads += 1
+        start = self.rows - UPLOAD_SIZE // 2 + self.uploads * UPLOAD_SIZE
+        return 'POST', '/api/businesses/upload', {'json': places_export(UPLOAD_SIZE, start)}
+
+    def record(self, endpoint, seconds, failed):
+        self.samples.setdefault(endpoint, []).append(seconds)
+        if failed:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            endpoints[endpoint] = {
+                'requests': len(ordered),
+                'errors': self.errors.get(endpoint, 0),
+                'throughput': round(len(ordered) / elapsed, 2),
+                'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+                'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2),
+            }
+        total = sum(values['requests'] for values in endpoints.values())
+        return {
+            'seconds': round(elapsed, 2),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'throughput': round(total / elapsed, 2) if elapsed else 0.0,
+            'endpoints': endpoints,
+        }
+
+
+def failed(response):
+    # api/index.py reports most failures as 200 {"error": ...}
+    return response.status_code >= 400 or response.content[:9] == b'{"error"'
+
+
+async def drive(base_url, workload, mix, users, duration):
+    import httpx
+
+    endpoints, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration
+
+    async def user(client):
+        while time.monotonic() < deadline:
+            endpoint = workload.random.choices(endpoints, weights)[0]
+            method, path, kwargs = workload.request(endpoint)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                bad = failed(response)
+            except httpx.HTTPError:
+                bad = True
+            workload.record(endpoint, time.perf_counter() - started, bad)
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, headers={'x-user-id': USER_ID}, limits=limits,
+                                 timeout=60) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(user(client) for _ in range(users)))
+        return time.monotonic() - started
+
+
+def run(rows=2000, users=20, duration=30.0, latency=0.02, jitter=0.0, mix=None, seed=0):
+    """Seed the stand-in, start both servers, drive the workload; returns the report dict."""
+    os.environ['LOG_LEVEL'] = os.environ.get('LOADTEST_LOG_LEVEL', 'WARNING')
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from postgrest import SyncPostgrestClient
+    import api.database
+    import api.index
+    from benchmarks.data import make_businesses, supabase_rows
+    from benchmarks.fakes import FakeSupabase
+    from benchmarks.postgrest import PostgREST, Server
+
+    mix = mix or DEFAULT_MIX
+    store = FakeSupabase({'businesses': supabase_rows(make_businesses(rows, seed), USER_ID)})
+    workload = Workload(rows, seed)
+    with Server(PostgREST(store, latency, jitter, seed).app) as database_url:
+        # The client supabase.table() delegates to, pointed at the stand-in
+        api.database._supabase_client = SyncPostgrestClient(f'{database_url}/rest/v1',
+                                                             headers={'apikey': 'load-test'})
+        try:
+            with Server(api.index.app) as app_url:
+                elapsed = asyncio.run(drive(app_url, workload, mix, users, duration))
+        finally:
+            api.database._supabase_client = None
+    report = workload.report(elapsed)
+    report['config'] = {'rows': rows, 'users': users, 'duration': duration, 'latency_ms': latency * 1000,
+                        'jitter_ms': jitter * 1000, 'mix': mix, 'database_requests': store.requests}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test api/index.py against a local PostgREST stand-in")
+    parser.add_argument('--rows', type=int, default=2000, help="businesses seeded for the test user")
+    parser.add_argument('--users', type=int, default=20, help="concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=30, help="seconds to run")
+    parser.add_argument('--latency-ms', type=float, default=20, help="added to every database request")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="random extra database latency, 0..jitter")
+    parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                        help="endpoint weights")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.users, args.duration, args.latency_ms / 1000, args.jitter_ms / 1000,
+                 parse_mix(args.mix), args.seed)
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for endpoint, values in report['endpoints'].items():
+        print(f"{endpoint:<10} {values['requests']:>9} {values['errors']:>7} {values['throughput']:>8} "
+              f"{values['p50_ms']:>9} {values['p95_ms']:>9} {values['p99_ms']:>9} {values['max_ms']:>9}")
+    print(f"{'total':<10} {report['requests']:>9} {report['errors']:>7} {report['throughput']:>8}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
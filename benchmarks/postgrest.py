@@ -0,0 +1,129 @@
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.fakes import FakeSupabase, column_test, logic_test
+
+# A local PostgREST stand-in for load tests. postgrest-py (the client behind
+# supabase.table()) talks to it over HTTP at http://127.0.0.1:<port>/rest/v1,
+# so api/database.py runs unchanged.
+# It speaks the subset api/database.py uses: select, eq/neq/lt/lte/gt/gte/
+# in/is filters and or=(...) trees, order, limit/offset, insert, update and delete, with
+# Prefer: count=exact and return=representation|minimal, and the RPCs
+# FakeSupabase implements. Rows live in a FakeSupabase. Every request sleeps latency plus up to jitter seconds first,
+# without blocking other requests.
+
+RESERVED = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+
+class PostgREST:
+    """Starlette app serving /rest/v1/<table> over a FakeSupabase."""
+
+    def __init__(self, store=None, latency=0.0, jitter=0.0, seed=0):
+        self.store = store or FakeSupabase()
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.app = Starlette(routes=[
+            Route('/rest/v1/rpc/{name}', self.rpc, methods=['POST']),
+            Route('/rest/v1/{table}', self.table, methods=['GET', 'HEAD', 'POST', 'PATCH', 'DELETE']),
+        ])
+
+    async def _delay(self):
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def rpc(self, request: Request):
+        await self._delay()
+        name = request.path_params['name']
+        try:
+            call = self.store.rpc(name, json.loads(await request.body() or b'{}'))
+        except NotImplementedError:
+            return JSONResponse({'code': 'PGRST202', 'message': f'Could not find the function public.{name}'},
+                                status_code=404)
+        return JSONResponse(call.execute().data)
+
+    async def table(self, request: Request):
+        await self._delay()
+        query = self.store.table(request.path_params['table'])
+        params = request.query_params
+        prefer = request.headers.get('prefer', '')
+        try:
+            for column, value in params.multi_items():
+                if column in ('or', 'and'):
+                    query.where(logic_test(column, value[1:-1]))
+                elif column not in RESERVED:
+                    operator, _, raw = value.partition('.')
+                    if operator == 'not':
+                        negated, _, raw = raw.partition('.')
+                        operator = f'not.{negated}'
+                    query.where(column_test(column, operator, raw))
+            if request.method in ('GET', 'HEAD'):
+                query.select(params.get('select', '*'), count='exact' if 'count=exact' in prefer else None)
+                for part in filter(None, params.get('order', '').split(',')):
+                    column, *modifiers = part.split('.')
+                    query.order(column, desc='desc' in modifiers)
+                if 'limit' in params or 'offset' in params:
+                    start = int(params.get('offset', 0))
+                    query.window = (start, int(params['limit']) if 'limit' in params else None)
+            elif request.method == 'POST':
+                query.insert(json.loads(await request.body() or b'[]'))
+            elif request.method == 'PATCH':
+                query.update(json.loads(await request.body() or b'{}'))
+            else:
+                query.delete()
+            result = query.execute()
+        except (KeyError, ValueError, TypeError) as e:
+            return JSONResponse({'code': 'PGRST100', 'message': str(e)}, status_code=400)
+
+        headers = {}
+        if result.count is not None:
+            headers['Content-Range'] = f"0-{max(len(result.data) - 1, 0)}/{result.count}"
+        if request.method == 'HEAD':
+            return Response(status_code=200, headers=headers)
+        if 'return=minimal' in prefer:
+            return Response(status_code=201 if request.method == 'POST' else 204, headers=headers)
+        return JSONResponse(result.data, status_code=201 if request.method == 'POST' else 200, headers=headers)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """Run an ASGI app with uvicorn on a background thread: with Server(app) as url: ..."""
+
+    def __init__(self, app, port=None):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='warning',
+                                                    lifespan='off'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self.url
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(10)
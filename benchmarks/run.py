@@ -0,0 +1,332 @@
+"""
+Benchmarks for the storage, API and enrichment hot paths, run offline.
+
+    python -m benchmarks.run                          # 1k, 10k and 100k rows
+    python -m benchmarks.run --sizes 1000 --repeat 5 --only load_data,filter_businesses
+    python -m benchmarks.run --compare benchmarks/results/<old commit>.json
+
+Each size gets a fresh synthetic call list in a scratch directory. Google
+Places and Supabase are replaced by the in-memory fakes in benchmarks/fakes.py,
+so numbers measure this code, not the network. Results are written as JSON
+(by default benchmarks/results/<commit>.json) for comparing commits.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (1000, 10000, 100000)
+USER_ID = 'benchmark-user'
+# Rows written per bulk add / upload call
+BATCH = 100
+
+
+def prepare_environment(workdir):
+    """Settings the app modules read at import time; call before importing them."""
+    os.environ['GOOGLE_API_KEY'] = os.environ.get('GOOGLE_API_KEY') or 'benchmark'
+    os.environ['LOG_LEVEL'] = os.environ.get('BENCHMARK_LOG_LEVEL', 'WARNING')
+    os.environ['CALL_HISTORY_DB'] = os.path.join(workdir, 'call_history.db')
+    os.environ['GEOCODE_CACHE_DB'] = os.path.join(workdir, 'geocode_cache.db')
+    os.environ['COVERAGE_TILE_STORE'] = os.path.join(workdir, 'coverage_tiles.json')
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def load_local_app():
+    """The top-level api.py app (the api/ package shadows it as a module name)."""
+    module = sys.modules.get('local_api')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('local_api', os.path.join(ROOT, 'api.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['local_api'] = module
+        spec.loader.exec_module(module)
+    return module.app
+
+
+def measure(fn, repeat, setup=None):
+    """Seconds per run of fn(setup()) (or fn()), setup not included."""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            fn(state) if setup else fn()
+            times.append(time.perf_counter() - started)
+    return times
+
+
+def check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.method} {response.request.url} -> "
+                           f"{response.status_code}: {response.text[:200]}")
+    return response
+
+
+class Workspace:
+    """A synthetic call list of a given size, on disk and in the fakes, plus clients for both apps."""
+
+    def __init__(self, root, rows):
+        from fastapi.testclient import TestClient
+        import api.database
+        import api.index
+        import call_tracker as ct
+        from benchmarks.data import make_businesses, supabase_rows
+        from benchmarks.fakes import FakePlaces, FakeSupabase
+
+        self.rows = rows
+        self.dir = os.path.join(root, str(rows))
+        os.makedirs(self.dir, exist_ok=True)
+        os.chdir(self.dir)
+        self.ct = ct
+        self.reset_caches()
+        self.df = make_businesses(rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ct.save_to_excel(self.df.copy(), ct.EXCEL_FILE)
+        self.names = self.df['Name'].tolist()
+        self.places = FakePlaces()
+        ct.gmaps = self.places
+        self.supabase = FakeSupabase({'businesses': supabase_rows(self.df, USER_ID)})
+        api.database._supabase_client = self.supabase
+        self.local = TestClient(load_local_app())
+        self.vercel = TestClient(api.index.app)
+        self.counter = 0
+
+    def reset_caches(self):
+        import geo_index
+        import search_index
+        self.ct._frames.clear()
+        geo_index._cache.clear()
+        search_index._cache.clear()
+
+    def next(self):
+        self.counter += 1
+        return self.counter
+
+    def name(self, i):
+        return self.names[(i * 7919) % len(self.names)]
+
+    def business_id(self, i):
+        """Id of the row name(i) is on (load_data numbers the sheet's rows from 1)."""
+        return (i * 7919) % len(self.names) + 1
+
+
+def bench_load_data(ws, repeat):
+    def setup():
+        ws.ct._frames.clear()
+    return measure(lambda _: ws.ct.load_data(ws.ct.EXCEL_FILE), repeat, setup)
+
+
+def bench_load_data_cached(ws, repeat):
+    ws.ct.load_data(ws.ct.EXCEL_FILE)
+    return measure(lambda: ws.ct.load_data(ws.ct.EXCEL_FILE), repeat)
+
+
+def bench_save_to_excel(ws, repeat):
+    df = ws.ct.load_data(ws.ct.EXCEL_FILE)
+    return measure(lambda: ws.ct.save_to_excel(df, ws.ct.EXCEL_FILE), repeat)
+
+
+def _mark(helper, *args):
+    def bench(ws, repeat):
+        df = ws.ct.load_data(ws.ct.EXCEL_FILE)
+        return measure(lambda frame: helper(ws.ct)(frame, ws.name(ws.next()), *args), repeat, df.copy)
+    return bench
+
+
+def bench_filter_businesses(ws, repeat):
+    from api.http_cache import response_cache
+    # Rendered from the frame every run, not served from the response cache
+    return measure(lambda _: check(ws.local.get('/api/businesses/filter', params={'status': 'tocall'})), repeat,
+                   response_cache.invalidate)
+
+
+def bench_filter_not_modified(ws, repeat):
+    tag = check(ws.local.get('/api/businesses/filter', params={'status': 'tocall'})).headers['ETag']
+
+    def poll():
+        response = ws.local.get('/api/businesses/filter', params={'status': 'tocall'}, headers={'If-None-Match': tag})
+        if response.status_code != 304:
+            raise RuntimeError(f"expected 304, got {response.status_code}")
+    return measure(poll, repeat)
+
+
+def bench_filter_open_now(ws, repeat):
+    return measure(lambda: check(ws.local.get('/api/businesses/filter', params={'open_now': 'true'})), repeat)
+
+
+def bench_update_business(ws, repeat):
+    def update():
+        i = ws.next()
+        check(ws.local.put(f'/api/businesses/{ws.business_id(i)}',
+                           json={'status': 'called' if i % 2 else 'callback', 'comments': f'benchmark {i}'}))
+    return measure(update, repeat)
+
+
+def bench_batch_update(ws, repeat):
+    def update():
+        start = ws.next() * 50
+        operations = [{'id': ws.business_id(i), 'patch': {'status': 'dont_call', 'comments': f'benchmark {i}'}}
+                      for i in range(start, start + 50)]
+        check(ws.local.post('/api/businesses/batch', json={'operations': operations}))
+    return measure(update, repeat)
+
+
+def bench_bulk_add(ws, repeat):
+    from benchmarks.data import new_businesses
+
+    def add():
+        check(ws.local.post('/api/businesses/bulk',
+                            json={'businesses': new_businesses(BATCH, ws.next() * BATCH)}))
+    return measure(add, repeat)
+
+
+def bench_upload(ws, repeat):
+    from benchmarks.data import places_export
+
+    def upload():
+        # Half the export is already in the table, so the known-place check has work to do
+        check(ws.vercel.post('/api/businesses/upload', headers={'x-user-id': USER_ID},
+                             json=places_export(BATCH, ws.rows - BATCH // 2 + ws.next() * BATCH)))
+    return measure(upload, repeat)
+
+
+def bench_search(ws, repeat):
+    def setup():
+        # Swept tiles are remembered; forget them so every run does the same calls
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.environ['COVERAGE_TILE_STORE'])
+    return measure(lambda _: check(ws.local.get('/api/businesses/search', params={
+        'query': 'Vancouver', 'keywords': 'restaurant', 'limit': 60})), repeat, setup)
+
+
+BENCHMARKS = {
+    'load_data': bench_load_data,
+    'load_data_cached': bench_load_data_cached,
+    'save_to_excel': bench_save_to_excel,
+    'mark_called': _mark(lambda ct: ct.mark_called),
+    'mark_tocall': _mark(lambda ct: ct.mark_tocall),
+    'mark_dont_call': _mark(lambda ct: ct.mark_dont_call),
+    'mark_callback': _mark(lambda ct: ct.mark_callback),
+    'filter_businesses': bench_filter_businesses,
+    'filter_open_now': bench_filter_open_now,
+    'filter_not_modified': bench_filter_not_modified,
+    'update_business': bench_update_business,
+    'batch_update': bench_batch_update,
+    'bulk_add': bench_bulk_add,
+    'upload': bench_upload,
+    'search': bench_search,
+}
+
+
+def summarize(name, rows, times):
+    return {
+        'name': name,
+        'rows': rows,
+        'runs': len(times),
+        'min': round(min(times), 6),
+        'median': round(statistics.median(times), 6),
+        'mean': round(statistics.fmean(times), 6),
+        'max': round(max(times), 6),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, only=None, workdir=None):
+    """Run the benchmarks; returns the report dict that main() writes as JSON."""
+    names = only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    root = workdir or tempfile.mkdtemp(prefix='benchmarks-')
+    prepare_environment(root)
+    import pandas as pd
+
+    started_in = os.getcwd()
+    results = []
+    try:
+        for rows in sizes:
+            ws = Workspace(root, rows)
+            for name in names:
+                times = BENCHMARKS[name](ws, repeat)
+                results.append(summarize(name, rows, times))
+                print(f"{name:<20} {rows:>8} rows  median {results[-1]['median'] * 1000:10.2f} ms", file=sys.stderr)
+    finally:
+        os.chdir(started_in)
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=1.2):
+    """Rows of (name, rows, old median, new median, ratio, regressed) for benchmarks in both reports."""
+    old = {(result['name'], result['rows']): result['median'] for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = (result['name'], result['rows'])
+        if key in old and old[key] > 0:
+            ratio = result['median'] / old[key]
+            rows.append((*key, old[key], result['median'], ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Cold Call Tracker")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated table sizes (rows)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark and size")
+    parser.add_argument('--only', help="comma-separated benchmark names: " + ', '.join(BENCHMARKS))
+    parser.add_argument('--out', help="JSON output path (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier JSON output to compare medians against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="ratio of new to old median that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run([int(size) for size in args.sizes.split(',')], args.repeat,
+                 args.only.split(',') if args.only else None)
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results', f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print(f"\nvs {baseline.get('commit', args.compare)}:")
+        for name, rows, old, new, ratio, regressed in compare(baseline, report, args.threshold):
+            regressions += regressed
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{name:<20} {rows:>8} rows  {old * 1000:10.2f} -> {new * 1000:10.2f} ms  x{ratio:.2f}{flag}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import sys
+import pandas as pd
+from status_normalizer import STATUS_DTYPE, normalize_statuses
+
+# Free text is stored as Arrow-backed strings when pyarrow is installed
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = pd.StringDtype("python")
+
+PRIORITY_DTYPE = pd.CategoricalDtype(['High', 'Medium', 'Low'])
+INTEREST_DTYPE = pd.CategoricalDtype(['High', 'Medium', 'Low', 'Unknown'])
+
+# Column -> (kind, default). Kinds:
+#   text      free text, '' when missing
+#   status    Categorical over status_normalizer.VALID_STATUSES
+#   enum      Categorical with a fixed set of categories (dtype given)
+#   category  Categorical whose categories grow with the data
+#   date      datetime64, NaT when missing
+#   int8      nullable Int8, default when missing
+#   float     float64, NaN when missing
+#   id        nullable Int64 (see assign_ids)
+SCHEMA = {
+    # Stable row id, like businesses.id in the Supabase schema; survives renames
+    'Id': ('id', None),
+    'Name': ('text', ''),
+    'Number': ('text', ''),
+    'Address': ('text', ''),
+    'Status': ('status', 'tocall'),
+    'Comments': ('text', ''),
+    'Region': ('text', ''),
+    'Hours': ('text', ''),
+    'Industry': ('category', 'Restaurant'),
+    'LastCalledDate': ('date', None),
+    'LastCallbackDate': ('date', None),
+    'CallbackDueDate': ('date', None),
+    'CallbackDueTime': ('text', ''),
+    'CallbackReason': ('text', ''),
+    'CallbackPriority': (PRIORITY_DTYPE, 'Medium'),
+    'CallbackCount': ('int8', 0),
+    'LeadScore': ('int8', 5),
+    'InterestLevel': (INTEREST_DTYPE, 'Unknown'),
+    'BestTimeToCall': ('text', ''),
+    'DecisionMaker': ('text', ''),
+    'NextAction': ('text', ''),
+    # Set at ingest from the Places result or the geocode cache (geo_index.py)
+    'Latitude': ('float', None),
+    'Longitude': ('float', None),
+    # Google place_id, so searches skip places that are already in the list
+    'PlaceId': ('text', ''),
+}
+
+INT8_RANGES = {'LeadScore': (1, 10), 'CallbackCount': (0, 127)}
+
+def to_text(series):
+    """Strings with '' for missing values; whole-number floats (phone numbers) lose their '.0'."""
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    return series.astype(TEXT_DTYPE).fillna('')
+
+def to_enum(series, dtype, default):
+    """Map values onto a fixed set of categories case-insensitively; unknown values get the default."""
+    lookup = {category.lower(): category for category in dtype.categories}
+    uniques = pd.unique(series)
+    mapping = {}
+    for value in uniques:
+        key = '' if pd.isna(value) else str(value).strip().lower()
+        mapping[value] = lookup.get(key, default)
+    return series.map(mapping).astype(dtype)
+
+def to_category(series, default):
+    """Open-ended categorical; blanks become the default."""
+    text = series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    return text.where(text != '', default).astype('category')
+
+def to_date(series):
+    """Datetime column (NaT for blanks or unparseable values)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]')
+    text = series.astype(object).where(series.notna(), None)
+    return pd.to_datetime(text, errors='coerce', format='ISO8601')
+
+def to_int8(series, column, default):
+    low, high = INT8_RANGES.get(column, (-128, 127))
+    numbers = pd.to_numeric(series, errors='coerce').fillna(default).round().clip(low, high)
+    return numbers.astype('Int8')
+
+def to_float(series):
+    return pd.to_numeric(series, errors='coerce').astype('float64')
+
+def to_id(series):
+    """Whole positive numbers; anything else is missing and gets an id from assign_ids."""
+    numbers = pd.to_numeric(series, errors='coerce')
+    return numbers.where((numbers % 1 == 0) & (numbers > 0)).astype('Int64')
+
+def next_id(df):
+    """The id for the next new row."""
+    if 'Id' not in df.columns or not df['Id'].notna().any():
+        return 1
+    return int(df['Id'].max()) + 1
+
+def assign_ids(df):
+    """
+    Give rows without an Id (legacy sheets, hand-added rows) and rows whose
+    Id repeats an earlier row's the next free ids, in row order. Rows are
+    numbered the same way on every load of the same sheet, so ids handed
+    out before the sheet is saved again stay valid. Modifies df in place.
+    """
+    if 'Id' not in df.columns:
+        df['Id'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    missing = df['Id'].isna() | df['Id'].duplicated()
+    if missing.any():
+        start = next_id(df[~missing])
+        df.loc[missing, 'Id'] = range(start, start + int(missing.sum()))
+    return df
+
+def _is_enum(kind):
+    # Checked before comparing kind with strings: a CategoricalDtype equals 'category'
+    return isinstance(kind, pd.CategoricalDtype)
+
+def _is_conformed(series, kind):
+    if _is_enum(kind):
+        return series.dtype == kind
+    if kind == 'text':
+        return series.dtype == TEXT_DTYPE
+    if kind == 'status':
+        return series.dtype == STATUS_DTYPE
+    if kind == 'category':
+        return isinstance(series.dtype, pd.CategoricalDtype)
+    if kind == 'date':
+        return series.dtype == 'datetime64[ns]'
+    if kind == 'int8':
+        return series.dtype == 'Int8'
+    if kind == 'float':
+        return series.dtype == 'float64'
+    if kind == 'id':
+        return series.dtype == 'Int64'
+    return False
+
+def conform_column(series, column):
+    """Convert one column to its schema dtype."""
+    kind, default = SCHEMA[column]
+    if _is_enum(kind):
+        return to_enum(series, kind, default)
+    if kind == 'text':
+        return to_text(series)
+    if kind == 'status':
+        return normalize_statuses(series)
+    if kind == 'category':
+        return to_category(series, default)
+    if kind == 'date':
+        return to_date(series)
+    if kind == 'int8':
+        return to_int8(series, column, default)
+    if kind == 'float':
+        return to_float(series)
+    if kind == 'id':
+        return to_id(series)
+    raise ValueError(f"Unknown schema kind for {column}: {kind!r}")
+
+def apply_schema(df):
+    """
+    Add missing columns and convert every known column to its schema dtype.
+    Columns that already have the right dtype are left alone, so this is
+    cheap to call again on an already typed frame. Modifies df in place.
+    """
+    for column, (kind, default) in SCHEMA.items():
+        if column not in df.columns:
+            df[column] = pd.Series(default, index=df.index, dtype=object)
+        elif _is_conformed(df[column], kind):
+            continue
+        df[column] = conform_column(df[column], column)
+    return df
+
+def coerce_value(column, value):
+    """Convert a single value (e.g. from an API request) to what the column stores."""
+    kind, default = SCHEMA.get(column, ('text', ''))
+    if kind == 'date':
+        if value is None or value == '' or (not isinstance(value, str) and pd.isna(value)):
+            return pd.NaT
+        return pd.Timestamp(value)
+    if kind == 'int8':
+        low, high = INT8_RANGES.get(column, (-128, 127))
+        return max(low, min(high, int(value)))
+    if kind == 'float':
+        return float('nan') if value is None or value == '' else float(value)
+    if kind == 'id':
+        return int(value)
+    return value
+
+def set_value(df, mask, column, value):
+    """
+    Assign one value to the masked rows, keeping the column's dtype.
+    New labels are added to open categoricals; closed enums reject them.
+    """
+    value = coerce_value(column, value)
+    if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+        kind = SCHEMA.get(column, ('category', None))[0]
+        if value not in df[column].cat.categories:
+            if _is_enum(kind) or kind != 'category':
+                raise ValueError(f"Invalid value for {column}: {value!r}")
+            df[column] = df[column].cat.add_categories([value])
+    df.loc[mask, column] = value
+    return df
+
+def format_date(value):
+    """YYYY-MM-DD for a date cell, '' for missing."""
+    if value is None or value == '' or pd.isna(value):
+        return ''
+    if isinstance(value, str):
+        return value
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def _legacy_frame(rows):
+    """Synthetic table as load_data used to build it: everything object/str with '' fill."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    statuses = np.array(['tocall', 'called', 'callback', 'dont_call', 'client', 'lead'])
+    cities = np.array(['Vancouver', 'Burnaby', 'Surrey', 'Richmond', 'Victoria', 'Kelowna'])
+    idx = np.arange(rows)
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+    has_date = rng.random(rows) < 0.3
+    city = cities[rng.integers(0, len(cities), rows)]
+    return pd.DataFrame({
+        'Name': [f"Business {i}" for i in idx],
+        'Number': [f"604-555-{i % 10000:04d}" for i in idx],
+        'Address': [f"{i % 9999} Main St, {c}, BC, Canada" for i, c in zip(idx, city)],
+        'Status': statuses[rng.integers(0, len(statuses), rows)].astype(object),
+        'Comments': np.where(rng.random(rows) < 0.5, '2024-01-02 10:00: left voicemail', '').astype(object),
+        'Region': city.astype(object),
+        'Hours': 'Monday: 9:00 AM – 5:00 PM | Tuesday: 9:00 AM – 5:00 PM',
+        'Industry': 'Restaurant',
+        'LastCalledDate': np.where(has_date, dates.strftime('%Y-%m-%d'), '').astype(object),
+        'LastCallbackDate': '',
+        'CallbackDueDate': np.where(has_date, dates.strftime('%Y-%m-%d'), '').astype(object),
+        'CallbackDueTime': np.where(has_date, '10:00', '').astype(object),
+        'CallbackReason': '',
+        'CallbackPriority': 'Medium',
+        'CallbackCount': rng.integers(0, 5, rows),
+        'LeadScore': rng.integers(1, 11, rows),
+        'InterestLevel': 'Unknown',
+        'BestTimeToCall': '',
+        'DecisionMaker': '',
+        'NextAction': '',
+    })
+
+def memory_report(rows=100_000):
+    """Compare deep memory usage of the legacy object-typed table and the typed schema."""
+    legacy = _legacy_frame(rows)
+    before = legacy.memory_usage(deep=True).sum()
+    typed = apply_schema(legacy.copy())
+    after = typed.memory_usage(deep=True).sum()
+    print(f"Rows: {rows}")
+    print(f"Text dtype: {TEXT_DTYPE} ({TEXT_DTYPE.storage})")
+    print(f"Legacy (object columns): {before / 1e6:.1f} MB")
+    print(f"Typed schema:            {after / 1e6:.1f} MB")
+    print(f"Reduction: {100 * (1 - after / before):.0f}%")
+    return before, after
+
+if __name__ == "__main__":
+    memory_report(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
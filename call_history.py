@@ -0,0 +1,188 @@
+import numbers
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+# Call events live in their own store so Comments only has to hold the latest
+# note. Events are keyed by the business's Id (as text). Events recorded by
+# name, before businesses had ids, are moved onto ids by adopt_ids when
+# call_tracker.load_data loads the sheet.
+HISTORY_DB = os.getenv('CALL_HISTORY_DB', 'call_history.db')
+PAGE_SIZE = 20
+
+# "2024-01-02 10:00: left voicemail" as written by call_tracker.add_comment
+_TIMESTAMPED = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}): (.*)$', re.S)
+
+_local = threading.local()
+
+def business_key(business):
+    """How a business's events are keyed: its Id, or for older events its lowercased name."""
+    if isinstance(business, numbers.Integral):
+        return str(int(business))
+    return str(business).strip().lower()
+
+def connect(db_path=None):
+    """One connection per thread and database file; the schema is created on first use."""
+    db_path = db_path or HISTORY_DB
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS call_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                business_id TEXT NOT NULL,
+                occurred_at TEXT NOT NULL,
+                outcome TEXT,
+                note TEXT,
+                duration_seconds INTEGER,
+                actor TEXT
+            )""")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_call_events_business_time
+            ON call_events(business_id, occurred_at, id)""")
+        conn.commit()
+        connections[db_path] = conn
+    return conn
+
+def now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def record_event(business, outcome=None, note=None, duration_seconds=None, occurred_at=None,
+                 actor=None, db_path=None):
+    """Store one call event for a business (its Id). Returns the event as a dict."""
+    event = {
+        'business_id': business_key(business),
+        'occurred_at': occurred_at or now(),
+        'outcome': outcome,
+        'note': note,
+        'duration_seconds': duration_seconds,
+        'actor': actor,
+    }
+    conn = connect(db_path)
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO call_events (business_id, occurred_at, outcome, note, duration_seconds, actor) "
+            "VALUES (:business_id, :occurred_at, :outcome, :note, :duration_seconds, :actor)", event)
+    event['id'] = cursor.lastrowid
+    return event
+
+def record_events(events, db_path=None):
+    """Bulk insert of event dicts with a 'business' (Id) key (used by the comment migration)."""
+    rows = [{
+        'business_id': business_key(event['business']),
+        'occurred_at': event.get('occurred_at') or now(),
+        'outcome': event.get('outcome'),
+        'note': event.get('note'),
+        'duration_seconds': event.get('duration_seconds'),
+        'actor': event.get('actor'),
+    } for event in events]
+    conn = connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO call_events (business_id, occurred_at, outcome, note, duration_seconds, actor) "
+            "VALUES (:business_id, :occurred_at, :outcome, :note, :duration_seconds, :actor)", rows)
+    return len(rows)
+
+def get_history(business, limit=PAGE_SIZE, before=None, db_path=None):
+    """
+    One page of a business's events, newest first. Pass the returned
+    next_before to get the following page (keyset paging on the
+    (business_id, occurred_at, id) index, so every page costs the same).
+    """
+    params = {'business_id': business_key(business), 'limit': limit + 1}
+    where = "business_id = :business_id"
+    if before is not None:
+        row = connect(db_path).execute(
+            "SELECT occurred_at FROM call_events WHERE id = ?", (before,)).fetchone()
+        if row is None:
+            return {'events': [], 'next_before': None}
+        params.update(before_at=row['occurred_at'], before_id=before)
+        where += " AND (occurred_at < :before_at OR (occurred_at = :before_at AND id < :before_id))"
+    rows = connect(db_path).execute(
+        f"SELECT * FROM call_events WHERE {where} ORDER BY occurred_at DESC, id DESC LIMIT :limit",
+        params).fetchall()
+    events = [dict(row) for row in rows[:limit]]
+    next_before = events[-1]['id'] if len(rows) > limit else None
+    return {'events': events, 'next_before': next_before}
+
+def businesses_with_history(businesses, db_path=None):
+    """The subset of business keys (ids or names) that already have events (keeps migrations re-runnable)."""
+    keys = list({business_key(business) for business in businesses})
+    found = set()
+    conn = connect(db_path)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        rows = conn.execute(
+            f"SELECT DISTINCT business_id FROM call_events WHERE business_id IN ({','.join('?' * len(chunk))})",
+            chunk).fetchall()
+        found.update(row['business_id'] for row in rows)
+    return found
+
+def adopt_ids(names, ids, db_path=None):
+    """
+    Move events still keyed by name onto the Id of the first row with that
+    name. Names no row has any more keep their events. Does nothing when the
+    store was never created. Returns the number of events moved.
+    """
+    db_path = db_path or HISTORY_DB
+    if not os.path.exists(db_path):
+        return 0
+    conn = connect(db_path)
+    # Id keys are all digits
+    keys = [row[0] for row in conn.execute(
+        "SELECT DISTINCT business_id FROM call_events WHERE business_id GLOB '*[^0-9]*'")]
+    if not keys:
+        return 0
+    first = {}
+    for name, business_id in zip(names, ids):
+        first.setdefault(business_key(name), business_key(int(business_id)))
+    moves = [(first[key], key) for key in keys if key in first]
+    with conn:
+        moved = sum(conn.execute("UPDATE call_events SET business_id = ? WHERE business_id = ?", move).rowcount
+                    for move in moves)
+    return moved
+
+def split_comments(text):
+    """
+    Split a legacy "a | 2024-01-02 10:00: b | ..." comment cell into
+    [(timestamp or None, note), ...], oldest first.
+    """
+    if text is None or not str(text).strip() or str(text).strip().lower() == 'nan':
+        return []
+    parts = []
+    for part in str(text).split(' | '):
+        part = part.strip()
+        if not part:
+            continue
+        match = _TIMESTAMPED.match(part)
+        if match:
+            parts.append((f"{match.group(1)}:00", match.group(2).strip()))
+        else:
+            parts.append((None, part))
+    return parts
+
+def comment_events(text, default_time=None):
+    """
+    (occurred_at, note) pairs for a legacy comment cell. Notes without a
+    timestamp get the earliest timestamp in the cell (insertion order then
+    keeps them first), or default_time when the cell has none.
+    """
+    parts = split_comments(text)
+    known = [timestamp for timestamp, _ in parts if timestamp]
+    fallback = known[0] if known else (default_time or now())
+    return [(timestamp or fallback, note) for timestamp, note in parts]
+
+def latest_note(text):
+    """What Comments keeps once the history is moved out: the newest entry."""
+    parts = split_comments(text)
+    if not parts:
+        return ''
+    timestamp, note = parts[-1]
+    return f"{timestamp[:16]}: {note}" if timestamp else note
@@ -0,0 +1,398 @@
+import heapq
+import itertools
+import re
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+import change_journal
+from api.hours import parse_hours, is_open
+
+# Who gets dialed next:
+#   1. callbacks that are due, High priority first, then oldest due time, then LeadScore
+#   2. businesses still to call, highest LeadScore first
+# Callbacks due later wait in a heap keyed by due time and move over when due.
+# Businesses are keyed by Id (in frames without ids, by lowercased, stripped name).
+PRIORITY_RANK = {'High': 0, 'Medium': 1, 'Low': 2}
+
+# How long a caller holds a business before it goes back into the queue
+LEASE_SECONDS = 10 * 60
+
+# Candidates outside their BestTimeToCall window are skipped while looking
+# for the next N, but only this many per requested business, so a queue full
+# of "Morning" businesses at 8am still answers quickly. (Closed businesses are
+# always skipped when filtering on opening hours.)
+DEFER_LIMIT = 20
+
+DAYPARTS = {
+    'morning': (9 * 60, 12 * 60),
+    'lunch': (11 * 60 + 30, 13 * 60 + 30),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 20 * 60),
+}
+
+_TIME = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
+_RANGE_RE = re.compile(_TIME + r'\s*(?:-|–|to|until)\s*' + _TIME, re.I)
+_BOUND_RE = re.compile(r'\b(after|before)\s+' + _TIME, re.I)
+_TIME_RE = re.compile(r'^\s*' + _TIME + r'\s*$', re.I)
+
+
+def _minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        meridiem = meridiem.lower()
+        if meridiem == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+    elif hour < 8:
+        hour += 12  # "2-4" means the afternoon
+    return min(hour * 60 + minute, 24 * 60)
+
+
+@lru_cache(maxsize=4096)
+def call_windows(text):
+    """
+    Parse BestTimeToCall ("Morning", "2-4pm", "after 3pm", "Mornings or
+    10:30am to noon") into ((start minute, end minute), ...). An empty
+    tuple means any time.
+    """
+    if not text:
+        return ()
+    text = str(text).lower().replace('noon', '12pm')
+    windows = [window for part, window in DAYPARTS.items() if part in text]
+    for match in _RANGE_RE.finditer(text):
+        end_meridiem = match.group(6)
+        windows.append((_minutes(match.group(1), match.group(2), match.group(3) or end_meridiem),
+                        _minutes(match.group(4), match.group(5), end_meridiem)))
+    for match in _BOUND_RE.finditer(text):
+        minute = _minutes(match.group(2), match.group(3), match.group(4))
+        windows.append((minute, 24 * 60) if match.group(1).lower() == 'after' else (0, minute))
+    return tuple(windows)
+
+
+def in_window(windows, moment):
+    minute = moment.hour * 60 + moment.minute
+    return any(start <= minute < end for start, end in windows)
+
+
+@lru_cache(maxsize=1024)
+def _time_offset(text):
+    """Nanoseconds into the day for a CallbackDueTime like "14:00" or "2:30 PM"."""
+    match = _TIME_RE.match(str(text or ''))
+    if not match:
+        return 0
+    hour, minute, meridiem = match.groups()
+    if not meridiem and int(hour) < 8:
+        meridiem = 'am'  # due times are written as given, not guessed like windows
+    return _minutes(hour, minute, meridiem) * 60 * 10**9
+
+
+def _order(status, due_date, due_time, priority, lead_score):
+    """Sort information for one business, or None if it is not waiting for a call."""
+    score = 5 if pd.isna(lead_score) else int(lead_score)
+    rank = PRIORITY_RANK.get(str(priority), 1)
+    if status == 'callback':
+        # A callback without a date is due right away
+        due = 0 if pd.isna(due_date) else pd.Timestamp(due_date).value + _time_offset(due_time)
+        return ('callback', due, rank, score)
+    if status == 'tocall':
+        return ('tocall', 0, rank, score)
+    return None
+
+
+def business_keys(df):
+    """The queue key of every row: its Id, or its lowercased, stripped name when the frame has no ids."""
+    if 'Id' in df.columns and df['Id'].notna().all():
+        return df['Id'].astype('int64')
+    return df['Name'].astype(str).str.strip().str.lower()
+
+
+def _positions(keys):
+    """key -> position of its first row (journal updates hit every row of a name; the first is shown)."""
+    first = ~keys.duplicated()
+    return dict(zip(keys[first], first.to_numpy().nonzero()[0].tolist())), first
+
+
+def _row_order(row):
+    return _order(str(row.get('Status', '')), row.get('CallbackDueDate'), row.get('CallbackDueTime'),
+                  row.get('CallbackPriority'), row.get('LeadScore'))
+
+
+class CallQueue:
+    """
+    Heap-based call queue over a business frame with leases, so two callers
+    asking at the same time never get the same business.
+
+    Updates are incremental: a changed business gets a fresh heap entry and
+    its old one is skipped when it surfaces (lazy deletion), so a status
+    change costs O(log n) instead of a rebuild.
+    """
+
+    def __init__(self, df=None):
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+        self._scheduled = []   # (due, rank, -score, seq, key)   callbacks not yet due
+        self._ready = []       # (rank, due, -score, seq, key)   callbacks that are due
+        self._fresh = []       # (-score, rank, seq, key)        businesses to call
+        self._current = {}     # key -> seq of its live heap entry
+        self._orders = {}      # key -> sort information of every queued business
+        self._windows = {}     # key -> BestTimeToCall windows, only when restricted
+        self._hours = {}       # key -> opening hours intervals, only when known
+        self._leases = {}      # key -> (caller, expires)
+        self._lease_heap = []  # (expires, key)
+        self.positions = {}    # key -> row position in the frame
+        self._by_id = False
+        if df is not None:
+            self.load(df)
+
+    def load(self, df):
+        """(Re)build from a frame. Leases on businesses that are still queued survive."""
+        keys = business_keys(df)
+        positions, first = _positions(keys)
+        columns = ['Status', 'CallbackDueDate', 'CallbackDueTime', 'CallbackPriority', 'LeadScore', 'BestTimeToCall',
+                   'Hours']
+        rows = df.loc[first.to_numpy(), [column for column in columns if column in df.columns]]
+        statuses = rows['Status'].astype(str)
+        queued = statuses.isin(['callback', 'tocall']).to_numpy()
+        rows, row_keys = rows[queued], keys[first][queued]
+
+        def column(name):
+            return rows[name] if name in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+
+        with self._lock:
+            self._by_id = keys.dtype == 'int64'
+            self._scheduled, self._ready, self._fresh = [], [], []
+            self._current, self._orders, self._windows, self._hours = {}, {}, {}, {}
+            self.positions = positions
+            for key, status, due_date, due_time, priority, score, best_time, hours in zip(
+                    row_keys, rows['Status'].astype(str), column('CallbackDueDate'), column('CallbackDueTime'),
+                    column('CallbackPriority').astype(object), column('LeadScore'), column('BestTimeToCall'),
+                    column('Hours')):
+                order = _order(status, due_date, due_time, priority, score)
+                self._orders[key] = order
+                self._set_times(key, best_time, hours)
+                if key not in self._leases:
+                    self._push(key, order, heapify=False)
+            heapq.heapify(self._scheduled)
+            heapq.heapify(self._fresh)
+            for key in [key for key in self._leases if key not in self._orders]:
+                del self._leases[key]
+
+    def _set_times(self, key, best_time, hours):
+        windows = call_windows(best_time if isinstance(best_time, str) else None)
+        if windows:
+            self._windows[key] = windows
+        else:
+            self._windows.pop(key, None)
+        intervals = parse_hours(hours if isinstance(hours, str) else None)
+        if intervals is not None:
+            self._hours[key] = intervals
+        else:
+            self._hours.pop(key, None)
+
+    def _push(self, key, order, heapify=True):
+        seq = next(self._seq)
+        self._current[key] = seq
+        kind, due, rank, score = order
+        if kind == 'callback':
+            item, heap = (due, rank, -score, seq, key), self._scheduled
+        else:
+            item, heap = (-score, rank, seq, key), self._fresh
+        if heapify:
+            heapq.heappush(heap, item)
+        else:
+            heap.append(item)
+
+    def update(self, key, row):
+        """Re-rank one business after its row changed (or drop it if it no longer needs a call)."""
+        order = _row_order(row)
+        with self._lock:
+            if order is None:
+                self.remove(key)
+                return
+            previous = self._orders.get(key)
+            self._orders[key] = order
+            self._set_times(key, row.get('BestTimeToCall'), row.get('Hours'))
+            if key in self._leases:
+                # A new status or due date means the call was made: the lease is done
+                if previous != order:
+                    del self._leases[key]
+                    self._push(key, order)
+            elif previous != order or key not in self._current:
+                self._push(key, order)
+
+    def remove(self, key):
+        with self._lock:
+            self._orders.pop(key, None)
+            self._current.pop(key, None)
+            self._windows.pop(key, None)
+            self._hours.pop(key, None)
+            self._leases.pop(key, None)
+
+    def apply(self, df, entries):
+        """Follow change journal entries that were applied to df (the new frame)."""
+        with self._lock:
+            if self._by_id and any(entry.get('id') is None for entry in entries):
+                # Journaled before ids: only the frame says which row it hit
+                self.load(df)
+                return
+            touched = []
+            if any(entry.get('op') in ('insert', 'delete') for entry in entries):
+                self.positions, _ = _positions(business_keys(df))
+            for entry in entries:
+                if self._by_id:
+                    touched.append(entry['id'])
+                    continue
+                key = change_journal.name_key(entry.get('name', ''))
+                new_name = (entry.get('changes') or {}).get('Name')
+                if entry.get('op') == 'update' and new_name is not None and change_journal.name_key(new_name) != key:
+                    position = self.positions.pop(key, None)
+                    if position is not None:
+                        self.positions[change_journal.name_key(new_name)] = position
+                    self.remove(key)
+                    key = change_journal.name_key(new_name)
+                touched.append(key)
+            for key in dict.fromkeys(touched):
+                position = self.positions.get(key)
+                if position is None or position >= len(df):
+                    self.remove(key)
+                else:
+                    self.update(key, df.iloc[position])
+
+    def _live(self, heap, seq_at):
+        while heap and self._current.get(heap[0][-1]) != heap[0][seq_at]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _reclaim(self, now_ns):
+        """Put businesses whose lease ran out back into the queue."""
+        while self._lease_heap and self._lease_heap[0][0] <= now_ns:
+            expires, key = heapq.heappop(self._lease_heap)
+            lease = self._leases.get(key)
+            if lease and lease[1] == expires:
+                del self._leases[key]
+                if key in self._orders:
+                    self._push(key, self._orders[key])
+
+    def _promote(self, now_ns):
+        """Move callbacks that became due from the scheduled heap to the ready heap."""
+        while True:
+            top = self._live(self._scheduled, 3)
+            if top is None or top[0] > now_ns:
+                return
+            due, rank, neg_score, seq, key = heapq.heappop(self._scheduled)
+            heapq.heappush(self._ready, (rank, due, neg_score, seq, key))
+
+    def _pop_best(self):
+        top = self._live(self._ready, 3)
+        heap = self._ready
+        if top is None:
+            top = self._live(self._fresh, 2)
+            heap = self._fresh
+        if top is None:
+            return None
+        heapq.heappop(heap)
+        del self._current[top[-1]]
+        return top[-1]
+
+    def next(self, n, caller, lease_seconds=LEASE_SECONDS, now=None, open_at=None, open_within=0):
+        """
+        Lease the next n businesses to caller. Returns [(key, reason, lease
+        expiry)] where reason is 'callback' or 'tocall'. Each pick is a heap
+        pop, O(log n). With open_at (the businesses' local time) only
+        businesses open then, or opening within open_within minutes, are
+        leased; closed ones stay queued.
+        """
+        now = now or datetime.now()
+        now_ns = pd.Timestamp(now).value
+        expires = pd.Timestamp(now + timedelta(seconds=lease_seconds))
+        with self._lock:
+            self._reclaim(now_ns)
+            self._promote(now_ns)
+            chosen, deferred, closed = [], [], []
+            while len(chosen) < n:
+                key = self._pop_best()
+                if key is None:
+                    break
+                if open_at is not None and not is_open(self._hours.get(key), open_at, open_within):
+                    closed.append(key)
+                    continue
+                windows = self._windows.get(key)
+                if windows and not in_window(windows, now) and len(deferred) < n * DEFER_LIMIT:
+                    deferred.append(key)
+                    continue
+                chosen.append(key)
+            # Outside-window businesses still beat an empty answer
+            while deferred and len(chosen) < n:
+                chosen.append(deferred.pop(0))
+            for key in deferred + closed:
+                self._push(key, self._orders[key])
+            picked = []
+            for key in chosen:
+                self._leases[key] = (caller, expires.value)
+                heapq.heappush(self._lease_heap, (expires.value, key))
+                picked.append((key, self._orders[key][0], expires))
+            return picked
+
+    def release(self, key, caller=None):
+        """Give a leased business back before its lease runs out."""
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or (caller is not None and lease[0] != caller):
+                return False
+            del self._leases[key]
+            if key in self._orders:
+                self._push(key, self._orders[key])
+            return True
+
+    def leases(self, caller=None):
+        with self._lock:
+            return {key: (holder, pd.Timestamp(expires)) for key, (holder, expires) in self._leases.items()
+                    if caller is None or holder == caller}
+
+    def stats(self, now=None):
+        now_ns = pd.Timestamp(now or datetime.now()).value
+        with self._lock:
+            self._reclaim(now_ns)
+            self._promote(now_ns)
+            callbacks = [self._orders[key][1] for key in self._current if self._orders[key][0] == 'callback']
+            return {
+                'due_callbacks': sum(1 for due in callbacks if due <= now_ns),
+                'scheduled_callbacks': sum(1 for due in callbacks if due > now_ns),
+                'tocall': len(self._current) - len(callbacks),
+                'leased': len(self._leases),
+            }
+
+
+# Cached (signature, frame, queue) per Excel file. Journaled edits are applied
+# to the queue entry by entry; only a rewritten snapshot rebuilds it.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_queue(file_path, loader):
+    """
+    Return (df, queue) for an Excel file, kept in step with the change
+    journal. `loader` is called with the file path and must return the
+    current frame (it is only read, never modified).
+    """
+    with _cache_lock:
+        signature = change_journal.signature(file_path)
+        cached = _cache.get(file_path)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+        df = loader(file_path)
+        if cached is None:
+            queue = CallQueue(df)
+        else:
+            queue = cached[2]
+            if cached[0][0] == signature[0]:
+                # Same snapshot, longer journal: follow the new entries only
+                queue.apply(df, list(change_journal.read_entries(file_path, cached[3])))
+            else:
+                queue.load(df)
+        _cache[file_path] = (signature, df, queue, change_journal.last_seq(file_path))
+        return df, queue
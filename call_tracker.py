@@ -1,17 +1,33 @@
 import pandas as pd
 import os
+import logging
 import googlemaps
 from tabulate import tabulate
 from dotenv import load_dotenv
+from extract_cities import fill_regions
+from status_normalizer import status_mask
+from business_schema import apply_schema, assign_ids, set_value, to_category, format_date
+from excel_stream import read_frame, iter_batches
+import change_journal
+import call_history
+from api.metrics import timed
 
-#Voice recognition
-import speech_recognition as sr
-import pyttsx3
+logger = logging.getLogger(__name__)
 
+#Voice recognition (optional: only the CLI's voice mode uses it, and it is not in requirements.txt)
+try:
+    import speech_recognition as sr
+    import pyttsx3
+except ImportError:
+    sr = pyttsx3 = None
 
-#GUI
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+
+#GUI (optional: headless servers often have no tkinter)
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, simpledialog
+except ImportError:
+    tk = None
 
 
 # Load environment variables
@@ -24,7 +40,8 @@ if not GOOGLE_API_KEY:
 
 EXCEL_FILE = "places_to_call.xlsx"
 
-engine = pyttsx3.init()
+# Created on first use so importing this module (e.g. from the API) needs no audio device
+engine = None
 
 valid_commands = [
     "list all",
@@ -54,10 +71,17 @@ valid_commands = [
 
 
 #---------------------------------Voice Recognition---------------------------------#
-mic = sr.Microphone()
-recognizer = sr.Recognizer()
+mic = None
+recognizer = None
 
 def listen_for_command():
+    global mic, recognizer
+    if sr is None:
+        print("❌ Voice control needs the SpeechRecognition and pyttsx3 packages.")
+        return None
+    if mic is None:
+        mic = sr.Microphone()
+        recognizer = sr.Recognizer()
     with mic as source:
         speak("Listening for command")
         print("Listening for command...")
@@ -86,7 +110,12 @@ def listen_for_command():
 
 #---------------------------------Speaking---------------------------------#
 def speak(text):
+    global engine
     print(f"🗣️ Speaking: {text}")
+    if pyttsx3 is None:
+        return
+    if engine is None:
+        engine = pyttsx3.init()
     engine.say(text)
     engine.runAndWait()
 
@@ -124,15 +153,42 @@ def create_empty_excel():
         df = pd.DataFrame(columns=['Name', 'Number', 'Address', 'Status', 'Comments'])
         save_to_excel(df)
 
-def load_data(file_path=EXCEL_FILE):
-    """Load data from Excel file, create if doesn't exist."""
+# file path -> (change_journal.signature, DataFrame) of the last load or journaled save
+_frames = {}
+
+@timed('excel')
+def load_data(file_path=EXCEL_FILE, copy=True):
+    """
+    Load data from Excel file, create if doesn't exist.
+    The result is the snapshot with the change journal replayed on top. It is
+    cached until the snapshot or journal changes, so callers get a copy.
+    copy=False returns the cached frame itself for callers that only read it.
+    """
     if not os.path.exists(file_path):
         create_empty_excel()
-    df = pd.read_excel(file_path)
-    # Ensure all new tracking columns exist
-    df = ensure_date_columns(df)
-    return df
-
+    signature = change_journal.signature(file_path)
+    cached = _frames.get(file_path)
+    if cached and cached[0] == signature:
+        return cached[1].copy() if copy else cached[1]
+    # Stream the sheet in batches and type each batch as it arrives, so large
+    # sheets never exist in memory as untyped object columns. The typed schema
+    # adds missing tracking columns, normalizes Status into a Categorical and
+    # turns dates into datetime64; the final call only matters for empty sheets.
+    df = apply_schema(read_frame(file_path, typed=True))
+    # Derive Region once at ingest for rows that don't have one yet
+    fill_regions(df)
+    # Legacy rows get ids before the journal is replayed, in the same order on every load
+    assign_ids(df)
+    df, replayed = change_journal.replay(df, file_path)
+    if replayed:
+        logger.info("Replayed %d journal entries on top of %s", replayed, file_path)
+    moved = call_history.adopt_ids(df['Name'], df['Id'])
+    if moved:
+        logger.info("Moved %d name-keyed call events onto business ids", moved)
+    _frames[file_path] = (signature, df)
+    return df.copy() if copy else df
+
+@timed('excel')
 def save_to_excel(df, file_path=EXCEL_FILE):
     """
     Save DataFrame to Excel with verification.
@@ -142,22 +198,28 @@ def save_to_excel(df, file_path=EXCEL_FILE):
     if 'Industry' not in df.columns:
         df['Industry'] = 'Restaurant'
     else:
-        df['Industry'] = df['Industry'].fillna('Restaurant').replace('', 'Restaurant')
-    try:
-        print(f"Saving to Excel: {file_path}")
-        df.to_excel(file_path, index=False)
-        
-        # Verify the save worked by reloading
+        df['Industry'] = to_category(df['Industry'], 'Restaurant')
+    # Other writers wait until the snapshot and the journal agree again
+    with change_journal.locked(file_path):
         try:
-            verification_df = pd.read_excel(file_path)
-            print(f"Save verified: {file_path} - {len(verification_df)} rows saved.")
-            return True
+            seq = change_journal.frame_seq(df, file_path)
+            logger.info("Saving to Excel: %s", file_path)
+            df.to_excel(file_path, index=False)
+
+            # Verify the save worked by reloading
+            try:
+                saved_rows = sum(len(batch) for batch in iter_batches(file_path))
+                logger.info("Save verified: %s - %d rows saved.", file_path, saved_rows)
+                # The snapshot contains the journaled changes up to seq; later
+                # ones (from other writers) stay in the journal and are replayed
+                change_journal.archive(file_path, seq)
+                return True
+            except Exception as e:
+                logger.error("ERROR verifying save: %s", e)
+                return False
         except Exception as e:
-            print(f"ERROR verifying save: {str(e)}")
+            logger.error("ERROR saving to Excel: %s", e)
             return False
-    except Exception as e:
-        print(f"ERROR saving to Excel: {str(e)}")
-        return False
 
 def get_business_details_online(place_name):
     """
@@ -165,7 +227,7 @@ def get_business_details_online(place_name):
     Returns (None, None) if API is not configured.
     """
     if not gmaps:
-        print("Google Maps API not configured - skipping online lookup")
+        logger.warning("Google Maps API not configured - skipping online lookup")
         return None, None
         
     try:
@@ -185,23 +247,69 @@ def get_business_details_online(place_name):
 
         return None, None  # No phone number or address found
     except Exception as e:
-        print(f"⚠️ Error searching for {place_name}: {e}")
+        logger.warning("Error searching for %s: %s", place_name, e)
         return None, None
 
+# file path -> (change_journal.signature, {Id: row position}) for the frames
+# load_data hands out. A frame that was changed in memory (rows inserted or
+# deleted) can disagree with the map, so every hit is checked against the
+# frame and the map is rebuilt from the frame when it does not match.
+_positions = {}
+
+def row_position(df, business_id, file_path=EXCEL_FILE):
+    """Position in df of the row with this Id, or None."""
+    signature = change_journal.signature(file_path)
+    cached = _positions.get(file_path)
+    if cached is not None and cached[0] == signature:
+        position = cached[1].get(business_id)
+        if position is not None and position < len(df) and df['Id'].iat[position] == business_id:
+            return position
+    positions = {int(value): position for position, value in enumerate(df['Id']) if pd.notna(value)}
+    _positions[file_path] = (signature, positions)
+    return positions.get(business_id)
+
+def find_rows(df, place, file_path=EXCEL_FILE):
+    """
+    Row labels of a business, for df.loc: the row whose Id is place (an int
+    or a string of digits), else every row named place (ignoring case and
+    surrounding whitespace). Empty if nothing matches. file_path is the
+    sheet df was loaded from.
+    """
+    if 'Id' in df.columns and str(place).strip().isdigit():
+        position = row_position(df, int(str(place).strip()), file_path)
+        if position is not None:
+            return df.index[[position]]
+    return df.index[df['Name'].str.lower().str.strip() == str(place).lower().strip()]
+
+def find_place(df, place_name):
+    """
+    find_rows for a command that changes one business. Prints why and
+    returns None when nothing matches or a name is shared by several
+    businesses (then only the id says which one is meant).
+    """
+    place_mask = find_rows(df, place_name)
+    if place_mask.empty:
+        print(f"❌ No matching place found for '{place_name}'.")
+        return None
+    if len(place_mask) > 1:
+        ids = ', '.join(str(business_id) for business_id in df.loc[place_mask, 'Id'])
+        print(f"❌ {len(place_mask)} places are named '{place_name}' (ids {ids}); use the id.")
+        return None
+    return place_mask
+
 def mark_called(df, place_name):
     """
     Mark the place's status as 'Called'. If no phone number or address, attempt to find them online.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-    
-    if not place_mask.any():
-        print(f"No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
     # Get the phone number & address if missing
     if df.loc[place_mask, 'Number'].str.strip().eq("").any() or df.loc[place_mask, 'Address'].str.strip().eq("").any():
-        print(f"🔍 Searching online for {place_name}'s details...")
-        phone_number, address = get_business_details_online(place_name)
+        name = df.loc[place_mask, 'Name'].iloc[0]
+        print(f"🔍 Searching online for {name}'s details...")
+        phone_number, address = get_business_details_online(name)
 
         if phone_number:
             df.loc[place_mask, 'Number'] = phone_number
@@ -215,7 +323,7 @@ def mark_called(df, place_name):
         else:
             print("❌ No address found online.")
 
-    df.loc[place_mask, 'Status'] = 'Called'
+    df.loc[place_mask, 'Status'] = 'called'
     print(f"✅ Updated: {place_name} is now marked as 'Called'.")
     return df
 
@@ -224,21 +332,18 @@ def mark_tocall(df, place_name):
     """
     Mark the place's status as 'To Call'.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-    
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
-    df.loc[place_mask, 'Status'] = "To Call"
+    df.loc[place_mask, 'Status'] = "tocall"
     print(f"📞 Updated: {place_name} is now marked as 'To Call'.")
     return df
 
 
 def list_tocall(df):
     """List all places marked as 'To Call'."""
-    status_mask = df['Status'].str.lower().str.strip() == "to call"
-    filtered = df[status_mask]
+    filtered = df[status_mask(df['Status'], "tocall")]
 
     if filtered.empty:
         print("✅ No places marked as 'To Call'.")
@@ -263,10 +368,6 @@ def get_all_numbers(df):
     Get phone numbers and addresses for all restaurants that don't have them.
     Updates the Excel file after retrieving missing data.
     """
-    # Ensure 'Number' and 'Address' columns are treated as strings and fill NaN values
-    df['Number'] = df['Number'].astype(str).replace("nan", "").fillna("")
-    df['Address'] = df['Address'].astype(str).replace("nan", "").fillna("")
-
     # Identify rows with missing numbers or addresses
     missing_data = df[(df['Number'].str.strip() == "") | (df['Address'].str.strip() == "")]
 
@@ -300,20 +401,12 @@ def get_all_numbers(df):
 
 def list_by_status(df, status):
     """List all places with the given status along with their phone numbers, addresses, and comments."""
-    # Convert 'Status' column to string and handle NaN values
-    df['Status'] = df['Status'].astype(str).replace("nan", "").fillna("")
-
-    status_mask = df['Status'].str.lower().str.strip() == status.lower().strip()
-    filtered = df[status_mask]
+    filtered = df[status_mask(df['Status'], status)]
 
     if filtered.empty:
         print(f"❌ No places found with status '{status}'.")
         return
 
-    # Ensure 'Number', 'Address', and 'Comments' columns are treated as strings
-    for col in ["Number", "Address", "Comments"]:
-        df[col] = df[col].astype(str).replace("nan", "").fillna("")
-
     table_data = []
     for _, row in filtered.iterrows():
         name = row['Name'] if pd.notna(row['Name']) and row['Name'] else "No name available."
@@ -332,13 +425,11 @@ def mark_dont_call(df, place_name):
     """
     Mark the place's status as 'Don't Call'.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-    
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
-    df.loc[place_mask, 'Status'] = "Don't Call"
+    df.loc[place_mask, 'Status'] = "dont_call"
     print(f"🚫 Updated: {place_name} is now marked as 'Don't Call'.")
     return df
 
@@ -348,10 +439,8 @@ def mark_callback(df, place_name, callback_date='', callback_time='', reason='',
     """
     Mark the place's status as 'Call Back' with enhanced tracking.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-    
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
     # Ensure new columns exist
@@ -361,24 +450,22 @@ def mark_callback(df, place_name, callback_date='', callback_time='', reason='',
     df.loc[place_mask, 'Status'] = "callback"
     
     # Set callback due date/time if provided, otherwise default to tomorrow
+    today = pd.Timestamp.now().normalize()
     if not callback_date:
-        from datetime import datetime, timedelta
-        tomorrow = datetime.now() + timedelta(days=1)
-        callback_date = tomorrow.strftime('%Y-%m-%d')
+        callback_date = (today + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
         callback_time = '10:00'  # Default time
     
-    df.loc[place_mask, 'CallbackDueDate'] = callback_date
+    set_value(df, place_mask, 'CallbackDueDate', callback_date)
     df.loc[place_mask, 'CallbackDueTime'] = callback_time
     df.loc[place_mask, 'CallbackReason'] = reason or 'Follow-up required'
-    df.loc[place_mask, 'CallbackPriority'] = priority
+    set_value(df, place_mask, 'CallbackPriority', priority)
     
     # Increment callback count
     current_count = df.loc[place_mask, 'CallbackCount'].iloc[0] if not df.loc[place_mask, 'CallbackCount'].empty else 0
-    df.loc[place_mask, 'CallbackCount'] = int(current_count) + 1
+    set_value(df, place_mask, 'CallbackCount', int(current_count) + 1)
     
     # Update last callback date
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    df.loc[place_mask, 'LastCallbackDate'] = today_str
+    set_value(df, place_mask, 'LastCallbackDate', today)
     
     print(f"📞 Updated: {place_name} is now marked as 'callback' - Due: {callback_date} at {callback_time}")
     return df
@@ -388,8 +475,7 @@ def mark_callback(df, place_name, callback_date='', callback_time='', reason='',
 def list_callback(df):
     """List all places marked as 'callback' with enhanced information."""
     df = ensure_date_columns(df)
-    status_mask = df['Status'].str.lower().str.strip() == "callback"
-    filtered = df[status_mask]
+    filtered = df[status_mask(df['Status'], "callback")]
 
     if filtered.empty:
         print("✅ No places marked as 'callback'.")
@@ -399,7 +485,7 @@ def list_callback(df):
         for _, row in filtered.iterrows():
             name = row['Name'] if pd.notna(row['Name']) and row['Name'] else "No name available."
             phone_number = row['Number'] if row['Number'].strip() else "No phone number available."
-            due_date = row.get('CallbackDueDate', '') or 'Not set'
+            due_date = format_date(row.get('CallbackDueDate')) or 'Not set'
             due_time = row.get('CallbackDueTime', '') or 'Not set'
             priority = row.get('CallbackPriority', 'Medium')
             reason = row.get('CallbackReason', '') or 'No reason'
@@ -412,18 +498,17 @@ def list_callback(df):
 
 def list_callbacks_due_today(df):
     """List callbacks that are due today."""
-    from datetime import datetime
     df = ensure_date_columns(df)
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = pd.Timestamp.now().normalize()
     
-    status_mask = df['Status'].str.lower().str.strip() == "callback"
+    callback_mask = status_mask(df['Status'], "callback")
     due_today_mask = df['CallbackDueDate'] == today
-    filtered = df[status_mask & due_today_mask]
+    filtered = df[callback_mask & due_today_mask]
     
     if filtered.empty:
         print("✅ No callbacks due today.")
     else:
-        print(f"\n🔥 **Callbacks Due Today ({today}):**")
+        print(f"\n🔥 **Callbacks Due Today ({today:%Y-%m-%d}):**")
         table_data = []
         for _, row in filtered.iterrows():
             name = row['Name']
@@ -443,13 +528,12 @@ def list_callbacks_due_today(df):
 
 def list_overdue_callbacks(df):
     """List callbacks that are overdue."""
-    from datetime import datetime
     df = ensure_date_columns(df)
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = pd.Timestamp.now().normalize()
     
-    status_mask = df['Status'].str.lower().str.strip() == "callback"
-    overdue_mask = (df['CallbackDueDate'] != '') & (df['CallbackDueDate'] < today)
-    filtered = df[status_mask & overdue_mask]
+    callback_mask = status_mask(df['Status'], "callback")
+    overdue_mask = df['CallbackDueDate'] < today  # NaT never compares as overdue
+    filtered = df[callback_mask & overdue_mask]
     
     if filtered.empty:
         print("✅ No overdue callbacks.")
@@ -459,19 +543,15 @@ def list_overdue_callbacks(df):
         for _, row in filtered.iterrows():
             name = row['Name']
             phone = row['Number'] or 'No phone'
-            due_date = row.get('CallbackDueDate', 'No date')
+            due = row['CallbackDueDate']
             priority = row.get('CallbackPriority', 'Medium')
             reason = row.get('CallbackReason', 'No reason')
             attempts = row.get('CallbackCount', 0)
             
             # Calculate days overdue
-            if due_date != 'No date':
-                due = datetime.strptime(due_date, '%Y-%m-%d')
-                days_overdue = (datetime.now() - due).days
-            else:
-                days_overdue = 0
+            days_overdue = (today - due).days
             
-            table_data.append([name, phone, due_date, f"{days_overdue} days", priority, reason, attempts])
+            table_data.append([name, phone, format_date(due), f"{days_overdue} days", priority, reason, attempts])
         
         # Sort by days overdue (most overdue first)
         table_data.sort(key=lambda x: int(x[3].split()[0]), reverse=True)
@@ -481,16 +561,14 @@ def list_overdue_callbacks(df):
 
 def update_lead_info(df, place_name, interest_level='', best_time='', decision_maker='', next_action='', lead_score=None):
     """Update detailed lead information for better tracking."""
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-    
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
     
     df = ensure_date_columns(df)
     
     if interest_level:
-        df.loc[place_mask, 'InterestLevel'] = interest_level
+        set_value(df, place_mask, 'InterestLevel', interest_level)
     if best_time:
         df.loc[place_mask, 'BestTimeToCall'] = best_time
     if decision_maker:
@@ -498,7 +576,7 @@ def update_lead_info(df, place_name, interest_level='', best_time='', decision_m
     if next_action:
         df.loc[place_mask, 'NextAction'] = next_action
     if lead_score is not None:
-        df.loc[place_mask, 'LeadScore'] = max(1, min(10, int(lead_score)))  # Ensure 1-10 range
+        set_value(df, place_mask, 'LeadScore', lead_score)  # Clamped to the 1-10 range
     
     print(f"✅ Updated lead information for {place_name}")
     return df
@@ -507,9 +585,9 @@ def update_lead_info(df, place_name, interest_level='', best_time='', decision_m
 def get_priority_callbacks(df, priority='High'):
     """Get callbacks by priority level."""
     df = ensure_date_columns(df)
-    status_mask = df['Status'].str.lower().str.strip() == "callback"
+    callback_mask = status_mask(df['Status'], "callback")
     priority_mask = df['CallbackPriority'].str.lower() == priority.lower()
-    filtered = df[status_mask & priority_mask]
+    filtered = df[callback_mask & priority_mask]
     
     if filtered.empty:
         print(f"✅ No {priority.lower()} priority callbacks.")
@@ -519,8 +597,8 @@ def get_priority_callbacks(df, priority='High'):
         for _, row in filtered.iterrows():
             name = row['Name']
             phone = row['Number'] or 'No phone'
-            due_date = row.get('CallbackDueDate', 'Not set')
-            due_time = row.get('CallbackDueTime', 'Not set')
+            due_date = format_date(row.get('CallbackDueDate')) or 'Not set'
+            due_time = row.get('CallbackDueTime', '') or 'Not set'
             reason = row.get('CallbackReason', 'No reason')
             
             table_data.append([name, phone, f"{due_date} {due_time}", reason])
@@ -580,10 +658,6 @@ def list_all(df):
         print("❌ No data available in the Excel file.")
         return
 
-    # Ensure 'Number', 'Address', and 'Comments' columns are treated as strings
-    for col in ["Number", "Address", "Comments"]:
-        df[col] = df[col].astype(str).replace("nan", "").fillna("")
-
     table_data = []
     for _, row in df.iterrows():
         name = row['Name'] if pd.notna(row['Name']) and row['Name'] else "No name available."
@@ -602,15 +676,10 @@ def reset_comment(df, place_name, new_comment):
     Reset the comment for a business in the Excel file.
     This will replace the existing comment with a new one.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
-    # Ensure 'Comments' column exists and is a string
-    df['Comments'] = df['Comments'].astype(str).replace("nan", "").fillna("")
-
     # Reset and add the new comment
     df.loc[place_mask, 'Comments'] = new_comment
     print(f"✅ Comment reset for {place_name}: {new_comment}")
@@ -620,35 +689,29 @@ def reset_comment(df, place_name, new_comment):
 
 
 #---------------------------------Add Comment---------------------------------#
-def add_comment(df, place_name, comment):
+def add_comment(df, place_name, comment, outcome=None, duration_seconds=None):
     """
-    Add a comment to a business in the Excel file.
-    If a comment already exists, append the new comment with a timestamp.
+    Add a comment to a business.
+    The comment is stored as a call event (see call_history.py) and the
+    Comments column is replaced with it, so Comments only holds the latest note.
     """
-    place_mask = df['Name'].str.lower().str.strip() == place_name.lower().strip()
-
-    if not place_mask.any():
-        print(f"❌ No matching place found for '{place_name}'.")
+    place_mask = find_place(df, place_name)
+    if place_mask is None:
         return df
 
-    # Ensure 'Comments' column exists and is a string
-    df['Comments'] = df['Comments'].astype(str).replace("nan", "").fillna("")
-
-    # Append new comment with timestamp
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    new_comment = f"{timestamp}: {comment}"
-
-    if df.loc[place_mask, 'Comments'].str.strip().eq("").any():
-        df.loc[place_mask, 'Comments'] = new_comment
-    else:
-        df.loc[place_mask, 'Comments'] += " | " + new_comment
+    event = call_history.record_event(df.loc[place_mask, 'Id'].iloc[0], outcome=outcome, note=comment,
+                                      duration_seconds=duration_seconds, actor='cli')
+    new_comment = f"{event['occurred_at'][:16]}: {comment}"
+    df.loc[place_mask, 'Comments'] = new_comment
 
     print(f"✅ Comment added for {place_name}: {new_comment}")
     return df
 
 #--------------------------------- GUI ---------------------------------#
 def launch_gui(df):
+    if tk is None:
+        print("❌ The GUI needs tkinter.")
+        return
 
     from tkinter import font
     style = ttk.Style()
@@ -759,6 +822,9 @@ def main():
             user_input = input(" ").strip().lower()
 
             if user_input == 'voice':
+                if sr is None:
+                    print("❌ Voice control needs the SpeechRecognition and pyttsx3 packages.")
+                    continue
                 speak("Voice control activated")
                 voice_mode = True
                 continue  # Restart loop to start voice input
@@ -864,43 +930,41 @@ def api_direct_save(df, file_path=EXCEL_FILE):
     Save DataFrame to Excel directly without any comment processing.
     This is used by the API to ensure comments are not appended with timestamps.
     """
-    # Ensure all rows have Industry set to 'Restaurant' if missing or blank
-    if 'Industry' not in df.columns:
-        df['Industry'] = 'Restaurant'
-    else:
-        df['Industry'] = df['Industry'].fillna('Restaurant').replace('', 'Restaurant')
     save_to_excel(df, file_path)
 
+@timed('excel')
+def api_journal_save(df, entries, file_path=EXCEL_FILE):
+    """
+    Record API changes by appending them to the change journal instead of
+    rewriting the whole sheet. df must already contain the changes; it becomes
+    the cached state returned by load_data. The journal is folded into the
+    snapshot once it reaches change_journal.COMPACT_AFTER entries. Changes
+    other processes journaled since df was loaded are applied to it first.
+    """
+    with change_journal.locked(file_path):
+        seq = change_journal.frame_seq(df, file_path)
+        change_journal.append(file_path, entries)
+        if entries and entries[0]['seq'] == seq + 1:
+            df.attrs[change_journal.SEQ_ATTR] = entries[-1]['seq']
+        else:
+            df, _ = change_journal.replay(df, file_path, seq)
+        if change_journal.pending_count(file_path) >= change_journal.COMPACT_AFTER:
+            compact(file_path, df)
+        _frames[file_path] = (change_journal.signature(file_path), df)
+
+def compact(file_path=EXCEL_FILE, df=None):
+    """Fold the change journal into the Excel snapshot."""
+    with change_journal.locked(file_path):
+        if df is None:
+            df = load_data(file_path)
+        else:
+            df, _ = change_journal.replay(df, file_path, change_journal.frame_seq(df, file_path))
+        if save_to_excel(df, file_path):
+            _frames[file_path] = (change_journal.signature(file_path), df)
+
 def ensure_date_columns(df):
-    """Ensure all tracking columns exist with default values."""
-    if 'LastCalledDate' not in df.columns:
-        df['LastCalledDate'] = ''
-    if 'LastCallbackDate' not in df.columns:
-        df['LastCallbackDate'] = ''
-    
-    # New enhanced callback tracking columns
-    if 'CallbackDueDate' not in df.columns:
-        df['CallbackDueDate'] = ''
-    if 'CallbackDueTime' not in df.columns:
-        df['CallbackDueTime'] = ''
-    if 'CallbackReason' not in df.columns:
-        df['CallbackReason'] = ''
-    if 'CallbackPriority' not in df.columns:
-        df['CallbackPriority'] = 'Medium'  # High, Medium, Low
-    if 'CallbackCount' not in df.columns:
-        df['CallbackCount'] = 0
-    if 'LeadScore' not in df.columns:
-        df['LeadScore'] = 5  # 1-10 scale, 5 is neutral
-    if 'InterestLevel' not in df.columns:
-        df['InterestLevel'] = 'Unknown'  # High, Medium, Low, Unknown
-    if 'BestTimeToCall' not in df.columns:
-        df['BestTimeToCall'] = ''
-    if 'DecisionMaker' not in df.columns:
-        df['DecisionMaker'] = ''
-    if 'NextAction' not in df.columns:
-        df['NextAction'] = ''
-    
-    return df
+    """Ensure all tracking columns exist with default values and schema dtypes."""
+    return apply_schema(df)
 
 def set_all_industries_to_restaurant():
     df = load_data()
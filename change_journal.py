@@ -0,0 +1,366 @@
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from business_schema import SCHEMA, apply_schema, assign_ids, set_value
+from excel_stream import concat_batches
+
+try:
+    import fcntl
+except ImportError:
+    # No OS file locks (Windows): only one process may write to a journal there
+    fcntl = None
+
+# The journal lives next to the Excel snapshot:
+#   places_to_call.xlsx.journal.jsonl          changes not yet folded into the snapshot
+#   places_to_call.xlsx.journal.archive.jsonl  every compacted change (the audit trail)
+#   places_to_call.xlsx.journal.lock           held while appending or compacting
+# Several processes (API workers, the CLI) may write to one journal: sequence
+# numbers are taken from the file under the lock, never from memory alone.
+JOURNAL_SUFFIX = '.journal.jsonl'
+ARCHIVE_SUFFIX = '.journal.archive.jsonl'
+LOCK_SUFFIX = '.journal.lock'
+
+# DataFrame.attrs key holding the last journal seq a frame contains
+SEQ_ATTR = 'journal_seq'
+
+# Fold the journal into the snapshot once it holds this many entries
+COMPACT_AFTER = int(os.getenv('JOURNAL_COMPACT_AFTER', '1000'))
+
+_lock = threading.RLock()
+# journal lock files this process holds (only touched under _lock)
+_held = set()
+# journal path -> (file stats it was read at, last sequence number written)
+_last_seq = {}
+# journal path -> (journal stats it was counted at, entries waiting to be compacted)
+_pending = {}
+
+def journal_path(file_path):
+    return f"{file_path}{JOURNAL_SUFFIX}"
+
+def archive_path(file_path):
+    return f"{file_path}{ARCHIVE_SUFFIX}"
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+@contextmanager
+def locked(file_path):
+    """
+    Exclusive access to the journal, across threads and (with fcntl)
+    processes. Re-entrant, so a caller can hold it around append and archive.
+    """
+    with _lock:
+        if fcntl is None or file_path in _held:
+            yield
+            return
+        with open(f"{file_path}{LOCK_SUFFIX}", 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            _held.add(file_path)
+            try:
+                yield
+            finally:
+                _held.discard(file_path)
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def name_key(name):
+    """Businesses are matched by name, ignoring case and surrounding whitespace."""
+    return str(name).strip().lower()
+
+def encode_value(value):
+    """JSON-safe form of a cell value."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalars
+    return value
+
+def _tail_seq(path):
+    """Sequence number of the last entry in a JSONL file, reading only its tail."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 65536))
+            lines = f.read().splitlines()
+    except OSError:
+        return 0
+    for line in reversed(lines):
+        try:
+            return int(json.loads(line)['seq'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return 0
+
+def last_seq(file_path):
+    """
+    Last sequence number ever written for this snapshot (survives compaction).
+    Read again only when the journal or archive changed since the last call.
+    """
+    path = journal_path(file_path)
+    stats = (_stat(path), _stat(archive_path(file_path)))
+    cached = _last_seq.get(path)
+    if cached is None or cached[0] != stats:
+        _last_seq[path] = (stats, _tail_seq(path) or _tail_seq(archive_path(file_path)))
+    return _last_seq[path][1]
+
+def make_entry(op, name, changes=None, actor=None, business_id=None):
+    """
+    One journal entry. op is 'update' (changes = {column: value}),
+    'insert' (changes = the full new row) or 'delete'. Entries with a
+    business_id (the row's Id) are applied by id; older ones by name.
+    """
+    entry = {
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'actor': actor or 'api',
+        'op': op,
+        'name': name,
+        'changes': {column: encode_value(value) for column, value in (changes or {}).items()},
+    }
+    if business_id is not None:
+        entry['id'] = int(business_id)
+    return entry
+
+def append(file_path, entries):
+    """
+    Append entries to the journal and fsync. Returns the entries with their
+    seq set. Holds the journal lock, so seq continues from whatever another
+    process wrote last.
+    """
+    if not entries:
+        return entries
+    path = journal_path(file_path)
+    with locked(file_path):
+        seq = last_seq(file_path)
+        lines = []
+        for entry in entries:
+            seq += 1
+            entry['seq'] = seq
+            lines.append(json.dumps(entry, ensure_ascii=False))
+        pending = pending_count(file_path)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        _last_seq[path] = ((_stat(path), _stat(archive_path(file_path))), seq)
+        _pending[path] = (_stat(path), pending + len(lines))
+    return entries
+
+def _read(path, after_seq):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('seq', 0) > after_seq:
+                yield entry
+
+def read_entries(file_path, after_seq=0):
+    """Yield journal entries with seq > after_seq. A torn last line is ignored."""
+    return _read(journal_path(file_path), after_seq)
+
+def entries_since(file_path, seq):
+    """
+    Every change after seq, oldest first. The archive is only read when some
+    of them were already compacted out of the journal.
+    """
+    pending = list(read_entries(file_path, seq))
+    first = pending[0]['seq'] if pending else last_seq(file_path) + 1
+    if first <= seq + 1:
+        return pending
+    return [entry for entry in _read(archive_path(file_path), seq) if entry['seq'] < first] + pending
+
+def pending_count(file_path):
+    """
+    Number of entries waiting to be compacted. The journal is only counted
+    again when something other than append in this process changed it.
+    """
+    path = journal_path(file_path)
+    stats = _stat(path)
+    cached = _pending.get(path)
+    if cached is None or cached[0] != stats:
+        _pending[path] = (stats, sum(1 for _ in read_entries(file_path)))
+    return _pending[path][1]
+
+def insert_rows(df, rows):
+    """Append row dicts to a typed frame, keeping the schema dtypes. Rows without an Id get the next free one."""
+    new_rows = apply_schema(pd.DataFrame(rows))
+    result = assign_ids(concat_batches([df, new_rows]).reset_index(drop=True))
+    result.attrs.update(df.attrs)
+    return result
+
+def entry_mask(df, entry):
+    """Rows an update or delete entry applies to: the row with its id, else the rows with its name."""
+    if entry.get('id') is not None:
+        return df['Id'].eq(entry['id']).fillna(False).astype(bool)
+    return df['Name'].str.strip().str.lower() == name_key(entry['name'])
+
+def apply_entry(df, entry):
+    """
+    Apply one journal entry to a typed frame and return the frame.
+    Entries are idempotent: replaying one that is already in the snapshot
+    changes nothing (inserts of an existing id, or name for entries without
+    one, are skipped).
+    """
+    op = entry.get('op')
+    changes = entry.get('changes') or {}
+    if op == 'insert':
+        if changes.get('Id') is not None:
+            exists = (df['Id'] == changes['Id']).any()
+        else:
+            exists = (df['Name'] == changes.get('Name')).any()
+        if not exists:
+            df = insert_rows(df, [changes])
+    elif op == 'delete':
+        df = df[~entry_mask(df, entry)].reset_index(drop=True)
+    elif op == 'update':
+        mask = entry_mask(df, entry)
+        if mask.any():
+            for column, value in changes.items():
+                if value is None and SCHEMA.get(column, ('text', ''))[0] == 'text':
+                    value = ''
+                set_value(df, mask, column, value)
+    return df
+
+def replay(df, file_path, after_seq=0):
+    """
+    Apply every journal entry after after_seq. Returns (df, entries applied).
+    The frame remembers the last seq it contains (see frame_seq).
+    """
+    applied = 0
+    seq = after_seq
+    for entry in read_entries(file_path, after_seq):
+        df = apply_entry(df, entry)
+        applied += 1
+        seq = max(seq, entry.get('seq', 0))
+    df.attrs[SEQ_ATTR] = seq
+    return df, applied
+
+def frame_seq(df, file_path):
+    """
+    Last journal seq contained in a frame from load_data or replay. A frame
+    built some other way is taken to contain every change written so far.
+    """
+    seq = df.attrs.get(SEQ_ATTR)
+    return last_seq(file_path) if seq is None else seq
+
+def signature(file_path):
+    """Changes whenever the snapshot is rewritten or the journal grows."""
+    return (_stat(file_path), _stat(journal_path(file_path)))
+
+def archive(file_path, upto_seq=None):
+    """
+    Move the journal entries with seq <= upto_seq (all of them by default)
+    into the archive after they were written into the snapshot; later ones
+    stay in the journal. Call only after the snapshot save succeeded, with
+    the lock held since the snapshot was built.
+    """
+    path = journal_path(file_path)
+    with locked(file_path):
+        if not os.path.exists(path):
+            return 0
+        moved, kept = [], []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    seq = json.loads(line)['seq']
+                except (ValueError, KeyError, TypeError):
+                    seq = None  # a torn line goes with the archived ones
+                if upto_seq is None or seq is None or seq <= upto_seq:
+                    moved.append(line if line.endswith('\n') else line + '\n')
+                else:
+                    kept.append(line)
+        if moved:
+            with open(archive_path(file_path), 'a', encoding='utf-8') as f:
+                f.writelines(moved)
+                f.flush()
+                os.fsync(f.fileno())
+        if kept:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        else:
+            os.remove(path)
+    return len(moved)
+
+def _all_entries(file_path):
+    for path in (archive_path(file_path), journal_path(file_path)):
+        yield from _read(path, 0)
+
+def _named(entry, key):
+    return name_key(entry.get('name', '')) == key or name_key(entry.get('changes', {}).get('Name', '')) == key
+
+def history(file_path, business_id=None, name=None, limit=50):
+    """
+    Most recent changes (newest first) from archive + journal, optionally for
+    one business: the entries with its id, and entries written before ids
+    that carry its name (as entry_mask matches them).
+    """
+    key = name_key(name) if name is not None else None
+    matches = []
+    for entry in _all_entries(file_path):
+        if business_id is None and key is None:
+            matches.append(entry)
+        elif entry.get('id') is not None:
+            if entry['id'] == business_id:
+                matches.append(entry)
+        elif key is not None and _named(entry, key):
+            matches.append(entry)
+    return matches[::-1][:limit]
+
+def named_ids(file_path, name):
+    """Ids of the businesses whose entries carry name, oldest first (e.g. deleted or since renamed)."""
+    key = name_key(name)
+    return list(dict.fromkeys(entry['id'] for entry in _all_entries(file_path)
+                              if entry.get('id') is not None and _named(entry, key)))
+
+def main():
+    """
+    Usage:
+        python change_journal.py compact [file.xlsx]      fold the journal into the snapshot
+        python change_journal.py history NAME|ID [file.xlsx] show recent changes to a business
+    """
+    import call_tracker as ct
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('compact', 'history'):
+        print(main.__doc__)
+        return
+    if sys.argv[1] == 'compact':
+        file_path = sys.argv[2] if len(sys.argv) > 2 else ct.EXCEL_FILE
+        pending = pending_count(file_path)
+        ct.compact(file_path)
+        print(f"Folded {pending} journal entries into {file_path}.")
+        return
+    file_path = sys.argv[3] if len(sys.argv) > 3 else ct.EXCEL_FILE
+    df = ct.load_data(file_path)
+    rows = ct.find_rows(df, sys.argv[2], file_path)
+    businesses = [(int(business_id), name) for business_id, name in zip(df.loc[rows, 'Id'], df.loc[rows, 'Name'])]
+    if not businesses:
+        # Deleted, or renamed since: the ids its entries were written with
+        businesses = [(business_id, sys.argv[2]) for business_id in named_ids(file_path, sys.argv[2])] \
+            or [(None, sys.argv[2])]
+    for business_id, name in businesses:
+        if len(businesses) > 1:
+            print(f"Id {business_id} ({name}):")
+        for entry in history(file_path, business_id, name):
+            print(f"#{entry['seq']} {entry['ts']} {entry['actor']} {entry['op']} {entry['name']}: {entry['changes']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,112 @@
-import pandas as pd
 import os
-from datetime import datetime
+import sys
 import shutil
+from datetime import datetime
+
+import pandas as pd
+
+import call_history
+from business_schema import assign_ids, to_id
+from excel_stream import iter_batches, read_frame, write_batches
 
 EXCEL_FILE = 'places_to_call.xlsx'
 
-def clean_comments_thoroughly(file_path=EXCEL_FILE):
+def _sheet_ids(file_path):
+    """Every row's Id, numbered the way call_tracker.load_data numbers rows without one."""
+    try:
+        ids = read_frame(file_path, usecols=['Id'])['Id']
+    except ValueError:
+        # A sheet written before ids
+        ids = pd.Series(None, index=range(sum(len(batch) for batch in iter_batches(file_path))), dtype=object)
+    return assign_ids(pd.DataFrame({'Id': to_id(ids)}))['Id']
+
+def migrate_comments(file_path=EXCEL_FILE, db_path=None):
     """
-    Completely clean all comments in the Excel file.
-    Creates a backup before making changes.
-    Completely rewrites the file to ensure no historical data remains.
+    Move the " | "-joined comment history of every business into the call
+    history store and keep only the latest note in the Comments column.
+    Events are keyed by Id; rows without one get it here and the Id column
+    is written back. Creates a backup of the Excel file first.
     """
-    # Create a backup first
     backup_file = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.path.basename(file_path)}"
+    shutil.copy2(file_path, backup_file)
+    print(f"Backup created: {backup_file}")
+
+    stats = {'rows': 0, 'events': 0, 'shortened': 0}
+    ids = _sheet_ids(file_path)
+
+    def migrated_batches():
+        for batch in iter_batches(file_path):
+            stats['rows'] += len(batch)
+            batch['Id'] = ids[batch.index].to_numpy()
+            if 'Comments' not in batch.columns:
+                yield batch
+                continue
+            events = []
+            # Events from an earlier run are keyed by id, or by name if recorded before ids
+            migrated = call_history.businesses_with_history(
+                [int(business_id) for business_id in batch['Id']] + list(batch['Name'].dropna()), db_path)
+            for business_id, name, comments in zip(batch['Id'], batch['Name'], batch['Comments']):
+                if pd.isna(name) or call_history.business_key(int(business_id)) in migrated or \
+                        call_history.business_key(name) in migrated:
+                    continue
+                for occurred_at, note in call_history.comment_events(comments):
+                    events.append({'business': int(business_id), 'occurred_at': occurred_at, 'note': note,
+                                   'actor': 'migration'})
+            stats['events'] += call_history.record_events(events, db_path)
+            latest = batch['Comments'].map(call_history.latest_note)
+            stats['shortened'] += int((latest != batch['Comments'].fillna('')).sum())
+            batch['Comments'] = latest
+            yield batch
+
     try:
-        shutil.copy2(file_path, backup_file)
-        print(f"Backup created: {backup_file}")
-    except Exception as e:
-        print(f"Warning: Could not create backup: {str(e)}")
-    
-    # Load the data
-    try:
-        df = pd.read_excel(file_path)
-        original_row_count = len(df)
-        print(f"Loaded {original_row_count} rows from {file_path}")
-        
-        # Check if Comments column exists
-        if 'Comments' in df.columns:
-            print("Found Comments column. Cleaning...")
-            
-            # Method 1: Replace with empty strings
-            df['Comments'] = df['Comments'].apply(lambda x: 
-                str(x).split('|')[-1].strip() 
-                if pd.notna(x) and str(x).strip() != "" 
-                else "")
-            
-            # Method 2: Complete overwrite by creating a new DataFrame
-            cleaned_df = pd.DataFrame()
-            for col in df.columns:
-                if col == 'Comments':
-                    # Already cleaned above, just copy
-                    cleaned_df[col] = df[col]
-                else:
-                    cleaned_df[col] = df[col]
-                    
-            # Save the cleaned data with verification
-            cleaned_df.to_excel(file_path, index=False)
-            print(f"Comments cleaned and saved to {file_path}")
-            
-            # Verify the save
-            verify_df = pd.read_excel(file_path)
-            if len(verify_df) == original_row_count:
-                print(f"Verification successful. {len(verify_df)} rows saved.")
-                for i, row in verify_df.iterrows():
-                    if 'Comments' in verify_df.columns and '|' in str(row.get('Comments', '')):
-                        print(f"WARNING: Row {i} still has '|' in Comments: {row.get('Comments', '')}")
-            else:
-                print(f"WARNING: Row count mismatch. Original: {original_row_count}, Saved: {len(verify_df)}")
-                
-        else:
-            print("No Comments column found in the Excel file.")
-    
+        write_batches(file_path, migrated_batches())
     except Exception as e:
         print(f"ERROR: {str(e)}")
-        print("Restoring from backup...")
-        try:
-            if os.path.exists(backup_file):
-                shutil.copy2(backup_file, file_path)
-                print(f"Restored from backup: {backup_file}")
-        except Exception as backup_error:
-            print(f"Failed to restore from backup: {str(backup_error)}")
+        print(f"The original file is unchanged; backup at {backup_file}")
+        raise
+    print(f"Moved {stats['events']} notes into {db_path or call_history.HISTORY_DB}; "
+          f"{stats['shortened']} of {stats['rows']} comment cells now hold only the latest note.")
+    return stats
+
+def migrate_comments_supabase(page_size=1000):
+    """
+    Same migration for Supabase: insert call_events rows for every note of
+    a joined comment history and set businesses.comments to the latest one.
+    Pages through businesses by id.
+    """
+    from excel_sync import get_supabase
+
+    supabase = get_supabase()
+    last_id = 0
+    moved = 0
+    while True:
+        rows = supabase.table('businesses').select('id, user_id, name, comments')\
+            .gt('id', last_id).order('id').limit(page_size).execute().data
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        events = []
+        updates = []
+        for row in rows:
+            # Only cells that still hold a joined history; after a run every cell
+            # is a single note, so running this again changes nothing
+            if len(call_history.split_comments(row.get('comments'))) < 2:
+                continue
+            for occurred_at, note in call_history.comment_events(row.get('comments')):
+                events.append({'business_id': row['id'], 'user_id': row.get('user_id'),
+                               'occurred_at': occurred_at, 'note': note})
+            updates.append({'id': row['id'], 'user_id': row.get('user_id'), 'name': row['name'],
+                            'comments': call_history.latest_note(row.get('comments'))})
+        if events:
+            supabase.table('call_events').insert(events).execute()
+            supabase.table('businesses').upsert(updates).execute()
+            moved += len(events)
+        print(f"Processed businesses through id {last_id} ({moved} notes moved)")
+    print(f"Done. Moved {moved} notes into call_events.")
 
 if __name__ == '__main__':
-    clean_comments_thoroughly()
-    print("Script completed.") 
\ No newline at end of file
+    if '--supabase' in sys.argv:
+        migrate_comments_supabase()
+    else:
+        migrate_comments()
+    print("Script completed.")
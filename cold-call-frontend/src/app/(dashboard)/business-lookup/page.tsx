@@ -28,10 +28,16 @@ export default function BusinessLookupPage() {
   const [industryInput, setIndustryInput] = useState("");
   const [industryDropdown, setIndustryDropdown] = useState("");
   const [pendingAddIdx, setPendingAddIdx] = useState<number | null>(null);
+  const [progress, setProgress] = useState("");
+  const searchStream = React.useRef<EventSource | null>(null);
+
+  // Stop a running search when leaving the page
+  useEffect(() => () => searchStream.current?.close(), []);
 
   // API configuration
   const BUSINESSES_API_URL = '/api/businesses';
   const SEARCH_API_URL = '/api/businesses/search';
+  const SEARCH_STREAM_URL = '/api/businesses/search/stream';
 
   // Headers configuration
   const getHeaders = () => {
@@ -95,16 +101,48 @@ export default function BusinessLookupPage() {
     setResults([]);
     setAddedIdx(null);
     setAddedAll(false);
+    setProgress("");
     setLoading(true);
+    const params = new URLSearchParams({
+      query,
+      limit: filterLimit.toString(),
+      no_website: filterNoWebsite ? "true" : "false",
+      initial_radius: initialRadius.toString(),
+      max_radius: maxRadius.toString(),
+      keywords: keywords,
+    });
+    if (typeof EventSource === "undefined") {
+      await fetchSearchResults(params);
+      return;
+    }
+    // Results are shown as soon as their details arrive
+    searchStream.current?.close();
+    const source = new EventSource(`${SEARCH_STREAM_URL}?${params.toString()}`);
+    searchStream.current = source;
+    let received = 0;
+    const finish = () => {
+      source.close();
+      setProgress("");
+      setLoading(false);
+    };
+    source.addEventListener("progress", (event: MessageEvent) => {
+      const data = JSON.parse(event.data);
+      setProgress(`Searching "${data.keyword}" (page ${data.page}) - ${data.results} found, ${data.quota_used} API calls`);
+    });
+    source.addEventListener("result", (event: MessageEvent) => {
+      received += 1;
+      const result = JSON.parse(event.data);
+      setResults(prev => [...prev, result]);
+    });
+    source.addEventListener("summary", finish);
+    source.addEventListener("error", (event: MessageEvent) => {
+      finish();
+      if (event.data || received === 0) setError("Failed to fetch business results");
+    });
+  }
+
+  async function fetchSearchResults(params: URLSearchParams) {
     try {
-      const params = new URLSearchParams({
-        query,
-        limit: filterLimit.toString(),
-        no_website: filterNoWebsite ? "true" : "false",
-        initial_radius: initialRadius.toString(),
-        max_radius: maxRadius.toString(),
-        keywords: keywords,
-      });
       const res = await fetch(`${SEARCH_API_URL}?${params.toString()}`);
       if (!res.ok) throw new Error(await res.text());
       const data = await res.json();
@@ -142,6 +180,9 @@ export default function BusinessLookupPage() {
           comments: "",
           hours: result.hours || "",
           industry,
+          place_id: result.place_id || undefined,
+          latitude: result.latitude ?? undefined,
+          longitude: result.longitude ?? undefined,
         }),
       });
       if (!res.ok) {
@@ -174,7 +215,10 @@ export default function BusinessLookupPage() {
             status: "tocall",
             comments: "",
             hours: result.hours || "",
-            industry: "Restaurant" // Default industry for bulk add
+            industry: "Restaurant", // Default industry for bulk add
+            place_id: result.place_id || undefined,
+            latitude: result.latitude ?? undefined,
+            longitude: result.longitude ?? undefined,
           }),
         });
         
@@ -313,6 +357,7 @@ export default function BusinessLookupPage() {
         </div>
       )}
       {error && <div className="text-red-500 mb-4">{error}</div>}
+      {progress && <div className="text-gray-500 mb-4">{progress}</div>}
       {results.length > 0 && (
         <div className="space-y-4">
           <div className="text-gray-600 mb-2">
@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from api.geo import METERS_PER_DEGREE
+
+# Nearby Search returns at most 3 pages of 20. A tile that comes back full
+# probably has more businesses than we saw, so it is split into smaller tiles.
+RESULT_CAP = 60
+PAGE_DELAY = 2          # seconds before a next_page_token becomes valid
+MIN_RADIUS = 100        # meters; tiles are not split below this
+MAX_RADIUS = 50000      # largest radius Nearby Search accepts
+MAX_ROOT_TILES = 64
+
+# Completed tiles, so sweeps that ask to can skip areas searched before
+TILE_STORE = os.getenv('COVERAGE_TILE_STORE', 'coverage_tiles.json')
+STALE_AFTER_DAYS = int(os.getenv('COVERAGE_STALE_AFTER_DAYS', '30'))
+
+
+def _degrees(lat, meters):
+    """(dlat, dlng) spanned by a distance in meters at a latitude."""
+    return meters / METERS_PER_DEGREE, meters / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+
+def tile_key(keyword, lat, lng, radius, scope=''):
+    """scope names the filters the caller applied to the tile's places; tiles searched with other filters are other tiles."""
+    key = f"{keyword.strip().lower()}|{lat:.5f},{lng:.5f}|{int(round(radius))}"
+    return f"{key}|{scope}" if scope else key
+
+
+def cover(south, west, north, east, radius):
+    """
+    Centers of circles of this radius that cover the box. Cells of a fixed
+    global grid (side radius * sqrt(2), so each circle covers its cell) are
+    used, so the same tiles come back for overlapping regions.
+    """
+    spacing = radius * math.sqrt(2)
+    dlat = spacing / METERS_PER_DEGREE
+    centers = []
+    for row in range(math.floor(south / dlat), math.floor(north / dlat) + 1):
+        edge = min(abs(row * dlat), abs((row + 1) * dlat)) if row * (row + 1) > 0 else 0.0
+        _, dlng = _degrees(edge, spacing)
+        lat = (row + 0.5) * dlat
+        for col in range(math.floor(west / dlng), math.floor(east / dlng) + 1):
+            centers.append((lat, (col + 0.5) * dlng))
+    return centers
+
+
+def split(lat, lng, radius):
+    """Four tiles of half the radius covering the quarters of a tile's cell."""
+    dlat, dlng = _degrees(lat, radius / (2 * math.sqrt(2)))
+    return [(lat + sy * dlat, lng + sx * dlng, radius / 2) for sy in (-1, 1) for sx in (-1, 1)]
+
+
+def root_radius(bounds, initial_radius):
+    """initial_radius, doubled until the region needs at most MAX_ROOT_TILES tiles."""
+    radius = max(initial_radius, MIN_RADIUS)
+    while radius < MAX_RADIUS and len(cover(*bounds, radius)) > MAX_ROOT_TILES:
+        radius *= 2
+    return min(radius, MAX_RADIUS)
+
+
+def region_bounds(client, query, max_radius):
+    """(south, west, north, east) of the geocoded query, at most max_radius from its center, or None."""
+    results = client.geocode(query)
+    if not results:
+        return None
+    geometry = results[0]['geometry']
+    lat, lng = geometry['location']['lat'], geometry['location']['lng']
+    dlat, dlng = _degrees(lat, max_radius)
+    south, west, north, east = lat - dlat, lng - dlng, lat + dlat, lng + dlng
+    viewport = geometry.get('viewport')
+    if viewport:
+        south = max(south, viewport['southwest']['lat'])
+        west = max(west, viewport['southwest']['lng'])
+        north = min(north, viewport['northeast']['lat'])
+        east = min(east, viewport['northeast']['lng'])
+    return south, west, north, east
+
+
+class TileStore:
+    """Completed tiles by key: when they were queried, how many results, whether they were split."""
+
+    def __init__(self, path=TILE_STORE, stale_after_days=STALE_AFTER_DAYS):
+        self.path = path
+        self.stale_after = timedelta(days=stale_after_days)
+        self.tiles = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.tiles = json.load(f).get('tiles', {})
+            except (OSError, ValueError):
+                print(f"Could not read {path} - all tiles will be queried again.")
+
+    def fresh(self, key, now=None):
+        """The tile's record if it was completed recently enough, else None."""
+        record = self.tiles.get(key)
+        if record is None:
+            return None
+        completed = datetime.strptime(record['completed_at'], '%Y-%m-%d %H:%M:%S')
+        return record if (now or datetime.now()) - completed < self.stale_after else None
+
+    def record(self, key, results, was_split):
+        self.tiles[key] = {'completed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                           'results': results, 'split': was_split}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'tiles': self.tiles}, f)
+        os.replace(tmp_path, self.path)
+
+
+class CoveragePlanner:
+    """
+    Sweeps a region with Nearby Search tiles. client is a googlemaps.Client
+    (or anything with the same places_nearby). seen holds the place_ids
+    already yielded, across sweeps of this planner.
+    """
+
+    def __init__(self, client, store=None, min_radius=MIN_RADIUS, page_delay=PAGE_DELAY, sleep=time.sleep):
+        self.client = client
+        self.store = store if store is not None else TileStore()
+        self.min_radius = min_radius
+        self.page_delay = page_delay
+        self.sleep = sleep
+        self.seen = set()
+        self._complete = True
+        self.stats = {'tiles_queried': 0, 'tiles_skipped': 0, 'tiles_split': 0, 'requests': 0, 'duplicates': 0}
+
+    def _query(self, keyword, lat, lng, radius):
+        """Every page of one tile's Nearby Search."""
+        places = []
+        page_token = None
+        while True:
+            if page_token:
+                self.sleep(self.page_delay)
+                response = self.client.places_nearby(page_token=page_token)
+            else:
+                response = self.client.places_nearby(location=(lat, lng), radius=radius, keyword=keyword)
+            self.stats['requests'] += 1
+            if response.get('status') not in ('OK', 'ZERO_RESULTS'):
+                raise RuntimeError(f"Nearby search failed: {response.get('status')}")
+            places.extend(response.get('results', []))
+            page_token = response.get('next_page_token')
+            if not page_token or len(places) >= RESULT_CAP:
+                return places
+
+    def incomplete(self):
+        """The caller could not use the place just yielded; its tile is not recorded as searched."""
+        self._complete = False
+
+    def sweep(self, keyword, bounds, radius, skip_searched=False, scope=''):
+        """
+        Yield the places for keyword in bounds, each place_id once. Tiles
+        are recorded once all of their places have been consumed and none
+        was reported incomplete(). Tiles known to be dense go straight to
+        their quarters; with skip_searched, tiles recorded recently are
+        skipped too, so a sweep that was stopped early picks up where it
+        left off.
+        """
+        stack = [(lat, lng, radius) for lat, lng in reversed(cover(*bounds, radius))]
+        try:
+            while stack:
+                lat, lng, tile_radius = stack.pop()
+                key = tile_key(keyword, lat, lng, tile_radius, scope)
+                record = self.store.fresh(key)
+                if record is not None and (skip_searched or record['split']):
+                    self.stats['tiles_skipped'] += 1
+                    if record['split']:
+                        stack.extend(split(lat, lng, tile_radius))
+                    continue
+                places = self._query(keyword, lat, lng, tile_radius)
+                self.stats['tiles_queried'] += 1
+                self._complete = True
+                for place in places:
+                    if place['place_id'] in self.seen:
+                        self.stats['duplicates'] += 1
+                        continue
+                    self.seen.add(place['place_id'])
+                    yield place
+                was_split = len(places) >= RESULT_CAP and tile_radius / 2 >= self.min_radius
+                if self._complete:
+                    self.store.record(key, len(places), was_split)
+                if was_split:
+                    self.stats['tiles_split'] += 1
+                    stack.extend(split(lat, lng, tile_radius))
+        finally:
+            self.store.save()
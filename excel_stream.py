@@ -0,0 +1,147 @@
+import os
+import sys
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+BATCH_SIZE = 5000
+
+def _header(row):
+    """Column names from the header row; blank headers get pandas-style 'Unnamed: n' names."""
+    names = []
+    for position, value in enumerate(row):
+        name = str(value).strip() if value is not None else ''
+        names.append(name or f"Unnamed: {position}")
+    return names
+
+def iter_batches(file_path, batch_size=BATCH_SIZE, sheet_name=0, usecols=None, typed=False):
+    """
+    Stream a worksheet as DataFrames of at most batch_size rows.
+
+    The workbook is opened with openpyxl read_only=True, so only one batch
+    of rows is held in memory at a time. Completely blank rows are skipped;
+    batches are indexed by data row position (0 = first non-blank row after
+    the header), so index values stay unique across batches. usecols limits the
+    batch to the named columns. typed=True runs business_schema.apply_schema
+    on each batch.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header(header)
+
+        if usecols is not None:
+            missing = [c for c in usecols if c not in columns]
+            if missing:
+                raise ValueError(f"Columns not found in {file_path}: {missing}")
+            positions = [columns.index(c) for c in usecols]
+            columns = list(usecols)
+        else:
+            positions = None
+
+        def make_batch(records, start):
+            batch = pd.DataFrame.from_records(records, columns=columns,
+                                              index=pd.RangeIndex(start, start + len(records)))
+            if typed:
+                from business_schema import apply_schema
+                apply_schema(batch)
+            return batch
+
+        records = []
+        start = 0
+        position = 0
+        width = len(columns) if positions is None else None
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            if positions is None:
+                row = tuple(row[:width]) + (None,) * (width - len(row))
+            else:
+                row = tuple(row[p] if p < len(row) else None for p in positions)
+            if not records:
+                start = position
+            records.append(row)
+            position += 1
+            if len(records) >= batch_size:
+                yield make_batch(records, start)
+                records = []
+        if records:
+            yield make_batch(records, start)
+    finally:
+        workbook.close()
+
+def concat_batches(batches):
+    """
+    Concatenate typed batches into one frame without losing Categorical
+    dtypes (batches may have seen different Industry labels).
+    """
+    batches = list(batches)
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return batches[0]
+    for column in batches[0].columns:
+        having = [batch for batch in batches if column in batch.columns]
+        dtypes = [batch[column].dtype for batch in having]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        categories = pd.Index([])
+        for dtype in dtypes:
+            categories = categories.append(dtype.categories[~dtype.categories.isin(categories)])
+        for batch in having:
+            batch[column] = batch[column].cat.set_categories(categories)
+    return pd.concat(batches)
+
+def read_frame(file_path, batch_size=BATCH_SIZE, sheet_name=0, usecols=None, typed=False):
+    """Read a whole sheet batch by batch; with typed=True peak memory stays near the typed size."""
+    frame = concat_batches(iter_batches(file_path, batch_size, sheet_name, usecols, typed))
+    return frame.reset_index(drop=True)
+
+def _cell(value):
+    """Excel-writable value: None for missing, plain Python objects otherwise."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalars
+    return value
+
+def write_batches(file_path, batches, sheet_title='Sheet1'):
+    """
+    Write DataFrame batches to a new workbook with openpyxl write_only=True,
+    so rows are flushed as they are written. The file is written next to
+    file_path and moved into place when complete. Returns the row count.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    written = 0
+    columns = None
+    for batch in batches:
+        if columns is None:
+            columns = list(batch.columns)
+            sheet.append(columns)
+        for row in batch[columns].itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+        written += len(batch)
+    if columns is None:
+        sheet.append([])
+    tmp_path = f"{file_path}.tmp.xlsx"
+    workbook.save(tmp_path)
+    os.replace(tmp_path, file_path)
+    return written
+
+if __name__ == "__main__":
+    # Usage: python excel_stream.py file.xlsx [batch_size]
+    path = sys.argv[1] if len(sys.argv) > 1 else 'places_to_call.xlsx'
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else BATCH_SIZE
+    total = 0
+    for number, batch in enumerate(iter_batches(path, size), start=1):
+        total += len(batch)
+        print(f"Batch {number}: {len(batch)} rows ({total} total)")
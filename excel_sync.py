@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import pandas as pd
+from dotenv import load_dotenv
+
+from api.hours import encode_intervals, parse_hours
+from excel_stream import iter_batches
+
+EXCEL_FILE = 'places_to_call.xlsx'
+TABLE = 'businesses'
+PAGE_SIZE = 1000
+BATCH_SIZE = 500
+READ_BATCH_SIZE = 5000
+
+def normalize_name(name):
+    """Normalize a business name for matching: lowercase, trimmed, single spaces."""
+    if name is None or (not isinstance(name, str) and pd.isna(name)):
+        return ''
+    return ' '.join(str(name).lower().split())
+
+def normalize_value(value):
+    """Turn an Excel cell into the value we store (None for blank cells)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+def with_derived_columns(row):
+    """Keep hours_intervals in step with hours, as api.database.with_hours does on API writes."""
+    if 'hours' in row:
+        row['hours_intervals'] = encode_intervals(parse_hours(row['hours']))
+    return row
+
+def get_supabase():
+    """Create a Supabase client from the environment."""
+    from supabase import create_client
+
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise ValueError("Supabase URL or key is not set. Please check your .env file.")
+    return create_client(url, key)
+
+def fetch_name_index(supabase, db_columns, page_size=PAGE_SIZE):
+    """
+    Fetch (id, name, synced columns) for every business once and index them
+    by normalized name. Returns ({normalized name: [rows]}, request count).
+    """
+    select = ', '.join(['id', 'user_id', 'name'] + [c for c in db_columns if c not in ('id', 'user_id', 'name')])
+    index = {}
+    requests = 0
+    last_id = 0
+    while True:
+        response = supabase.table(TABLE).select(select).gt('id', last_id).order('id').limit(page_size).execute()
+        requests += 1
+        rows = response.data
+        if not rows:
+            break
+        for row in rows:
+            index.setdefault(normalize_name(row.get('name')), []).append(row)
+        last_id = rows[-1]['id']
+        if len(rows) < page_size:
+            break
+    return index, requests
+
+def plan_updates(df, index, mapping, key_column='Name', clear_empty=True, updates=None, stats=None):
+    """
+    Join Excel rows to database rows by normalized name and work out which
+    rows actually change. Returns (updates keyed by id, stats, diffs).
+    Pass the updates and stats of a previous call to accumulate over batches.
+    """
+    if stats is None:
+        stats = {'rows': 0, 'matched': 0, 'unchanged': 0, 'not_found': 0, 'ambiguous': 0}
+    stats['rows'] += len(df)
+    updates = {} if updates is None else updates
+    diffs = []
+
+    names = df[key_column].map(normalize_name)
+    for position, name in enumerate(names):
+        if not name:
+            continue
+        matches = index.get(name)
+        if not matches:
+            stats['not_found'] += 1
+            continue
+        if len(matches) > 1:
+            stats['ambiguous'] += 1
+            print(f"Warning: {len(matches)} businesses are named '{matches[0]['name']}'. Skipping.")
+            continue
+        stats['matched'] += 1
+        current = matches[0]
+
+        changes = {}
+        for excel_column, db_column in mapping.items():
+            new_value = normalize_value(df[excel_column].iat[position])
+            if new_value is None and not clear_empty:
+                continue
+            if new_value != normalize_value(current.get(db_column)):
+                changes[db_column] = new_value
+
+        if not changes:
+            stats['unchanged'] += 1
+            continue
+
+        for db_column, new_value in changes.items():
+            diffs.append((current['name'], db_column, current.get(db_column), new_value))
+        pending = updates.setdefault(current['id'], {
+            'id': current['id'],
+            'user_id': current.get('user_id'),
+            'name': current['name'],
+            **{db_column: current.get(db_column) for db_column in mapping.values()}
+        })
+        pending.update(changes)
+
+    return updates, stats, diffs
+
+def run_sync(mapping, excel_file=EXCEL_FILE, sheet_name=0, key_column='Name',
+             clear_empty=True, dry_run=False, batch_size=BATCH_SIZE, supabase=None):
+    """
+    Sync Excel columns into the Supabase businesses table.
+
+    mapping maps Excel column -> database column, e.g. {'Hours': 'hours'}.
+    Businesses are matched by normalized name against a single fetch of the
+    table; only rows whose values differ are sent, as batched upserts keyed
+    on id. With clear_empty=False blank Excel cells leave the database alone.
+    Columns derived from a synced one (hours_intervals from hours) are sent
+    with it, so only the rows that changed are touched.
+    """
+    started = time.perf_counter()
+
+    supabase = supabase or get_supabase()
+    index, requests = fetch_name_index(supabase, list(mapping.values()))
+    print(f"Fetched {sum(len(rows) for rows in index.values())} businesses from Supabase.")
+
+    # Stream the sheet so only one batch of Excel rows is in memory at a time
+    updates = {}
+    stats = {'rows': 0, 'matched': 0, 'unchanged': 0, 'not_found': 0, 'ambiguous': 0}
+    for df in iter_batches(excel_file, READ_BATCH_SIZE, sheet_name, usecols=[key_column] + list(mapping)):
+        updates, stats, diffs = plan_updates(df, index, mapping, key_column, clear_empty, updates, stats)
+        if dry_run:
+            for name, column, old, new in diffs:
+                print(f"[dry run] {name}: {column} {old!r} -> {new!r}")
+    print(f"Read {stats['rows']} rows from {excel_file}.")
+    payload = [with_derived_columns(row) for row in updates.values()]
+
+    if not dry_run:
+        for start in range(0, len(payload), batch_size):
+            supabase.table(TABLE).upsert(payload[start:start + batch_size]).execute()
+            requests += 1
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        'updated': len(payload),
+        'requests': requests,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(stats['rows'] / elapsed, 1) if elapsed else None,
+        'dry_run': dry_run,
+    })
+
+    print("\n--- Sync Summary ---")
+    print(f"Excel rows: {stats['rows']}")
+    print(f"Matched: {stats['matched']}  Unchanged: {stats['unchanged']}  "
+          f"{'Would update' if dry_run else 'Updated'}: {stats['updated']}")
+    print(f"Not found: {stats['not_found']}  Ambiguous names: {stats['ambiguous']}")
+    print(f"{requests} Supabase requests in {stats['seconds']}s ({stats['rows_per_second']} rows/s)")
+    print("--------------------")
+    return stats
+
+def main():
+    """
+    Usage: python excel_sync.py ExcelColumn:db_column [...] [--dry-run] [--keep-empty]
+    Example: python excel_sync.py Hours:hours Region:region --dry-run
+    """
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args:
+        print(main.__doc__)
+        return
+    mapping = dict(arg.split(':', 1) for arg in args)
+    run_sync(mapping, clear_empty='--keep-empty' not in sys.argv, dry_run='--dry-run' in sys.argv)
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,129 @@
+import os
+import sys
 import pandas as pd
-import re
-
-def extract_city(address):
-    # List of province abbreviations and "Canada" to skip
-    skip_words = {'BC', 'AB', 'SK', 'MB', 'ON', 'QC', 'NB', 'NS', 'PE', 'NL', 'YT', 'NT', 'NU', 'Canada'}
-    
-    # Split the address by comma and clean each part
-    parts = [p.strip() for p in address.split(',')]
-    
-    # Go through parts from right to left
-    for part in reversed(parts):
-        # Skip empty parts
-        if not part:
-            continue
-            
-        # Skip if it's a province abbreviation or "Canada"
-        if part in skip_words:
+from dotenv import load_dotenv
+
+# The region heuristic lives in the api package so the local API, the
+# Supabase API and this backfill all derive regions the same way.
+from api.regions import extract_city, extract_cities
+from excel_stream import iter_batches, write_batches
+
+EXCEL_FILE = 'places_to_call.xlsx'
+BATCH_SIZE = 5000
+
+def needs_region(df):
+    """Mask of rows that have an address but no region yet."""
+    if 'Region' not in df.columns:
+        return pd.Series(True, index=df.index)
+    region = df['Region']
+    return region.isna() | (region.astype(str).str.strip() == '')
+
+def fill_regions(df, force=False):
+    """
+    Set the Region column from Address for rows that are missing it
+    (or for every row when force=True). Returns the number of rows updated.
+    """
+    if 'Address' not in df.columns:
+        return 0
+    if 'Region' not in df.columns:
+        df['Region'] = ''
+    mask = pd.Series(True, index=df.index) if force else needs_region(df)
+    if mask.any():
+        df.loc[mask, 'Region'] = extract_cities(df.loc[mask, 'Address']).values
+    return int(mask.sum())
+
+def backfill_excel(excel_file=EXCEL_FILE, batch_size=BATCH_SIZE, force=False):
+    """
+    Backfill the Region column of the Excel file, streaming it in batches
+    so memory stays bounded for very large sheets.
+    Returns the number of businesses per region.
+    """
+    counts = {}
+    updated = 0
+
+    def filled_batches():
+        nonlocal updated
+        done = 0
+        for batch in iter_batches(excel_file, batch_size):
+            if 'Region' not in batch.columns:
+                batch['Region'] = ''
+            batch['Region'] = batch['Region'].astype(object)
+            updated += fill_regions(batch, force=force)
+            for city, count in batch['Region'].value_counts().items():
+                counts[city] = counts.get(city, 0) + count
+            done += len(batch)
+            print(f"Processed rows {done - len(batch) + 1}-{done}")
+            yield batch
+
+    print("Reading Excel file...")
+    write_batches(excel_file, filled_batches())
+    print(f"Saved changes to {excel_file}. Updated region for {updated} businesses.")
+    return pd.Series(counts, dtype='int64').sort_values(ascending=False)
+
+def backfill_supabase(batch_size=1000, force=False):
+    """Backfill businesses.region in Supabase, one page of rows per round trip."""
+    from supabase import create_client
+
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+    updated = 0
+    last_id = 0
+    while True:
+        # Keyset pagination on the primary key keeps every page an index scan
+        response = supabase.table('businesses')\
+            .select('id, user_id, name, address, region')\
+            .gt('id', last_id)\
+            .order('id')\
+            .limit(batch_size)\
+            .execute()
+        rows = response.data
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        page = pd.DataFrame(rows).rename(columns={'address': 'Address', 'region': 'Region'})
+        mask = pd.Series(True, index=page.index) if force else needs_region(page)
+        page = page[mask]
+        if page.empty:
             continue
-            
-        # Skip if it contains any numbers
-        if re.search(r'\d', part):
+        page['Region'] = extract_cities(page['Address']).values
+        page = page[page['Region'] != '']
+        if page.empty:
             continue
-            
-        # If we get here and the part contains letters, it's likely our city
-        if re.search(r'[a-zA-Z]', part):
-            return part
-    
-    return ''
+
+        payload = page[['id', 'user_id', 'name', 'Region']].rename(columns={'Region': 'region'}).to_dict('records')
+        supabase.table('businesses').upsert(payload).execute()
+        updated += len(payload)
+        print(f"Updated {len(payload)} regions (through id {last_id})")
+
+    print(f"\nComplete! Updated {updated} businesses with their regions.")
 
 def main():
+    """
+    Usage:
+        python extract_cities.py              backfill the Excel file
+        python extract_cities.py --supabase   backfill the Supabase businesses table
+        add --force to recompute regions that are already set
+    """
+    force = '--force' in sys.argv
     try:
-        # Read the Excel file
-        print("Reading Excel file...")
-        excel_file = 'places_to_call.xlsx'
-        df = pd.read_excel(excel_file)
-        
-        # Extract city from Address column
-        print("Extracting cities from addresses...")
-        df['Region'] = df['Address'].apply(extract_city)
-        
-        # Save changes back to the original file
-        print("Saving changes to original file...")
-        df.to_excel(excel_file, index=False)
-        
+        if '--supabase' in sys.argv:
+            backfill_supabase(force=force)
+            return
+
+        cities = backfill_excel(force=force)
+
         # Print summary
-        cities = df['Region'].value_counts()
         print("\nCities extracted:")
         for city, count in cities.items():
             if city:  # Only show non-empty cities
                 print(f"{city}: {count} businesses")
-            
+
         print("\nDone! The original file has been updated.")
-        
+
     except Exception as e:
         print(f"Error: {str(e)}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import change_journal
+from api.geo import PRECISION, cell_size_m, geohash, geohashes, haversine_m
+from excel_stream import iter_batches, write_batches
+
+EXCEL_FILE = 'places_to_call.xlsx'
+BATCH_SIZE = 5000
+
+# Address -> coordinates learned from Places results (and optional geocoding),
+# so businesses added later by address alone still get a location.
+GEOCODE_DB = os.getenv('GEOCODE_CACHE_DB', 'geocode_cache.db')
+
+# Two results this close with the same name are the same business
+SAME_PLACE_METERS = 75
+
+_local = threading.local()
+
+
+def address_key(address):
+    return ' '.join(str(address).lower().split())
+
+
+def connect(db_path=None):
+    """One connection per thread and database file; the table is created on first use."""
+    db_path = db_path or GEOCODE_DB
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                address_key TEXT PRIMARY KEY,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                source TEXT,
+                updated_at TEXT
+            )""")
+        conn.commit()
+        connections[db_path] = conn
+    return conn
+
+
+def remember(locations, source='places', db_path=None):
+    """Cache (address, lat, lng) triples. Returns how many were stored."""
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rows = [(address_key(address), lat, lng, source, now) for address, lat, lng in locations
+            if address and lat is not None and lng is not None]
+    conn = connect(db_path)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def lookup(addresses, db_path=None):
+    """address key -> (lat, lng) for the cached ones among addresses."""
+    keys = list({address_key(address) for address in addresses if address})
+    found = {}
+    conn = connect(db_path)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        rows = conn.execute(
+            f"SELECT address_key, latitude, longitude FROM geocode WHERE address_key IN ({','.join('?' * len(chunk))})",
+            chunk).fetchall()
+        found.update((key, (lat, lng)) for key, lat, lng in rows)
+    return found
+
+
+def needs_location(df):
+    """Mask of rows with an address but no coordinates yet."""
+    if 'Latitude' not in df.columns or 'Longitude' not in df.columns:
+        return pd.Series(True, index=df.index)
+    has_address = df['Address'].astype(str).str.strip() != ''
+    return has_address & (pd.to_numeric(df['Latitude'], errors='coerce').isna() |
+                          pd.to_numeric(df['Longitude'], errors='coerce').isna())
+
+
+def fill_locations(df, geocode=None, db_path=None):
+    """
+    Set Latitude/Longitude from the geocode cache for rows missing them.
+    geocode, if given, is called with an address for cache misses and
+    returns (lat, lng) or (None, None); its answers are cached. Modifies df
+    in place and returns the number of rows located.
+    """
+    if 'Address' not in df.columns:
+        return 0
+    for column in ('Latitude', 'Longitude'):
+        if column not in df.columns:
+            df[column] = np.nan
+    mask = needs_location(df)
+    if not mask.any():
+        return 0
+    addresses = df.loc[mask, 'Address']
+    cached = lookup(addresses, db_path)
+    if geocode is not None:
+        learned = []
+        for address in pd.unique(addresses):
+            key = address_key(address)
+            if key in cached or not key:
+                continue
+            lat, lng = geocode(address)
+            if lat is not None and lng is not None:
+                cached[key] = (lat, lng)
+                learned.append((address, lat, lng))
+        remember(learned, 'geocode', db_path)
+    located = addresses.map(lambda address: cached.get(address_key(address), (np.nan, np.nan)))
+    df.loc[mask, 'Latitude'] = [lat for lat, _ in located]
+    df.loc[mask, 'Longitude'] = [lng for _, lng in located]
+    return int(located.map(lambda location: not pd.isna(location[0])).sum())
+
+
+class GeoIndex:
+    """
+    Businesses sorted by geohash. A geohash prefix is a contiguous slice of
+    the sorted array, so a radius query looks at the 3x3 block of cells
+    around the point (cells at least as large as the radius) and only
+    computes distances for the businesses in those cells.
+    """
+
+    def __init__(self, df):
+        lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float) \
+            if 'Latitude' in df.columns else np.full(len(df), np.nan)
+        lng = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float) \
+            if 'Longitude' in df.columns else np.full(len(df), np.nan)
+        located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+        hashes = geohashes(lat[located], lng[located], PRECISION)
+        order = np.argsort(hashes, kind='stable')
+        self.size = len(df)
+        # Google place_ids already in the list; a search skips these outright
+        self.place_ids = set(df['PlaceId'].dropna().astype(str)) - {''} if 'PlaceId' in df.columns else set()
+        self.hashes = hashes[order]
+        self.positions = located[order]   # row position of each sorted entry
+        self.lat = lat[self.positions]
+        self.lng = lng[self.positions]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell(self, prefix):
+        return slice(np.searchsorted(self.hashes, prefix, 'left'),
+                     np.searchsorted(self.hashes, prefix + '{', 'left'))  # '{' sorts after every base32 char
+
+    def near(self, lat, lng, radius_m, limit=None):
+        """[(row position, distance in meters)] within radius_m, nearest first."""
+        precision = next((p for p in range(PRECISION, 0, -1) if min(cell_size_m(p, lat)) >= radius_m), 0)
+        if precision == 0:
+            candidates = np.arange(len(self.positions))
+        else:
+            height, width = cell_size_m(precision, lat)
+            dlat, dlng = height / 111320.0, width / (111320.0 * max(np.cos(np.radians(lat)), 0.01))
+            cells = {geohash(max(-90.0, min(90.0, lat + dy * dlat)), (lng + dx * dlng + 180.0) % 360.0 - 180.0, precision)
+                     for dy in (-1, 0, 1) for dx in (-1, 0, 1)}
+            candidates = np.concatenate([np.arange(len(self.positions))[self._cell(cell)] for cell in cells])
+        distances = haversine_m(lat, lng, self.lat[candidates], self.lng[candidates])
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')[:limit]
+        return list(zip(self.positions[candidates[order]].tolist(), distances[order].tolist()))
+
+    def cluster_order(self, positions):
+        """
+        Reorder row positions so neighbours are next to each other (geohash
+        order); rows without coordinates keep their order at the end.
+        """
+        rank = np.full(self.size, len(self.positions), dtype=np.int64)
+        rank[self.positions] = np.arange(len(self.positions))
+        positions = np.asarray(positions, dtype=np.int64)
+        return positions[np.argsort(rank[positions], kind='stable')]
+
+
+# Cached (signature, DataFrame, index) per Excel file, like search_index
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_index(file_path, loader):
+    """Return (df, index) for an Excel file, rebuilding only when the data changed."""
+    signature = change_journal.signature(file_path)
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+    df = loader(file_path).reset_index(drop=True)
+    index = GeoIndex(df)
+    with _cache_lock:
+        _cache[file_path] = (signature, df, index)
+    return df, index
+
+
+def backfill_excel(excel_file=EXCEL_FILE, batch_size=BATCH_SIZE, geocode=None):
+    """Fill Latitude/Longitude of the Excel file from the cache (and geocode), streaming it."""
+    located = 0
+
+    def filled_batches():
+        nonlocal located
+        for batch in iter_batches(excel_file, batch_size):
+            located += fill_locations(batch, geocode)
+            yield batch
+
+    write_batches(excel_file, filled_batches())
+    print(f"Saved changes to {excel_file}. Located {located} businesses.")
+    return located
+
+
+def google_geocoder():
+    """geocode callable backed by the Google Geocoding API (costs one request per address)."""
+    import call_tracker as ct
+
+    def geocode(address):
+        results = ct.gmaps.geocode(address)
+        if not results:
+            return None, None
+        location = results[0]['geometry']['location']
+        return location['lat'], location['lng']
+    return geocode
+
+
+def main():
+    """
+    Usage:
+        python geo_index.py backfill             fill coordinates from the geocode cache
+        python geo_index.py backfill --geocode   also geocode cache misses with Google
+    """
+    if len(sys.argv) < 2 or sys.argv[1] != 'backfill':
+        print(main.__doc__)
+        return
+    backfill_excel(geocode=google_geocoder() if '--geocode' in sys.argv else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,154 +1,297 @@
-import pandas as pd
-import os
-from dotenv import load_dotenv
 import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
 import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-print("Starting migration script...")
+from api.regions import extract_cities
+from api.geo import geohashes
+from excel_stream import iter_batches
 
-# Load environment variables
-load_dotenv()
+EXCEL_FILE = 'places_to_call.xlsx'
+CHECKPOINT_FILE = 'migrate_excel.checkpoint.json'
+CHUNK_SIZE = 500
+WORKERS = 4
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Natural key used for upserts. Needs the businesses_natural_key unique index
+# from supabase-setup-safe.sql; re-running the migration updates rows in place.
+NATURAL_KEY = ['user_id', 'name', 'phone']
+
+# Map Excel columns (lowercased, spaces -> underscores) to database columns
+COLUMN_MAPPING = {
+    'name': 'name',
+    'number': 'phone',  # Map Number column to phone field
+    'address': 'address',
+    'status': 'status',
+    'comments': 'comments',
+    'hours': 'hours',
+    'industry': 'industry',
+    'region': 'region',
+    'callback_due_date': 'callback_due_date',
+    'callback_due_time': 'callback_due_time',
+    'callback_reason': 'callback_reason',
+    'callback_priority': 'callback_priority',
+    'callback_count': 'callback_count',
+    'lead_score': 'lead_score',
+    'interest_level': 'interest_level',
+    'best_time_to_call': 'best_time_to_call',
+    'decision_maker': 'decision_maker',
+    'next_action': 'next_action',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'placeid': 'place_id'
+}
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: Missing required environment variables.")
-    print("Please set SUPABASE_URL and SUPABASE_KEY in your .env file.")
-    exit(1)
+INTEGER_COLUMNS = {'callback_count', 'lead_score'}
+FLOAT_COLUMNS = {'latitude', 'longitude'}
+# DATE/TIME columns must be NULL rather than '' when empty; so must place_id
+# (unique per user, see idx_businesses_user_place)
+NULLABLE_COLUMNS = {'callback_due_date', 'callback_due_time', 'place_id'}
 
-# Initialize headers
-headers = {
-    'apikey': SUPABASE_KEY,
-    'Authorization': f'Bearer {SUPABASE_KEY}',
-    'Content-Type': 'application/json',
-    'Prefer': 'return=representation'
+# Defaults for columns missing from the sheet entirely
+DEFAULTS = {
+    'status': 'tocall',
+    'industry': 'Restaurant',
+    'region': '',
+    'phone': '',
+    'callback_count': 0,
+    'lead_score': 5,
 }
 
-def clean_record(record):
-    """Clean and format a record for Supabase."""
-    cleaned = {}
-    
-    # Map Excel columns to database columns - match exact schema
-    column_mapping = {
-        'name': 'name',
-        'number': 'phone',  # Map Number column to phone field
-        'address': 'address',
-        'status': 'status',
-        'comments': 'comments',
-        'industry': 'industry',
-        'region': 'region',
-        'callback_due_date': 'callback_due_date',
-        'callback_due_time': 'callback_due_time',
-        'callback_reason': 'callback_reason',
-        'callback_priority': 'callback_priority',
-        'callback_count': 'callback_count',
-        'lead_score': 'lead_score',
-        'interest_level': 'interest_level',
-        'best_time_to_call': 'best_time_to_call',
-        'decision_maker': 'decision_maker',
-        'next_action': 'next_action'
-    }
-    
-    for k, v in record.items():
-        # Get the mapped column name
-        clean_key = str(k).lower().strip().replace(' ', '_')
-        db_column = column_mapping.get(clean_key)
-        
-        if not db_column:
-            continue
-            
-        # Handle NaN values
-        if pd.isna(v):
-            if db_column == 'phone':  # Changed from number to phone
-                cleaned[db_column] = ''  # Empty string for missing phone numbers
-            elif db_column in ['callback_count', 'lead_score']:
-                cleaned[db_column] = 0  # Default to 0 for numeric fields
-            else:
-                cleaned[db_column] = ''  # Empty string for other fields
-            continue
-            
-        # Clean and format the value
-        if isinstance(v, (int, float)):
-            if db_column in ['callback_count', 'lead_score']:
-                cleaned[db_column] = int(v)  # Convert float to int for these fields
-            else:
-                cleaned[db_column] = v
+def get_config():
+    """Read Supabase settings from the environment."""
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        print("Error: Missing required environment variables.")
+        print("Please set SUPABASE_URL and SUPABASE_KEY in your .env file.")
+        sys.exit(1)
+    return url, key, os.getenv("MIGRATION_USER_ID")
+
+def _as_text(series):
+    """Column to stripped strings, '' for missing; whole-number floats lose their '.0'."""
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    missing = series.isna()
+    text = series.astype(object).where(~missing, '').astype(str).str.strip()
+    return text
+
+def clean_frame(df, user_id=None, dedupe=True):
+    """
+    Clean and format a whole DataFrame for Supabase in one column-wise pass.
+    Returns a DataFrame whose columns are database columns; the index of
+    the input rows is kept.
+    """
+    renamed = {}
+    for col in df.columns:
+        db_column = COLUMN_MAPPING.get(str(col).lower().strip().replace(' ', '_'))
+        if db_column and db_column not in renamed.values():
+            renamed[col] = db_column
+    cleaned = df[list(renamed)].rename(columns=renamed)
+
+    for col in cleaned.columns:
+        if col in INTEGER_COLUMNS:
+            cleaned[col] = pd.to_numeric(cleaned[col], errors='coerce').fillna(0).astype(int)
+        elif col in FLOAT_COLUMNS:
+            numbers = pd.to_numeric(cleaned[col], errors='coerce')
+            cleaned[col] = numbers.astype(object).where(numbers.notna(), None)
         else:
-            cleaned[db_column] = str(v).strip()
-    
+            cleaned[col] = _as_text(cleaned[col])
+
+    for col in NULLABLE_COLUMNS & set(cleaned.columns):
+        cleaned[col] = cleaned[col].astype(object).where(cleaned[col] != '', None)
+
     # Set default values for required fields
-    if 'status' not in cleaned:
-        cleaned['status'] = 'tocall'
-    if 'industry' not in cleaned:
-        cleaned['industry'] = 'Restaurant'
-    if 'region' not in cleaned:
-        cleaned['region'] = ''
-    if 'phone' not in cleaned:  # Changed from number to phone
-        cleaned['phone'] = ''
-    if 'callback_count' not in cleaned:
-        cleaned['callback_count'] = 0
-    if 'lead_score' not in cleaned:
-        cleaned['lead_score'] = 5
-    
+    for col, default in DEFAULTS.items():
+        if col not in cleaned.columns:
+            cleaned[col] = default
+
+    # Fill regions the same way the API does at ingest
+    if 'address' in cleaned.columns:
+        missing_region = cleaned['region'] == ''
+        if missing_region.any():
+            cleaned.loc[missing_region, 'region'] = extract_cities(cleaned.loc[missing_region, 'address']).values
+
+    # Geohash for cluster ordering, as database.with_location does on API writes
+    if {'latitude', 'longitude'} <= set(cleaned.columns):
+        located = cleaned['latitude'].notna() & cleaned['longitude'].notna()
+        cleaned['geohash'] = None
+        if located.any():
+            cleaned.loc[located, 'geohash'] = geohashes(cleaned.loc[located, 'latitude'].astype(float),
+                                                        cleaned.loc[located, 'longitude'].astype(float))
+
+    cleaned['user_id'] = user_id
+    cleaned = cleaned[cleaned['name'] != '']
+    if dedupe:
+        # One row per natural key, otherwise a chunk would upsert the same row twice
+        cleaned = cleaned.drop_duplicates(subset=NATURAL_KEY, keep='last')
     return cleaned
 
-def migrate_excel_to_supabase():
+def key_columns(excel_file):
+    """Excel headers that feed the natural key (name and phone)."""
+    batch = next(iter_batches(excel_file, batch_size=1), None)
+    if batch is None:
+        return []
+    return [col for col in batch.columns
+            if COLUMN_MAPPING.get(str(col).lower().strip().replace(' ', '_')) in NATURAL_KEY]
+
+def last_occurrences(excel_file, user_id=None, batch_size=CHUNK_SIZE * 10):
+    """
+    Stream only the key columns once and return the row positions holding the
+    last occurrence of each natural key, so chunks can be deduplicated across
+    the whole sheet without loading it.
+    """
+    columns = key_columns(excel_file)
+    if not columns:
+        return set()
+    keys = [clean_frame(batch, user_id, dedupe=False)[NATURAL_KEY]
+            for batch in iter_batches(excel_file, batch_size, usecols=columns)]
+    keys = pd.concat(keys) if keys else pd.DataFrame(columns=NATURAL_KEY)
+    return set(keys.index[~keys.duplicated(subset=NATURAL_KEY, keep='last')])
+
+def make_session(api_key, workers=WORKERS):
+    """Pooled keep-alive session that retries transient failures with backoff."""
+    session = requests.Session()
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST']),  # safe: the request is an idempotent upsert
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'apikey': api_key,
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json',
+        'Prefer': 'resolution=merge-duplicates,return=minimal'
+    })
+    return session
+
+def _source_signature(excel_file):
+    stat = os.stat(excel_file)
+    return {'file': os.path.abspath(excel_file), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def load_checkpoint(path, source, chunk_size):
+    """Return the set of finished chunk numbers for this exact source file and chunking."""
+    if not os.path.exists(path):
+        return set()
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if checkpoint.get('source') != source or checkpoint.get('chunk_size') != chunk_size:
+        print("Checkpoint is for a different file or chunk size - starting from the beginning.")
+        return set()
+    return set(checkpoint.get('done', []))
+
+def save_checkpoint(path, source, chunk_size, done):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'source': source, 'chunk_size': chunk_size, 'done': sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+def post_chunk(session, url, records):
+    """Upsert one chunk of records as a single array POST."""
+    response = session.post(
+        f'{url}/rest/v1/businesses',
+        params={'on_conflict': ','.join(NATURAL_KEY)},
+        data=json.dumps(records),
+        timeout=60
+    )
+    if response.status_code not in (200, 201, 204):
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:500]}")
+
+def migrate_excel_to_supabase(excel_file=EXCEL_FILE, chunk_size=CHUNK_SIZE, workers=WORKERS,
+                              checkpoint_file=CHECKPOINT_FILE):
     try:
         print("Starting migration process...")
-        
-        # Deletion functionality removed - migration will append/update records instead
-        print("Skipping deletion of existing records (deletion functionality removed)...")
-        
-        # Read the Excel file
-        print("\nReading Excel file...")
+        url, api_key, user_id = get_config()
+
+        source = _source_signature(excel_file)
+        done = load_checkpoint(checkpoint_file, source, chunk_size)
+        if done:
+            print(f"Resuming: {len(done)} chunks already migrated.")
+
+        # Chunk n is always source rows [n * chunk_size, (n + 1) * chunk_size),
+        # so checkpoints stay valid while the sheet is streamed
+        print("\nIndexing natural keys...")
         try:
-            df = pd.read_excel('places_to_call.xlsx')
-            print(f"Successfully read Excel file. Found {len(df)} records")
-            print("Column names:", df.columns.tolist())
+            keep = last_occurrences(excel_file, user_id)
         except Exception as e:
             print(f"Error reading Excel file: {e}")
             return
-        
-        # Convert DataFrame to list of dictionaries
-        records = df.to_dict('records')
+
+        session = make_session(api_key, workers)
+        total_rows = 0
+        total_records = 0
         success_count = 0
-        fail_count = 0
-        
-        print("\nStarting record migration...")
-        for i, record in enumerate(records):
-            try:
-                cleaned_record = clean_record(record)
-                print(f"\nProcessing record {i+1}/{len(records)}:")
-                print(f"Original record: {record}")
-                print(f"Cleaned record: {cleaned_record}")
-                
-                response = requests.post(
-                    f'{SUPABASE_URL}/rest/v1/businesses',
-                    headers=headers,
-                    json=cleaned_record
-                )
-                
-                if response.status_code == 201:
-                    success_count += 1
-                    print(f"Successfully added record {i+1}")
-                else:
-                    fail_count += 1
-                    print(f"Failed to add record {i+1}")
-                    print(f"Status code: {response.status_code}")
-                    print(f"Response: {response.text}")
-                    
-            except Exception as e:
-                fail_count += 1
-                print(f"Error processing record {i+1}: {str(e)}")
-        
+        failed = []
+        started = time.perf_counter()
+
+        def chunk_records(chunk):
+            cleaned = clean_frame(chunk, user_id, dedupe=False)
+            cleaned = cleaned[cleaned.index.isin(keep)]
+            return cleaned.astype(object).where(cleaned.notna(), None).to_dict('records')
+
+        print(f"\nUpserting chunks of {chunk_size} rows with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+
+            def collect(future):
+                nonlocal success_count
+                n, size = futures.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(size)
+                    print(f"Chunk {n + 1} failed: {e}")
+                    return
+                done.add(n)
+                success_count += size
+                save_checkpoint(checkpoint_file, source, chunk_size, done)
+                print(f"Chunk {n + 1} done ({success_count} records)")
+
+            for n, chunk in enumerate(iter_batches(excel_file, chunk_size)):
+                total_rows += len(chunk)
+                records = chunk_records(chunk)
+                total_records += len(records)
+                if n in done:
+                    success_count += len(records)
+                    continue
+                if not records:
+                    done.add(n)
+                    continue
+                futures[executor.submit(post_chunk, session, url, records)] = (n, len(records))
+                # Keep at most two chunks per worker in flight so memory stays bounded
+                while len(futures) >= workers * 2:
+                    collect(next(as_completed(list(futures))))
+            while futures:
+                collect(next(as_completed(list(futures))))
+
+        elapsed = time.perf_counter() - started
         print(f"\nMigration complete!")
-        print(f"Total records processed: {len(records)}")
+        print(f"Total records processed: {total_records} ({total_rows - total_records} blank or duplicate rows skipped)")
         print(f"Successful: {success_count}")
-        print(f"Failed: {fail_count}")
-        
+        print(f"Failed: {sum(failed)}")
+        print(f"Elapsed: {elapsed:.1f}s")
+
+        if failed:
+            print(f"Re-run to retry the {len(failed)} failed chunks; finished chunks are skipped.")
+        elif os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
     except Exception as e:
         print(f"Migration error: {str(e)}")
 
 if __name__ == "__main__":
-    migrate_excel_to_supabase() 
\ No newline at end of file
+    migrate_excel_to_supabase()
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from api.metrics import OPERATION_SECONDS, register_collector
+
+# Outbound third-party calls (Google Places, VAPI) run on their own bounded
+# thread pools instead of blocking the event loop or starlette's threadpool.
+# A full queue is rejected up front, every call has a deadline, and a call
+# still waiting for a worker is dropped once nobody wants its answer.
+
+
+class Overloaded(Exception):
+    """The executor's queue is full; retry later."""
+
+
+class DeadlineExceeded(Exception):
+    """The call did not finish (or start) before its deadline."""
+
+
+class Cancelled(Exception):
+    """The caller went away (client disconnect) before the call ran."""
+
+
+class Executor:
+    def __init__(self, name, workers, max_queue, timeout):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"outbound-{name}")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._waits = deque(maxlen=1000)   # seconds from submit to start, most recent calls
+        self.counts = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                       'timed_out': 0, 'cancelled': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def submit(self, fn, *args, timeout=None, cancel=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs); returns a concurrent.futures.Future. cancel
+        is an optional threading.Event: once set, the call is skipped if it
+        has not started yet.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        operation = getattr(fn, '__name__', None) or getattr(getattr(fn, 'func', None), '__name__', 'call')
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.counts['rejected'] += 1
+                raise Overloaded(f"{self.name} queue is full ({self.max_queue} waiting)")
+            self._queued += 1
+            self.counts['submitted'] += 1
+        submitted = time.monotonic()
+
+        def run():
+            started = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._waits.append(started - submitted)
+            try:
+                if cancel is not None and cancel.is_set():
+                    self._count('cancelled')
+                    raise Cancelled(f"{self.name} call cancelled before it started")
+                if started > deadline:
+                    self._count('timed_out')
+                    raise DeadlineExceeded(f"{self.name} call waited past its deadline")
+                outcome = 'error'
+                try:
+                    result = fn(*args, **kwargs)
+                    outcome = 'ok'
+                except Exception:
+                    self._count('failed')
+                    raise
+                finally:
+                    OPERATION_SECONDS.observe(time.monotonic() - started, system=self.name, operation=operation,
+                                              outcome=outcome)
+                self._count('completed')
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        future = self._pool.submit(run)
+        future.deadline = deadline
+        return future
+
+    def call(self, fn, *args, timeout=None, cancel=None, **kwargs):
+        """Run fn on the pool and wait for it (for code already off the event loop)."""
+        future = self.submit(fn, *args, timeout=timeout, cancel=cancel, **kwargs)
+        try:
+            return future.result(max(future.deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            future.cancel()
+            self._count('timed_out')
+            raise DeadlineExceeded(f"{self.name} call took longer than its deadline")
+
+    async def run(self, fn, *args, timeout=None, request=None, **kwargs):
+        """
+        Await fn on the pool. With request (a starlette Request), the call is
+        abandoned as soon as the client disconnects.
+        """
+        cancel = threading.Event()
+        future = self.submit(fn, *args, timeout=timeout, cancel=cancel, **kwargs)
+        call = asyncio.wrap_future(future)
+        waiters = {call}
+        watcher = None
+        if request is not None:
+            watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+            waiters.add(watcher)
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=max(future.deadline - time.monotonic(), 0),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if call in done:
+                return call.result()
+            cancel.set()
+            future.cancel()
+            if watcher in done:
+                self._count('cancelled')
+                raise Cancelled(f"client disconnected during {self.name} call")
+            self._count('timed_out')
+            raise DeadlineExceeded(f"{self.name} call took longer than {timeout or self.timeout}s")
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = dict(self.counts, workers=self.workers, max_queue=self.max_queue,
+                         queued=self._queued, running=self._running)
+        stats['wait_seconds'] = {
+            'avg': round(sum(waits) / len(waits), 4) if waits else 0.0,
+            'p95': round(waits[int(len(waits) * 0.95)], 4) if waits else 0.0,
+            'max': round(waits[-1], 4) if waits else 0.0,
+        }
+        return stats
+
+
+async def _wait_for_disconnect(request, interval=0.25):
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+
+async def cancel_on_disconnect(request, cancel):
+    """Set cancel (a threading.Event) once the client disconnects."""
+    await _wait_for_disconnect(request)
+    cancel.set()
+
+
+class Client:
+    """
+    Wraps a client (googlemaps.Client) so each method call goes through an
+    executor and blocks until it finishes. For synchronous code running off
+    the event loop, e.g. the search generator.
+    """
+
+    def __init__(self, client, executor, cancel=None):
+        self._client = client
+        self._executor = executor
+        self._cancel = cancel
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            if self._cancel is not None and self._cancel.is_set():
+                self._executor._count('cancelled')
+                raise Cancelled(f"{self._executor.name} call cancelled")
+            return self._executor.call(method, *args, cancel=self._cancel, **kwargs)
+        return call
+
+    def __bool__(self):
+        return bool(self._client)
+
+
+places = Executor('places',
+                  workers=int(os.getenv('PLACES_WORKERS', '8')),
+                  max_queue=int(os.getenv('PLACES_MAX_QUEUE', '64')),
+                  timeout=float(os.getenv('PLACES_TIMEOUT', '15')))
+vapi = Executor('vapi',
+                workers=int(os.getenv('VAPI_WORKERS', '4')),
+                max_queue=int(os.getenv('VAPI_MAX_QUEUE', '32')),
+                timeout=float(os.getenv('VAPI_TIMEOUT', '30')))
+
+EXECUTORS = {executor.name: executor for executor in (places, vapi)}
+
+
+def stats():
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+
+def _collect():
+    current = stats()
+
+    def per_executor(key):
+        return [({'executor': name}, values[key]) for name, values in current.items()]
+
+    yield 'outbound_queue_length', 'gauge', 'Calls waiting for a worker', per_executor('queued')
+    yield 'outbound_running', 'gauge', 'Calls running now', per_executor('running')
+    yield 'outbound_wait_seconds_p95', 'gauge', 'p95 time from submit to start over recent calls', \
+        [({'executor': name}, values['wait_seconds']['p95']) for name, values in current.items()]
+    yield 'outbound_calls_total', 'counter', 'Outbound calls by outcome', \
+        [({'executor': name, 'outcome': outcome}, values[outcome]) for name, values in current.items()
+         for outcome in ('completed', 'failed', 'rejected', 'timed_out', 'cancelled')]
+
+
+register_collector(_collect)
@@ -0,0 +1,152 @@
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+import change_journal
+
+# Columns that are searchable and how much a hit in each counts towards the rank
+SEARCH_FIELDS = {
+    'Name': 3.0,
+    'DecisionMaker': 2.0,
+    'Address': 1.5,
+    'Comments': 1.0,
+}
+
+# Minimum trigram similarity for a word to count as a (typo-tolerant) match.
+# 0.3 is the pg_trgm default, so local and Supabase results behave alike.
+SIMILARITY_THRESHOLD = 0.3
+
+# How many close vocabulary words we follow per query word
+MAX_EXPANSIONS = 25
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token):
+    """Return the set of trigrams for a token, padded the same way as pg_trgm."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index over the searchable business columns.
+
+    Words are indexed once into a vocabulary; each vocabulary word keeps its
+    trigram set and the rows it appears in. A query word is matched against
+    the vocabulary (not the rows), so typo tolerance costs the same no matter
+    how many businesses share a word.
+    """
+
+    def __init__(self, df, fields=None):
+        self.fields = fields or SEARCH_FIELDS
+        self.size = len(df)
+        self._vocab = {}                        # token -> token id
+        self._tokens = []                       # token id -> token
+        self._token_grams = []                  # token id -> trigram count
+        self._gram_postings = defaultdict(list)  # trigram -> [token id]
+        self._postings = []                     # token id -> {row position: weight}
+        self._build(df)
+
+    def _token_id(self, token):
+        token_id = self._vocab.get(token)
+        if token_id is None:
+            token_id = len(self._tokens)
+            self._vocab[token] = token_id
+            self._tokens.append(token)
+            grams = trigrams(token)
+            self._token_grams.append(len(grams))
+            for gram in grams:
+                self._gram_postings[gram].append(token_id)
+            self._postings.append({})
+        return token_id
+
+    def _build(self, df):
+        for column, weight in self.fields.items():
+            if column not in df.columns:
+                continue
+            values = df[column].tolist()
+            for position, value in enumerate(values):
+                for token in set(tokenize(value)):
+                    postings = self._postings[self._token_id(token)]
+                    if postings.get(position, 0) < weight:
+                        postings[position] = weight
+
+    def _expand(self, token):
+        """Find vocabulary words similar to a query word as (token id, similarity)."""
+        exact = self._vocab.get(token)
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            for token_id in self._gram_postings.get(gram, ()):
+                shared[token_id] += 1
+
+        matches = {}
+        for token_id, count in shared.items():
+            similarity = count / (len(grams) + self._token_grams[token_id] - count)
+            if self._tokens[token_id].startswith(token):
+                # Prefix hits keep search-as-you-type useful
+                similarity = max(similarity, 0.9)
+            if similarity >= SIMILARITY_THRESHOLD:
+                matches[token_id] = similarity
+        if exact is not None:
+            matches[exact] = 1.0
+
+        best = sorted(matches.items(), key=lambda item: item[1], reverse=True)
+        return best[:MAX_EXPANSIONS]
+
+    def search(self, query, limit=50):
+        """Return [(row position, score)] for the best matches, highest score first."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            token_scores = {}
+            for token_id, similarity in self._expand(token):
+                for position, weight in self._postings[token_id].items():
+                    score = similarity * weight
+                    if score > token_scores.get(position, 0):
+                        token_scores[position] = score
+            for position, score in token_scores.items():
+                scores[position] += score
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+# Cached (signature, DataFrame, index) per Excel file so the index is only
+# rebuilt after the file changes on disk.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _file_signature(file_path):
+    # Journaled edits change the data without touching the Excel file itself
+    signature = change_journal.signature(file_path)
+    return signature if signature[0] is not None else None
+
+
+def get_index(file_path, loader):
+    """
+    Return (df, index) for an Excel file, rebuilding only when the file changed.
+    `loader` is called with the file path to load the DataFrame.
+    """
+    signature = _file_signature(file_path)
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached and signature is not None and cached[0] == signature:
+            return cached[1], cached[2]
+
+    df = loader(file_path).reset_index(drop=True)
+    index = TrigramIndex(df)
+    with _cache_lock:
+        _cache[file_path] = (signature, df, index)
+    return df, index
+
@@ -1,35 +1,150 @@
-import pandas as pd
+import json
 import os
+import pandas as pd
 
-# Define the valid statuses (must match the ones in api.py)
+# Define the valid statuses (api.py imports this list)
 VALID_STATUSES = ['tocall', 'called', 'callback', 'dont_call', 'client', 'lead']
 
-def normalize_status(status):
-    """Normalize a status value to one of the valid statuses."""
-    if pd.isna(status):
-        return 'tocall'  # Default status for empty values
-    
+DEFAULT_STATUS = 'tocall'
+
+# Spellings used by older sheets, the CLI and JSON imports
+STATUS_ALIASES = {
+    'to call': 'tocall',
+    'to_call': 'tocall',
+    'not called': 'tocall',
+    'new': 'tocall',
+    'call back': 'callback',
+    'call_back': 'callback',
+    'call-back': 'callback',
+    "don't call": 'dont_call',
+    'dont call': 'dont_call',
+    'do not call': 'dont_call',
+    'dnc': 'dont_call',
+}
+
+# Extra alias rules can be supplied as a JSON object {"raw": "canonical"}
+ALIASES_FILE_ENV = 'STATUS_ALIASES_FILE'
+
+STATUS_DTYPE = pd.CategoricalDtype(VALID_STATUSES)
+STATUS_CODES = {status: code for code, status in enumerate(VALID_STATUSES)}
+
+# STATUS_ALIASES merged with the alias file, loaded on first use
+_aliases = None
+# raw value -> canonical status, filled once per distinct value per process
+_status_map = {}
+# raw values that only mapped to the default, reported once each
+_unmapped = set()
+
+def load_aliases(path=None):
+    """Default aliases merged with the optional JSON alias file."""
+    aliases = dict(STATUS_ALIASES)
+    path = path or os.getenv(ALIASES_FILE_ENV)
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for raw, canonical in json.load(f).items():
+                if canonical not in VALID_STATUSES:
+                    raise ValueError(f"Alias '{raw}' maps to unknown status '{canonical}'")
+                aliases[str(raw).strip().lower()] = canonical
+    return aliases
+
+def default_aliases():
+    """load_aliases() for the file named by STATUS_ALIASES_FILE, read once per process."""
+    global _aliases
+    if _aliases is None:
+        _aliases = load_aliases()
+    return _aliases
+
+def canonical_status(status, aliases=None):
+    """
+    Map one raw status to a valid status.
+    Returns (status, matched); matched is False when we fell back to the default.
+    """
+    if status is None or (not isinstance(status, str) and pd.isna(status)):
+        return DEFAULT_STATUS, True  # Default status for empty values
+
     # Convert to string, lowercase and strip whitespace
     clean_status = str(status).strip().lower()
-    
+    if not clean_status:
+        return DEFAULT_STATUS, True
+
     # Direct match
-    if clean_status in VALID_STATUSES:
-        return clean_status
-    
+    if clean_status in STATUS_CODES:
+        return clean_status, True
+
+    aliases = default_aliases() if aliases is None else aliases
+    if clean_status in aliases:
+        return aliases[clean_status], True
+
     # Check for partial matches
     for valid_status in VALID_STATUSES:
         if valid_status in clean_status or clean_status in valid_status:
-            print(f"Normalizing '{status}' to '{valid_status}'")
-            return valid_status
-    
-    # If no match, default to 'tocall'
-    print(f"WARNING: No match found for '{status}', defaulting to 'tocall'")
-    return 'tocall'
+            return valid_status, True
+
+    return DEFAULT_STATUS, False
+
+def normalize_status(status):
+    """Normalize a status value to one of the valid statuses."""
+    return canonical_status(status)[0]
+
+def build_status_map(values, aliases=None):
+    """Map each distinct raw value once. Returns (mapping, unmapped raw values)."""
+    mapping = {}
+    unmapped = []
+    for value in values:
+        canonical, matched = canonical_status(value, aliases)
+        mapping[value] = canonical
+        if not matched:
+            unmapped.append(value)
+    return mapping, unmapped
+
+def normalize_statuses(series, aliases=None):
+    """
+    Normalize a whole Status column into a Categorical over VALID_STATUSES.
+
+    Only values not seen before in this process are parsed; everything else
+    is a dictionary lookup. aliases defaults to STATUS_ALIASES plus the rules
+    in STATUS_ALIASES_FILE. Values with no match become 'tocall' and are
+    reported once.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.dtype == STATUS_DTYPE:
+        return series.fillna(DEFAULT_STATUS)
+
+    uniques = pd.unique(series)
+    if aliases is None:
+        new_values = [value for value in uniques if value not in _status_map]
+        mapping, unmapped = build_status_map(new_values)
+        _status_map.update(mapping)
+        mapping = _status_map
+    else:
+        mapping, unmapped = build_status_map(uniques, aliases)
+
+    for value in unmapped:
+        if value not in _unmapped:
+            _unmapped.add(value)
+            print(f"WARNING: No match found for status '{value}', defaulting to '{DEFAULT_STATUS}'")
+
+    codes = series.map({value: STATUS_CODES[mapping[value]] for value in uniques})
+    categorical = pd.Categorical.from_codes(codes.to_numpy(dtype='int8'), dtype=STATUS_DTYPE)
+    return pd.Series(categorical, index=series.index, name=series.name)
+
+def unmapped_statuses():
+    """Raw status values seen in this process that had no rule and fell back to the default."""
+    return sorted(str(value) for value in _unmapped)
+
+def status_mask(series, status):
+    """Boolean mask of rows whose status matches, compared on category codes."""
+    canonical, matched = canonical_status(status)
+    if not matched:
+        return pd.Series(False, index=series.index)
+    code = STATUS_CODES[canonical]
+    if not (isinstance(series.dtype, pd.CategoricalDtype) and series.dtype == STATUS_DTYPE):
+        series = normalize_statuses(series)
+    return series.cat.codes == code
 
 def main():
     # Path to Excel file
     excel_file = "places_to_call.xlsx"
-    
+
     # Backup the original file
     backup_file = "places_to_call_backup.xlsx"
     if os.path.exists(excel_file):
@@ -39,26 +154,33 @@ def main():
     else:
         print(f"Error: {excel_file} not found")
         return
-    
+
     # Load data
     df = pd.read_excel(excel_file)
-    
+
     # Print original status values
-    original_statuses = df['Status'].unique()
-    print(f"Original unique status values: {original_statuses}")
-    
+    original_counts = df['Status'].value_counts(dropna=False)
+    print(f"Original unique status values: {list(original_counts.index)}")
+
     # Normalize status values
     print("\nNormalizing status values...")
-    df['Status'] = df['Status'].apply(normalize_status)
-    
+    aliases = default_aliases()
+    mapping, unmapped = build_status_map(original_counts.index, aliases)
+    for raw, canonical in mapping.items():
+        if raw != canonical:
+            print(f"  '{raw}' -> '{canonical}' ({original_counts[raw]} rows)")
+    df['Status'] = normalize_statuses(df['Status'], aliases)
+
     # Print new status values
-    new_statuses = df['Status'].unique()
-    print(f"\nNew unique status values: {new_statuses}")
-    
+    print(f"\nNew status counts: {df['Status'].value_counts().to_dict()}")
+    if unmapped:
+        print(f"Unmapped values (set to '{DEFAULT_STATUS}'): {[str(v) for v in unmapped]}")
+        print(f"Add rules for them in a JSON file and point {ALIASES_FILE_ENV} at it.")
+
     # Save the updated file
     df.to_excel(excel_file, index=False)
     print(f"\nSaved normalized statuses to {excel_file}")
     print(f"Original file backed up to {backup_file}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
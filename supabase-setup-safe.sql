@@ -65,6 +65,48 @@ CREATE TABLE IF NOT EXISTS clients (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Create call_events table (one row per call; businesses.comments keeps only the latest note)
+CREATE TABLE IF NOT EXISTS call_events (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID,
+    business_id INTEGER NOT NULL,
+    occurred_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    outcome TEXT,
+    note TEXT,
+    duration_seconds INTEGER,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Create business_versions table (one counter per user, bumped by every
+-- businesses write; list endpoints use it as their ETag and each write's
+-- number is its change_seq)
+CREATE TABLE IF NOT EXISTS business_versions (
+    user_id UUID PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Create business_tombstones table (businesses deleted from, or moved out of,
+-- a user's list; GET /api/businesses/changes reports them as deletions)
+CREATE TABLE IF NOT EXISTS business_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    business_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    change_seq BIGINT
+);
+
+-- Create business_batches table (results of POST /api/businesses/batch by
+-- idempotency key, so a retried batch is not applied twice)
+CREATE TABLE IF NOT EXISTS business_batches (
+    user_id UUID NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    results JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, idempotency_key)
+);
+
 -- ========================================
 -- 2. ADD COLUMNS (IF NOT EXISTS)
 -- ========================================
@@ -77,11 +119,35 @@ ALTER TABLE clients ADD COLUMN IF NOT EXISTS user_id UUID;
 -- Add timestamp columns if they don't exist
 ALTER TABLE businesses ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
 ALTER TABLE businesses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+-- Delta sync pages on updated_at, so every business needs one
+UPDATE businesses SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE businesses ALTER COLUMN updated_at SET NOT NULL;
+-- Delta sync pages on change_seq: the owner's business_versions number for
+-- the write, handed out in commit order (next_business_change)
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+ALTER TABLE business_tombstones ADD COLUMN IF NOT EXISTS change_seq BIGINT;
 ALTER TABLE meetings ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
 ALTER TABLE meetings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
 ALTER TABLE clients ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
 ALTER TABLE clients ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
 
+-- Opening hours parsed at write time (api/hours.py): flat [start, end, ...]
+-- minute-of-week intervals, Monday 00:00 = 0. NULL means unknown hours.
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS hours_intervals INTEGER[];
+
+-- Coordinates from the Places result at ingest; geohash (api/geo.py) sorts
+-- neighbours together for cluster-ordered call lists
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS geohash TEXT;
+
+-- Google place_id, so searches and imports skip places already in the list
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS place_id TEXT;
+
+-- Call queue leases (see lease_next_businesses)
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS leased_by TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP;
+
 -- ========================================
 -- 3. ADD FOREIGN KEY CONSTRAINTS
 -- ========================================
@@ -131,6 +197,23 @@ BEGIN
         ALTER TABLE clients ADD CONSTRAINT clients_business_id_fkey 
         FOREIGN KEY (business_id) REFERENCES businesses(id) ON DELETE RESTRICT;
     END IF;
+    
+    -- Call events table constraints
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.table_constraints 
+        WHERE constraint_name = 'call_events_user_id_fkey'
+    ) THEN
+        ALTER TABLE call_events ADD CONSTRAINT call_events_user_id_fkey 
+        FOREIGN KEY (user_id) REFERENCES auth.users(id) ON DELETE RESTRICT;
+    END IF;
+    
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.table_constraints 
+        WHERE constraint_name = 'call_events_business_id_fkey'
+    ) THEN
+        ALTER TABLE call_events ADD CONSTRAINT call_events_business_id_fkey 
+        FOREIGN KEY (business_id) REFERENCES businesses(id) ON DELETE CASCADE;
+    END IF;
 END $$;
 
 -- ========================================
@@ -140,6 +223,10 @@ END $$;
 ALTER TABLE businesses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE meetings ENABLE ROW LEVEL SECURITY;
 ALTER TABLE clients ENABLE ROW LEVEL SECURITY;
+ALTER TABLE call_events ENABLE ROW LEVEL SECURITY;
+ALTER TABLE business_versions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE business_tombstones ENABLE ROW LEVEL SECURITY;
+ALTER TABLE business_batches ENABLE ROW LEVEL SECURITY;
 
 -- ========================================
 -- 5. CREATE/REPLACE RLS POLICIES
@@ -161,6 +248,15 @@ DROP POLICY IF EXISTS "Users can insert their own clients" ON clients;
 DROP POLICY IF EXISTS "Users can update their own clients" ON clients;
 DROP POLICY IF EXISTS "Users can delete their own clients" ON clients;
 
+DROP POLICY IF EXISTS "Users can view their own call events" ON call_events;
+DROP POLICY IF EXISTS "Users can insert their own call events" ON call_events;
+
+DROP POLICY IF EXISTS "Users can view their own business version" ON business_versions;
+DROP POLICY IF EXISTS "Users can view their own business tombstones" ON business_tombstones;
+
+DROP POLICY IF EXISTS "Users can view their own business batches" ON business_batches;
+DROP POLICY IF EXISTS "Users can insert their own business batches" ON business_batches;
+
 -- Create new policies (DELETE policies removed for security)
 -- Businesses policies
 CREATE POLICY "Users can view their own businesses" ON businesses
@@ -192,6 +288,28 @@ CREATE POLICY "Users can insert their own clients" ON clients
 CREATE POLICY "Users can update their own clients" ON clients
     FOR UPDATE USING (auth.uid() = user_id);
 
+-- Call events policies (append-only: no update or delete)
+CREATE POLICY "Users can view their own call events" ON call_events
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own call events" ON call_events
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+-- Business versions are written by next_business_change() only
+CREATE POLICY "Users can view their own business version" ON business_versions
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- Tombstones are written by the log_business_tombstone trigger only
+CREATE POLICY "Users can view their own business tombstones" ON business_tombstones
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- Business batches policies (kept as the record of applied batches: no update or delete)
+CREATE POLICY "Users can view their own business batches" ON business_batches
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own business batches" ON business_batches
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
 -- ========================================
 -- 6. CREATE/REPLACE INDEXES
 -- ========================================
@@ -200,19 +318,319 @@ CREATE POLICY "Users can update their own clients" ON clients
 DROP INDEX IF EXISTS idx_businesses_user_id;
 DROP INDEX IF EXISTS idx_businesses_status;
 DROP INDEX IF EXISTS idx_businesses_callback_due_date;
+DROP INDEX IF EXISTS idx_businesses_user_region;
 DROP INDEX IF EXISTS idx_meetings_user_id;
 DROP INDEX IF EXISTS idx_meetings_business_id;
 DROP INDEX IF EXISTS idx_clients_user_id;
 DROP INDEX IF EXISTS idx_clients_business_id;
+DROP INDEX IF EXISTS idx_call_events_business_time;
+DROP INDEX IF EXISTS idx_businesses_queue;
+DROP INDEX IF EXISTS idx_businesses_location;
+DROP INDEX IF EXISTS idx_businesses_user_geohash;
+DROP INDEX IF EXISTS idx_businesses_user_updated;
+DROP INDEX IF EXISTS idx_businesses_user_change;
+DROP INDEX IF EXISTS idx_business_tombstones_user;
 
 -- Create new indexes
 CREATE INDEX idx_businesses_user_id ON businesses(user_id);
 CREATE INDEX idx_businesses_status ON businesses(status);
 CREATE INDEX idx_businesses_callback_due_date ON businesses(callback_due_date);
+-- region is derived from address on write (api/regions.py), filters are a lookup
+CREATE INDEX idx_businesses_user_region ON businesses(user_id, region);
 CREATE INDEX idx_meetings_user_id ON meetings(user_id);
 CREATE INDEX idx_meetings_business_id ON meetings(business_id);
 CREATE INDEX idx_clients_user_id ON clients(user_id);
 CREATE INDEX idx_clients_business_id ON clients(business_id);
+-- Call history pages are keyset scans on (occurred_at, id) within one business
+CREATE INDEX idx_call_events_business_time ON call_events(business_id, occurred_at DESC, id DESC);
+-- Only businesses waiting for a call are candidates for the call queue
+CREATE INDEX idx_businesses_queue ON businesses(user_id, status, callback_due_date, lead_score DESC)
+    WHERE status IN ('callback', 'tocall');
+-- Delta sync pages are keyset scans on change_seq within one user
+CREATE INDEX idx_businesses_user_change ON businesses(user_id, change_seq);
+CREATE INDEX idx_business_tombstones_user ON business_tombstones(user_id, change_seq);
+
+-- Natural key for idempotent imports (migrate_excel.py upserts on it).
+-- Remove existing duplicate (user_id, name, phone) rows before running this.
+CREATE UNIQUE INDEX IF NOT EXISTS businesses_natural_key
+    ON businesses(user_id, name, phone) NULLS NOT DISTINCT;
+
+-- One row per Google place per user; businesses added by hand have no place_id
+CREATE UNIQUE INDEX IF NOT EXISTS idx_businesses_user_place
+    ON businesses(user_id, place_id) WHERE place_id IS NOT NULL;
+
+-- ========================================
+-- 6a. LOCATION
+-- ========================================
+
+-- Great-circle distances and radius boxes (GET /api/businesses/near)
+CREATE EXTENSION IF NOT EXISTS cube;
+CREATE EXTENSION IF NOT EXISTS earthdistance;
+
+CREATE INDEX idx_businesses_location ON businesses USING GIST (ll_to_earth(latitude, longitude))
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+-- Cluster-ordered lists read businesses in geohash order
+CREATE INDEX idx_businesses_user_geohash ON businesses(user_id, geohash);
+
+-- Businesses within p_radius_m meters of a point, nearest first
+CREATE OR REPLACE FUNCTION businesses_near(
+    p_user_id TEXT,
+    p_lat DOUBLE PRECISION,
+    p_lng DOUBLE PRECISION,
+    p_radius_m DOUBLE PRECISION DEFAULT 1000,
+    p_limit INTEGER DEFAULT 50,
+    p_status TEXT DEFAULT NULL
+)
+RETURNS TABLE (business businesses, distance_m DOUBLE PRECISION)
+LANGUAGE sql STABLE
+AS $$
+    SELECT b, earth_distance(ll_to_earth(p_lat, p_lng), ll_to_earth(b.latitude, b.longitude)) AS distance_m
+    FROM businesses b
+    WHERE b.user_id::text = p_user_id
+      AND b.latitude IS NOT NULL AND b.longitude IS NOT NULL
+      AND (p_status IS NULL OR b.status = p_status)
+      AND earth_box(ll_to_earth(p_lat, p_lng), p_radius_m) @> ll_to_earth(b.latitude, b.longitude)
+      AND earth_distance(ll_to_earth(p_lat, p_lng), ll_to_earth(b.latitude, b.longitude)) <= p_radius_m
+    ORDER BY distance_m
+    LIMIT p_limit;
+$$;
+
+-- ========================================
+-- 6b. FULL-TEXT AND FUZZY SEARCH
+-- ========================================
+
+-- Trigram matching for typo-tolerant search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP INDEX IF EXISTS idx_businesses_search_fts;
+DROP INDEX IF EXISTS idx_businesses_search_trgm;
+
+-- Both indexes are on expressions so no extra columns are stored or returned.
+-- The expressions must match the ones in search_businesses() exactly.
+CREATE INDEX idx_businesses_search_fts ON businesses USING GIN ((
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(decision_maker, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(address, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(comments, '')), 'D')
+));
+
+CREATE INDEX idx_businesses_search_trgm ON businesses USING GIN ((
+    lower(coalesce(name, '') || ' ' || coalesce(decision_maker, '') || ' ' ||
+          coalesce(address, '') || ' ' || coalesce(comments, ''))
+) gin_trgm_ops);
+
+-- Ranked search used by GET /api/businesses/query
+CREATE OR REPLACE FUNCTION search_businesses(
+    search_query TEXT,
+    max_results INTEGER DEFAULT 50,
+    p_user_id TEXT DEFAULT NULL
+)
+RETURNS SETOF businesses
+LANGUAGE sql STABLE
+SET pg_trgm.word_similarity_threshold = 0.4
+AS $$
+    SELECT b.*
+    FROM businesses b
+    WHERE (p_user_id IS NULL OR b.user_id::text = p_user_id)
+      AND (
+        (setweight(to_tsvector('simple', coalesce(b.name, '')), 'A') ||
+         setweight(to_tsvector('simple', coalesce(b.decision_maker, '')), 'B') ||
+         setweight(to_tsvector('simple', coalesce(b.address, '')), 'C') ||
+         setweight(to_tsvector('simple', coalesce(b.comments, '')), 'D'))
+            @@ websearch_to_tsquery('simple', search_query)
+        OR lower(search_query) <% lower(coalesce(b.name, '') || ' ' || coalesce(b.decision_maker, '') || ' ' ||
+                                        coalesce(b.address, '') || ' ' || coalesce(b.comments, ''))
+      )
+    ORDER BY
+        ts_rank(
+            setweight(to_tsvector('simple', coalesce(b.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(b.decision_maker, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(b.address, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(b.comments, '')), 'D'),
+            websearch_to_tsquery('simple', search_query)
+        )
+        + word_similarity(lower(search_query), lower(coalesce(b.name, ''))) DESC
+    LIMIT max_results;
+$$;
+
+-- ========================================
+-- 6c. CALL QUEUE
+-- ========================================
+
+-- Open at minute-of-week p_minute, or opening within p_within minutes
+-- (same rules as api/hours.py: unknown hours count as open)
+CREATE OR REPLACE FUNCTION hours_open(p_intervals INTEGER[], p_minute INTEGER, p_within INTEGER DEFAULT 0)
+RETURNS BOOLEAN
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT p_intervals IS NULL OR EXISTS (
+        SELECT 1
+        FROM generate_series(1, coalesce(array_length(p_intervals, 1), 0), 2) AS i
+        WHERE (p_intervals[i] < p_minute + greatest(p_within, 1) AND p_intervals[i + 1] > p_minute)
+           OR p_intervals[i] < p_minute + greatest(p_within, 1) - 10080
+    );
+$$;
+
+-- Lease the next businesses to dial (GET /api/queue/next): due callbacks first
+-- (High priority, oldest due date, best lead), then to-call businesses by
+-- lead_score. p_open_at (minute of the week in the businesses' time zone)
+-- skips businesses that are closed then. FOR UPDATE SKIP LOCKED makes concurrent callers pass over rows
+-- another caller is leasing, so no business is handed out twice.
+DROP FUNCTION IF EXISTS lease_next_businesses(TEXT, TEXT, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION lease_next_businesses(
+    p_user_id TEXT,
+    p_caller TEXT,
+    p_count INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 600,
+    p_open_at INTEGER DEFAULT NULL,
+    p_open_within INTEGER DEFAULT 0
+)
+RETURNS SETOF businesses
+LANGUAGE sql
+AS $$
+    WITH next AS (
+        SELECT b.id
+        FROM businesses b
+        WHERE b.user_id::text = p_user_id
+          AND (b.status = 'tocall'
+               OR (b.status = 'callback'
+                   AND (b.callback_due_date IS NULL
+                        OR b.callback_due_date + coalesce(b.callback_due_time, '00:00'::time) <= NOW())))
+          AND (b.lease_expires_at IS NULL OR b.lease_expires_at < NOW())
+          AND (p_open_at IS NULL OR hours_open(b.hours_intervals, p_open_at, p_open_within))
+        ORDER BY
+            CASE WHEN b.status = 'callback' THEN 0 ELSE 1 END,
+            CASE WHEN b.status = 'callback' THEN
+                CASE b.callback_priority WHEN 'High' THEN 0 WHEN 'Low' THEN 2 ELSE 1 END END,
+            b.callback_due_date NULLS FIRST,
+            b.lead_score DESC NULLS LAST,
+            b.id
+        LIMIT p_count
+        FOR UPDATE SKIP LOCKED
+    ),
+    leased AS (
+        UPDATE businesses b
+        SET leased_by = p_caller,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+        FROM next
+        WHERE b.id = next.id
+        RETURNING b.*
+    )
+    SELECT * FROM leased
+    ORDER BY
+        CASE WHEN status = 'callback' THEN 0 ELSE 1 END,
+        CASE WHEN status = 'callback' THEN
+            CASE callback_priority WHEN 'High' THEN 0 WHEN 'Low' THEN 2 ELSE 1 END END,
+        callback_due_date NULLS FIRST,
+        lead_score DESC NULLS LAST,
+        id;
+$$;
+
+-- ========================================
+-- 6d. BATCH UPDATES
+-- ========================================
+
+-- Apply [{"id": ..., "patch": {...}}] for POST /api/businesses/batch in one
+-- transaction: every patch or none (when an id is not the user's). With
+-- p_key, the result is stored in business_batches and a retry gets it back
+-- ("replayed"); the same key with a different p_request_hash gets
+-- {"conflict": true}. Patches are validated by the API (patch_errors in
+-- api/database.py); fields missing from a patch keep their value. As in the
+-- local API, setting status to 'called' or 'callback' stamps
+-- last_called_date or last_callback_date unless the patch sets it.
+CREATE OR REPLACE FUNCTION apply_business_batch(
+    p_user_id TEXT,
+    p_key TEXT,
+    p_request_hash TEXT,
+    p_operations JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_previous business_batches%ROWTYPE;
+    v_missing JSONB;
+    v_operation JSONB;
+    v_patch JSONB;
+    v_row businesses%ROWTYPE;
+    v_results JSONB := '[]'::jsonb;
+BEGIN
+    IF p_key IS NOT NULL THEN
+        -- A retry sent while the first attempt is running waits for it here
+        PERFORM pg_advisory_xact_lock(hashtext(p_user_id || '|' || p_key));
+        SELECT * INTO v_previous FROM business_batches
+        WHERE user_id::text = p_user_id AND idempotency_key = p_key;
+        IF FOUND THEN
+            IF v_previous.request_hash <> p_request_hash THEN
+                RETURN jsonb_build_object('conflict', true);
+            END IF;
+            RETURN jsonb_build_object('applied', true, 'replayed', true, 'results', v_previous.results);
+        END IF;
+    END IF;
+
+    SELECT coalesce(jsonb_agg(o.position - 1), '[]'::jsonb) INTO v_missing
+    FROM jsonb_array_elements(p_operations) WITH ORDINALITY AS o(operation, position)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM businesses b
+        WHERE b.id = (o.operation->>'id')::integer AND b.user_id::text = p_user_id
+    );
+    IF jsonb_array_length(v_missing) > 0 THEN
+        RETURN jsonb_build_object('applied', false, 'missing', v_missing);
+    END IF;
+
+    FOR v_operation IN SELECT value FROM jsonb_array_elements(p_operations) LOOP
+        v_patch := v_operation->'patch';
+        IF v_patch->>'status' = 'called' AND NOT v_patch ? 'last_called_date' THEN
+            v_patch := v_patch || jsonb_build_object('last_called_date', NOW()::timestamp);
+        ELSIF v_patch->>'status' = 'callback' AND NOT v_patch ? 'last_callback_date' THEN
+            v_patch := v_patch || jsonb_build_object('last_callback_date', NOW()::timestamp);
+        END IF;
+        UPDATE businesses AS b
+        SET (name, phone, address, status, comments, hours, hours_intervals, industry, region,
+             callback_count, lead_score, last_called_date, last_callback_date, callback_due_date,
+             callback_due_time, callback_reason, callback_priority, interest_level, best_time_to_call,
+             decision_maker, next_action, latitude, longitude, geohash, place_id) = (
+            SELECT p.name, p.phone, p.address, p.status, p.comments, p.hours, p.hours_intervals, p.industry,
+                   p.region, p.callback_count, p.lead_score, p.last_called_date, p.last_callback_date,
+                   p.callback_due_date, p.callback_due_time, p.callback_reason, p.callback_priority,
+                   p.interest_level, p.best_time_to_call, p.decision_maker, p.next_action, p.latitude,
+                   p.longitude, p.geohash, p.place_id
+            FROM jsonb_populate_record(b, v_patch) AS p
+        )
+        WHERE b.id = (v_operation->>'id')::integer AND b.user_id::text = p_user_id
+        RETURNING b.* INTO v_row;
+        v_results := v_results || jsonb_build_array(jsonb_build_object('id', v_row.id, 'business', to_jsonb(v_row)));
+    END LOOP;
+
+    IF p_key IS NOT NULL THEN
+        INSERT INTO business_batches (user_id, idempotency_key, request_hash, results)
+        VALUES (p_user_id::uuid, p_key, p_request_hash, v_results);
+    END IF;
+    RETURN jsonb_build_object('applied', true, 'replayed', false, 'results', v_results);
+END;
+$$;
+
+-- ========================================
+-- 6e. REALTIME
+-- ========================================
+
+-- Publish business changes to Supabase Realtime, for clients that subscribe
+-- to postgres_changes directly instead of GET /api/businesses/events.
+-- Realtime applies RLS to inserts and updates but not to deletes, so
+-- deletions are published as inserts into business_tombstones.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        IF NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                       WHERE pubname = 'supabase_realtime' AND tablename = 'businesses') THEN
+            ALTER PUBLICATION supabase_realtime ADD TABLE businesses;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                       WHERE pubname = 'supabase_realtime' AND tablename = 'business_tombstones') THEN
+            ALTER PUBLICATION supabase_realtime ADD TABLE business_tombstones;
+        END IF;
+    END IF;
+END $$;
 
 -- ========================================
 -- 7. CREATE/REPLACE TRIGGER FUNCTION
@@ -227,6 +645,84 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+-- A new status or due date means the leased call was made: end the lease
+CREATE OR REPLACE FUNCTION end_business_lease()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status IS DISTINCT FROM OLD.status
+       OR NEW.callback_due_date IS DISTINCT FROM OLD.callback_due_date THEN
+        NEW.leased_by = NULL;
+        NEW.lease_expires_at = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Keep businesses.comments equal to the latest call note
+CREATE OR REPLACE FUNCTION set_latest_call_note()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.note IS NOT NULL AND NEW.note <> '' THEN
+        UPDATE businesses SET comments = NEW.note
+        WHERE id = NEW.business_id
+          AND NOT EXISTS (
+              SELECT 1 FROM call_events e
+              WHERE e.business_id = NEW.business_id
+                AND e.note IS NOT NULL AND e.note <> ''
+                AND (e.occurred_at, e.id) > (NEW.occurred_at, NEW.id)
+          );
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Next number of the owner's business_versions counter. Its row stays
+-- locked until the writing transaction commits, so another write for the
+-- same user waits and gets a higher number: one user's numbers are in
+-- commit order, and a delta sync cursor on them never passes a write that
+-- is still to commit. SECURITY DEFINER so it can write the table users may
+-- only read.
+CREATE OR REPLACE FUNCTION next_business_change(owner UUID)
+RETURNS BIGINT AS $$
+DECLARE
+    seq BIGINT;
+BEGIN
+    INSERT INTO business_versions (user_id, version, updated_at)
+    VALUES (owner, 1, NOW())
+    ON CONFLICT (user_id) DO UPDATE
+        SET version = business_versions.version + 1, updated_at = NOW()
+    RETURNING version INTO seq;
+    RETURN seq;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+-- Number every insert and update of a business for its owner
+CREATE OR REPLACE FUNCTION stamp_business_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.user_id IS NOT NULL THEN
+        NEW.change_seq := next_business_change(NEW.user_id);
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Record a tombstone when a business leaves a user's list (deleted or
+-- reassigned), numbered for the user it left
+CREATE OR REPLACE FUNCTION log_business_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.user_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' OR OLD.user_id IS DISTINCT FROM NEW.user_id THEN
+        INSERT INTO business_tombstones (user_id, business_id, change_seq)
+        VALUES (OLD.user_id, OLD.id, next_business_change(OLD.user_id));
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
 -- ========================================
 -- 8. CREATE/REPLACE TRIGGERS
 -- ========================================
@@ -235,6 +731,13 @@ $$ language 'plpgsql';
 DROP TRIGGER IF EXISTS update_businesses_updated_at ON businesses;
 DROP TRIGGER IF EXISTS update_meetings_updated_at ON meetings;
 DROP TRIGGER IF EXISTS update_clients_updated_at ON clients;
+DROP TRIGGER IF EXISTS set_latest_call_note ON call_events;
+DROP TRIGGER IF EXISTS end_business_lease ON businesses;
+DROP TRIGGER IF EXISTS bump_business_version ON businesses;
+DROP TRIGGER IF EXISTS stamp_business_change ON businesses;
+DROP TRIGGER IF EXISTS log_business_tombstone ON businesses;
+-- Replaced by stamp_business_change and log_business_tombstone
+DROP FUNCTION IF EXISTS bump_business_version();
 
 -- Create new triggers
 CREATE TRIGGER update_businesses_updated_at BEFORE UPDATE ON businesses
@@ -246,6 +749,22 @@ CREATE TRIGGER update_meetings_updated_at BEFORE UPDATE ON meetings
 CREATE TRIGGER update_clients_updated_at BEFORE UPDATE ON clients
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER set_latest_call_note AFTER INSERT ON call_events
+    FOR EACH ROW EXECUTE FUNCTION set_latest_call_note();
+
+CREATE TRIGGER end_business_lease BEFORE UPDATE ON businesses
+    FOR EACH ROW EXECUTE FUNCTION end_business_lease();
+
+CREATE TRIGGER stamp_business_change BEFORE INSERT OR UPDATE ON businesses
+    FOR EACH ROW EXECUTE FUNCTION stamp_business_change();
+
+CREATE TRIGGER log_business_tombstone AFTER UPDATE OF user_id OR DELETE ON businesses
+    FOR EACH ROW EXECUTE FUNCTION log_business_tombstone();
+
+-- Number the businesses written before change_seq existed (the trigger
+-- stamps each updated row)
+UPDATE businesses SET change_seq = NULL WHERE change_seq IS NULL AND user_id IS NOT NULL;
+
 -- ========================================
 -- 9. COMPLETION MESSAGE
 -- ========================================
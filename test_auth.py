@@ -0,0 +1,51 @@
+import os
+import unittest
+from fastapi.testclient import TestClient
+import api.index
+
+class TestAdminRoutes(unittest.TestCase):
+    def setUp(self):
+        self.saved_token = os.environ.get('ADMIN_TOKEN')
+        os.environ['ADMIN_TOKEN'] = 'scrape-secret'
+        self.client = TestClient(api.index.app)
+
+    def tearDown(self):
+        if self.saved_token is None:
+            os.environ.pop('ADMIN_TOKEN', None)
+        else:
+            os.environ['ADMIN_TOKEN'] = self.saved_token
+
+    def get(self, path, **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_signed_in_users_are_not_admins(self):
+        for path in ('/metrics', '/api/admin/profiles', '/api/admin/profiles/missing'):
+            self.assertEqual(self.get(path).status_code, 403, path)
+            self.assertEqual(self.get(path, **{'x-user-id': 'u1'}).status_code, 403, path)
+            self.assertEqual(self.get(path, authorization='Bearer wrong').status_code, 403, path)
+        response = self.client.post('/api/admin/profiles/settings', json={'enabled': True}, headers={'x-user-id': 'u1'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_headers_cannot_claim_admin(self):
+        spoofed = {'x-user-id': 'admin', 'x-admin-token': ''}
+        self.assertEqual(self.get('/metrics', **spoofed).status_code, 403)
+        self.client.cookies.set('user_id', 'admin')
+        self.assertEqual(self.get('/api/admin/profiles', **spoofed).status_code, 403)
+        response = self.client.post('/api/admin/profiles/settings', json={'enabled': True}, headers=spoofed)
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_token(self):
+        self.assertEqual(self.get('/metrics', authorization='Bearer scrape-secret').status_code, 200)
+        self.assertEqual(self.get('/metrics', **{'x-admin-token': 'scrape-secret'}).status_code, 200)
+        response = self.get('/api/admin/profiles', **{'x-admin-token': 'scrape-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('settings', response.json())
+        self.assertEqual(self.get('/api/admin/profiles/missing', **{'x-admin-token': 'scrape-secret'}).status_code, 404)
+
+    def test_closed_without_configuration(self):
+        os.environ.pop('ADMIN_TOKEN')
+        self.assertEqual(self.get('/metrics', authorization='Bearer scrape-secret').status_code, 403)
+        self.assertEqual(self.get('/api/admin/profiles', **{'x-user-id': 'demo-user-001'}).status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault('GOOGLE_API_KEY', 'test')
+
+import api.database
+import api.index
+import call_history
+import call_queue
+import call_tracker as ct
+import change_journal
+from api import idempotency
+from api.idempotency import IdempotencyConflict, IdempotencyStore
+from benchmarks.fakes import FakeSupabase
+
+def local_app():
+    """The top-level api.py app (the api/ package shadows it as a module name)."""
+    module = sys.modules.get('local_api')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('local_api', os.path.join(ROOT, 'api.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['local_api'] = module
+        spec.loader.exec_module(module)
+    return module.app
+
+class TestIdempotencyStore(unittest.TestCase):
+    def test_claim_finish_and_conflicts(self):
+        store = IdempotencyStore(ttl=60)
+        self.assertIsNone(store.begin('s', 'k', 'a'))
+        with self.assertRaises(IdempotencyConflict):
+            store.begin('s', 'k', 'a')  # still running
+        store.finish('s', 'k', 'a', {'ok': True})
+        self.assertEqual(store.begin('s', 'k', 'a'), {'ok': True})
+        with self.assertRaises(IdempotencyConflict):
+            store.begin('s', 'k', 'b')
+        store.release('s', 'k')
+        self.assertIsNone(store.begin('s', 'k', 'b'))
+
+class TestLocalBatch(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.saved_history_db = call_history.HISTORY_DB
+        call_history.HISTORY_DB = os.path.join(self.tmp, 'history.db')
+        self.saved_store = idempotency.store
+        idempotency.store = IdempotencyStore()
+        self.reset_caches()
+        pd.DataFrame({
+            'Id': [10, 11, 12, 13],
+            'Name': ['Golden Dragon', 'Blue Sushi', 'Maple Bistro', 'Corner Cafe'],
+            'Number': ['604-555-0001', '604-555-0002', '604-555-0003', '604-555-0004'],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC', '3 Elm St, Surrey, BC',
+                        '4 Pine Rd, Richmond, BC'],
+            'Status': ['tocall'] * 4,
+        }).to_excel(ct.EXCEL_FILE, index=False)
+        self.client = TestClient(local_app())
+
+    def tearDown(self):
+        conn = getattr(call_history._local, 'connections', {}).pop(call_history.HISTORY_DB, None)
+        if conn is not None:
+            conn.close()
+        call_history.HISTORY_DB = self.saved_history_db
+        idempotency.store = self.saved_store
+        self.reset_caches()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def reset_caches(self):
+        ct._frames.clear()
+        call_queue._cache.clear()
+        change_journal._last_seq.clear()
+        change_journal._pending.clear()
+
+    def post(self, operations, key=None):
+        return self.client.post('/api/businesses/batch', json={'operations': operations},
+                                headers={'Idempotency-Key': key} if key else {})
+
+    def businesses(self):
+        return {row['id']: (row['name'], row['status']) for row in self.client.get('/api/businesses/filter').json()}
+
+    def cursor(self):
+        return self.client.get('/api/businesses/changes', params={'since': 0}).json()['cursor']
+
+    def test_missing_id_rejects_the_whole_batch(self):
+        before = (self.businesses(), self.cursor())
+        response = self.post([
+            {'id': 10, 'patch': {'status': 'dont_call'}},
+            {'id': 11, 'patch': {'lead_score': 11}},
+            {'id': 99, 'patch': {'status': 'called'}},
+        ])
+        self.assertEqual(response.status_code, 422)
+        results = response.json()['results']
+        self.assertEqual([result['ok'] for result in results], [True, False, False])
+        self.assertIn('Lead score', results[1]['error'])
+        self.assertIn('99', results[2]['error'])
+        self.assertEqual(self.post([{'id': 10, 'patch': {'status': 'dont_call'}},
+                                    {'id': 99, 'patch': {'status': 'called'}}]).status_code, 422)
+        self.assertEqual((self.businesses(), self.cursor()), before)
+
+    def test_replay_with_the_same_key(self):
+        operations = [{'id': business_id, 'patch': {'status': 'dont_call'}} for business_id in (10, 12, 13)]
+        first = self.post(operations, 'k1').json()
+        self.assertEqual((first['applied'], first['replayed']), (True, False))
+        self.assertEqual([result['business']['status'] for result in first['results']], ['dont_call'] * 3)
+        self.assertEqual(self.cursor(), '3')
+
+        again = self.post(operations, 'k1').json()
+        self.assertEqual((again['replayed'], again['results']), (True, first['results']))
+        self.assertEqual(self.cursor(), '3')
+        # Another key is another request
+        self.assertFalse(self.post(operations, 'k2').json()['replayed'])
+
+    def test_same_key_with_a_different_body_conflicts(self):
+        self.post([{'id': 10, 'patch': {'status': 'dont_call'}}], 'k1')
+        before = (self.businesses(), self.cursor())
+        response = self.post([{'id': 10, 'patch': {'status': 'called'}}], 'k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((self.businesses(), self.cursor()), before)
+        self.assertEqual(self.businesses()[10], ('Golden Dragon', 'dont_call'))
+
+    def test_operations_by_id(self):
+        results = self.post([
+            {'id': 10, 'patch': {'name': 'Blue Sushi'}},
+            {'id': 11, 'patch': {'status': 'callback'}},
+        ]).json()['results']
+        self.assertEqual([(result['business']['id'], result['business']['name']) for result in results],
+                         [(10, 'Blue Sushi'), (11, 'Blue Sushi')])
+        businesses = self.businesses()
+        self.assertEqual((businesses[10], businesses[11]), (('Blue Sushi', 'tocall'), ('Blue Sushi', 'callback')))
+
+class TestSupabaseBatch(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeSupabase({'businesses': [
+            {'id': i, 'user_id': 'u1', 'name': f'b{i}', 'status': 'tocall'} for i in (1, 2, 3)] + [
+            {'id': 4, 'user_id': 'u2', 'name': 'other', 'status': 'tocall'}]})
+        api.database._supabase_client = self.db
+        self.client = TestClient(api.index.app, headers={'x-user-id': 'u1'})
+
+    def tearDown(self):
+        api.database._supabase_client = None
+
+    def post(self, operations, key=None):
+        return self.client.post('/api/businesses/batch', json={'operations': operations},
+                                headers={'Idempotency-Key': key} if key else {})
+
+    def test_validation_and_ownership(self):
+        response = self.post([{'id': 1, 'patch': {'status': 'called'}}, {'id': 2, 'patch': {'user_id': 'u2'}}])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['results'][1]['error'], 'Unknown field: user_id')
+        response = self.post([{'id': 1, 'patch': {'status': 'called'}}, {'id': 4, 'patch': {'status': 'called'}}])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['results'][1]['error'], 'Business not found')
+        self.assertEqual(self.db.tables['businesses'][0]['status'], 'tocall')
+
+    def test_applied_once_per_key(self):
+        operations = [{'id': i, 'patch': {'status': 'dont_call', 'address': '1 Main St, Vancouver, BC'}} for i in (1, 2)]
+        first = self.post(operations, 'k').json()
+        self.assertEqual([result['business']['region'] for result in first['results']], ['Vancouver'] * 2)
+        requests = self.db.requests
+        again = self.post(operations, 'k').json()
+        self.assertEqual((again['replayed'], self.db.requests - requests), (True, 1))
+        self.assertEqual(self.post([{'id': 1, 'patch': {'status': 'called'}}], 'k').status_code, 409)
+
+    def test_status_stamps_call_dates(self):
+        results = self.post([{'id': 1, 'patch': {'status': 'called'}},
+                             {'id': 2, 'patch': {'status': 'callback'}},
+                             {'id': 3, 'patch': {'status': 'called', 'last_called_date': '2024-01-02'}}]).json()['results']
+        businesses = [result['business'] for result in results]
+        self.assertTrue(businesses[0]['last_called_date'])
+        self.assertIsNone(businesses[0].get('last_callback_date'))
+        self.assertTrue(businesses[1]['last_callback_date'])
+        self.assertIsNone(businesses[1].get('last_called_date'))
+        self.assertEqual(businesses[2]['last_called_date'], '2024-01-02')
+
+    def test_call_outcomes_are_statuses(self):
+        response = self.client.post('/api/businesses/1/history', json={'outcome': 'maybe', 'note': 'hm'})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('call_events', self.db.tables)
+        self.client.post('/api/businesses/2/history', json={'outcome': 'callback'})
+        business = self.db.tables['businesses'][1]
+        self.assertEqual(business['status'], 'callback')
+        self.assertTrue(business['last_callback_date'])
+        self.assertEqual(self.post([{'id': 1, 'patch': {'status': 'maybe'}}]).status_code, 422)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from postgrest import SyncPostgrestClient
+from benchmarks.fakes import FakeSupabase
+from benchmarks.postgrest import PostgREST, Server
+from benchmarks import loadtest, run
+
+class TestFakeSupabase(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeSupabase({'businesses': [
+            {'id': 1, 'user_id': 'u1', 'name': 'a', 'status': 'tocall', 'due': '2024-01-02'},
+            {'id': 2, 'user_id': 'u1', 'name': 'b', 'status': 'called', 'due': None},
+            {'id': 3, 'user_id': 'u2', 'name': 'c', 'status': 'tocall', 'due': '2024-01-01'},
+        ]})
+
+    def test_select_filters_order_and_range(self):
+        table = lambda: self.db.table('businesses')
+        self.assertEqual([r['id'] for r in table().select('*').eq('status', 'tocall').execute().data], [1, 3])
+        self.assertEqual([r['id'] for r in table().select('*').lt('due', '2024-01-02').execute().data], [3])
+        self.assertEqual(table().select('name').in_('id', [2, 3]).execute().data, [{'name': 'b'}, {'name': 'c'}])
+        ordered = table().select('id', count='exact').order('due').range(0, 1).execute()
+        self.assertEqual(([r['id'] for r in ordered.data], ordered.count), ([3, 1], 3))
+        self.assertEqual([r['id'] for r in table().select('*').order('due', desc=True).execute().data], [2, 1, 3])
+
+    def test_insert_and_update(self):
+        created = self.db.table('businesses').insert({'name': 'd', 'user_id': 'u1'}).execute().data
+        self.assertEqual(created[0]['id'], 4)
+        updated = self.db.table('businesses').update({'status': 'called'}).eq('user_id', 'u1').execute().data
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(self.db.table('businesses').select('*').eq('status', 'called').execute().data[-1]['name'], 'd')
+        self.assertEqual(self.db.requests, 3)
+
+class TestPostgREST(unittest.TestCase):
+    def test_client_round_trip(self):
+        store = FakeSupabase({'businesses': [
+            {'id': 1, 'user_id': 'u1', 'name': 'a', 'status': 'tocall', 'place_id': 'p,1', 'due': '2024-01-02'},
+            {'id': 2, 'user_id': 'u1', 'name': 'b', 'status': 'callback', 'place_id': 'p2', 'due': None},
+        ]})
+        with Server(PostgREST(store).app) as url:
+            table = lambda: SyncPostgrestClient(f'{url}/rest/v1').table('businesses')
+            self.assertEqual(table().select('place_id').in_('place_id', ['p,1', 'zz']).execute().data,
+                             [{'place_id': 'p,1'}])
+            self.assertEqual([r['id'] for r in table().select('*').eq('id', 2).eq('user_id', 'u1').execute().data], [2])
+            self.assertEqual([r['id'] for r in table().select('*').lt('due', '2024-06-01').execute().data], [1])
+            self.assertEqual([r['id'] for r in table().select('id').or_('due.gt."2024-01-02",and(name.eq.b,id.gt.1)')
+                              .execute().data], [2])
+            page = table().select('id', count='exact').order('name', desc=True).range(0, 0).execute()
+            self.assertEqual((page.data, page.count), ([{'id': 2}], 2))
+            self.assertEqual(table().insert({'name': 'c', 'user_id': 'u1'}).execute().data[0]['id'], 3)
+            self.assertEqual(table().update({'status': 'called'}).eq('id', 1).execute().data[0]['status'], 'called')
+            # As in SQL, a NULL status is neither equal nor unequal to anything
+            self.assertEqual([r['id'] for r in table().select('id').neq('status', 'called').execute().data], [2])
+
+class TestLoadTest(unittest.TestCase):
+    def test_short_run_reports_every_endpoint(self):
+        report = loadtest.run(rows=100, users=2, duration=1.5, latency=0.001)
+        self.assertIn('list', report['endpoints'])
+        self.assertLessEqual(set(report['endpoints']), {'list', 'filter', 'update', 'upload'})
+        self.assertGreater(report['requests'], 0)
+        self.assertEqual(report['errors'], 0)
+        for values in report['endpoints'].values():
+            self.assertLessEqual(values['p50_ms'], values['p95_ms'])
+            self.assertLessEqual(values['p95_ms'], values['p99_ms'])
+        self.assertEqual(loadtest.percentile([1, 2, 3, 4], 0.5), 2)
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('list=1,delete=2')
+
+class TestRun(unittest.TestCase):
+    def test_small_run_and_compare(self):
+        report = run.run(sizes=[200], repeat=1, only=['load_data', 'mark_callback', 'update_business', 'upload'])
+        self.assertEqual([(r['name'], r['rows'], r['runs']) for r in report['results']],
+                         [('load_data', 200, 1), ('mark_callback', 200, 1), ('update_business', 200, 1),
+                          ('upload', 200, 1)])
+        slower = {'results': [dict(r, median=r['median'] * 2) for r in report['results']]}
+        self.assertTrue(all(row[-1] for row in run.compare(report, slower)))
+        self.assertFalse(any(row[-1] for row in run.compare(slower, report)))
+        with self.assertRaises(ValueError):
+            run.run(sizes=[200], only=['nope'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+import api.database
+import api.index
+from benchmarks import run
+from benchmarks.fakes import FakeSupabase
+
+class TestSupabaseChanges(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeSupabase({'businesses': [
+            {'id': i, 'user_id': 'u1', 'name': f'b{i}', 'status': 'tocall', 'updated_at': '2024-01-01T00:00:00+00:00'}
+            for i in range(1, 6)] + [
+            {'id': 6, 'user_id': 'u2', 'name': 'other', 'status': 'tocall', 'updated_at': '2024-01-01T00:00:00+00:00'}]})
+        api.database._supabase_client = self.db
+        self.client = TestClient(api.index.app, headers={'x-user-id': 'u1'})
+
+    def tearDown(self):
+        api.database._supabase_client = None
+
+    def changes(self, **params):
+        response = self.client.get('/api/businesses/changes', params=params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_pages_then_deltas(self):
+        first = self.changes(limit=3)
+        self.assertEqual(([row['id'] for row in first['changes']], first['has_more'], first['full']),
+                         ([1, 2, 3], True, True))
+        rest = self.changes(since=first['cursor'], limit=3)
+        self.assertEqual(([row['id'] for row in rest['changes']], rest['has_more']), ([4, 5], False))
+        self.assertEqual(self.changes(since=rest['cursor'])['changes'], [])
+
+        self.client.put('/api/businesses/2', json={'status': 'called'})
+        self.db.table('businesses').delete().eq('id', 4).execute()
+        delta = self.changes(since=rest['cursor'])
+        self.assertEqual([(row['id'], row['status']) for row in delta['changes']], [(2, 'called')])
+        self.assertEqual((delta['deleted'], delta['full']), ([4], False))
+        after = self.changes(since=delta['cursor'])
+        self.assertEqual((after['changes'], after['deleted']), ([], []))
+
+    def test_late_commits_are_not_skipped(self):
+        cursor = self.changes()['cursor']
+        # A write whose transaction started (and took its updated_at) before
+        # that poll but committed after it
+        self.db.table('businesses').insert({'id': 7, 'user_id': 'u1', 'name': 'late', 'status': 'tocall',
+                                            'updated_at': '2023-12-31T00:00:00+00:00'}).execute()
+        self.assertEqual([row['id'] for row in self.changes(since=cursor)['changes']], [7])
+
+    def test_cursors_from_before_change_seq_sync_everything(self):
+        old = api.database.encode_cursor({'u': '2024-01-01T00:00:00+00:00', 'i': 5, 't': 0})
+        delta = self.changes(since=old)
+        self.assertEqual((len(delta['changes']), delta['full']), (5, True))
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get('/api/businesses/changes', params={'since': 'nope'}).status_code, 400)
+
+class TestLocalChanges(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        root = tempfile.mkdtemp()
+        run.prepare_environment(root)
+        self.ws = run.Workspace(root, 20)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_journal_cursor(self):
+        client = self.ws.local
+        full = client.get('/api/businesses/changes').json()
+        self.assertEqual((len(full['changes']), full['full']), (20, True))
+        first, second = full['changes'][:2]
+        client.put(f"/api/businesses/{first['id']}", json={'status': 'called', 'name': 'Renamed'})
+        client.delete(f"/api/businesses/{second['name']}")
+        delta = client.get('/api/businesses/changes', params={'since': full['cursor']}).json()
+        self.assertEqual([(row['id'], row['name'], row['status']) for row in delta['changes']],
+                         [(first['id'], 'Renamed', 'called')])
+        self.assertEqual((delta['deleted'], delta['full']), ([second['id']], False))
+        again = client.get('/api/businesses/changes', params={'since': delta['cursor']}).json()
+        self.assertEqual((again['changes'], again['deleted']), ([], []))
+
+    def test_ids_survive_compaction(self):
+        import call_tracker as ct
+        client = self.ws.local
+        ids = [row['id'] for row in client.get('/api/businesses/changes').json()['changes']]
+        self.assertEqual(ids, list(range(1, 21)))
+        added = client.post('/api/businesses', json={'name': 'New Place', 'phone': '', 'address': '1 Main St, Burnaby, BC',
+                                                     'status': 'tocall'}).json()
+        self.assertEqual(added['id'], 21)
+        client.put('/api/businesses/21', json={'status': 'called'})
+        ct.compact(ct.EXCEL_FILE)
+        ct._frames.clear()
+        df = ct.load_data(ct.EXCEL_FILE)
+        self.assertEqual(list(df['Id']), ids + [21])
+        self.assertEqual(df.loc[ct.find_rows(df, 21), 'Status'].iloc[0], 'called')
+        self.assertEqual(df.loc[ct.find_rows(df, 'new place '), 'Id'].iloc[0], 21)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault('GOOGLE_API_KEY', 'test')
+
+import call_history
+import call_queue
+import call_tracker as ct
+import change_journal
+
+def local_app():
+    """The top-level api.py app (the api/ package shadows it as a module name)."""
+    module = sys.modules.get('local_api')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('local_api', os.path.join(ROOT, 'api.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['local_api'] = module
+        spec.loader.exec_module(module)
+    return module.app
+
+class TestBusinessIds(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.saved_history_db = call_history.HISTORY_DB
+        call_history.HISTORY_DB = os.path.join(self.tmp, 'history.db')
+        ct._frames.clear()
+        call_queue._cache.clear()
+        change_journal._last_seq.clear()
+        change_journal._pending.clear()
+        # No Id column, as in sheets written before ids; two rows share a name
+        pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi', 'Blue Sushi'],
+            'Number': ['604-555-0001', '604-555-0002', '604-555-0003'],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC', '3 Elm St, Surrey, BC'],
+            'Status': ['tocall', 'tocall', 'callback'],
+        }).to_excel(ct.EXCEL_FILE, index=False)
+        self.client = TestClient(local_app())
+
+    def tearDown(self):
+        conn = getattr(call_history._local, 'connections', {}).pop(call_history.HISTORY_DB, None)
+        if conn is not None:
+            conn.close()
+        call_history.HISTORY_DB = self.saved_history_db
+        ct._frames.clear()
+        change_journal._last_seq.clear()
+        change_journal._pending.clear()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def test_filter_returns_ids(self):
+        rows = self.client.get('/api/businesses/filter').json()
+        self.assertEqual([(row['id'], row['name']) for row in rows],
+                         [(1, 'Golden Dragon'), (2, 'Blue Sushi'), (3, 'Blue Sushi')])
+        self.assertEqual(rows[1]['region'], 'Burnaby')
+        called = self.client.get('/api/businesses/filter', params={'status': 'callback'}).json()
+        self.assertEqual([row['id'] for row in called], [3])
+
+    def test_id_lookup_follows_the_frame(self):
+        df = ct.load_data()
+        other = pd.DataFrame({'Name': ['Corner Cafe', 'Blue Sushi'], 'Id': pd.array([3, 1], dtype='Int64')})
+        for _ in range(2):
+            self.assertEqual(list(ct.find_rows(df, '3')), [2])
+            self.assertEqual(list(ct.find_rows(other, '3')), [0])
+        # An edit moves the rows; the cached positions are for the old sheet
+        df = df.drop(index=0).reset_index(drop=True)
+        ct.save_to_excel(df)
+        self.assertEqual(list(ct.find_rows(ct.load_data(), 3)), [1])
+        self.assertEqual(len(ct.find_rows(ct.load_data(), 1)), 0)
+
+    def test_shared_name_is_ambiguous(self):
+        response = self.client.put('/api/businesses/Blue%20Sushi', json={'status': 'called'})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('ids 2, 3', response.json()['detail'])
+        self.assertEqual(self.client.delete('/api/businesses/blue sushi').status_code, 409)
+        self.assertEqual(self.client.put('/api/businesses/Golden%20Dragon', json={'status': 'called'}).status_code, 200)
+        self.assertEqual(self.client.put('/api/businesses/3', json={'status': 'called'}).status_code, 200)
+        statuses = [row['status'] for row in self.client.get('/api/businesses/filter').json()]
+        self.assertEqual(statuses, ['called', 'tocall', 'called'])
+
+    def notes(self, business_id):
+        return [event['note'] for event in self.client.get(f'/api/businesses/{business_id}/history').json()['events']]
+
+    def test_history_is_kept_per_id(self):
+        # Recorded by name before ids: it moves to the first row with that name
+        call_history.record_event('blue sushi ', note='before ids')
+        self.client.post('/api/businesses/3/history', json={'note': 'third row', 'outcome': 'called'})
+        self.assertEqual(self.notes(2), ['before ids'])
+        self.assertEqual(self.notes(3), ['third row'])
+        self.client.put('/api/businesses/3', json={'name': 'Blue Sushi Surrey', 'comments': 'renamed'})
+        self.client.delete('/api/businesses/3')
+        self.assertEqual(self.notes(3), ['renamed', 'third row'])
+
+    def test_call_outcomes_stamp_call_dates(self):
+        self.client.post('/api/businesses/1/history', json={'outcome': 'callback'})
+        self.client.post('/api/businesses/2/history', json={'outcome': 'called'})
+        df = ct.load_data()
+        self.assertTrue(pd.notna(df.loc[0, 'LastCallbackDate']))
+        self.assertTrue(pd.notna(df.loc[1, 'LastCalledDate']))
+        self.assertEqual(self.client.post('/api/businesses/3/history', json={'outcome': 'maybe'}).status_code, 400)
+
+    def test_queue_leases_by_id(self):
+        leased = self.client.get('/api/queue/next', params={'n': 3, 'caller': 'alice'}).json()
+        self.assertEqual(sorted(item['business']['id'] for item in leased), [1, 2, 3])
+        self.assertEqual(self.client.post('/api/queue/3/release', params={'caller': 'bob'}).status_code, 404)
+        self.assertEqual(self.client.post('/api/queue/3/release', params={'caller': 'alice'}).status_code, 200)
+        again = self.client.get('/api/queue/next', params={'caller': 'bob'}).json()
+        self.assertEqual([item['business']['id'] for item in again], [3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import math
+import unittest
+import pandas as pd
+from business_schema import (INTEREST_DTYPE, PRIORITY_DTYPE, TEXT_DTYPE, apply_schema, assign_ids,
+                             coerce_value, format_date, next_id, set_value)
+from status_normalizer import STATUS_DTYPE
+
+class TestBusinessSchema(unittest.TestCase):
+    def frame(self):
+        # As read from a hand-edited sheet: everything loosely typed
+        return apply_schema(pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi', None],
+            'Number': [6045550001.0, 6045550002.0, None],
+            'Status': ['Called', 'call back', 'whatever'],
+            'LastCalledDate': ['2024-03-01', '', 'not a date'],
+            'LeadScore': ['7', 'x', 42],
+            'CallbackCount': [1.6, None, -3],
+            'CallbackPriority': ['high', 'urgent', None],
+            'Industry': ['Cafe', '', None],
+            'Latitude': ['49.28', '', 'north'],
+        }))
+
+    def test_columns_get_schema_dtypes(self):
+        df = self.frame()
+        self.assertEqual(df['Name'].dtype, TEXT_DTYPE)
+        self.assertEqual(list(df['Name']), ['Golden Dragon', 'Blue Sushi', ''])
+        self.assertEqual(list(df['Number']), ['6045550001', '6045550002', ''])
+        self.assertEqual(df['Status'].dtype, STATUS_DTYPE)
+        self.assertEqual(list(df['Status']), ['called', 'callback', 'tocall'])
+        self.assertEqual(df['LastCalledDate'].dtype, 'datetime64[ns]')
+        self.assertEqual(df['LastCalledDate'].iloc[0], pd.Timestamp('2024-03-01'))
+        self.assertTrue(df['LastCalledDate'].iloc[1:].isna().all())
+        self.assertEqual(df['LeadScore'].dtype, 'Int8')
+        self.assertEqual(list(df['LeadScore']), [7, 5, 10])
+        self.assertEqual(list(df['CallbackCount']), [2, 0, 0])
+        self.assertEqual(df['CallbackPriority'].dtype, PRIORITY_DTYPE)
+        self.assertEqual(list(df['CallbackPriority']), ['High', 'Medium', 'Medium'])
+        self.assertEqual(list(df['Industry']), ['Cafe', 'Restaurant', 'Restaurant'])
+        self.assertEqual(df['Latitude'].dtype, 'float64')
+        self.assertEqual(df['Latitude'].iloc[0], 49.28)
+        self.assertTrue(df['Latitude'].iloc[1:].isna().all())
+        # Missing columns are added with their defaults
+        self.assertEqual(df['InterestLevel'].dtype, INTEREST_DTYPE)
+        self.assertEqual(df['Id'].dtype, 'Int64')
+        self.assertTrue(df['Id'].isna().all())
+
+    def test_apply_schema_again_changes_nothing(self):
+        df = self.frame()
+        self.assertTrue(apply_schema(df.copy()).equals(df))
+
+    def test_set_value_on_categoricals(self):
+        df = self.frame()
+        set_value(df, df['Name'] == 'Blue Sushi', 'Status', 'client')
+        set_value(df, df.index == 0, 'Industry', 'Bakery')
+        set_value(df, df.index == 2, 'CallbackPriority', 'Low')
+        self.assertEqual(list(df['Status']), ['called', 'client', 'tocall'])
+        self.assertEqual(df['Status'].dtype, STATUS_DTYPE)
+        self.assertEqual(list(df['Industry']), ['Bakery', 'Restaurant', 'Restaurant'])
+        self.assertEqual(df['CallbackPriority'].iloc[2], 'Low')
+        with self.assertRaises(ValueError):
+            set_value(df, df.index == 0, 'Status', 'maybe')
+        with self.assertRaises(ValueError):
+            set_value(df, df.index == 0, 'CallbackPriority', 'Urgent')
+        self.assertEqual(df['CallbackPriority'].dtype, PRIORITY_DTYPE)
+
+    def test_coerce_value(self):
+        self.assertEqual(coerce_value('LastCalledDate', '2024-05-06'), pd.Timestamp('2024-05-06'))
+        self.assertIs(coerce_value('LastCalledDate', ''), pd.NaT)
+        self.assertEqual(coerce_value('LeadScore', 99), 10)
+        self.assertEqual(coerce_value('CallbackCount', '-2'), 0)
+        self.assertTrue(math.isnan(coerce_value('Latitude', '')))
+        self.assertEqual(coerce_value('Id', '12'), 12)
+        self.assertEqual(coerce_value('Comments', 'hello'), 'hello')
+        self.assertEqual(format_date(pd.Timestamp('2024-05-06 13:00')), '2024-05-06')
+        self.assertEqual(format_date(pd.NaT), '')
+
+    def test_assign_ids_keeps_existing_ids(self):
+        df = apply_schema(pd.DataFrame({'Name': list('abcde'), 'Id': [None, 7, 'x', 3, 7]}))
+        self.assertEqual(next_id(df), 8)
+        assign_ids(df)
+        self.assertEqual(list(df['Id']), [8, 7, 9, 3, 10])
+        self.assertEqual(df['Id'].dtype, 'Int64')
+        self.assertEqual(next_id(df), 11)
+        self.assertEqual(list(assign_ids(df.copy())['Id']), list(df['Id']))
+
+    def test_next_id_of_an_empty_table(self):
+        self.assertEqual(next_id(pd.DataFrame({'Name': []})), 1)
+        self.assertEqual(list(assign_ids(apply_schema(pd.DataFrame({'Name': ['a', 'b']})))['Id']), [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
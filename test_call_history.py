@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+import call_history
+
+class TestCallHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, 'history.db')
+
+    def tearDown(self):
+        conn = getattr(call_history._local, 'connections', {}).pop(self.db_path, None)
+        if conn is not None:
+            conn.close()
+        shutil.rmtree(self.tmp)
+
+    def test_split_legacy_comments(self):
+        text = "first call | 2024-01-02 10:00: left voicemail | 2024-01-05 09:30: spoke to owner"
+        self.assertEqual(call_history.comment_events(text), [
+            ('2024-01-02 10:00:00', 'first call'),
+            ('2024-01-02 10:00:00', 'left voicemail'),
+            ('2024-01-05 09:30:00', 'spoke to owner'),
+        ])
+        self.assertEqual(call_history.latest_note(text), '2024-01-05 09:30: spoke to owner')
+        self.assertEqual(call_history.latest_note(''), '')
+
+    def test_history_pages_newest_first(self):
+        for day in range(1, 6):
+            call_history.record_event('Golden Dragon', note=f"call {day}",
+                                      occurred_at=f"2024-01-0{day} 10:00:00", db_path=self.db_path)
+        call_history.record_event('Blue Sushi', note="other", db_path=self.db_path)
+
+        first = call_history.get_history(' golden dragon', limit=2, db_path=self.db_path)
+        self.assertEqual([e['note'] for e in first['events']], ['call 5', 'call 4'])
+        second = call_history.get_history('Golden Dragon', limit=2, before=first['next_before'], db_path=self.db_path)
+        self.assertEqual([e['note'] for e in second['events']], ['call 3', 'call 2'])
+        last = call_history.get_history('Golden Dragon', limit=2, before=second['next_before'], db_path=self.db_path)
+        self.assertEqual([e['note'] for e in last['events']], ['call 1'])
+        self.assertIsNone(last['next_before'])
+
+    def test_adopt_ids(self):
+        self.assertEqual(call_history.adopt_ids(['a'], [1], self.db_path), 0)  # no store yet
+        call_history.record_event('Blue Sushi', note="by name", db_path=self.db_path)
+        call_history.record_event('Closed Place', note="gone", db_path=self.db_path)
+        call_history.record_event(2, note="by id", db_path=self.db_path)
+        self.assertEqual(call_history.adopt_ids(['Golden Dragon', 'blue sushi', 'Blue Sushi'], [1, 2, 3], self.db_path), 1)
+        self.assertEqual([e['note'] for e in call_history.get_history(2, db_path=self.db_path)['events']],
+                         ['by id', 'by name'])
+        self.assertEqual(call_history.get_history(3, db_path=self.db_path)['events'], [])
+        self.assertEqual(len(call_history.get_history('closed place', db_path=self.db_path)['events']), 1)
+        self.assertEqual(call_history.adopt_ids(['Blue Sushi'], [2], self.db_path), 0)
+
+if __name__ == '__main__':
+    unittest.main()
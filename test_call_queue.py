@@ -0,0 +1,66 @@
+import unittest
+from datetime import datetime, timedelta
+import pandas as pd
+from call_queue import CallQueue, call_windows
+from business_schema import apply_schema
+
+NOW = datetime(2030, 1, 10, 10, 0)
+
+class TestCallQueue(unittest.TestCase):
+    def setUp(self):
+        self.df = apply_schema(pd.DataFrame({
+            'Name': ['Low Lead', 'Top Lead', 'Due Medium', 'Due High', 'Future Callback', 'Client', 'Evenings Only'],
+            'Status': ['tocall', 'tocall', 'callback', 'callback', 'callback', 'client', 'tocall'],
+            'CallbackDueDate': ['', '', '2030-01-09', '2030-01-10', '2030-01-12', '', ''],
+            'CallbackPriority': ['Medium', 'Medium', 'Medium', 'High', 'High', 'Medium', 'Medium'],
+            'LeadScore': [2, 9, 5, 5, 5, 10, 10],
+            'BestTimeToCall': ['', '', '', '', '', '', 'Evening'],
+        }))
+        self.queue = CallQueue(self.df)
+
+    def next_names(self, n, caller='alice', now=NOW, **kwargs):
+        return [key for key, _, _ in self.queue.next(n, caller, now=now, **kwargs)]
+
+    def test_due_callbacks_then_best_leads(self):
+        self.assertEqual(self.next_names(4), ['due high', 'due medium', 'top lead', 'low lead'])
+        # Outside its window a business is only handed out when nothing else is left
+        self.assertEqual(self.next_names(5), ['evenings only'])
+
+    def test_leases_are_exclusive_and_expire(self):
+        first = self.next_names(2, 'alice', lease_seconds=60)
+        second = self.next_names(2, 'bob')
+        self.assertFalse(set(first) & set(second))
+        later = NOW + timedelta(minutes=5)
+        self.assertEqual(self.next_names(2, 'carol', now=later), first)
+        self.assertFalse(self.queue.release('due high', 'bob'))
+        self.assertTrue(self.queue.release('due high', 'carol'))
+
+    def test_updates_are_incremental(self):
+        self.assertEqual(self.next_names(1), ['due high'])
+        # The leased business was called: its lease ends and it leaves the queue
+        self.df.loc[3, 'Status'] = 'called'
+        self.queue.update('due high', self.df.iloc[3])
+        self.assertEqual(self.queue.leases(), {})
+        self.df.loc[0, 'LeadScore'] = 10
+        self.queue.update('low lead', self.df.iloc[0])
+        self.assertEqual(self.next_names(2, 'bob'), ['due medium', 'low lead'])
+        # Callbacks scheduled for later come up once they are due
+        self.assertIn('future callback', self.next_names(3, 'bob', now=NOW + timedelta(days=2)))
+
+    def test_closed_businesses_stay_queued(self):
+        self.df.loc[1, 'Hours'] = 'Thursday: 9:00 AM – 5:00 PM'  # NOW is a Thursday
+        self.df.loc[3, 'Hours'] = 'Thursday: 6:00 PM – 11:00 PM'
+        self.queue.update('top lead', self.df.iloc[1])
+        self.queue.update('due high', self.df.iloc[3])
+        self.assertEqual(self.next_names(2, open_at=NOW), ['due medium', 'top lead'])
+        self.assertEqual(self.next_names(1, 'bob', open_at=NOW.replace(hour=17, minute=30), open_within=60),
+                         ['due high'])
+
+    def test_call_windows(self):
+        self.assertEqual(call_windows('2-4pm'), ((14 * 60, 16 * 60),))
+        self.assertEqual(call_windows('after 3pm'), ((15 * 60, 24 * 60),))
+        self.assertEqual(call_windows('Morning'), ((9 * 60, 12 * 60),))
+        self.assertEqual(call_windows('anytime'), ())
+
+if __name__ == '__main__':
+    unittest.main()
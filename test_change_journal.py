@@ -0,0 +1,172 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import pandas as pd
+import change_journal
+from business_schema import apply_schema, assign_ids, set_value
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault('GOOGLE_API_KEY', 'test')
+
+import call_tracker as ct
+
+class TestChangeJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp, 'places.xlsx')
+        self.df = apply_schema(pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi House'],
+            'Number': ['604-555-0001', '604-555-0002'],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC'],
+            'Status': ['tocall', 'tocall']
+        }))
+
+    def tearDown(self):
+        change_journal._last_seq.clear()
+        change_journal._pending.clear()
+        shutil.rmtree(self.tmp)
+
+    def record(self, *entries):
+        change_journal.append(self.file_path, list(entries))
+
+    def test_replay_applies_entries_in_order(self):
+        self.record(
+            change_journal.make_entry('update', 'golden dragon ', {'Status': 'called', 'Comments': 'left voicemail'}),
+            change_journal.make_entry('update', 'Golden Dragon', {'CallbackDueDate': pd.Timestamp('2030-01-02'), 'LeadScore': 8}),
+            change_journal.make_entry('insert', 'Maple Bistro', {'Name': 'Maple Bistro', 'Status': 'lead'}),
+            change_journal.make_entry('delete', ' blue sushi house'),
+        )
+        df, applied = change_journal.replay(self.df.copy(), self.file_path)
+        self.assertEqual(applied, 4)
+        self.assertEqual(list(df['Name']), ['Golden Dragon', 'Maple Bistro'])
+        row = df.iloc[0]
+        self.assertEqual((row['Status'], row['Comments'], row['LeadScore']), ('called', 'left voicemail', 8))
+        self.assertEqual(row['CallbackDueDate'], pd.Timestamp('2030-01-02'))
+        self.assertEqual(df['Status'].dtype, self.df['Status'].dtype)
+
+    def test_replay_is_idempotent(self):
+        self.record(
+            change_journal.make_entry('insert', 'Maple Bistro', {'Name': 'Maple Bistro'}),
+            change_journal.make_entry('update', 'Maple Bistro', {'Status': 'client'}),
+        )
+        once, _ = change_journal.replay(self.df.copy(), self.file_path)
+        twice, _ = change_journal.replay(once.copy(), self.file_path)
+        self.assertEqual(len(twice), 3)
+        self.assertTrue(once.equals(twice))
+
+    def test_entries_with_ids_follow_the_row(self):
+        df = assign_ids(self.df.copy())
+        df.loc[1, 'Name'] = 'Golden Dragon'  # two businesses with one name
+        self.record(
+            change_journal.make_entry('update', 'Golden Dragon', {'Name': 'Red Dragon'}, business_id=1),
+            change_journal.make_entry('update', 'Red Dragon', {'Status': 'called'}, business_id=1),
+            change_journal.make_entry('insert', 'Maple Bistro', {'Id': 3, 'Name': 'Maple Bistro'}, business_id=3),
+            change_journal.make_entry('delete', 'Golden Dragon', business_id=2),
+        )
+        once, _ = change_journal.replay(df.copy(), self.file_path)
+        self.assertEqual(list(zip(once['Id'], once['Name'], once['Status'])),
+                         [(1, 'Red Dragon', 'called'), (3, 'Maple Bistro', 'tocall')])
+        twice, _ = change_journal.replay(once.copy(), self.file_path)
+        self.assertTrue(once.equals(twice))
+
+    def test_assign_ids_fills_gaps_and_repeats(self):
+        df = apply_schema(pd.DataFrame({'Name': list('abcd'), 'Id': [4, None, 4, 2]}))
+        self.assertEqual(list(assign_ids(df)['Id']), [4, 5, 6, 2])
+
+    def test_archive_keeps_sequence_and_history(self):
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}, actor='alice'))
+        self.assertEqual(change_journal.archive(self.file_path), 1)
+        self.assertEqual(change_journal.pending_count(self.file_path), 0)
+
+        change_journal._last_seq.clear()  # as after a restart
+        change_journal._pending.clear()
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'client'}))
+        history = change_journal.history(self.file_path, name='golden dragon')
+        self.assertEqual([entry['seq'] for entry in history], [2, 1])
+        self.assertEqual(history[1]['actor'], 'alice')
+
+    def test_history_follows_the_id(self):
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}),
+                    change_journal.make_entry('update', 'Golden Dragon', {'Name': 'Red Dragon'}, business_id=1),
+                    change_journal.make_entry('update', 'Golden Dragon', {'Status': 'client'}, business_id=2),
+                    change_journal.make_entry('update', 'Red Dragon', {'Status': 'lead'}, business_id=1))
+        history = change_journal.history(self.file_path, 1, 'Red Dragon')
+        self.assertEqual([entry['seq'] for entry in history], [4, 2])
+        self.assertEqual([entry['seq'] for entry in change_journal.history(self.file_path, 2, 'Golden Dragon')], [3, 1])
+        self.assertEqual(change_journal.named_ids(self.file_path, 'golden dragon'), [1, 2])
+
+    def test_pending_count_is_kept_without_rereading(self):
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}))
+        change_journal._pending.clear()  # as after a restart: counted from the file once
+        self.assertEqual(change_journal.pending_count(self.file_path), 1)
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'client'}),
+                    change_journal.make_entry('delete', 'Blue Sushi House'))
+        self.assertEqual(change_journal.pending_count(self.file_path), 3)
+        change_journal.archive(self.file_path)
+        self.assertEqual(change_journal.pending_count(self.file_path), 0)
+
+    def test_writers_in_other_processes_are_seen(self):
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}))
+        self.assertEqual(change_journal.last_seq(self.file_path), 1)
+        # Another worker appends to the same journal
+        code = ('import change_journal; change_journal.append(%r, '
+                '[change_journal.make_entry("update", "Blue Sushi House", {"Status": "called"}) for _ in range(2)])' % self.file_path)
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+        self.assertEqual(change_journal.pending_count(self.file_path), 3)
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'client'}))
+        seqs = [entry['seq'] for entry in change_journal.read_entries(self.file_path)]
+        self.assertEqual(seqs, [1, 2, 3, 4])
+
+    def test_archive_keeps_later_entries(self):
+        self.record(*[change_journal.make_entry('update', 'Golden Dragon', {'LeadScore': score}, business_id=1)
+                      for score in (6, 7, 8)])
+        self.assertEqual(change_journal.archive(self.file_path, 2), 2)
+        self.assertEqual([entry['seq'] for entry in change_journal.read_entries(self.file_path)], [3])
+        self.assertEqual(change_journal.pending_count(self.file_path), 1)
+        self.assertEqual(change_journal.last_seq(self.file_path), 3)
+        self.assertEqual([entry['seq'] for entry in change_journal.entries_since(self.file_path, 0)], [1, 2, 3])
+
+    def test_compaction_keeps_changes_from_other_processes(self):
+        saved_compact_after = change_journal.COMPACT_AFTER
+        change_journal.COMPACT_AFTER = 2
+        try:
+            ct.save_to_excel(assign_ids(self.df.copy()), self.file_path)
+            df = ct.load_data(self.file_path)
+            # Another worker journals a change after this one loaded the frame
+            code = ('import change_journal; change_journal.append(%r, '
+                    '[change_journal.make_entry("update", "Blue Sushi House", {"Status": "client"}, business_id=2)])'
+                    % self.file_path)
+            subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+            entry = change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}, business_id=1)
+            set_value(df, df['Id'] == 1, 'Status', 'called')
+            ct.api_journal_save(df, [entry], self.file_path)  # compacts
+
+            self.assertEqual(list(ct.load_data(self.file_path)['Status']), ['called', 'client'])
+            ct._frames.clear()
+            self.assertEqual(list(ct.read_frame(self.file_path)['Status']), ['called', 'client'])
+            self.assertEqual(change_journal.pending_count(self.file_path), 0)
+
+            # A frame loaded before a compaction leaves the later entries in the journal
+            stale = ct.load_data(self.file_path)
+            ct.api_journal_save(ct.load_data(self.file_path), [
+                change_journal.make_entry('update', 'Golden Dragon', {'LeadScore': 9}, business_id=1)], self.file_path)
+            ct.compact(self.file_path, stale)
+            self.assertEqual(ct.load_data(self.file_path)['LeadScore'].iloc[0], 9)
+        finally:
+            change_journal.COMPACT_AFTER = saved_compact_after
+            ct._frames.clear()
+
+    def test_entries_since_reads_archive_only_when_needed(self):
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'called'}),
+                    change_journal.make_entry('delete', 'Blue Sushi House'))
+        change_journal.archive(self.file_path)
+        self.record(change_journal.make_entry('update', 'Golden Dragon', {'Status': 'client'}))
+        self.assertEqual([entry['seq'] for entry in change_journal.entries_since(self.file_path, 1)], [2, 3])
+        self.assertEqual([entry['seq'] for entry in change_journal.entries_since(self.file_path, 2)], [3])
+        self.assertEqual(change_journal.entries_since(self.file_path, 3), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from api.geo import haversine_m
+from coverage_planner import CoveragePlanner, TileStore, cover, root_radius, RESULT_CAP
+
+BOUNDS = (40.70, -74.02, 40.76, -73.94)
+
+class FakePlaces:
+    """Nearby Search over synthetic places: 20 per page, at most RESULT_CAP per query."""
+
+    def __init__(self, seed=3):
+        rng = np.random.default_rng(seed)
+        # A dense downtown cluster plus sparse places over the whole area
+        self.lat = np.concatenate([40.73 + rng.normal(0, 0.003, 400), rng.uniform(40.70, 40.76, 200)])
+        self.lng = np.concatenate([-73.98 + rng.normal(0, 0.003, 400), rng.uniform(-74.02, -73.94, 200)])
+        self.calls = 0
+        self.pages = {}
+
+    def places_nearby(self, location=None, radius=None, keyword=None, page_token=None):
+        self.calls += 1
+        if page_token:
+            matches = self.pages.pop(page_token)
+        else:
+            inside = np.flatnonzero(haversine_m(location[0], location[1], self.lat, self.lng) <= radius)
+            matches = [{'place_id': f'p{i}', 'name': f'{keyword} {i}',
+                        'geometry': {'location': {'lat': self.lat[i], 'lng': self.lng[i]}}}
+                       for i in inside[:RESULT_CAP]]
+        response = {'status': 'OK' if matches else 'ZERO_RESULTS', 'results': matches[:20]}
+        if len(matches) > 20:
+            response['next_page_token'] = f't{self.calls}'
+            self.pages[response['next_page_token']] = matches[20:]
+        return response
+
+def in_bounds(backend):
+    south, west, north, east = BOUNDS
+    return {f'p{i}' for i in range(len(backend.lat))
+            if south <= backend.lat[i] <= north and west <= backend.lng[i] <= east}
+
+class TestCoveragePlanner(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'tiles.json')
+
+    def planner(self, backend, **store_options):
+        return CoveragePlanner(backend, TileStore(self.path, **store_options), sleep=lambda seconds: None)
+
+    def test_cover_is_a_fixed_grid(self):
+        tiles = cover(*BOUNDS, 1000)
+        self.assertTrue(set(cover(40.71, -74.0, 40.75, -73.96, 1000)) <= set(tiles))
+        self.assertLessEqual(len(cover(*BOUNDS, root_radius(BOUNDS, 100))), 64)
+
+    def test_dense_tiles_are_split_until_everything_is_found(self):
+        backend = FakePlaces()
+        planner = self.planner(backend)
+        found = [place['place_id'] for place in planner.sweep('cafe', BOUNDS, 2000)]
+        self.assertEqual(len(found), len(set(found)))
+        self.assertTrue(in_bounds(backend) <= set(found))
+        self.assertGreater(planner.stats['tiles_split'], 0)
+
+    def test_repeat_sweeps_find_the_same_places(self):
+        backend = FakePlaces()
+        first = {place['place_id'] for place in self.planner(backend).sweep('cafe', BOUNDS, 2000)}
+        calls = backend.calls
+        planner = self.planner(backend)
+        self.assertEqual({place['place_id'] for place in planner.sweep('cafe', BOUNDS, 2000)}, first)
+        # Tiles known to be dense go straight to their quarters
+        self.assertLess(backend.calls - calls, calls)
+        self.assertGreater(planner.stats['tiles_skipped'], 0)
+
+    def test_reruns_only_query_new_or_stale_tiles(self):
+        backend = FakePlaces()
+        list(self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True))
+        calls = backend.calls
+        self.assertEqual(list(self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True)), [])
+        self.assertEqual(backend.calls, calls)
+        # Another keyword or other filters are another set of tiles
+        self.assertTrue(list(self.planner(backend).sweep('bar', BOUNDS, 2000, skip_searched=True)))
+        self.assertTrue(list(self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True, scope='no_website=1')))
+        # Stale tiles are queried again
+        self.assertTrue(list(self.planner(backend, stale_after_days=0).sweep('cafe', BOUNDS, 2000, skip_searched=True)))
+
+    def test_stopped_sweep_resumes(self):
+        backend = FakePlaces()
+        sweep = self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True)
+        first = [next(sweep)['place_id'] for _ in range(5)]
+        sweep.close()
+        rest = {place['place_id'] for place in self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True)}
+        self.assertTrue(in_bounds(backend) <= rest | set(first))
+
+    def test_tiles_with_unused_places_are_searched_again(self):
+        backend = FakePlaces()
+        planner = self.planner(backend)
+        sweep = planner.sweep('cafe', BOUNDS, 2000, skip_searched=True)
+        dropped = next(sweep)['place_id']
+        planner.incomplete()
+        list(sweep)
+        again = {place['place_id'] for place in self.planner(backend).sweep('cafe', BOUNDS, 2000, skip_searched=True)}
+        self.assertIn(dropped, again)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from openpyxl import Workbook
+from excel_stream import concat_batches, iter_batches, read_frame, write_batches
+
+class TestExcelStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp, 'places.xlsx')
+        # A hand-edited sheet: a blank header, a blank row and a short row
+        workbook = Workbook()
+        sheet = workbook.active
+        for row in [('Name', 'Status', None, 'LeadScore'),
+                    ('Golden Dragon', 'Called', 'x', 7),
+                    (None, None, None, None),
+                    ('Blue Sushi', 'call back'),
+                    ('Maple Bistro', 'lead', None, 3),
+                    ('Corner Cafe', None, None, None)]:
+            sheet.append(row)
+        workbook.save(self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_batches_skip_blank_rows(self):
+        batches = list(iter_batches(self.file_path, batch_size=2))
+        self.assertEqual([list(batch.index) for batch in batches], [[0, 1], [2, 3]])
+        self.assertEqual(list(batches[0].columns), ['Name', 'Status', 'Unnamed: 2', 'LeadScore'])
+        self.assertEqual(list(batches[0]['Name']), ['Golden Dragon', 'Blue Sushi'])
+        self.assertTrue(pd.isna(batches[0]['LeadScore'].iloc[1]))
+        names = read_frame(self.file_path, batch_size=2, usecols=['Name'])
+        self.assertEqual(list(names.columns), ['Name'])
+        self.assertEqual(len(names), 4)
+        with self.assertRaises(ValueError):
+            list(iter_batches(self.file_path, usecols=['Id']))
+
+    def test_round_trip(self):
+        typed = read_frame(self.file_path, batch_size=3, typed=True)
+        self.assertEqual(list(typed['Status']), ['called', 'callback', 'lead', 'tocall'])
+        copy_path = os.path.join(self.tmp, 'copy.xlsx')
+        written = write_batches(copy_path, iter_batches(self.file_path, batch_size=3, typed=True))
+        self.assertEqual(written, 4)
+        self.assertFalse(os.path.exists(f"{copy_path}.tmp.xlsx"))
+        again = read_frame(copy_path, batch_size=3, typed=True)
+        self.assertEqual(list(again.columns), list(typed.columns))
+        for column in ('Name', 'Status', 'LeadScore', 'CallbackPriority', 'Industry'):
+            self.assertEqual(list(again[column]), list(typed[column]), column)
+            self.assertEqual(again[column].dtype, typed[column].dtype, column)
+
+    def test_concat_keeps_categories(self):
+        first = pd.DataFrame({'Industry': pd.Categorical(['Cafe'])})
+        second = pd.DataFrame({'Industry': pd.Categorical(['Bakery', 'Cafe'])}, index=[1, 2])
+        both = concat_batches([first, second])
+        self.assertIsInstance(both['Industry'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(both['Industry']), ['Cafe', 'Bakery', 'Cafe'])
+
+    def test_empty_sheet(self):
+        path = os.path.join(self.tmp, 'empty.xlsx')
+        self.assertEqual(write_batches(path, []), 0)
+        self.assertEqual(list(iter_batches(path)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from api.hours import encode_intervals, parse_hours
+from benchmarks.fakes import FakeSupabase
+from excel_sync import run_sync
+
+OLD_HOURS = 'Monday: 9:00 AM – 5:00 PM'
+NEW_HOURS = 'Monday: 10:00 AM – 2:00 PM'
+
+class TestExcelSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.excel_file = os.path.join(self.tmp, 'places.xlsx')
+        self.supabase = FakeSupabase({'businesses': [
+            {'id': 1, 'user_id': 'u1', 'name': 'Golden Dragon', 'hours': OLD_HOURS, 'hours_intervals': 'stale'},
+            {'id': 2, 'user_id': 'u1', 'name': 'Blue Sushi', 'hours': OLD_HOURS, 'hours_intervals': 'untouched'},
+            {'id': 3, 'user_id': 'u1', 'name': 'Maple Bistro', 'hours': OLD_HOURS, 'hours_intervals': 'stale'},
+            {'id': 4, 'user_id': 'u1', 'name': 'Twin Cafe', 'hours': None, 'hours_intervals': None},
+            {'id': 5, 'user_id': 'u2', 'name': 'twin cafe', 'hours': None, 'hours_intervals': None},
+        ]})
+        pd.DataFrame({
+            'Name': ['golden  dragon', 'Blue Sushi', 'Maple Bistro', 'Twin Cafe', 'Unknown Diner'],
+            'Hours': [NEW_HOURS, OLD_HOURS, None, NEW_HOURS, NEW_HOURS],
+        }).to_excel(self.excel_file, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def sync(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_sync({'Hours': 'hours'}, excel_file=self.excel_file, supabase=self.supabase, **options)
+
+    def rows(self):
+        return {row['id']: (row['hours'], row['hours_intervals']) for row in self.supabase.tables['businesses']}
+
+    def test_only_changed_rows_are_written(self):
+        stats = self.sync()
+        self.assertEqual((stats['matched'], stats['unchanged'], stats['updated']), (3, 1, 2))
+        self.assertEqual((stats['not_found'], stats['ambiguous']), (1, 1))
+        rows = self.rows()
+        self.assertEqual(rows[1], (NEW_HOURS, encode_intervals(parse_hours(NEW_HOURS))))
+        # Blank cells clear the field; hours_intervals follows
+        self.assertEqual(rows[3], (None, encode_intervals(parse_hours(None))))
+        self.assertEqual(rows[2], (OLD_HOURS, 'untouched'))
+        self.assertEqual(rows[4], (None, None))
+
+    def test_keep_empty_and_dry_run(self):
+        before = self.rows()
+        stats = self.sync(dry_run=True)
+        self.assertEqual(stats['updated'], 2)
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(self.sync(clear_empty=False)['updated'], 1)
+        self.assertEqual(self.rows()[3], (OLD_HOURS, 'stale'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from api.geo import geohash, geohashes, haversine_m
+from geo_index import GeoIndex, fill_locations, remember
+
+class TestGeohash(unittest.TestCase):
+    def test_reference_values(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash(42.6, -5.6, 5), 'ezs42')
+        self.assertEqual(list(geohashes([42.6, 57.64911], [-5.6, 10.40744], 5)), ['ezs42', 'u4pru'])
+
+class TestGeoIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        lat = 40.70 + rng.random(2000) * 0.1
+        lng = -74.05 + rng.random(2000) * 0.1
+        lat[::50] = np.nan  # some businesses have no location yet
+        self.df = pd.DataFrame({'Name': [f'b{i}' for i in range(2000)], 'Latitude': lat, 'Longitude': lng})
+        self.index = GeoIndex(self.df)
+
+    def test_near_matches_brute_force(self):
+        for radius in (200, 1500, 20000):
+            distances = haversine_m(40.75, -74.0, self.df['Latitude'], self.df['Longitude'])
+            expected = set(np.flatnonzero(distances <= radius).tolist())
+            found = self.index.near(40.75, -74.0, radius)
+            self.assertEqual({position for position, _ in found}, expected, radius)
+            self.assertEqual([d for _, d in found], sorted(d for _, d in found))
+        self.assertEqual(len(self.index.near(40.75, -74.0, 20000, limit=5)), 5)
+
+    def test_cluster_order_groups_neighbours(self):
+        positions = np.arange(len(self.df))
+        ordered = self.index.cluster_order(positions)
+        self.assertEqual(sorted(ordered.tolist()), positions.tolist())
+        # Rows without coordinates come last, in their original order
+        self.assertEqual(ordered[-40:].tolist(), positions[::50].tolist())
+        hashes = geohashes(self.df['Latitude'].to_numpy()[ordered[:-40]], self.df['Longitude'].to_numpy()[ordered[:-40]])
+        self.assertEqual(list(hashes), sorted(hashes))
+
+    def test_known_place_ids(self):
+        df = pd.DataFrame({'Name': ['a', 'b', 'c'], 'Latitude': [1.0, np.nan, 2.0], 'Longitude': [1.0, np.nan, 2.0],
+                           'PlaceId': ['p1', '', np.nan]})
+        self.assertEqual(GeoIndex(df).place_ids, {'p1'})
+        self.assertEqual(GeoIndex(df.drop(columns='PlaceId')).place_ids, set())
+
+class TestFillLocations(unittest.TestCase):
+    def test_fills_from_cache_and_geocoder(self):
+        db_path = os.path.join(tempfile.mkdtemp(), 'geocode.db')
+        remember([('1 Main St, Springfield', 40.1, -74.1)], db_path=db_path)
+        df = pd.DataFrame({'Address': ['1  main st, Springfield', '2 Oak Ave', '', '3 Elm Rd'],
+                           'Latitude': [np.nan, np.nan, np.nan, 41.0],
+                           'Longitude': [np.nan, np.nan, np.nan, -73.0]})
+        calls = []
+
+        def geocode(address):
+            calls.append(address)
+            return (40.2, -74.2) if address == '2 Oak Ave' else (None, None)
+
+        self.assertEqual(fill_locations(df, geocode, db_path=db_path), 2)
+        self.assertEqual(calls, ['2 Oak Ave'])
+        self.assertEqual(df['Latitude'].tolist()[:2], [40.1, 40.2])
+        self.assertTrue(np.isnan(df.loc[2, 'Latitude']))
+        self.assertEqual(df.loc[3, 'Latitude'], 41.0)
+        # Geocoded addresses are cached for next time
+        again = pd.DataFrame({'Address': ['2 oak ave'], 'Latitude': [np.nan], 'Longitude': [np.nan]})
+        self.assertEqual(fill_locations(again, db_path=db_path), 1)
+
+if __name__ == '__main__':
+    unittest.main()
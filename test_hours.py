@@ -0,0 +1,45 @@
+import unittest
+from datetime import datetime
+from api.hours import HoursIndex, parse_hours, is_open, DAY
+
+GOOGLE_HOURS = ("Monday: 9:00 AM – 5:00 PM | Tuesday: Closed | Wednesday: Open 24 hours | "
+                "Thursday: 11:00 AM – 2:30 PM, 5:00 – 10:00 PM | Friday: 5:00 PM – 2:00 AM | "
+                "Saturday: 11:00 – 2:00 PM | Sunday: 10:00 PM – 1:00 AM")
+
+# 2030-01-07 is a Monday
+MONDAY = datetime(2030, 1, 7)
+
+class TestHours(unittest.TestCase):
+    def test_parses_google_weekday_text(self):
+        self.assertEqual(parse_hours(GOOGLE_HOURS), (
+            (0, 60),                                   # Sunday night runs into Monday
+            (9 * 60, 17 * 60),
+            (2 * DAY, 3 * DAY),
+            (3 * DAY + 11 * 60, 3 * DAY + 14 * 60 + 30),
+            (3 * DAY + 17 * 60, 3 * DAY + 22 * 60),
+            (4 * DAY + 17 * 60, 5 * DAY + 2 * 60),    # past midnight
+            (5 * DAY + 11 * 60, 5 * DAY + 14 * 60),
+            (6 * DAY + 22 * 60, 7 * DAY),
+        ))
+
+    def test_import_format_and_day_ranges(self):
+        self.assertEqual(parse_hours("Monday: 9AM-5PM, Tuesday: 9AM-5PM"), ((540, 1020), (DAY + 540, DAY + 1020)))
+        self.assertEqual(len(parse_hours("Mon-Fri: 09:00–17:00")), 5)
+
+    def test_unknown_is_not_closed(self):
+        self.assertIsNone(parse_hours(""))
+        self.assertIsNone(parse_hours("call for hours"))
+        self.assertEqual(parse_hours("Monday: Closed"), ())
+
+    def test_open_mask_matches_scalar_check(self):
+        texts = [GOOGLE_HOURS, "", "Monday: 9:00 AM – 5:00 PM", "Tuesday: Closed", GOOGLE_HOURS]
+        index = HoursIndex.from_text(texts)
+        for moment, within in [(MONDAY.replace(hour=10), 0), (MONDAY.replace(hour=8, minute=30), 60),
+                               (MONDAY.replace(hour=0, minute=30), 0), (datetime(2030, 1, 13, 23, 30), 0),
+                               (datetime(2030, 1, 13, 21, 30), 60), (MONDAY.replace(hour=6), 0)]:
+            expected = [is_open(parse_hours(text), moment, within) for text in texts]
+            self.assertEqual(list(index.open_mask(moment, within)), expected, (moment, within))
+        self.assertEqual(list(index.open_mask(MONDAY.replace(hour=6))), [False, True, False, False, False])
+
+if __name__ == '__main__':
+    unittest.main()
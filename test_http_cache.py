@@ -0,0 +1,81 @@
+import unittest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+import api.database
+import api.index
+from api.http_cache import ResponseCache, matches
+from benchmarks.fakes import FakeSupabase
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(max_entries=10, max_bytes=10000)
+        self.version = 1
+        self.produced = 0
+        app = FastAPI()
+
+        @app.get("/items")
+        async def items(request: Request):
+            def produce():
+                self.produced += 1
+                return [{"n": i} for i in range(3)]
+            return await self.cache.respond(request, "u1", self.version, produce)
+
+        self.client = TestClient(app)
+
+    def test_not_modified_and_cache_hit(self):
+        first = self.client.get("/items")
+        self.assertEqual(first.json(), [{"n": 0}, {"n": 1}, {"n": 2}])
+        tag = first.headers["ETag"]
+        self.assertEqual(self.client.get("/items", headers={"If-None-Match": tag}).status_code, 304)
+        self.assertEqual(self.client.get("/items").json(), first.json())
+        self.assertEqual(self.produced, 1)
+        self.assertEqual(self.cache.counts, {"hit": 1, "miss": 1, "not_modified": 1})
+
+    def test_new_version_changes_tag(self):
+        tag = self.client.get("/items").headers["ETag"]
+        self.version = 2
+        response = self.client.get("/items", headers={"If-None-Match": tag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], tag)
+        self.assertEqual(self.produced, 2)
+
+    def test_eviction_and_invalidate(self):
+        for i in range(5):
+            self.cache.put("u1", f"k{i}", 1, b"x" * 3000)
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self.assertIsNone(self.cache.get("u1", "k0", 1))
+        self.assertIsNotNone(self.cache.get("u1", "k4", 1))
+        self.cache.put("u2", "k", 1, b"y")
+        self.cache.invalidate("u1")
+        self.assertEqual((self.cache.stats()["entries"], self.cache.stats()["bytes"]), (1, 1))
+
+    def test_matches(self):
+        self.assertTrue(matches('"a", W/"b"', 'W/"b"'))
+        self.assertTrue(matches('*', 'W/"b"'))
+        self.assertFalse(matches('W/"c"', 'W/"b"'))
+
+class TestIndexLists(unittest.TestCase):
+    def setUp(self):
+        api.database._supabase_client = FakeSupabase({'businesses': [
+            {'id': 1, 'user_id': 'u1', 'name': 'a', 'status': 'tocall'},
+            {'id': 2, 'user_id': 'u1', 'name': 'b', 'status': 'callback'},
+        ]})
+        self.client = TestClient(api.index.app, headers={'x-user-id': 'u1'})
+
+    def tearDown(self):
+        api.database._supabase_client = None
+
+    def test_write_changes_etag(self):
+        first = self.client.get('/api/businesses')
+        self.assertEqual(len(first.json()), 2)
+        tag = first.headers['ETag']
+        self.assertEqual(self.client.get('/api/businesses', headers={'If-None-Match': tag}).status_code, 304)
+        self.client.put('/api/businesses/1', json={'status': 'called'})
+        changed = self.client.get('/api/businesses', headers={'If-None-Match': tag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['status'], 'called')
+        # Opening-hours lists depend on the clock and are not tagged
+        self.assertNotIn('ETag', self.client.get('/api/businesses', params={'open_now': True}).headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import logging
+import unittest
+from api.metrics import Histogram, JsonFormatter, OPERATION_SECONDS, render, timed
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test', ('route',), buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(seconds, route='/a')
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{route="/a",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{route="/a",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{route="/a",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{route="/a"} 4', lines)
+        self.assertIn('test_seconds_sum{route="/a"} 3.650000', lines)
+
+    def test_timed_records_sync_and_async_calls(self):
+        @timed('test', 'sync_op')
+        def sync_op():
+            raise ValueError
+
+        @timed('test')
+        async def async_op():
+            return 1
+
+        with self.assertRaises(ValueError):
+            sync_op()
+        self.assertEqual(asyncio.run(async_op()), 1)
+        text = render()
+        self.assertIn('operation_duration_seconds_count{system="test",operation="sync_op",outcome="error"} 1', text)
+        self.assertIn('operation_duration_seconds_count{system="test",operation="async_op",outcome="ok"} 1', text)
+
+    def test_json_log_lines(self):
+        record = logging.LogRecord('access', logging.INFO, __file__, 1, 'request %s', ('x',), None)
+        record.fields = {'status': 200}
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['level'], entry['msg'], entry['status']), ('info', 'request x', 200))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import migrate_excel
+
+class TestMigrateExcel(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.saved_env = {name: os.environ.get(name) for name in ('SUPABASE_URL', 'SUPABASE_KEY', 'MIGRATION_USER_ID')}
+        os.environ.update({'SUPABASE_URL': 'http://supabase.test', 'SUPABASE_KEY': 'key', 'MIGRATION_USER_ID': 'u1'})
+        self.saved_post_chunk = migrate_excel.post_chunk
+        migrate_excel.post_chunk = self.post_chunk
+        # businesses, upserted on the natural key as PostgREST does with on_conflict
+        self.table = {}
+        self.posts = []
+        self.fail = set()
+        self.excel_file = 'places.xlsx'
+        pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi', 'Golden Dragon', '', 'Maple Bistro'],
+            'Number': [6045550001, 6045550002, 6045550001, 6045550009, 6045550003],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC', '1 Main St, Vancouver, BC',
+                        '', '3 Elm St, Surrey, BC'],
+            'Status': ['tocall', 'called', 'client', 'tocall', 'lead'],
+            'Lead Score': [5, 6, 9, 1, None],
+        }).to_excel(self.excel_file, index=False)
+
+    def tearDown(self):
+        migrate_excel.post_chunk = self.saved_post_chunk
+        for name, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def post_chunk(self, session, url, records):
+        names = [record['name'] for record in records]
+        self.posts.append(names)
+        if tuple(names) in self.fail:
+            self.fail.discard(tuple(names))
+            raise RuntimeError('HTTP 503: unavailable')
+        for record in records:
+            self.table[tuple(record[column] for column in migrate_excel.NATURAL_KEY)] = record
+
+    def migrate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate_excel.migrate_excel_to_supabase(self.excel_file, chunk_size=2, workers=1,
+                                                    checkpoint_file='checkpoint.json')
+
+    def rows(self):
+        return sorted((record['name'], record['phone'], record['status'], record['lead_score'], record['region'])
+                      for record in self.table.values())
+
+    def test_natural_key_upsert(self):
+        self.migrate()
+        # The last row of a repeated key wins; rows without a name are skipped
+        self.assertEqual(self.rows(), [
+            ('Blue Sushi', '6045550002', 'called', 6, 'Burnaby'),
+            ('Golden Dragon', '6045550001', 'client', 9, 'Vancouver'),
+            ('Maple Bistro', '6045550003', 'lead', 0, 'Surrey'),
+        ])
+        self.assertEqual(self.posts, [['Blue Sushi'], ['Golden Dragon'], ['Maple Bistro']])
+        self.assertFalse(os.path.exists('checkpoint.json'))
+        first = self.rows()
+        self.migrate()
+        self.assertEqual(self.rows(), first)
+
+    def test_rerun_resumes_from_checkpoint(self):
+        self.fail.add(('Golden Dragon',))
+        self.migrate()
+        self.assertTrue(os.path.exists('checkpoint.json'))
+        self.assertEqual(len(self.table), 2)
+        self.posts.clear()
+        self.migrate()
+        # Only the failed chunk is sent again
+        self.assertEqual(self.posts, [['Golden Dragon']])
+        self.assertEqual(len(self.table), 3)
+        self.assertFalse(os.path.exists('checkpoint.json'))
+
+    def test_checkpoint_of_another_sheet_is_ignored(self):
+        self.fail.add(('Golden Dragon',))
+        self.migrate()
+        pd.read_excel(self.excel_file).head(2).to_excel(self.excel_file, index=False)
+        self.posts.clear()
+        self.migrate()
+        self.assertEqual(self.posts, [['Golden Dragon', 'Blue Sushi']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+import unittest
+from outbound import Cancelled, Client, DeadlineExceeded, Executor, Overloaded
+
+class FakeClient:
+    def place(self, place_id):
+        return {'result': {'place_id': place_id}}
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = Executor('test', workers=1, max_queue=1, timeout=0.2)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_full_queue_is_rejected(self):
+        self.executor.submit(self.release.wait)      # running
+        waiting = self.executor.submit(time.sleep, 0)  # queued
+        with self.assertRaises(Overloaded):
+            self.executor.submit(time.sleep, 0)
+        self.release.set()
+        waiting.result()
+        self.assertEqual(self.executor.stats()['rejected'], 1)
+
+    def test_calls_past_their_deadline_are_not_run(self):
+        calls = []
+        self.executor.submit(self.release.wait)
+        late = self.executor.submit(calls.append, 1)
+        time.sleep(0.25)
+        self.release.set()
+        with self.assertRaises(DeadlineExceeded):
+            late.result()
+        self.assertEqual(calls, [])
+        with self.assertRaises(DeadlineExceeded):
+            self.executor.call(time.sleep, 0.5)
+
+    def test_cancelled_client_makes_no_calls(self):
+        cancel = threading.Event()
+        client = Client(FakeClient(), self.executor, cancel)
+        self.assertEqual(client.place('a'), {'result': {'place_id': 'a'}})
+        cancel.set()
+        with self.assertRaises(Cancelled):
+            client.place('b')
+        self.assertEqual(self.executor.stats()['completed'], 1)
+
+    def test_run_awaits_with_a_deadline(self):
+        self.assertEqual(asyncio.run(self.executor.run(sum, [1, 2])), 3)
+        with self.assertRaises(DeadlineExceeded):
+            asyncio.run(self.executor.run(self.release.wait))
+
+if __name__ == '__main__':
+    unittest.main()
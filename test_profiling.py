@@ -0,0 +1,63 @@
+import marshal
+import unittest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api import profiling
+
+def slow_sum(n):
+    return sum(i * i for i in range(n))
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(profiling.settings), profiling.TOKEN
+        profiling._profiles.clear()
+        app = FastAPI()
+
+        @app.get("/items/{name}")
+        async def item(name: str):
+            return {"name": name, "total": slow_sum(20000)}
+
+        profiling.install(app)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        profiling.settings.update(self.saved[0])
+        profiling.TOKEN = self.saved[1]
+        profiling._profiles.clear()
+
+    def test_off_by_default(self):
+        profiling.update_settings(enabled=False, sample_rate=0)
+        response = self.client.get("/items/a", headers={"X-Profile": "1"})
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_header_captures_profile_when_enabled(self):
+        profiling.update_settings(enabled=True, sample_rate=0)
+        self.assertNotIn("X-Profile-Id", self.client.get("/items/a").headers)
+        response = self.client.get("/items/b", headers={"X-Profile": "1"})
+        profile_id = response.headers["X-Profile-Id"]
+        [listed] = profiling.list_profiles()
+        self.assertEqual((listed["id"], listed["route"], listed["path"], listed["status"]),
+                         (profile_id, "/items/{name}", "/items/b", 200))
+        profile = profiling.get_profile(profile_id)
+        self.assertIn("slow_sum", profile["text"])
+        self.assertTrue(any(func[2] == "slow_sum" for func in marshal.loads(profile["pstats"])))
+
+    def test_token_works_while_disabled(self):
+        profiling.update_settings(enabled=False)
+        profiling.TOKEN = "secret"
+        self.assertNotIn("X-Profile-Id", self.client.get("/items/a", headers={"X-Profile": "wrong"}).headers)
+        self.assertIn("X-Profile-Id", self.client.get("/items/a", headers={"X-Profile": "secret"}).headers)
+
+    def test_sampling_and_ring_buffer(self):
+        profiling.update_settings(enabled=True, sample_rate=1)
+        for i in range(profiling.KEEP + 5):
+            self.client.get(f"/items/{i}")
+        profiles = profiling.list_profiles()
+        self.assertEqual(len(profiles), profiling.KEEP)
+        self.assertEqual(profiles[0]["path"], f"/items/{profiling.KEEP + 4}")
+        with self.assertRaises(ValueError):
+            profiling.update_settings(sample_rate=2)
+
+if __name__ == '__main__':
+    unittest.main()
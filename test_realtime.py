@@ -0,0 +1,75 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+import api.database
+import api.index
+from api import realtime
+from benchmarks import run
+from benchmarks.fakes import FakeSupabase
+
+class TestHub(unittest.TestCase):
+    def test_publish_wakes_subscribers_of_the_scope(self):
+        async def scenario():
+            hub = realtime.Hub()
+            mine, other = hub.subscribe('u1'), hub.subscribe('u2')
+            hub.publish('u1')
+            woken = await mine.wait(0.1), await other.wait(0.05)
+            # Woken once per publish burst
+            again = await mine.wait(0.05)
+            mine.close()
+            return woken, again, hub.count()
+        self.assertEqual(asyncio.run(scenario()), ((True, False), False, 1))
+
+class TestEventStream(unittest.TestCase):
+    def setUp(self):
+        self.saved = realtime.POLL_SECONDS, realtime.STREAM_SECONDS
+        realtime.POLL_SECONDS, realtime.STREAM_SECONDS = 0.05, 0.3
+        api.database._supabase_client = FakeSupabase({'businesses': [
+            {'id': 1, 'user_id': 'u1', 'name': 'a', 'status': 'tocall', 'updated_at': '2024-01-01T00:00:00+00:00'},
+            {'id': 2, 'user_id': 'u1', 'name': 'b', 'status': 'tocall', 'updated_at': '2024-01-01T00:00:00+00:00'},
+        ]})
+        self.client = TestClient(api.index.app, headers={'x-user-id': 'u1'})
+
+    def tearDown(self):
+        realtime.POLL_SECONDS, realtime.STREAM_SECONDS = self.saved
+        api.database._supabase_client = None
+
+    def events(self, **params):
+        response = self.client.get('/api/businesses/events', params=params)
+        self.assertEqual(response.headers['content-type'].split(';')[0], 'text/event-stream')
+        frames = [frame for frame in response.text.split('\n\n') if frame.startswith('id:')]
+        return [dict(line.split(': ', 1) for line in frame.split('\n')) for frame in frames]
+
+    def test_stream_sends_changes_after_cursor(self):
+        head = self.client.get('/api/businesses/changes').json()['cursor']
+        self.assertEqual(self.events(since=head), [])
+        self.client.put('/api/businesses/2', json={'status': 'called'})
+        [event] = self.events(since=head)
+        self.assertEqual(event['event'], 'changes')
+        delta = json.loads(event['data'])
+        self.assertEqual([(row['id'], row['status']) for row in delta['changes']], [(2, 'called')])
+        self.assertEqual(event['id'], delta['cursor'])
+
+class TestLocalWebSocket(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        root = tempfile.mkdtemp()
+        run.prepare_environment(root)
+        self.ws = run.Workspace(root, 10)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_update_is_pushed(self):
+        name = self.ws.names[0]
+        with self.ws.local.websocket_connect('/api/ws/businesses') as socket:
+            self.ws.local.put(f'/api/businesses/{name}', json={'status': 'called'})
+            message = socket.receive_json()
+        self.assertEqual([(row['name'], row['status']) for row in message['changes']], [(name, 'called')])
+        self.assertEqual(realtime.hub.count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
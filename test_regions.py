@@ -0,0 +1,81 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault('GOOGLE_API_KEY', 'test')
+
+import call_history
+import call_tracker as ct
+import change_journal
+
+def local_api():
+    """The top-level api.py module (the api/ package shadows it as a module name)."""
+    module = sys.modules.get('local_api')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('local_api', os.path.join(ROOT, 'api.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['local_api'] = module
+        spec.loader.exec_module(module)
+    return module
+
+class TestRegions(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.saved_history_db = call_history.HISTORY_DB
+        call_history.HISTORY_DB = os.path.join(self.tmp, 'history.db')
+        self.api = local_api()
+        self.reset_caches()
+        # One region is set by hand; the others are backfilled from the address on load
+        pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi', 'Maple Bistro', 'Corner Cafe'],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC',
+                        '3 Elm St, Vancouver, BC V5K 0A1', '4 Pine Rd, Surrey, BC'],
+            'Region': ['', None, '', 'White Rock '],
+            'Status': ['tocall', 'tocall', 'called', 'tocall'],
+        }).to_excel(ct.EXCEL_FILE, index=False)
+        self.client = TestClient(self.api.app)
+
+    def tearDown(self):
+        conn = getattr(call_history._local, 'connections', {}).pop(call_history.HISTORY_DB, None)
+        if conn is not None:
+            conn.close()
+        call_history.HISTORY_DB = self.saved_history_db
+        self.reset_caches()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def reset_caches(self):
+        ct._frames.clear()
+        change_journal._last_seq.clear()
+        change_journal._pending.clear()
+        self.api._region_cache.clear()
+
+    def names(self, **params):
+        return [row['name'] for row in self.client.get('/api/businesses/filter', params=params).json()]
+
+    def test_regions_are_backfilled_on_load(self):
+        df = ct.load_data()
+        self.assertEqual(list(df['Region']), ['Vancouver', 'Burnaby', 'Vancouver', 'White Rock '])
+
+    def test_filter_by_region(self):
+        self.assertEqual(self.names(region=' vancouver'), ['Golden Dragon', 'Maple Bistro'])
+        self.assertEqual(self.names(region='WHITE ROCK'), ['Corner Cafe'])
+        self.assertEqual(self.names(region='Vancouver', status='called'), ['Maple Bistro'])
+        self.assertEqual(self.names(region='Richmond'), [])
+
+    def test_filter_follows_address_changes(self):
+        self.assertEqual(self.names(region='Burnaby'), ['Blue Sushi'])
+        self.client.put('/api/businesses/2', json={'address': '9 King St, Richmond, BC'})
+        self.assertEqual(self.names(region='Burnaby'), [])
+        self.assertEqual(self.names(region='Richmond'), ['Blue Sushi'])
+
+if __name__ == '__main__':
+    unittest.main()
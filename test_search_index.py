@@ -0,0 +1,44 @@
+import unittest
+import pandas as pd
+from search_index import TrigramIndex
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Name': ['Golden Dragon', 'Blue Sushi House', 'Maple Bistro'],
+            'Address': ['1 Main St, Vancouver, BC', '2 Oak Ave, Burnaby, BC', '3 Pine Rd, Surrey, BC'],
+            'Comments': ['', 'Owner prefers mornings', ''],
+            'DecisionMaker': ['', '', 'Maria Garcia']
+        })
+        self.index = TrigramIndex(self.df)
+
+    def names(self, query):
+        return [self.df.iloc[position]['Name'] for position, _ in self.index.search(query)]
+
+    def test_exact_match_ranks_first(self):
+        self.assertEqual(self.names("golden dragon")[0], 'Golden Dragon')
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.names("goldn dragn")[0], 'Golden Dragon')
+        self.assertEqual(self.names("burnby")[0], 'Blue Sushi House')
+
+    def test_prefix_match(self):
+        self.assertEqual(self.names("sush")[0], 'Blue Sushi House')
+
+    def test_searches_comments_and_decision_maker(self):
+        self.assertEqual(self.names("mornings")[0], 'Blue Sushi House')
+        self.assertEqual(self.names("garcia")[0], 'Maple Bistro')
+
+    def test_name_outranks_address(self):
+        df = pd.DataFrame({
+            'Name': ['Corner Cafe', 'Surrey Grill'],
+            'Address': ['1 Surrey Rd', '2 Main St']
+        })
+        index = TrigramIndex(df)
+        self.assertEqual(index.search("surrey")[0][0], 1)
+
+    def test_no_match(self):
+        self.assertEqual(self.names("zzzzqqq"), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import status_normalizer
+from status_normalizer import ALIASES_FILE_ENV, STATUS_DTYPE, normalize_statuses, status_mask
+
+class TestStatusNormalizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.aliases_file = os.path.join(self.tmp, 'aliases.json')
+        with open(self.aliases_file, 'w') as f:
+            json.dump({'Voicemail': 'callback', 'signed': 'client'}, f)
+        self.saved_env = os.environ.get(ALIASES_FILE_ENV)
+        os.environ[ALIASES_FILE_ENV] = self.aliases_file
+        self.reset()
+
+    def tearDown(self):
+        if self.saved_env is None:
+            os.environ.pop(ALIASES_FILE_ENV, None)
+        else:
+            os.environ[ALIASES_FILE_ENV] = self.saved_env
+        self.reset()
+        shutil.rmtree(self.tmp)
+
+    def reset(self):
+        status_normalizer._aliases = None
+        status_normalizer._status_map.clear()
+        status_normalizer._unmapped.clear()
+
+    def test_alias_file_is_the_default_mapping(self):
+        series = pd.Series(['voicemail ', 'SIGNED', 'Call Back', 'called', None])
+        result = normalize_statuses(series)
+        self.assertEqual(result.dtype, STATUS_DTYPE)
+        self.assertEqual(list(result), ['callback', 'client', 'callback', 'called', 'tocall'])
+        self.assertEqual(list(status_mask(series, 'voicemail')), [True, False, True, False, False])
+
+    def test_alias_file_is_read_once(self):
+        normalize_statuses(pd.Series(['voicemail']))
+        os.remove(self.aliases_file)
+        self.assertEqual(list(normalize_statuses(pd.Series(['signed']))), ['client'])
+
+    def test_alias_file_rejects_unknown_statuses(self):
+        with open(self.aliases_file, 'w') as f:
+            json.dump({'maybe': 'perhaps'}, f)
+        with self.assertRaises(ValueError):
+            normalize_statuses(pd.Series(['maybe']))
+
+    def test_unmapped_values_fall_back_once(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            first = normalize_statuses(pd.Series(['zzz', 'called', 'zzz']))
+            second = normalize_statuses(pd.Series(['zzz']))
+        self.assertEqual(list(first), ['tocall', 'called', 'tocall'])
+        self.assertEqual(list(second), ['tocall'])
+        self.assertEqual(output.getvalue().count("No match found for status 'zzz'"), 1)
+        self.assertEqual(status_normalizer.unmapped_statuses(), ['zzz'])
+        self.assertFalse(status_mask(pd.Series(['zzz']), 'zzz').any())
+
+if __name__ == '__main__':
+    unittest.main()